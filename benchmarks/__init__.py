@@ -0,0 +1,5 @@
+"""
+    Micro benchmarks for performance sensitive parts of instl.
+    Benchmarks are not part of the test suite, each module can be run from the instl folder, e.g.:
+        python -m benchmarks.bench_checksum
+"""
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3.9
+
+"""
+    Compare throughput and peak memory of utils.get_file_checksum (chunked read)
+    with the previous implementation that read the whole file to memory before hashing.
+    Usage:
+        python -m benchmarks.bench_checksum [--sizes 1K 1M 64M 1G 4G] [--buffer-size 1M] [--folder /tmp]
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+
+
+size_suffixes = {"K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def size_from_str(size_str):
+    retVal = int(size_str[:-1]) * size_suffixes[size_str[-1].upper()] if size_str[-1].upper() in size_suffixes else int(size_str)
+    return retVal
+
+
+def whole_file_checksum(file_path):
+    """ the implementation of utils.get_file_checksum before chunked reading """
+    with open(file_path, "rb") as rfd:
+        retVal = utils.get_buffer_checksum(rfd.read())
+    return retVal
+
+
+def chunked_file_checksum(file_path):
+    return utils.get_file_checksum(file_path)
+
+
+def create_test_file(folder, size):
+    file_path = os.path.join(folder, f"checksum_bench_{size}.bin")
+    chunk = os.urandom(min(size, 1024**2))
+    with open(file_path, "wb") as wfd:
+        remaining = size
+        while remaining > 0:
+            wfd.write(chunk[:remaining])
+            remaining -= len(chunk)
+    return file_path
+
+
+def measure(checksum_func, file_path):
+    tracemalloc.start()
+    with utils.Timer_CM(checksum_func.__name__, print_results=False) as timer:
+        checksum = checksum_func(file_path)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return checksum, float(timer.elapsed), peak_memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark file checksum calculation")
+    parser.add_argument("--sizes", nargs="+", default=["1K", "1M", "64M", "1G"])
+    parser.add_argument("--buffer-size", default="1M")
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    utils.misc_utils.checksum_read_buffer_size = size_from_str(args.buffer_size)
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        print(f"{'size':>6} {'function':<24} {'seconds':>10} {'MB/sec':>10} {'peak MB':>10}")
+        for size_str in args.sizes:
+            size = size_from_str(size_str)
+            file_path = create_test_file(temp_folder, size)
+            checksums = set()
+            for checksum_func in (whole_file_checksum, chunked_file_checksum):
+                checksum, seconds, peak_memory = measure(checksum_func, file_path)
+                checksums.add(checksum)
+                throughput = size / (1024**2) / seconds if seconds else float("inf")
+                print(f"{size_str:>6} {checksum_func.__name__:<24} {seconds:>10.4f} {throughput:>10.1f} {peak_memory / 1024**2:>10.2f}")
+            assert len(checksums) == 1, f"checksums differ for {size_str}: {checksums}"
+            os.remove(file_path)
+
+
+if __name__ == "__main__":
+    main()
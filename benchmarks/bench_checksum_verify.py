@@ -0,0 +1,65 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure wall clock time of CheckDownloadFolderChecksum verifying a download folder with different number of worker threads.
+    Files are read from the OS page cache after the first run, so the numbers show hashing throughput, not disk throughput.
+    Usage:
+        python -m benchmarks.bench_checksum_verify [--num-files 64] [--file-size 16777216] [--workers 1 2 4 8] [--folder /tmp]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from configVar import config_vars
+from pybatch import CheckDownloadFolderChecksum
+
+
+def create_download_folder(download_folder: Path, num_files, file_size):
+    """ create num_files random files, return a list of file items as returned by SVNTable.get_download_items """
+    retVal = list()
+    download_folder.mkdir(parents=True)
+    for file_num in range(num_files):
+        file_path = download_folder.joinpath(f"file_{file_num:04}.bin")
+        file_path.write_bytes(os.urandom(file_size))
+        retVal.append(SimpleNamespace(download_path=os.fspath(file_path), checksum=utils.get_file_checksum(file_path)))
+    return retVal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark CheckDownloadFolderChecksum with parallel worker threads")
+    parser.add_argument("--num-files", type=int, default=64)
+    parser.add_argument("--file-size", type=int, default=16 * 1024 * 1024)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        download_folder = Path(temp_folder, "download")
+        file_items = create_download_folder(download_folder, args.num_files, args.file_size)
+        total_mb = args.num_files * args.file_size / (1024 * 1024)
+        print(f"{args.num_files} files, {total_mb:.1f}MB, {os.cpu_count()} cpus")
+        print(f"{'workers':>8} {'seconds':>10} {'MB/sec':>10} {'speedup':>8}")
+        config_vars["LOCAL_SYNC_DIR"] = download_folder
+        info_map_table = SimpleNamespace(get_download_items=lambda what: file_items)
+        serial_time = None
+        with mock.patch.object(CheckDownloadFolderChecksum, "info_map_table", info_map_table, create=True):
+            for num_workers in args.workers:
+                config_vars["NUM_CHECKSUM_WORKERS"] = num_workers
+                with CheckDownloadFolderChecksum(report_own_progress=False) as checker:
+                    with utils.Timer_CM("verify", print_results=False) as timer:
+                        checker()
+                assert checker.is_checksum_ok()
+                verify_time = float(timer.elapsed)
+                serial_time = serial_time or verify_time
+                print(f"{num_workers:>8} {verify_time:>10.3f} {total_mb / verify_time:>10.1f} {serial_time / verify_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
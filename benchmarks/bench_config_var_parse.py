@@ -0,0 +1,76 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure parse throughput of configVar.configVarParser.var_parse_imp vs. var_parse_imp_by_char,
+    the character by character parser that was used before.
+    Parsed text:
+        batch: synthetic lines in the form of a batch script created by PythonBatchCommandAccum before resolving,
+            with plain, array and parameterized references, and a few references with parenthesis or unterminated.
+        defaults: the lines of defaults/*.yaml.
+    Usage:
+        python -m benchmarks.bench_config_var_parse [--num-items 2000] [--repeat 3]
+"""
+
+import os
+import sys
+import random
+import argparse
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from configVar.configVarParser import var_parse_imp, var_parse_imp_by_char
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+
+
+def generate_batch_script_lines(num_items, seed=17):
+    """ return lines similar to a batch script of copying num_items items, before resolving """
+    rand = random.Random(seed)
+    retVal = list()
+    for item_num in range(num_items):
+        name = f"P{item_num:05}"
+        retVal.extend((
+            f'with Stage(r"copy", r"{name}_IID: Product {item_num} v$(VERSION_{name})", prog_num={item_num * 5}):',
+            f'    CopyDirToDir(r"$(COPY_SOURCES_ROOT_DIR)/Mac/Products/{name}/{name}.bundle", r"$(__INSTALL_FOLDER__)/$(VENDOR_DIR_NAME)", hard_links=False, prog_num={item_num * 5 + 1})',
+            f'    Chmod(path=r"$(__INSTALL_FOLDER__)/$(VENDOR_DIR_NAME)/{name}.bundle", mode="a+rwX", recursive=True, prog_num={item_num * 5 + 2})',
+            f'    ShellCommand(r"$(SET_ICON_TOOL_PATH) $(__INSTALL_FOLDER__)/{name}.bundle $(ICON_PATH<{name}, size={rand.choice((32, 64, 128))}>)", prog_num={item_num * 5 + 3})',
+            f'    Echo(r"done $(PRODUCTS[{rand.randint(0, 9)}]) 100% ($(TIME))", prog_num={item_num * 5 + 4})',
+        ))
+        if rand.random() < 0.05:  # references parsed character by character
+            retVal.append(f'    ShellCommand(r"$(PROGRAM_FILES(X86))/{name} $$ $(UNTERMINATED")')
+    return retVal
+
+
+def time_parse(parse_func, lines, repeat):
+    best_time = None
+    for _ in range(repeat):
+        with utils.Timer_CM(parse_func.__name__, print_results=False) as timer:
+            for line in lines:
+                for _ in parse_func(line):
+                    pass
+        best_time = min(best_time or float(timer.elapsed), float(timer.elapsed))
+    return best_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark configVar string parsing")
+    parser.add_argument("--num-items", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = {"batch": generate_batch_script_lines(args.num_items),
+             "defaults": [line for yaml_path in sorted(defaults_folder.glob("*.yaml")) for line in yaml_path.read_text().splitlines()]}
+
+    print(f"{'text':<9} {'lines':>7} {'MB':>6} {'by char MB/s':>13} {'new MB/s':>9} {'speedup':>8}")
+    for text_name, lines in texts.items():
+        for line in lines:
+            assert list(var_parse_imp(line)) == list(var_parse_imp_by_char(line)), line
+        mb = sum(len(line) for line in lines) / (1024 * 1024)
+        by_char_time = time_parse(var_parse_imp_by_char, lines, args.repeat)
+        new_time = time_parse(var_parse_imp, lines, args.repeat)
+        print(f"{text_name:<9} {len(lines):>7} {mb:>6.2f} {mb / by_char_time:>13.2f} {mb / new_time:>9.2f} {by_char_time / new_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
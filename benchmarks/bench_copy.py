@@ -0,0 +1,68 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure RsyncClone throughput with different number of file copy workers.
+    A tree of small files is created and copied to a fresh destination (copy and hard link),
+    then copied again over the existing destination (files are skipped after stat).
+    Usage:
+        python -m benchmarks.bench_copy [--num-files 20000] [--file-size 16384] [--workers 1 2 4 8 16] [--folder /tmp] [--dst-folder /mnt/share]
+    use --dst-folder to measure copy to a different disk or a network share.
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from pybatch import RsyncClone
+
+
+def create_source_tree(src_folder: Path, num_files, file_size, files_per_folder=50):
+    data = os.urandom(file_size)
+    for file_num in range(num_files):
+        folder = src_folder.joinpath(f"folder_{file_num // (files_per_folder * 20):03}", f"sub_{(file_num // files_per_folder) % 20:02}")
+        if file_num % files_per_folder == 0:
+            folder.mkdir(parents=True, exist_ok=True)
+        folder.joinpath(f"file_{file_num:07}.bin").write_bytes(data)
+
+
+def time_copy(src, dst, num_workers, hard_links):
+    with RsyncClone(src, dst, hard_links=hard_links, num_workers=num_workers, report_own_progress=False) as copier:
+        with utils.Timer_CM("copy", print_results=False) as timer:
+            copier()
+    return float(timer.elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark RsyncClone with parallel file copy workers")
+    parser.add_argument("--num-files", type=int, default=20_000)
+    parser.add_argument("--file-size", type=int, default=16 * 1024)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--folder", default=None, help="where to create the source tree")
+    parser.add_argument("--dst-folder", default=None, help="where to copy to, default is next to the source")
+    args = parser.parse_args()
+
+    total_mb = args.num_files * args.file_size / (1024 * 1024)
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder, tempfile.TemporaryDirectory(dir=args.dst_folder or args.folder) as dst_temp_folder:
+        src = Path(temp_folder, "source")
+        with utils.Timer_CM("create", print_results=False) as timer:
+            create_source_tree(src, args.num_files, args.file_size)
+        print(f"created {args.num_files} files, {total_mb:.1f}MB in {float(timer.elapsed):.3f}s")
+        print(f"{'workers':>8} {'copy':>10} {'files/s':>10} {'MB/s':>8} {'recopy':>10} {'hard link':>10}")
+        for num_workers in args.workers:
+            dst = Path(dst_temp_folder, f"copy_{num_workers}")
+            copy_time = time_copy(src, dst, num_workers, hard_links=False)
+            recopy_time = time_copy(src, dst, num_workers, hard_links=False)
+            shutil.rmtree(dst)
+            link_dst = Path(temp_folder, f"link_{num_workers}")  # hard links must be on the same volume as the source
+            link_time = time_copy(src, link_dst, num_workers, hard_links=True)
+            shutil.rmtree(link_dst)
+            print(f"{num_workers:>8} {copy_time:>9.3f}s {args.num_files / copy_time:>10.0f} {total_mb / copy_time:>8.1f} {recopy_time:>9.3f}s {link_time:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
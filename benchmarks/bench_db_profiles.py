@@ -0,0 +1,65 @@
+#!/usr/bin/env python3.9
+
+"""
+    Compare DBMaster performance profiles on file backed and in-memory databases
+    by timing the bulk insert of SVNTable.read_from_text, index creation and a few typical queries.
+    Usage:
+        python -m benchmarks.bench_db_profiles [--num-files 100000] [--folder /tmp]
+"""
+
+import io
+import os
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from db.dbMaster import DBMaster
+from svnTree import SVNTable
+from benchmarks.synthetic_data import generate_info_map_text
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+
+
+def run_one(db_url, profile, info_map_text):
+    timings = dict()
+    db = DBMaster(db_url, defaults_folder, performance_profile=profile)
+    table = SVNTable(db)
+    rfd = io.StringIO(info_map_text)
+    rfd.name = "synthetic_info_map.txt"
+    with utils.Timer_CM("read_from_text", print_results=False) as timer:
+        table.read_from_text(rfd)
+    timings["read_from_text"] = float(timer.elapsed)
+    with utils.Timer_CM("create_indexes", print_results=False) as timer:
+        table.create_indexes()
+    timings["create_indexes"] = float(timer.elapsed)
+    with utils.Timer_CM("queries", print_results=False) as timer:
+        table.mark_required_for_dir("Mac/Product_0001.bundle")
+        table.mark_required_completion()
+        table.get_required_items()
+        table.num_items("all-files")
+    timings["queries"] = float(timer.elapsed)
+    db.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark DBMaster performance profiles")
+    parser.add_argument("--num-files", type=int, default=100_000)
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    info_map_text = generate_info_map_text(args.num_files)
+    print(f"{'db':<8} {'profile':<16} {'read_from_text':>15} {'create_indexes':>15} {'queries':>10}")
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        for profile in DBMaster.performance_profiles:
+            for db_kind in ("memory", "file"):
+                db_url = ":memory:" if db_kind == "memory" else os.path.join(temp_folder, f"bench_{profile}.sqlite")
+                timings = run_one(db_url, profile, info_map_text)
+                print(f"{db_kind:<8} {profile:<16} {timings['read_from_text']:>15.3f} {timings['create_indexes']:>15.3f} {timings['queries']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
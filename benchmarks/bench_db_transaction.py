@@ -0,0 +1,69 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure the overhead of opening DBMaster transactions and selections without a description, as done in tight loops
+    by SVNTable and IndexItemsTable, with and without collecting statistics (config var PRINT_STATISTICS_DB).
+    For comparison also times naming each transaction with inspect.stack(), as was done before.
+    Usage:
+        python -m benchmarks.bench_db_transaction [--num-calls 10000] [--print-statistics]
+"""
+
+import io
+import os
+import sys
+import inspect
+import argparse
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from configVar import config_vars
+from db.dbMaster import DBMaster
+from svnTree import SVNTable
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+
+
+def update_one_item(db, _id):
+    with db.transaction() as curs:
+        curs.execute("UPDATE svn_item_t SET required=1 WHERE _id == ?", (_id,))
+
+
+def select_one_item(db, _id):
+    with db.selection() as curs:
+        return curs.execute("SELECT path FROM svn_item_t WHERE _id == ?", (_id,)).fetchone()
+
+
+def update_one_item_with_inspect_stack(db, _id):
+    description = inspect.stack()[1][3]
+    with db.transaction(description) as curs:
+        curs.execute("UPDATE svn_item_t SET required=1 WHERE _id == ?", (_id,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark DBMaster transaction overhead")
+    parser.add_argument("--num-calls", type=int, default=10_000)
+    parser.add_argument("--print-statistics", action="store_true", default=False)
+    args = parser.parse_args()
+
+    db = DBMaster(":memory:", defaults_folder)
+    table = SVNTable(db)
+    rfd = io.StringIO("Mac, d, 1\nMac/file.txt, f, 1, 0123456789abcdef0123456789abcdef01234567, 17\n")
+    rfd.name = "tiny_info_map.txt"
+    table.read_from_text(rfd)
+
+    print(f"{'':<34} {'collect_statistics':>18} {'seconds':>9} {'us/call':>9}")
+    for func in (update_one_item, select_one_item, update_one_item_with_inspect_stack):
+        for collect_statistics in (False, True):
+            config_vars["PRINT_STATISTICS_DB"] = "yes" if collect_statistics else "no"
+            with utils.Timer_CM(func.__name__, print_results=False) as timer:
+                for _ in range(args.num_calls):
+                    func(db, 1)
+            seconds = float(timer.elapsed)
+            print(f"{func.__name__:<34} {str(collect_statistics):>18} {seconds:>9.3f} {seconds / args.num_calls * 1_000_000:>9.1f}")
+    if args.print_statistics:
+        print("\n".join(db.statistics_report()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3.9
+
+"""
+    Compare downloading many small files with curl config files (DOWNLOAD_ENGINE: curl)
+    and with the in-process ParallelDownloader (DOWNLOAD_ENGINE: python).
+    Files are served by a local http.server, so the numbers show per file overhead
+    (process start-up, connection set-up) and not network speed.
+    Usage:
+        python -m benchmarks.bench_download_engine [--num-files 2000] [--file-size 4096] [--parallel 16]
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+import tempfile
+import functools
+import threading
+import subprocess
+import http.server
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from configVar import config_vars
+from pybatch import ParallelDownloader
+from pyinstl.curlHelper import CUrlHelper
+
+
+class QuietHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHTTPRequestHandler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_server_files(server_folder, num_files, file_size):
+    retVal = dict()
+    for i in range(num_files):
+        contents = hashlib.sha1(str(i).encode()).digest() * (file_size // 20 + 1)
+        contents = contents[:file_size]
+        file_name = f"file_{i:06}.bin"
+        Path(server_folder, file_name).write_bytes(contents)
+        retVal[file_name] = hashlib.sha1(contents).hexdigest()
+    return retVal
+
+
+def download_list(base_url, checksums, download_folder):
+    return [(f"{base_url}/{name}", os.path.join(download_folder, name), 0, checksum) for name, checksum in checksums.items()]
+
+
+def run_curl(the_list, config_folder, parallel):
+    config_vars["CURL_CONFIG_FILE_NAME"] = "dl"
+    dl_tool = CUrlHelper()
+    for url, path, size, checksum in the_list:
+        dl_tool.add_download_url(url, path, verbatim=True, size=size, checksum=checksum)
+    config_files = [config_file for config_file in dl_tool.create_config_files(Path(config_folder), parallel) if config_file is not None]
+    processes = [subprocess.Popen(["curl", "--config", os.fspath(config_file.path)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for config_file in config_files]
+    for process in processes:
+        process.wait()
+    return f"{len(config_files)} config files, {'internal' if dl_tool.is_internal_parallel_supported() else 'external'} parallel"
+
+
+def run_python(the_list, parallel):
+    failures = ParallelDownloader(num_workers=parallel, max_connections_per_host=parallel).download(the_list)
+    assert not failures, failures
+    return f"{parallel} threads"
+
+
+def verify(checksums, download_folder):
+    for name, checksum in checksums.items():
+        assert utils.get_file_checksum(os.path.join(download_folder, name)) == checksum, name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark curl vs. in-process download")
+    parser.add_argument("--num-files", type=int, default=2000)
+    parser.add_argument("--file-size", type=int, default=4096)
+    parser.add_argument("--parallel", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_folder:
+        server_folder = os.path.join(temp_folder, "server")
+        os.makedirs(server_folder)
+        checksums = create_server_files(server_folder, args.num_files, args.file_size)
+        server = start_server(server_folder)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"{'engine':<8} {'files':>8} {'seconds':>8}  details")
+        for engine in ("curl", "python"):
+            download_folder = os.path.join(temp_folder, f"download_{engine}")
+            the_list = download_list(base_url, checksums, download_folder)
+            with utils.Timer_CM(engine, print_results=False) as timer:
+                if engine == "curl":
+                    details = run_curl(the_list, temp_folder, args.parallel)
+                else:
+                    details = run_python(the_list, args.parallel)
+            verify(checksums, download_folder)
+            print(f"{engine:<8} {args.num_files:>8} {float(timer.elapsed):>8.3f}  {details}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
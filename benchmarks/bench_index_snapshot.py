@@ -0,0 +1,77 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure reading a synthetic index.yaml with IndexYamlReaderBase:
+        no snapshot: parsing and reading all documents, as done when USE_INDEX_SNAPSHOT_CACHE is false.
+        cold: same as no snapshot plus saving an IndexSnapshot.
+        warm: loading the !index documents from the IndexSnapshot saved by cold.
+    Each read is done to a fresh in memory db. Inheritance is not resolved since it is not part of the snapshot.
+    Usage:
+        python -m benchmarks.bench_index_snapshot [--num-items 1000 10000 50000] [--folder /tmp]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from configVar import config_vars
+from db.dbMaster import DBMaster
+from db.indexItemTable import IndexItemsTable
+from pyinstl import IndexYamlReaderBase
+from pyinstl.test.synthetic_index import generate_index_yaml_text
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+
+
+class BenchIndexYamlReader(IndexYamlReaderBase):
+    """ IndexYamlReaderBase with it's own in memory items table, instead of the one shared by DBManager instances """
+    def __init__(self, snapshot_folder) -> None:
+        super().__init__(config_vars)
+        self.snapshot_folder = snapshot_folder
+        self.own_items_table = IndexItemsTable(DBMaster(":memory:", defaults_folder))
+
+    @property
+    def items_table(self):
+        return self.own_items_table
+
+    def get_index_snapshot_folder(self):
+        return self.snapshot_folder
+
+
+def time_read(index_path, snapshot_folder, name):
+    reader = BenchIndexYamlReader(snapshot_folder)
+    with utils.Timer_CM(name, print_results=False) as timer:
+        reader.read_yaml_file(index_path)
+    num_details = reader.items_table.db.select_and_fetchall("SELECT COUNT(*) FROM index_item_detail_t")[0]
+    return float(timer.elapsed), num_details
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark reading index.yaml with and without IndexSnapshot")
+    parser.add_argument("--num-items", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    print(f"{'items':>8} {'details':>9} {'no snapshot':>12} {'cold':>9} {'warm':>9} {'speedup':>8} {'snapshot MB':>12}")
+    for num_items in args.num_items:
+        with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+            index_path = Path(temp_folder, "index.yaml")
+            # reading a big !index document is slow, so index is written in parts
+            index_path.write_text(generate_index_yaml_text(num_items, items_per_document=1000))
+            snapshot_folder = Path(temp_folder, "index_snapshots")
+
+            no_snapshot_time, num_details = time_read(index_path, None, "no snapshot")
+            cold_time, cold_num_details = time_read(index_path, snapshot_folder, "cold")
+            warm_time, warm_num_details = time_read(index_path, snapshot_folder, "warm")
+            assert num_details == cold_num_details == warm_num_details
+            snapshot_size = sum(snapshot.stat().st_size for snapshot in snapshot_folder.glob("*.sqlite"))
+            print(f"{num_items:>8} {num_details:>9} {no_snapshot_time:>12.3f} {cold_time:>9.3f} {warm_time:>9.3f}"
+                  f" {no_snapshot_time / warm_time:>7.1f}x {snapshot_size / (1024 * 1024):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
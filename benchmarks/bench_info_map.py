@@ -0,0 +1,404 @@
+#!/usr/bin/env python3.9
+
+"""
+    Benchmark suite for info_map read, query and write paths of SVNTable and InfoMapSplitWriter.
+    Synthetic info_map, svn info and svn props files are generated at the requested scales,
+    each stage is timed with utils.Timer_CM and it's peak python memory is measured with tracemalloc
+    (in a separate run, so tracing does not effect the timing).
+    Results are written as JSON, so runs can be compared with the compare command.
+    Usage:
+        python -m benchmarks.bench_info_map run [--num-files 10000 100000] [--stages ...] [--repeat 3] [--output results.json]
+        python -m benchmarks.bench_info_map compare baseline.json current.json [--threshold 0.1]
+    compare exits with 1 if any stage is slower (or uses more memory) than the baseline by more than the threshold.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from configVar import config_vars
+from db.dbMaster import DBMaster, DBManager
+from svnTree import SVNTable
+from pyinstl.curlHelper import CUrlHelper
+from benchmarks.synthetic_data import write_info_map_file, write_svn_info_file, write_props_file
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+results_format_version = 1
+
+
+class StageData(object):
+    """ synthetic files for one scale, created once and shared by all stages """
+    def __init__(self, folder, num_files):
+        self.folder = Path(folder)
+        self.num_files = num_files
+        self.info_map_path = self.folder.joinpath(f"info_map_{num_files}.txt")
+        self.svn_info_path = self.folder.joinpath(f"svn_info_{num_files}.txt")
+        self.props_path = self.folder.joinpath(f"props_{num_files}.txt")
+        write_info_map_file(self.info_map_path, num_files)
+        write_svn_info_file(self.svn_info_path, num_files)
+        write_props_file(self.props_path, num_files)
+
+
+def new_table():
+    return SVNTable(DBMaster(":memory:", defaults_folder))
+
+
+def table_with_info_map(data):
+    table = new_table()
+    with open(data.info_map_path, "r", encoding="utf-8") as rfd:
+        table.read_from_text(rfd)
+    table.create_indexes()
+    return table
+
+
+# each stage is a pair of functions: prepare(data) -> state, and run(state) -> number of rows handled.
+# only run is measured. prepare is called again before each measured run.
+
+def prepare_read_from_text(data):
+    return new_table(), data.info_map_path
+
+
+def run_read_from_text(state):
+    table, info_map_path = state
+    with open(info_map_path, "r", encoding="utf-8") as rfd:
+        table.read_from_text(rfd)
+    return table.num_items("all-items")
+
+
+def prepare_read_from_svn_info(data):
+    return new_table(), data.svn_info_path
+
+
+def run_read_from_svn_info(state):
+    table, svn_info_path = state
+    with open(svn_info_path, "r", encoding="utf-8") as rfd:
+        table.read_from_svn_info(rfd)
+    return table.num_items("all-items")
+
+
+def prepare_read_props(data):
+    table = new_table()
+    with open(data.svn_info_path, "r", encoding="utf-8") as rfd:
+        table.read_from_svn_info(rfd)
+    table.create_indexes()
+    return table, data.props_path
+
+
+def run_read_props(state):
+    table, props_path = state
+    with open(props_path, "r", encoding="utf-8") as rfd:
+        table.read_props(rfd)
+    return table.num_items("all-items")
+
+
+def prepare_get_required_items(data):
+    table = table_with_info_map(data)
+    for product_path in table.get_items_in_dir("Mac", immediate_children_only=True):
+        if product_path.leaf.endswith(("0.bundle", "3.bundle", "6.bundle")):
+            table.mark_required_for_dir(product_path.path)
+    table.mark_required_completion()
+    return table
+
+
+def run_get_required_items(table):
+    return len(table.get_required_items())
+
+
+def run_iter_required_items(table):
+    return sum(1 for _ in table.iter_required_items())
+
+
+def prepare_write_as_text(data):
+    table = table_with_info_map(data)
+    return table, table.get_items(), data.folder.joinpath("written_info_map.txt")
+
+
+def run_write_as_text(state):
+    table, items, out_path = state
+    table.write_to_file(os.fspath(out_path), items_list=items, field_to_write=('path', 'flags', 'revision', 'checksum', 'size'))
+    return len(items)
+
+
+def prepare_write_as_text_streaming(data):
+    table = table_with_info_map(data)
+    return table, data.folder.joinpath("written_info_map.txt")
+
+
+def run_write_as_text_streaming(state):
+    """ unlike write_as_text stage, items are read from the db while writing """
+    table, out_path = state
+    table.write_to_file(os.fspath(out_path), items_list=table.iter_items(), field_to_write=('path', 'flags', 'revision', 'checksum', 'size'))
+    return table.num_items("all-items")
+
+
+def prepare_info_map_split_writer(data):
+    """ every product is an iid with install_sources, every 4th product has it's own info_map.
+        DBManager's db is a process wide singleton, so tables are emptied before each run.
+    """
+    config_vars.setdefault("__MAIN_DB_FILE__", ":memory:")
+    config_vars.setdefault("__INSTL_DEFAULTS_FOLDER__", os.fspath(defaults_folder))
+    config_vars.setdefault("MAIN_INFO_MAP_FILE_NAME", "info_map.txt")
+    config_vars.setdefault("TARGET_REPO_REV", "1")
+    config_vars.setdefault("WZLIB_EXTENSION", ".wzip")
+    config_vars.setdefault("ZLIB_COMPRESSION_LEVEL", "8")
+    db_manager = DBManager()
+    info_map_table = db_manager.info_map_table  # first access to a table also opens the db
+    with db_manager.db.transaction() as curs:
+        for table_name in ("iid_to_svn_item_t", "svn_item_t", "index_item_detail_t", "index_item_t"):
+            curs.execute(f"DELETE FROM {table_name}")
+    with open(data.info_map_path, "r", encoding="utf-8") as rfd:
+        info_map_table.read_from_text(rfd)
+    info_map_table.create_indexes()
+    products = [item.path for item in info_map_table.get_items_in_dir("Mac", immediate_children_only=True)]
+    with db_manager.db.transaction() as curs:
+        for product_num, product_path in enumerate(products):
+            iid = f"PRODUCT_{product_num:04}_IID"
+            curs.execute("INSERT INTO index_item_t (iid) VALUES (?)", (iid,))
+            details = [(iid, iid, 0, "install_sources", product_path)]
+            if product_num % 4 == 0:
+                details.append((iid, iid, 0, "info_map", f"Product_{product_num:04}_info_map.txt"))
+            curs.executemany("""INSERT INTO index_item_detail_t (original_iid, owner_iid, os_id, detail_name, detail_value)
+                                VALUES (?, ?, ?, ?, ?)""", details)
+    work_folder = data.folder.joinpath("split_info_maps")
+    work_folder.mkdir(exist_ok=True)
+    for old_file in work_folder.iterdir():
+        old_file.unlink()
+    return db_manager, work_folder
+
+
+def run_info_map_split_writer(state):
+    from pybatch.info_mapBatchCommands import InfoMapSplitWriter
+    db_manager, work_folder = state
+    with InfoMapSplitWriter(work_folder, report_own_progress=False) as splitter:
+        splitter()
+    return db_manager.info_map_table.num_items("all-items")
+
+
+def prepare_sync_urls(data):
+    """ all files need download, every product is an iid, every 4th product has it's own sync_base_url """
+    config_vars.setdefault("SYNC_BASE_URL", "https://sync.example.com/repo")
+    config_vars.setdefault("NUM_DIGITS_REPO_REV_HIERARCHY", "4")
+    config_vars.setdefault("NUM_DIGITS_PER_FOLDER_REPO_REV_HIERARCHY", "2")
+    table = table_with_info_map(data)
+    products = [item.path for item in table.get_items_in_dir("Mac", immediate_children_only=True)]
+    with table.db.transaction() as curs:
+        for product_num, product_path in enumerate(products):
+            iid = f"PRODUCT_{product_num:04}_IID"
+            curs.execute("INSERT INTO index_item_t (iid) VALUES (?)", (iid,))
+            if product_num % 4 == 0:
+                curs.execute("""INSERT INTO index_item_detail_t (original_iid, owner_iid, os_id, detail_name, detail_value)
+                                VALUES (?, ?, 0, 'sync_base_url', ?)""", (iid, iid, f"https://product{product_num}.example.com/repo"))
+            curs.execute("""UPDATE svn_item_t SET needed_for_iid=?
+                            WHERE path == ? OR path LIKE ?""", (iid, product_path, f"{product_path}/%"))
+        curs.execute("UPDATE svn_item_t SET need_download=1, download_path='/sync/'||path WHERE fileFlag==1")
+    return table
+
+
+def run_sync_urls_per_item(table):
+    """ as create_sync_urls was done: url for each file item with get_sync_url_for_file_item """
+    dl_tool = CUrlHelper()
+    for file_item in table.get_download_items(what="file"):
+        source_url = table.get_sync_url_for_file_item(file_item)
+        dl_tool.add_download_url(source_url, file_item.download_path, size=file_item.size, download_last=source_url.endswith('Info.xml'), checksum=file_item.checksum)
+    return dl_tool.get_num_urls_to_download()
+
+
+def run_sync_urls_bulk(table):
+    dl_tool = CUrlHelper()
+    dl_tool.add_download_urls(table.iter_sync_urls_for_download_files())
+    return dl_tool.get_num_urls_to_download()
+
+
+def prepare_download_locations(data):
+    """ every folder in a product is a source, sources of every 3rd product are direct-sync
+        returns the table and a list of (source, source_tag, direct_sync, install_folder)
+    """
+    table = table_with_info_map(data)
+    sync_sources = list()
+    products = [item.path for item in table.get_items_in_dir("Mac", immediate_children_only=True)]
+    for product_num, product_path in enumerate(products):
+        for item in table.get_items_in_dir(product_path, immediate_children_only=True):
+            if product_num % 3 == 0:
+                sync_sources.append((item.unwtarred, "!dir", True, f"/Applications/Product {product_num}"))
+            else:
+                sync_sources.append((item.unwtarred, "!file" if item.fileFlag else "!dir", False, None))
+    return table, sync_sources
+
+
+def run_download_locations_per_item(state):
+    """ as set_sync_locations_for_active_items was done: query the items of each source and update item by item """
+    table, sync_sources = state
+    items_to_update = list()
+    for source, source_tag, direct_sync, install_folder in sync_sources:
+        if source_tag == "!dir":
+            source_parent = "/".join(source.split("/")[:-1])
+            for item in table.get_recursive_paths_in_dir(dir_path=source, what="any" if direct_sync else "file"):
+                if direct_sync:
+                    items_to_update.append({"_id": item['_id'],
+                                            "download_path": config_vars.resolve_str("/".join((install_folder, item['path'][len(source_parent)+1:]))),
+                                            "download_root": config_vars.resolve_str("/".join((install_folder, source.split("/")[-1])))})
+                else:
+                    items_to_update.append({"_id": item['_id'], "download_path": config_vars.resolve_str("/".join(("/sync", item['path']))), "download_root": None})
+        else:
+            for item in table.get_required_paths_for_file(source):
+                items_to_update.append({"_id": item['_id'], "download_path": config_vars.resolve_str("/".join(("/sync", item['path']))), "download_root": None})
+    table.update_downloads(items_to_update)
+    return len(items_to_update)
+
+
+def run_download_locations_bulk(state):
+    table, sync_sources = state
+    download_sources = list()
+    for source, source_tag, direct_sync, install_folder in sync_sources:
+        if direct_sync:
+            source_parts = source.split("/")
+            download_sources.append((source, "dir-any", install_folder + "/", len("/".join(source_parts[:-1])) + 1,
+                                     config_vars.resolve_str("/".join((install_folder, source_parts[-1])))))
+        else:
+            download_sources.append((source, "dir-file" if source_tag == "!dir" else "file-path", "/sync/", 0, None))
+    return table.set_download_locations_for_sources(download_sources, resolve_callback=config_vars.resolve_str)
+
+
+stages = {
+    "read_from_text": (prepare_read_from_text, run_read_from_text),
+    "read_from_svn_info": (prepare_read_from_svn_info, run_read_from_svn_info),
+    "read_props": (prepare_read_props, run_read_props),
+    "get_required_items": (prepare_get_required_items, run_get_required_items),
+    "iter_required_items": (prepare_get_required_items, run_iter_required_items),
+    "write_as_text": (prepare_write_as_text, run_write_as_text),
+    "write_as_text_streaming": (prepare_write_as_text_streaming, run_write_as_text_streaming),
+    "info_map_split_writer": (prepare_info_map_split_writer, run_info_map_split_writer),
+    "sync_urls_per_item": (prepare_sync_urls, run_sync_urls_per_item),
+    "sync_urls_bulk": (prepare_sync_urls, run_sync_urls_bulk),
+    "download_locations_per_item": (prepare_download_locations, run_download_locations_per_item),
+    "download_locations_bulk": (prepare_download_locations, run_download_locations_bulk),
+}
+
+
+def measure_stage(stage_name, data, repeat=1, measure_memory=True):
+    """ return dict with the best time of repeat runs, peak memory and number of rows """
+    prepare, run = stages[stage_name]
+    retVal = {"stage": stage_name, "num_files": data.num_files}
+    times = list()
+    for _ in range(repeat):
+        state = prepare(data)
+        with utils.Timer_CM(stage_name, print_results=False) as timer:
+            retVal["rows"] = run(state)
+        times.append(float(timer.elapsed))
+        del state
+    retVal["seconds"] = min(times)
+    retVal["all_seconds"] = times
+    if measure_memory:
+        state = prepare(data)
+        tracemalloc.start()
+        try:
+            run(state)
+            retVal["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        del state
+    return retVal
+
+
+def result_key(result):
+    return f"{result['stage']}@{result['num_files']}"
+
+
+def run_command(args):
+    results = dict()
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        for num_files in args.num_files:
+            with utils.Timer_CM("generate", print_results=False) as timer:
+                data = StageData(temp_folder, num_files)
+            print(f"generated synthetic data for {num_files} files in {float(timer.elapsed):.3f}s")
+            for stage_name in args.stages:
+                result = measure_stage(stage_name, data, repeat=args.repeat, measure_memory=not args.no_memory)
+                results[result_key(result)] = result
+                memory_str = f"{result['peak_memory_bytes'] / 1024 ** 2:>10.1f}MB" if "peak_memory_bytes" in result else ""
+                print(f"{stage_name:<24} {num_files:>9} {result['rows']:>9} rows {result['seconds']:>9.3f}s {memory_str}")
+
+    report = {
+        "format_version": results_format_version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as wfd:
+            json.dump(report, wfd, indent=2, sort_keys=True)
+        print(f"results written to {args.output}")
+    return 0
+
+
+def compare_reports(baseline, current, threshold):
+    """ return list of (key, measure, baseline value, current value, ratio, is_regression)
+        for each stage@num_files present in both reports.
+    """
+    retVal = list()
+    for key in sorted(set(baseline["results"]) & set(current["results"])):
+        for measure in ("seconds", "peak_memory_bytes"):
+            base_value = baseline["results"][key].get(measure)
+            current_value = current["results"][key].get(measure)
+            if not base_value or current_value is None:
+                continue
+            ratio = current_value / base_value
+            retVal.append((key, measure, base_value, current_value, ratio, ratio > 1 + threshold))
+    return retVal
+
+
+def compare_command(args):
+    with open(args.baseline, "r", encoding="utf-8") as rfd:
+        baseline = json.load(rfd)
+    with open(args.current, "r", encoding="utf-8") as rfd:
+        current = json.load(rfd)
+    comparison = compare_reports(baseline, current, args.threshold)
+    num_regressions = 0
+    for key, measure, base_value, current_value, ratio, is_regression in comparison:
+        flag = "REGRESSION" if is_regression else ""
+        print(f"{key:<36} {measure:<18} {base_value:>14.3f} {current_value:>14.3f} {ratio:>7.2f} {flag}")
+        num_regressions += is_regression
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"not in {args.current}: {', '.join(missing)}")
+    print(f"{num_regressions} regressions above {args.threshold:.0%}")
+    return 1 if num_regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark info_map read, query and write paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run benchmarks and optionally write results as JSON")
+    run_parser.add_argument("--num-files", type=int, nargs="+", default=[10_000, 100_000])
+    run_parser.add_argument("--stages", nargs="+", choices=list(stages), default=list(stages))
+    run_parser.add_argument("--repeat", type=int, default=1, help="number of timed runs per stage, best time is reported")
+    run_parser.add_argument("--no-memory", action="store_true", help="do not measure peak memory")
+    run_parser.add_argument("--folder", default=None, help="where to create the synthetic files")
+    run_parser.add_argument("--output", default=None, help="path to JSON results file")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two JSON results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown considered a regression, 0.1 means 10%%")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        return run_command(args)
+    else:
+        return compare_command(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
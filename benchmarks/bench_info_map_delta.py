@@ -0,0 +1,129 @@
+#!/usr/bin/env python3.9
+
+"""
+    Compare the full info_map path of sync with the info_map delta path, for a big repository with few changes:
+    full: read the new info_map (as downloaded) to the table.
+    delta: read have_info_map, apply the delta of the new repo-rev to the table.
+    In both cases the table ends up with the same items, and then required and download items are marked
+    like sync does, every 3rd product being an active item. The sync folder is empty, so all required files need download.
+    Times are reported until the table is ready and until download items are marked.
+    Also reports the number of bytes that would be downloaded (wzip for info_map, plain text for the delta)
+    and the time admin takes to create the delta.
+    Usage:
+        python -m benchmarks.bench_info_map_delta [--num-files 100000] [--num-changes 10 100 1000] [--repeat 3] [--folder /tmp]
+"""
+
+import os
+import sys
+import zlib
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from db.dbMaster import DBMaster
+from svnTree import SVNTable, write_info_map_delta
+from benchmarks.synthetic_data import write_info_map_file
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+
+
+def write_changed_info_map(old_info_map_path, new_info_map_path, num_changes, seed=17):
+    """ copy info_map changing checksum, size and revision of num_changes random files """
+    with open(old_info_map_path, "r", encoding="utf-8") as rfd:
+        lines = rfd.readlines()
+    rand = random.Random(seed)
+    file_line_indexes = [i for i, line in enumerate(lines) if ", f" in line]
+    for line_index in rand.sample(file_line_indexes, num_changes):
+        path = lines[line_index].split(", ", 1)[0]
+        lines[line_index] = f"{path}, f, 501, {rand.getrandbits(160):040x}, {rand.randint(1, 10**6)}\n"
+    with open(new_info_map_path, "w", encoding="utf-8") as wfd:
+        wfd.writelines(lines)
+
+
+def add_active_items(table):
+    """ every 3rd product is an active iid with the product as install_sources """
+    products = [item.path for item in table.get_items_in_dir("Mac", immediate_children_only=True)]
+    active_products = products[::3]
+    with table.db.transaction() as curs:
+        for product_num, product_path in enumerate(active_products):
+            iid = f"PRODUCT_{product_num:04}_IID"
+            curs.execute("INSERT INTO index_item_t (iid, install_status) VALUES (?, 1)", (iid,))
+            curs.execute("""INSERT INTO index_item_detail_t (original_iid, owner_iid, os_id, detail_name, detail_value, os_is_active)
+                            VALUES (?, ?, 0, 'install_sources', ?, 1)""", (iid, iid, product_path))
+    return active_products
+
+
+def mark_download_items(table, sync_folder):
+    """ what InstlInstanceSync.mark_required_items and mark_download_items do to the table """
+    active_products = add_active_items(table)
+    table.mark_required_files_for_active_items()
+    table.set_download_locations_for_sources([(product_path, "dir-file", sync_folder + "/", 0, None) for product_path in active_products])
+    table.mark_need_download()
+    return table.num_items("need-download-files")
+
+
+def download_items_marked_time(read_func, sync_folder, repeat):
+    """ best times of repeat runs of read_func(table) on a new table, including creating indexes,
+        and then marking required and download items.
+        returns (seconds until table is ready, seconds until download items are marked, number of files to download)
+    """
+    best_ready_time = best_marked_time = None
+    num_download_files = 0
+    for _ in range(repeat):
+        table = SVNTable(DBMaster(":memory:", defaults_folder))
+        with utils.Timer_CM("mark download items", print_results=False) as marked_timer:
+            with utils.Timer_CM("read", print_results=False) as ready_timer:
+                with table.reading_files_context():
+                    read_func(table)
+            num_download_files = mark_download_items(table, sync_folder)
+        best_ready_time = min(best_ready_time or float(ready_timer.elapsed), float(ready_timer.elapsed))
+        best_marked_time = min(best_marked_time or float(marked_timer.elapsed), float(marked_timer.elapsed))
+    return best_ready_time, best_marked_time, num_download_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark reading info_map with delta vs. full info_map")
+    parser.add_argument("--num-files", type=int, default=100_000)
+    parser.add_argument("--num-changes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        temp_folder = Path(temp_folder)
+        have_info_map_path = temp_folder.joinpath("have_info_map.txt")
+        write_info_map_file(have_info_map_path, args.num_files)
+        print(f"{args.num_files} files, info_map {have_info_map_path.stat().st_size / 1024 ** 2:.1f}MB")
+        sync_folder = os.fspath(temp_folder.joinpath("sync"))
+        print(f"{'changes':>8} {'method':<6} {'ready':>9} {'marked':>9} {'to download':>12} {'download KB':>12} {'create delta':>13}")
+        for num_changes in args.num_changes:
+            new_info_map_path = temp_folder.joinpath(f"info_map_{num_changes}.txt")
+            delta_path = temp_folder.joinpath(f"info_map_{num_changes}.delta")
+            write_changed_info_map(have_info_map_path, new_info_map_path, num_changes)
+            with utils.Timer_CM("create delta", print_results=False) as timer:
+                write_info_map_delta(delta_path, 500, 501, [("info_map.txt", have_info_map_path, new_info_map_path)])
+            create_delta_seconds = float(timer.elapsed)
+
+            def read_full(table):
+                with open(new_info_map_path, "r", encoding="utf-8") as rfd:
+                    table.read_from_text(rfd)
+
+            def read_delta(table):
+                with open(have_info_map_path, "r", encoding="utf-8") as rfd:
+                    table.read_from_text(rfd)
+                with open(delta_path, "r", encoding="utf-8") as rfd:
+                    table.read_from_info_map_delta(rfd, {"info_map.txt"})
+
+            full_download_kb = len(zlib.compress(new_info_map_path.read_bytes(), 8)) / 1024
+            delta_download_kb = delta_path.stat().st_size / 1024
+            ready_seconds, marked_seconds, num_download_files = download_items_marked_time(read_full, sync_folder, args.repeat)
+            print(f"{num_changes:>8} {'full':<6} {ready_seconds:>8.3f}s {marked_seconds:>8.3f}s {num_download_files:>12} {full_download_kb:>12.1f}")
+            ready_seconds, marked_seconds, num_download_files = download_items_marked_time(read_delta, sync_folder, args.repeat)
+            print(f"{num_changes:>8} {'delta':<6} {ready_seconds:>8.3f}s {marked_seconds:>8.3f}s {num_download_files:>12} {delta_download_kb:>12.1f} {create_delta_seconds:>12.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure IndexItemsTable.resolve_inheritance on synthetic index.yaml with template inheritance chains.
+    Compares:
+        order: prepare_inherit_order vs. the recursive version with list.index checks, as was done before.
+            The recursive version is quadratic and is skipped above --max-items-recursive.
+        resolve: one INSERT...SELECT per inheritance level vs. one per iid in a single script, as was done before.
+    Usage:
+        python -m benchmarks.bench_inheritance [--num-items 1000 10000 50000] [--max-items-recursive 50000]
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+import yaml
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from db.dbMaster import DBMaster
+from db.indexItemTable import IndexItemsTable
+from aYaml.yamlReader import YamlNodeStack
+from pyinstl.test.synthetic_index import generate_index_yaml_text
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+
+
+def prepare_inherit_order_recursive(items_table):
+    """ prepare_inherit_order as it was before, recursive resolving and quadratic checking of the order """
+    inherit_order = utils.unique_list()
+    inherit_dict = dict()
+    for iid, parent_iid in items_table.db.select_and_fetchall("""
+            SELECT original_iid, detail_value
+            FROM index_item_detail_t
+            JOIN active_operating_systems_t
+            ON active_operating_systems_t._id=os_id
+            AND active_operating_systems_t.os_is_active = 1
+            WHERE detail_name = 'inherit'
+            """):
+        inherit_dict.setdefault(iid, list()).append(parent_iid)
+
+    def resolve_iid(iid):
+        for parent_iid in inherit_dict.get(iid, []):
+            resolve_iid(parent_iid)
+        if iid in inherit_dict:
+            inherit_order.append(iid)
+
+    for iid in sorted(inherit_dict):
+        resolve_iid(iid)
+    for i in range(len(inherit_order)):
+        for parent_iid in inherit_dict[inherit_order[i]]:
+            if parent_iid in inherit_dict:
+                assert inherit_order.index(parent_iid) < i
+    return inherit_order, inherit_dict
+
+
+def resolve_one_by_one(items_table, inherit_order, inherit_dict):
+    """ resolve_inheritance as it was before, one INSERT...SELECT per iid in a single script """
+    resolve_items_script = "".join(items_table.get_resolve_item_query_for_iid(iid, inherit_dict[iid]) for iid in inherit_order)
+    with items_table.db.transaction() as curs:
+        curs.executescript(resolve_items_script)
+        curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_owner_iid ON index_item_detail_t(owner_iid)""")
+
+
+def new_items_table(index_nodes):
+    retVal = IndexItemsTable(DBMaster(":memory:", defaults_folder))
+    for index_node in index_nodes:
+        retVal.read_index_node(index_node, **{'node-stack': YamlNodeStack()})
+    retVal.activate_specific_oses("Mac", "Mac64")
+    return retVal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark resolving inheritance of index items")
+    parser.add_argument("--num-items", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--max-items-recursive", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print(f"{'items':>8} {'details':>9} {'order':>9} {'order recursive':>16} {'by levels':>10} {'one by one':>11}")
+    for num_items in args.num_items:
+        # reading a big !index document is slow, so index is read in parts
+        index_nodes = list(yaml.compose_all(generate_index_yaml_text(num_items, items_per_document=1000)))
+
+        items_table = new_items_table(index_nodes)
+        with utils.Timer_CM("order", print_results=False) as order_timer:
+            inherit_order, inherit_dict = items_table.prepare_inherit_order()
+        with utils.Timer_CM("by levels", print_results=False) as by_levels_timer:
+            items_table.resolve_inheritance_by_levels(inherit_order, inherit_dict)
+        num_details = items_table.db.select_and_fetchall("SELECT COUNT(*) FROM index_item_detail_t")[0]
+
+        items_table = new_items_table(index_nodes)
+        recursive_order_time = "skipped"
+        if num_items <= args.max_items_recursive:
+            with utils.Timer_CM("order recursive", print_results=False) as recursive_order_timer:
+                assert list(prepare_inherit_order_recursive(items_table)[0]) == list(inherit_order)
+            recursive_order_time = f"{float(recursive_order_timer.elapsed):.3f}"
+        with utils.Timer_CM("one by one", print_results=False) as one_by_one_timer:
+            resolve_one_by_one(items_table, inherit_order, inherit_dict)
+
+        print(f"{num_items:>8} {num_details:>9} {float(order_timer.elapsed):>9.3f} {recursive_order_time:>16}"
+              f" {float(by_levels_timer.elapsed):>10.3f} {float(one_by_one_timer.elapsed):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
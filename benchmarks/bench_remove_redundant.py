@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.9
+
+"""
+    Compare the LIKE based prefix join previously used by SVNTable.get_files_that_should_be_removed_from_sync_folder
+    with the current range based prefix match, for growing number of paths in the sync folder.
+    The LIKE join is quadratic so it is only timed up to --like-max-paths.
+    Usage:
+        python -m benchmarks.bench_remove_redundant [--sizes 10000 100000 1000000] [--like-max-paths 10000]
+"""
+
+import io
+import os
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from db.dbMaster import DBMaster
+from svnTree import SVNTable
+from benchmarks.synthetic_data import generate_info_map_text
+
+defaults_folder = Path(__file__).parent.parent.joinpath("defaults")
+
+like_query = """
+    SELECT cache_t.path FROM cache_t
+    WHERE cache_t.path NOT IN
+    (SELECT cache_t.path FROM cache_t,
+        (SELECT install_sources_t.detail_value||"%" AS path
+        FROM index_item_detail_t AS install_sources_t, index_item_detail_t as info_map_t
+        WHERE install_sources_t.detail_name == "install_sources"
+                AND info_map_t.detail_name == "info_map"
+                AND info_map_t.owner_iid == install_sources_t.owner_iid
+                AND install_sources_t.detail_value NOT IN (SELECT path FROM svn_item_t)
+        UNION
+        SELECT svn_item_t.path AS path FROM svn_item_t) AS do_not_remove_t
+    WHERE cache_t.path LIKE do_not_remove_t.path)
+    """
+
+
+def prepare_table(num_paths, num_custom_iids=50):
+    """ create an SVNTable with about half of num_paths in the info_map, and IIDs with custom info_maps.
+        return the table and a list of num_paths paths to check: a third are in the info_map,
+        a third are under the install_sources of the custom IIDs and a third are redundant.
+    """
+    db = DBMaster(":memory:", defaults_folder)
+    table = SVNTable(db)
+    rfd = io.StringIO(generate_info_map_text(num_paths // 3))
+    rfd.name = "synthetic_info_map.txt"
+    table.read_from_text(rfd)
+    table.create_indexes()
+    with db.transaction() as curs:
+        for iid_num in range(num_custom_iids):
+            iid = f"CUSTOM_IID_{iid_num:03}"
+            curs.execute("INSERT INTO index_item_t (iid) VALUES (?)", (iid,))
+            curs.executemany("""INSERT INTO index_item_detail_t (original_iid, owner_iid, os_id, detail_name, detail_value)
+                                VALUES (?, ?, 0, ?, ?)""",
+                             ((iid, iid, "install_sources", f"Mac/Custom_{iid_num:03}.bundle"),
+                              (iid, iid, "info_map", f"Custom_{iid_num:03}_info_map.txt")))
+    files_to_check = [item.path for item in table.get_items(what="file")]
+    num_others = (num_paths - len(files_to_check)) // 2
+    files_to_check.extend(f"Mac/Custom_{i % num_custom_iids:03}.bundle/Contents/file_{i}.txt" for i in range(num_others))
+    files_to_check.extend(f"Mac/Removed_{i % 97:03}.bundle/Contents/file_{i}.txt" for i in range(num_paths - len(files_to_check)))
+    return table, files_to_check
+
+
+def time_like_join(table, files_to_check):
+    with table.db.transaction() as curs:
+        curs.execute("CREATE TEMP TABLE cache_t (path TEXT)")
+        curs.executemany("INSERT INTO cache_t (path) VALUES (?)", ((p,) for p in files_to_check))
+    with utils.Timer_CM("like", print_results=False) as timer:
+        result = table.db.select_and_fetchall(like_query)
+    with table.db.transaction() as curs:
+        curs.execute("DROP TABLE cache_t")
+    return float(timer.elapsed), len(result)
+
+
+def time_range_join(table, files_to_check):
+    with utils.Timer_CM("range", print_results=False) as timer:
+        result = table.get_files_that_should_be_removed_from_sync_folder(files_to_check)
+    return float(timer.elapsed), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark get_files_that_should_be_removed_from_sync_folder")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--like-max-paths", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'paths':>10} {'to remove':>10} {'range (s)':>10} {'like (s)':>10}")
+    for num_paths in args.sizes:
+        table, files_to_check = prepare_table(num_paths)
+        range_time, num_to_remove = time_range_join(table, files_to_check)
+        like_time_str = "skipped"
+        if num_paths <= args.like_max_paths:
+            like_time, num_like_to_remove = time_like_join(table, files_to_check)
+            assert num_like_to_remove == num_to_remove, f"LIKE join found {num_like_to_remove}, range join found {num_to_remove}"
+            like_time_str = f"{like_time:.3f}"
+        print(f"{len(files_to_check):>10} {num_to_remove:>10} {range_time:>10.3f} {like_time_str:>10}")
+        table.db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure wall clock time of unwtarring a folder of independent wtar archives with different number of worker processes.
+    Usage:
+        python -m benchmarks.bench_unwtar [--num-archives 32] [--files-per-archive 40] [--file-size 262144] [--workers 1 2 4 8] [--folder /tmp]
+"""
+
+import os
+import sys
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from pybatch import Wtar, Unwtar
+
+
+def create_wtars_folder(work_folder: Path, num_archives, files_per_archive, file_size):
+    """ create num_archives bundles of semi compressible files and wtar each into wtars_folder """
+    rand = random.Random(17)
+    originals_folder = work_folder.joinpath("originals")
+    wtars_folder = work_folder.joinpath("wtars")
+    wtars_folder.mkdir(parents=True)
+    words = [bytes(rand.choices(range(97, 123), k=rand.randint(3, 10))) for _ in range(2000)]
+    for archive_num in range(num_archives):
+        bundle_folder = originals_folder.joinpath(f"Bundle_{archive_num:03}.bundle", "Contents", "Resources")
+        bundle_folder.mkdir(parents=True)
+        for file_num in range(files_per_archive):
+            text = b" ".join(rand.choices(words, k=file_size // 6))[:file_size]
+            bundle_folder.joinpath(f"resource_{file_num:03}.txt").write_bytes(text)
+        with Wtar(bundle_folder.parent.parent, wtars_folder, report_own_progress=False) as wtarer:
+            wtarer()
+    return wtars_folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark Unwtar with parallel worker processes")
+    parser.add_argument("--num-archives", type=int, default=32)
+    parser.add_argument("--files-per-archive", type=int, default=40)
+    parser.add_argument("--file-size", type=int, default=256 * 1024)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        with utils.Timer_CM("create", print_results=False) as timer:
+            wtars_folder = create_wtars_folder(Path(temp_folder), args.num_archives, args.files_per_archive, args.file_size)
+        wtars_size_mb = sum(f.stat().st_size for f in wtars_folder.iterdir()) / (1024 * 1024)
+        print(f"created {args.num_archives} archives, {wtars_size_mb:.1f}MB in {float(timer.elapsed):.3f}s, {os.cpu_count()} cpus")
+        print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+        serial_time = None
+        for num_workers in args.workers:
+            destination = Path(temp_folder, f"unwtar_{num_workers}")
+            with Unwtar(wtars_folder, destination, num_workers=num_workers, copy_owner=False, report_own_progress=False) as unwtarer:
+                with utils.Timer_CM("unwtar", print_results=False) as timer:
+                    unwtarer()
+            unwtar_time = float(timer.elapsed)
+            serial_time = serial_time or unwtar_time
+            print(f"{num_workers:>8} {unwtar_time:>9.3f}s {serial_time / unwtar_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
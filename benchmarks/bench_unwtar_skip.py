@@ -0,0 +1,64 @@
+#!/usr/bin/env python3.9
+
+"""
+    Measure how long Unwtar takes to decide an already unwtarred destination is up to date:
+    with the manifest written when unwtarring (only stat of each file) vs. full_verify (checksum of each file).
+    Usage:
+        python -m benchmarks.bench_unwtar_skip [--num-files 2000] [--file-size 262144] [--repeat 3] [--folder /tmp]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+from pybatch import Wtar, Unwtar
+
+
+def create_installed_tree(work_folder: Path, num_files, file_size):
+    """ create a folder of num_files files, wtar it and unwtar it. return the wtar file and the folder to unwtar to """
+    source_folder = work_folder.joinpath("source", "Big.bundle")
+    files_per_folder = 100
+    for file_num in range(num_files):
+        sub_folder = source_folder.joinpath("Contents", "Resources", f"folder_{file_num // files_per_folder:03}")
+        sub_folder.mkdir(parents=True, exist_ok=True)
+        sub_folder.joinpath(f"resource_{file_num:05}.bin").write_bytes(os.urandom(file_size))
+    wtar_folder = work_folder.joinpath("wtar")
+    wtar_folder.mkdir()
+    with Wtar(source_folder, wtar_folder, report_own_progress=False) as wtarer:
+        wtarer()
+    wtar_file = next(wtar_folder.glob("Big.bundle.wtar*"))
+    installed_folder = work_folder.joinpath("installed")
+    with Unwtar(wtar_file, installed_folder, copy_owner=False, report_own_progress=False) as unwtarer:
+        unwtarer()
+    return wtar_file, installed_folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark Unwtar's check whether destination is up to date")
+    parser.add_argument("--num-files", type=int, default=2000)
+    parser.add_argument("--file-size", type=int, default=256 * 1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        wtar_file, installed_folder = create_installed_tree(Path(temp_folder), args.num_files, args.file_size)
+        installed_mb = args.num_files * args.file_size / (1024 * 1024)
+        print(f"installed tree: {args.num_files} files, {installed_mb:.1f}MB")
+        print(f"{'method':<12} {'best seconds':>12}")
+        for name, full_verify in (("manifest", False), ("full verify", True)):
+            best_time = None
+            for _ in range(args.repeat):
+                with Unwtar(wtar_file, installed_folder, copy_owner=False, full_verify=full_verify, report_own_progress=False) as unwtarer:
+                    with utils.Timer_CM(name, print_results=False) as timer:
+                        unwtarer()
+                best_time = min(best_time or float(timer.elapsed), float(timer.elapsed))
+            print(f"{name:<12} {best_time:>11.3f}s")
+
+
+if __name__ == "__main__":
+    main()
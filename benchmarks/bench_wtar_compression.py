@@ -0,0 +1,70 @@
+#!/usr/bin/env python3.9
+
+"""
+    Compare tar+bz2 throughput of single stream tarfile 'w:bz2' (as in Wtar with num_workers=1)
+    and multi-stream utils.ParallelBZ2Writer with different number of threads.
+    Usage:
+        python -m benchmarks.bench_wtar_compression [--size-mb 128] [--workers 2 4 8] [--block-size 1048576] [--folder /tmp]
+"""
+
+import os
+import sys
+import random
+import tarfile
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import utils
+
+
+def create_source_folder(folder: Path, size_mb, file_size=4 * 1024 * 1024):
+    """ semi compressible text files, bz2 compresses them to about 30% """
+    rand = random.Random(17)
+    words = [bytes(rand.choices(range(97, 123), k=rand.randint(3, 10))) for _ in range(5000)]
+    folder.mkdir(parents=True)
+    for file_num in range(max(1, size_mb * 1024 * 1024 // file_size)):
+        text = b" ".join(rand.choices(words, k=file_size // 6))[:file_size]
+        folder.joinpath(f"resource_{file_num:04}.txt").write_bytes(text)
+
+
+def tar_single_stream(source_folder: Path, target_file: Path, **kwargs):
+    with tarfile.open(target_file, "w:bz2", format=tarfile.PAX_FORMAT, compresslevel=1) as tar:
+        tar.add(source_folder, arcname=source_folder.name)
+
+
+def tar_multi_stream(source_folder: Path, target_file: Path, num_workers=1, block_size=1024 * 1024):
+    with utils.ParallelBZ2Writer(target_file, compresslevel=1, num_workers=num_workers, block_size=block_size) as bz2_writer:
+        with tarfile.open(fileobj=bz2_writer, mode="w", format=tarfile.PAX_FORMAT) as tar:
+            tar.add(source_folder, arcname=source_folder.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark single vs multi-stream bz2 compression of wtar files")
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--block-size", type=int, default=1024 * 1024)
+    parser.add_argument("--folder", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as temp_folder:
+        source_folder = Path(temp_folder, "source")
+        create_source_folder(source_folder, args.size_mb)
+        source_mb = sum(f.stat().st_size for f in source_folder.iterdir()) / (1024 * 1024)
+        print(f"source {source_mb:.1f}MB, {os.cpu_count()} cpus")
+        print(f"{'method':<20} {'seconds':>10} {'MB/s':>8} {'ratio':>7}")
+        runs = [("single stream", tar_single_stream, {})]
+        runs.extend((f"multi stream x{num_workers}", tar_multi_stream, {"num_workers": num_workers, "block_size": args.block_size}) for num_workers in args.workers)
+        for name, tar_func, kwargs in runs:
+            target_file = Path(temp_folder, "target.wtar")
+            with utils.Timer_CM(name, print_results=False) as timer:
+                tar_func(source_folder, target_file, **kwargs)
+            seconds = float(timer.elapsed)
+            ratio = target_file.stat().st_size / (source_mb * 1024 * 1024)
+            print(f"{name:<20} {seconds:>9.3f}s {source_mb / seconds:>8.1f} {ratio:>7.3f}")
+            target_file.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3.9
+
+"""
+    generate synthetic info_map, svn info and svn props data for benchmarks.
+    Data is deterministic for a given set of parameters, so different runs
+    of a benchmark work on the same data.
+"""
+
+import io
+import random
+import hashlib
+
+
+def generate_info_map_rows(num_files, files_per_folder=40, folders_per_product=25, max_repo_rev=500, wtar_ratio=0.1, seed=17):
+    """ yield (path, flags, revision, checksum, size) tuples, folders are yielded before their contents.
+        folders have None for checksum and size.
+        about wtar_ratio of the files are wtar files (some of them split to several parts).
+    """
+    rand = random.Random(seed)
+    num_files_yielded = 0
+    product_num = 0
+    yield "Mac", "d", max_repo_rev, None, None
+    while num_files_yielded < num_files:
+        product_path = f"Mac/Product_{product_num:04}.bundle"
+        yield product_path, "d", rand.randint(1, max_repo_rev), None, None
+        yield f"{product_path}/Contents", "d", rand.randint(1, max_repo_rev), None, None
+        for folder_num in range(folders_per_product):
+            if num_files_yielded >= num_files:
+                break
+            folder_path = f"{product_path}/Contents/Resources_{folder_num:03}"
+            yield folder_path, "d", rand.randint(1, max_repo_rev), None, None
+            for file_num in range(files_per_folder):
+                if num_files_yielded >= num_files:
+                    break
+                revision = rand.randint(1, max_repo_rev)
+                size = rand.randint(1, 8 * 1024 * 1024)
+                checksum = hashlib.sha1(f"{folder_path}/{file_num}/{revision}".encode()).hexdigest()
+                if rand.random() < wtar_ratio:
+                    base_path = f"{folder_path}/Sample_{file_num:04}.wav.wtar"
+                    if size > 4 * 1024 * 1024:
+                        yield f"{base_path}.aa", "f", revision, checksum, size // 2
+                        yield f"{base_path}.ab", "f", revision, checksum[::-1], size - size // 2
+                        num_files_yielded += 2
+                    else:
+                        yield base_path, "f", revision, checksum, size
+                        num_files_yielded += 1
+                else:
+                    flags = "fx" if rand.random() < 0.02 else "f"
+                    yield f"{folder_path}/Sample_{file_num:04}.wav", flags, revision, checksum, size
+                    num_files_yielded += 1
+        product_num += 1
+
+
+def info_map_line(row):
+    path, flags, revision, checksum, size = row
+    if checksum is None:
+        retVal = f"{path}, {flags}, {revision}"
+    else:
+        retVal = f"{path}, {flags}, {revision}, {checksum}, {size}"
+    return retVal
+
+
+def generate_info_map_text(num_files, **kwargs):
+    retVal = "\n".join(info_map_line(row) for row in generate_info_map_rows(num_files, **kwargs)) + "\n"
+    return retVal
+
+
+def info_map_fd(num_files, name="synthetic_info_map.txt", **kwargs):
+    """ return an open text file-like object with info_map text, as expected by SVNTable.read_from_text """
+    retVal = io.StringIO(generate_info_map_text(num_files, **kwargs))
+    retVal.name = name
+    return retVal
+
+
+def svn_info_record(row):
+    path, flags, revision, checksum, size = row
+    lines = [f"Path: {path}", f"Node Kind: {'directory' if 'd' in flags else 'file'}", f"Last Changed Rev: {revision}"]
+    if checksum is not None:
+        lines.append(f"Checksum: {checksum}")
+    return "\n".join(lines) + "\n\n"
+
+
+def props_record(row, rand):
+    """ return svn proplist text for a row, or None if the row has no properties """
+    path, flags, revision, checksum, size = row
+    props = list()
+    if 'x' in flags:
+        props.append("svn:executable")
+    if checksum is not None and rand.random() < 0.05:
+        props.append("svn:mime-type")
+    if rand.random() < 0.01:
+        props.append("svn:special")
+    retVal = None
+    if props:
+        retVal = f"Properties on '{path}':\n" + "".join(f"  {prop}\n" for prop in props)
+    return retVal
+
+
+def write_info_map_file(file_path, num_files, **kwargs):
+    """ write an info_map text file, as read by SVNTable.read_from_text, without holding all text in memory """
+    with open(file_path, "w", encoding="utf-8") as wfd:
+        for row in generate_info_map_rows(num_files, **kwargs):
+            wfd.write(info_map_line(row))
+            wfd.write("\n")
+
+
+def write_svn_info_file(file_path, num_files, **kwargs):
+    """ write 'svn info --depth infinity' like text file, as read by SVNTable.read_from_svn_info """
+    with open(file_path, "w", encoding="utf-8") as wfd:
+        for row in generate_info_map_rows(num_files, **kwargs):
+            wfd.write(svn_info_record(row))
+
+
+def write_props_file(file_path, num_files, seed=17, **kwargs):
+    """ write 'svn proplist --depth infinity' like text file, as read by SVNTable.read_props """
+    rand = random.Random(seed)
+    with open(file_path, "w", encoding="utf-8") as wfd:
+        for row in generate_info_map_rows(num_files, seed=seed, **kwargs):
+            record = props_record(row, rand)
+            if record:
+                wfd.write(record)
+
@@ -83,6 +83,7 @@ class ConfigVar:
         else:
             self.callback_when_value_is_get = new_callback_when_value_is_get
             self.dynamic = True
+            self.owner.config_var_changed(self)
 
     def __len__(self) -> int:
         """ :return: number of values """
@@ -231,6 +232,7 @@ class ConfigVar:
         """
         if value is not None:
             self.values.append(str(value))
+            self.owner.config_var_changed(self)
             self.callback_when_value_is_set(self.name, value)
 
     def extend(self, values):
@@ -254,6 +256,7 @@ class ConfigVar:
         """ erase all values """
         if self.values:
             self.values.clear()
+            self.owner.config_var_changed(self)
 
     def raw(self, join_sep: Optional[str] = "") -> Union[str, List[str]]:
         """ return the list of values unresolved"""
@@ -2,6 +2,7 @@
 
 import re
 import string
+import functools
 from collections import namedtuple
 from typing import Optional, Callable, Dict
 
@@ -79,31 +80,29 @@ vars_split_level_1_re = re.compile("\s*,\s*", re.X)
 vars_split_level_2_re = re.compile("\s*=\s*", re.X)
 
 
-def var_parse_imp(f_string, resolve_indicator='$'):
-    """
-        Yield parsed sections of f_string consisting of:
-            literal_text: prefix text that is not a variable reference (or empty string)
-            variable_name: name of a variable to resolve
-            variable_params_str:
-            variable_str: the original text of the variable, to be used as default in case resolving fails
-    """
+def parse_var_params(cont: VarParseImpContext):
+    if cont.variable_params_str:  # might be None (no params) or "" (empty params, i.e. $(A<>))
+        cont.positional_params = []
+        cont.key_word_params = {}
+        comma_separated_list = vars_split_level_1_re.split(cont.variable_params_str.strip())
+        for csi in comma_separated_list:
+            single_param = vars_split_level_2_re.split(csi.strip(), 1)
+            if len(single_param) > 1:
+                if single_param[0] and single_param[1]:
+                    cont.key_word_params[single_param[0]] = single_param[1]
+                else:  # "=", '=a' or 'a=' should translate to a single param
+                    cont.positional_params.append(csi.strip())
+            else:
+                if single_param[0]:
+                    cont.positional_params.append(single_param[0])
 
-    def parse_var_params(cont: VarParseImpContext):
-        if cont.variable_params_str:  # might be None (no params) or "" (empty params, i.e. $(A<>))
-            cont.positional_params = []
-            cont.key_word_params = {}
-            comma_separated_list = vars_split_level_1_re.split(cont.variable_params_str.strip())
-            for csi in comma_separated_list:
-                single_param = vars_split_level_2_re.split(csi.strip(), 1)
-                if len(single_param) > 1:
-                    if single_param[0] and single_param[1]:
-                        cont.key_word_params[single_param[0]] = single_param[1]
-                    else:  # "=", '=a' or 'a=' should translate to a single param
-                        cont.positional_params.append(csi.strip())
-                else:
-                    if single_param[0]:
-                        cont.positional_params.append(single_param[0])
 
+@functools.lru_cache(maxsize=None)
+def var_parse_states(resolve_indicator='$'):
+    """ states of the character by character parser. Each state is a function getting the next character
+        and the context, and returning the next state and a ParseRetVal to yield or None.
+        return the literal state and the states in which a variable reference is being parsed.
+    """
     def discard_variable(c, cont: VarParseImpContext):
         next_state = literal_state
         new_literal_text = cont.literal_text + cont.variable_str
@@ -236,17 +235,16 @@ def var_parse_imp(f_string, resolve_indicator='$'):
             next_state = discard_variable(c, cont)
         return next_state, yield_val
 
-    cont: VarParseImpContext = VarParseImpContext()
-    next_state_func: Callable[[str], VarParseImpContext] = literal_state
-    for c in f_string:
-        next_state_func, yield_val = next_state_func(c, cont)
-        if yield_val is not None:
-            yield yield_val
+    variable_states = frozenset((var_ref_started_state, var_name_state, params_state, array_state,
+                                 var_name_ended_state, params_ended_state, array_ended_state))
+    return literal_state, variable_states
+
 
-    # Any of the following states means that parsing stopped while in variable
+def end_of_parse(f_string, next_state_func, cont: VarParseImpContext, literal_state, variable_states):
+    """ yield the last ParseRetVal after the last character was parsed """
+    # Any of the variable states means that parsing stopped while in variable
     # and therefore the whole variable string becomes part of the literal text
-    if next_state_func in (var_ref_started_state, var_name_state, params_state, array_state,
-                      var_name_ended_state, params_ended_state, array_ended_state):
+    if next_state_func in variable_states:
         cont.literal_text += cont.variable_str
         cont.variable_name = None
         next_state_func = literal_state         # this will force a final yield
@@ -257,6 +255,86 @@ def var_parse_imp(f_string, resolve_indicator='$'):
         raise ValueError(f"failed to parse {f_string}")
 
 
+def var_parse_imp_by_char(f_string, resolve_indicator='$'):
+    """ parse f_string character by character, yields the same as var_parse_imp
+        var_parse_imp uses the same states for variable references that var_ref_regex does not match.
+    """
+    literal_state, variable_states = var_parse_states(resolve_indicator)
+    cont: VarParseImpContext = VarParseImpContext()
+    next_state_func: Callable[[str], VarParseImpContext] = literal_state
+    for c in f_string:
+        next_state_func, yield_val = next_state_func(c, cont)
+        if yield_val is not None:
+            yield yield_val
+    yield from end_of_parse(f_string, next_state_func, cont, literal_state, variable_states)
+
+
+@functools.lru_cache(maxsize=None)
+def var_ref_regex(resolve_indicator='$'):
+    """ regex matching the common forms of variable reference: $(A), $(A<params>), $(A[index])
+        with optional whitespace before the closing ), and before <
+    """
+    whitespace = "".join(f"\\x{ord(c):02x}" for c in string.whitespace)
+    return re.compile(f"""{re.escape(resolve_indicator)}\\((?P<variable_name>[A-Za-z0-9_-]*)
+                              (?:[{whitespace}]*\\)
+                                |[{whitespace}]*<(?P<variable_params_str>[^>]*)>[{whitespace}]*\\)
+                                |\\[(?P<array_index_str>[^\\]]*)\\][{whitespace}]*\\))""", re.X)
+
+
+def var_parse_imp(f_string, resolve_indicator='$'):
+    """
+        Yield parsed sections of f_string consisting of:
+            literal_text: prefix text that is not a variable reference (or empty string)
+            variable_name: name of a variable to resolve
+            variable_params_str:
+            variable_str: the original text of the variable, to be used as default in case resolving fails
+        The text between variable references is found with str.find, variable references are matched with var_ref_regex.
+        References var_ref_regex does not match (unbalanced or invalid references, names with parenthesis)
+        are parsed by the states of var_parse_imp_by_char, so the results are the same as parsing character by character.
+    """
+    var_ref_re = var_ref_regex(resolve_indicator)
+    cont: VarParseImpContext = VarParseImpContext()
+    pos = 0
+    while True:
+        var_ref_start = f_string.find(resolve_indicator, pos)
+        if var_ref_start == -1:
+            cont.literal_text += f_string[pos:]
+            yield cont.get_return_tuple()
+            break
+        cont.literal_text += f_string[pos:var_ref_start]
+
+        # after some invalid references parenthesis_balance is not zero and affects the next reference
+        var_ref_match = var_ref_re.match(f_string, var_ref_start) if cont.parenthesis_balance == 0 else None
+        if var_ref_match is not None and var_ref_match['array_index_str'] is not None:
+            try:
+                cont.array_index_int = int(var_ref_match['array_index_str'])
+            except ValueError:
+                var_ref_match = None
+        if var_ref_match is not None:
+            cont.variable_str = var_ref_match[0]
+            cont.variable_name = var_ref_match['variable_name']
+            cont.variable_params_str = var_ref_match['variable_params_str']
+            cont.array_index_str = var_ref_match['array_index_str']
+            parse_var_params(cont)
+            yield cont.get_return_tuple()
+            cont.reset_return_tuple()
+            pos = var_ref_match.end()
+        else:
+            literal_state, variable_states = var_parse_states(resolve_indicator)
+            next_state_func = literal_state
+            pos = var_ref_start
+            while pos < len(f_string):
+                next_state_func, yield_val = next_state_func(f_string[pos], cont)
+                pos += 1
+                if yield_val is not None:
+                    yield yield_val
+                if next_state_func == literal_state:
+                    break
+            if next_state_func != literal_state:
+                yield from end_of_parse(f_string, next_state_func, cont, literal_state, variable_states)
+                break
+
+
 def resolve_variable_1(parse_retVal, default=""):
     retVal = "".join(("!", parse_retVal.variable_name))
     if parse_retVal.array_index_str is not None:
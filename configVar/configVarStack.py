@@ -22,20 +22,19 @@ class ConfigVarStack:
         ConfigVarStack represent a stack of ConfigVar dicts.
         this allows to override a ConfigVar by an inner context
 
-        caching: (removed in version 2.1.6.0)
-            ConfigVarStack used to maintains a cache of resolved strings.
-            This proved to save very little resolve time (-9% ~100ms for large installations),
-            at the cost of much complexity:
-            Whenever a ConfigVar is added, removed or changed the cache needs to be
-            cleared.
-            But resolving a ConfigVar with params is done by adding a level to the stack
-            and adding temporary variables - which would invalidate the cache.
-            Since this is done a lot it would make the number of cache hits very small.
-            To overcome this self.use_cache is set to False when resolving
-            a ConfigVar with params. When self.use_cache is False cache is not used
-            while resolving and cache is not purged
-            also with the introduction of dynamic configVars maintain a cache becomes more complicated, as these cannot be cached
-            last version with cache was 2.1.5.5 9/12/2019
+        caching:
+            ConfigVarStack maintains a cache of resolved strings, keyed on the string to resolve.
+            (a previous cache was removed in version 2.1.6.0, last version with that cache was 2.1.5.5 9/12/2019)
+            self.generation is incremented whenever a ConfigVar is added, removed or changed,
+            a scope is pushed or popped or the resolve indicator is changed.
+            The cache is cleared when it is accessed and self.generation is different from the generation the cache
+            was filled in.
+            Resolving a ConfigVar with params is done by pushing a temporary scope with the params as ConfigVars.
+            Such scopes are pushed with push_scope_context(use_cache=False): while they exist the cache is not used,
+            and changes to ConfigVars in these scopes do not increment self.generation, so the cache is not cleared.
+            Strings that refer, directly or indirectly, to dynamic ConfigVars are not cached since the values of
+            dynamic ConfigVars are calculated by a callback each time they are resolved.
+            Cache hits and misses are counted and printed by print_statistics.
         simple resolve:
             when a string to resolve does not contain '$' it need not go through parsing
             this proved to save relatively a lot of resolve time (-60% ~500ms for large installations) - much more than caching
@@ -46,6 +45,14 @@ class ConfigVarStack:
         self.simple_resolve_counter: int = 0
         self.resolve_time: float = 0.0
         self.resolve_indicator = '$'  # default is $ but can be changed for special cases
+        self.generation: int = 0  # incremented when anything that might change the result of resolving is changed
+        self.use_resolve_cache: bool = True
+        self.resolve_cache: Dict[str, tuple] = dict()
+        self.resolve_cache_generation: int = 0  # value of self.generation when resolve_cache was filled
+        self.resolve_cache_suspended_from_level = None  # stack level of the outermost scope pushed with use_cache=False
+        self.resolve_cache_hits: int = 0
+        self.resolve_cache_misses: int = 0
+        self.resolved_uncachable: bool = False  # set when resolving touches a dynamic ConfigVar
 
     def __len__(self) -> int:
         """ From RafeKettler/magicmethods: Returns the length of the container.
@@ -99,12 +106,26 @@ class ConfigVarStack:
         except KeyError:
             config_var = ConfigVar(self, key)
             self.var_list[-1][key] = config_var
+            # a new ConfigVar might have no values, so config_var_changed would not be called by extend
+            if self.resolve_cache_suspended_from_level is None or len(self.var_list) <= self.resolve_cache_suspended_from_level:
+                self.generation += 1
         else:
             # clear the ConfigVar if its already in self.var_list[-1]
             config_var.clear()
         finally:
             config_var.extend(values)
 
+    def config_var_changed(self, config_var: ConfigVar) -> None:
+        """ called by a ConfigVar when it's values or callbacks are changed.
+            Changes to ConfigVars that are not in the stack, or only exist in scopes
+            pushed with use_cache=False do not effect the cache.
+        """
+        top_level = len(self.var_list) if self.resolve_cache_suspended_from_level is None else self.resolve_cache_suspended_from_level
+        for level in range(top_level-1, -1, -1):
+            if self.var_list[level].get(config_var.name) is config_var:
+                self.generation += 1
+                break
+
     def set_dynamic_var(self, key, callback_func, initial_value=None):
         if initial_value is None:
             self.__setitem__(key, callback_func.__name__)  # there must be a dummy value so callback will be called
@@ -128,6 +149,7 @@ class ConfigVarStack:
         for var_dict in reversed(self.var_list):
             try:
                 del var_dict[key]
+                self.generation += 1
                 return
             except KeyError:
                 continue
@@ -188,6 +210,7 @@ class ConfigVarStack:
             if default:
                 new_config_var.append(default)
             self.var_list[-1][key] = new_config_var
+            self.generation += 1
         retVal = self[key]
         return retVal
 
@@ -195,6 +218,7 @@ class ConfigVarStack:
         """ clear all stack levels"""
         self.var_list.clear()
         self.var_list.append(dict())
+        self.generation += 1
 
     def variable_params_to_config_vars(self, parser_retVal):
         """ parse positional and/or key word params and create
@@ -231,7 +255,34 @@ class ConfigVarStack:
     def resolve_str_to_list_with_statistics(self, str_to_resolve):
         """ resolve a string to a list, return the list and also the number of variables and literal in the list.
             Returning these statistic can help with debugging
+            Results are cached, see "caching" in the class doc string.
         """
+        if not self.use_resolve_cache or self.resolve_cache_suspended_from_level is not None:
+            return self.resolve_str_to_list_with_statistics_no_cache(str_to_resolve)
+
+        if self.resolve_cache_generation != self.generation:
+            self.resolve_cache.clear()
+            self.resolve_cache_generation = self.generation
+        retVal = self.resolve_cache.get(str_to_resolve)
+        if retVal is not None:
+            self.resolve_cache_hits += 1
+            return retVal
+
+        self.resolve_cache_misses += 1
+        generation_before = self.generation
+        outer_resolved_uncachable = self.resolved_uncachable
+        self.resolved_uncachable = False
+        try:
+            retVal = self.resolve_str_to_list_with_statistics_no_cache(str_to_resolve)
+        finally:
+            # generation might change while resolving, e.g. if a dynamic ConfigVar's callback is setting ConfigVars
+            resolved_uncachable = self.resolved_uncachable or generation_before != self.generation
+            self.resolved_uncachable = outer_resolved_uncachable or resolved_uncachable
+        if not resolved_uncachable:
+            self.resolve_cache[str_to_resolve] = retVal
+        return retVal
+
+    def resolve_str_to_list_with_statistics_no_cache(self, str_to_resolve):
         resolved_parts = list()
         num_literals = 0
         num_variables = 0
@@ -243,11 +294,14 @@ class ConfigVarStack:
                 if parser_retVal.variable_name in self:
                     with self.push_scope_context(use_cache=False):
                         array_range = self.variable_params_to_config_vars(parser_retVal)
-                        resolved_parts.extend(list(self[parser_retVal.variable_name])[array_range[0]:array_range[1]])
+                        config_var = self[parser_retVal.variable_name]
+                        if config_var.dynamic:
+                            self.resolved_uncachable = True
+                        resolved_parts.extend(list(config_var)[array_range[0]:array_range[1]])
                 else:
                     resolved_parts.append(parser_retVal.variable_str)
                 num_variables += 1
-        return resolved_parts, num_literals, num_variables
+        return tuple(resolved_parts), num_literals, num_variables
 
     def resolve_str(self, val_to_resolve: str) -> str:
         #start_time = time.perf_counter()
@@ -347,15 +401,35 @@ class ConfigVarStack:
 
     def push_scope(self):
         self.var_list.append(dict())
+        self.generation += 1
 
     def pop_scope(self):
         self.var_list.pop()
+        self.generation += 1
 
     @contextmanager
     def push_scope_context(self, use_cache=True):
-        self.push_scope()
-        yield self
-        self.pop_scope()
+        """ when use_cache is False the resolve cache is not used while the scope exists,
+            and changes to ConfigVars in the scope will not clear the cache.
+            This is used for temporary scopes that are discarded without effecting
+            the values in the lower scopes.
+        """
+        if use_cache:
+            self.push_scope()
+            try:
+                yield self
+            finally:
+                self.pop_scope()
+        else:
+            outer_suspended_from_level = self.resolve_cache_suspended_from_level
+            if outer_suspended_from_level is None:
+                self.resolve_cache_suspended_from_level = len(self.var_list)
+            self.var_list.append(dict())
+            try:
+                yield self
+            finally:
+                self.var_list.pop()
+                self.resolve_cache_suspended_from_level = outer_suspended_from_level
 
     def read_environment(self, vars_to_read_from_environ=None):
         """ Get values from environment. Get all values if regex is None.
@@ -404,10 +478,16 @@ class ConfigVarStack:
             print(f"{len(self)} ConfigVars")
             print(f"{self.resolve_counter} resolves")
             print(f"{self.simple_resolve_counter} simple resolves")
+            print(self.resolve_cache_statistics_str())
             average_resolve_ms = (self.resolve_time / self.resolve_counter)*1000 if self.resolve_counter else 0.0
             print(f"{average_resolve_ms:.4}ms per resolve")
             print(f"{self.resolve_time:.3}sec total resolve time")
 
+    def resolve_cache_statistics_str(self) -> str:
+        num_lookups = self.resolve_cache_hits + self.resolve_cache_misses
+        hit_rate = self.resolve_cache_hits / num_lookups if num_lookups else 0.0
+        return f"resolve cache: {self.resolve_cache_hits} hits, {self.resolve_cache_misses} misses, {hit_rate:.1%} hit rate"
+
     def shallow_resolve_str(self, val_to_resolve: str) -> str:
         """ resolve a string without consideration for:
             - confiVar "functions", e.g.  $(Set_Specific_Folder_Icon<...>)
@@ -435,8 +515,12 @@ class ConfigVarStack:
     def push_resolve_indicator(self, resolve_indicator):
         previous_resolve_indicator = self.resolve_indicator
         self.resolve_indicator = resolve_indicator
-        yield self
-        self.resolve_indicator = previous_resolve_indicator
+        self.generation += 1
+        try:
+            yield self
+        finally:
+            self.resolve_indicator = previous_resolve_indicator
+            self.generation += 1
 
     def does_config_var_name_means_path(self, config_var_name):
         for ending in self.get("CONFIG_VAR_NAME_ENDING_DENOTING_PATH", []).list():
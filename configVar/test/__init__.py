@@ -1 +1 @@
-from .testConfigVar import TestConfigVar
+from .testConfigVar import TestConfigVar, TestConfigVarResolveCache
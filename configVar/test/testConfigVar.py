@@ -2,6 +2,8 @@
 
 import sys
 import os
+import random
+import tempfile
 import unittest
 from pathlib import Path
 import time, datetime
@@ -15,6 +17,7 @@ import aYaml
 
 from configVar import config_vars
 from configVar import ConfigVarYamlReader
+from configVar.configVarParser import var_parse_imp, var_parse_imp_by_char
 
 
 def normalize_yaml_lines(yaml_file):
@@ -91,7 +94,6 @@ class TestConfigVar(unittest.TestCase):
 
     def test_readFile(self):
         input_file_path = Path(__file__).parent.joinpath("test_input.yaml")
-        out_file_path = Path(__file__).parent.joinpath("test_out.yaml")
         expected_file_path = Path(__file__).parent.joinpath("expected_output.yaml")
 
         reader = ConfigVarYamlReader(config_vars)
@@ -100,11 +102,13 @@ class TestConfigVar(unittest.TestCase):
         variables_as_yaml = config_vars.repr_for_yaml()
         yaml_doc = aYaml.YamlDumpDocWrap(variables_as_yaml, '!define', "",
                                               explicit_start=True, sort_mappings=True)
-        with open(out_file_path, "w") as wfd:
-            aYaml.writeAsYaml(yaml_doc, wfd)
+        with tempfile.TemporaryDirectory() as out_folder:
+            out_file_path = Path(out_folder, "test_out.yaml")
+            with open(out_file_path, "w") as wfd:
+                aYaml.writeAsYaml(yaml_doc, wfd)
 
-        with open(out_file_path, "r") as r_out:
-            out_lines = r_out.readlines()
+            with open(out_file_path, "r") as r_out:
+                out_lines = r_out.readlines()
         with open(expected_file_path, "r") as r_expected:
             expected_lines = r_expected.readlines()
 
@@ -194,3 +198,140 @@ class TestConfigVar(unittest.TestCase):
         self.assertEqual(config_vars["00"].str(), "@(ONE) @(TWO)")
 
 
+
+
+class TestConfigVarResolveCache(unittest.TestCase):
+    def setUp(self):
+        config_vars.clear()
+        config_vars["SYNC_DIR"] = "$(BASE_DIR)/sync"
+        config_vars["BASE_DIR"] = "/base"
+
+    def tearDown(self):
+        config_vars.clear()
+
+    def test_hits(self):
+        hits_before = config_vars.resolve_cache_hits
+        self.assertEqual("/base/sync/a", config_vars.resolve_str("$(SYNC_DIR)/a"))
+        self.assertEqual("/base/sync/a", config_vars.resolve_str("$(SYNC_DIR)/a"))
+        self.assertEqual(["/base/sync/a"], config_vars.resolve_str_to_list("$(SYNC_DIR)/a"))
+        self.assertEqual(hits_before + 2, config_vars.resolve_cache_hits)
+        self.assertIn("hit rate", config_vars.resolve_cache_statistics_str())
+
+    def test_no_stale_values_after_change(self):
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        config_vars["BASE_DIR"] = "/other"
+        self.assertEqual("/other/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        config_vars["BASE_DIR"].append("/more")
+        self.assertEqual("/other/more/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        config_vars["BASE_DIR"].clear()
+        self.assertEqual("/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        del config_vars["BASE_DIR"]
+        self.assertEqual("$(BASE_DIR)/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        config_vars.setdefault("BASE_DIR", "/default")
+        self.assertEqual("/default/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+
+    def test_no_stale_values_across_scopes(self):
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        with config_vars.push_scope_context():
+            config_vars["BASE_DIR"] = "/inner"
+            self.assertEqual("/inner/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+            with config_vars.push_scope_context():
+                config_vars["SYNC_DIR"] = "$(BASE_DIR)/inner_sync"
+                self.assertEqual("/inner/inner_sync", config_vars.resolve_str("$(SYNC_DIR)"))
+            self.assertEqual("/inner/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+
+        stack_size = config_vars.stack_size()
+        config_vars.push_scope()
+        config_vars["BASE_DIR"] = "/pushed"
+        self.assertEqual("/pushed/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        config_vars.resize_stack(stack_size)
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+
+    def test_new_var_without_values(self):
+        self.assertEqual("a$(NEW_VAR)b", config_vars.resolve_str("a$(NEW_VAR)b"))
+        config_vars["NEW_VAR"] = None
+        self.assertEqual("ab", config_vars.resolve_str("a$(NEW_VAR)b"))
+        self.assertEqual("a$(NEW_LIST)b", config_vars.resolve_str("a$(NEW_LIST)b"))
+        config_vars["NEW_LIST"] = []
+        self.assertEqual("ab", config_vars.resolve_str("a$(NEW_LIST)b"))
+        # shadowing BASE_DIR with an empty ConfigVar on a higher level
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        with config_vars.push_scope_context():
+            config_vars["BASE_DIR"] = ()
+            self.assertEqual("/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+
+    def test_params_do_not_clear_cache(self):
+        config_vars["GREET"] = "hello $(__GREET_1__) $(title) from $(BASE_DIR)"
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+        generation_before = config_vars.generation
+        self.assertEqual("hello world sir from /base", config_vars.resolve_str("$(GREET<world, title=sir>)"))
+        self.assertEqual("hello moon madam from /base", config_vars.resolve_str("$(GREET<moon, title=madam>)"))
+        self.assertEqual(generation_before, config_vars.generation)
+        self.assertNotIn("__GREET_1__", config_vars)
+        self.assertEqual("$(title)", config_vars.resolve_str("$(title)"))
+        config_vars["BASE_DIR"] = "/changed"
+        self.assertEqual("hello world sir from /changed", config_vars.resolve_str("$(GREET<world, title=sir>)"))
+
+    def test_dynamic_config_var_not_cached(self):
+        counter = [0]
+
+        def next_number(val):
+            counter[0] += 1
+            return str(counter[0])
+        config_vars.set_dynamic_var("__COUNTER__", next_number)
+        config_vars["COUNTED_DIR"] = "$(SYNC_DIR)/$(__COUNTER__)"
+        self.assertEqual("/base/sync/1", config_vars["COUNTED_DIR"].str())
+        self.assertEqual("/base/sync/2", config_vars["COUNTED_DIR"].str())
+        self.assertEqual("/base/sync/3", config_vars.resolve_str("$(COUNTED_DIR)"))
+
+    def test_resolve_indicator(self):
+        self.assertEqual("@(SYNC_DIR)", config_vars.resolve_str("@(SYNC_DIR)"))
+        with config_vars.push_resolve_indicator("@"):
+            config_vars["AT_SYNC_DIR"] = "@(BASE_DIR)/at_sync"
+            self.assertEqual("/base/at_sync", config_vars.resolve_str("@(AT_SYNC_DIR)"))
+            self.assertEqual("$(SYNC_DIR)", config_vars.resolve_str("$(SYNC_DIR)"))
+        self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+
+    def test_cache_disabled(self):
+        config_vars.use_resolve_cache = False
+        try:
+            hits_before = config_vars.resolve_cache_hits
+            self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+            self.assertEqual("/base/sync", config_vars.resolve_str("$(SYNC_DIR)"))
+            self.assertEqual(hits_before, config_vars.resolve_cache_hits)
+        finally:
+            config_vars.use_resolve_cache = True
+
+
+class TestVarParseImp(unittest.TestCase):
+    """ var_parse_imp should yield the same as parsing character by character with var_parse_imp_by_char """
+
+    def assert_same_parse(self, f_string, resolve_indicator='$'):
+        self.assertEqual(list(var_parse_imp_by_char(f_string, resolve_indicator)),
+                         list(var_parse_imp(f_string, resolve_indicator)), repr(f_string))
+
+    def test_parse(self):
+        parsed = list(var_parse_imp("copy $(SRC<a, b=7>)[x] to $(DST[2] ) $(A $(B"))
+        self.assertEqual(["copy ", "[x] to ", " $(A $(B"], [p.literal_text for p in parsed])  # unterminated references are literal
+        self.assertEqual(["SRC", "DST", None], [p.variable_name for p in parsed])
+        self.assertEqual(["$(SRC<a, b=7>)", "$(DST[2] )"], [p.variable_str for p in parsed[:2]])
+        self.assertEqual((["a"], {"b": "7"}), (parsed[0].positional_params, parsed[0].key_word_params))
+        self.assertEqual(("2", 2), (parsed[1].array_index_str, parsed[1].array_index_int))
+
+    def test_same_as_by_char(self):
+        for f_string in ("", "no refs", "$", "$$(A)", "$(A)", "$(A", "$()", "$(A )", "$(A <b> )", "$(A<>)",
+                         "$(A<b)>)", "$(A[0])", "$(A[ 1 ])", "$(A[-1])", "$(A[x])", "$(A [0])", "$(A[0]",
+                         "$(A(x86))", "$(A(x86)", "$(A(B C)$(D)$(E))", "$(A.B)", "$(A$(B))", "$(é)", "\t$(A\n)",
+                         "$(A<b=)>)$(C[1]x)$(D)", "path/$(A)/$(B)/$(C<d, e=f>)/end"):
+            self.assert_same_parse(f_string)
+            self.assert_same_parse(f_string.replace("$", "@"), "@")
+
+    def test_fuzz_same_as_by_char(self):
+        rand = random.Random(25)
+        fragments = list("$$(()<>[]=, \t\nAz_-09.@") + ["$(", "$(A)", "$(A<", "$(A[", "1", " 2 "]
+        for _ in range(20000):
+            f_string = "".join(rand.choice(fragments) for _ in range(rand.randint(0, 24)))
+            self.assert_same_parse(f_string)
+            self.assert_same_parse(f_string, "@")
@@ -1,8 +1,9 @@
 import os
+import sys
+import time
 import sqlite3
 from contextlib import contextmanager
 import datetime
-import inspect
 from pathlib import Path
 from _collections import defaultdict
 import shutil
@@ -31,27 +32,69 @@ unique_name_to_disk_db = False
 
 
 class Statistic():
+    """ count, total and max time in ms of db transactions/selections opened from the same call site """
     def __init__(self) -> None:
         self.count = 0
         self.time = 0.0
+        self.max_time = 0.0
 
     def add_instance(self, time):
         self.count += 1
         self.time += time
+        self.max_time = max(self.max_time, time)
 
     def __str__(self):
         average = self.time/self.count if self.count else 0.0
-        retVal = f"count, {self.count}, time, {self.time:.2f}, ms, average, {average:.2f}, ms"
+        retVal = f"count, {self.count}, time, {self.time:.2f}, ms, average, {average:.2f}, ms, max, {self.max_time:.2f}, ms"
         return retVal
 
     def __repr__(self):
         average = self.time/self.count if self.count else 0.0
-        retVal = f"{self.count}, {self.time:.2f}, {average:.2f}"
+        retVal = f"{self.count}, {self.time:.2f}, {average:.2f}, {self.max_time:.2f}"
         return retVal
 
 
+def caller_name(depth=1):
+    """ name of the function depth frames above the caller of caller_name.
+        Much cheaper than inspect.stack() which reads the source of all frames.
+    """
+    try:
+        retVal = sys._getframe(depth + 1).f_code.co_name
+    except ValueError:  # call stack is not deep enough
+        retVal = "unknown"
+    return retVal
+
+
+def caller_site(depth=1):
+    """ function name, file name and line of the frame depth frames above the caller of caller_site """
+    try:
+        frame = sys._getframe(depth + 1)
+        retVal = f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+    except ValueError:  # call stack is not deep enough
+        retVal = "unknown"
+    return retVal
+
+
 class DBMaster(object):
-    def __init__(self, db_url: str, ddl_folder: Path) -> None:
+    """ performance profiles are sets of pragmas applied when the db is opened.
+        profile is selected by config var DB_PERFORMANCE_PROFILE or by the performance_profile parameter.
+        - durable: sqlite's defaults, safest for a db file that must survive a crash
+        - fast-bulk-load: for creating and filling the db, as is done by most instl commands.
+            journal is kept in memory (so transactions can still be rolled back) and nothing is synced to disk
+        - read-mostly: for a db file that is read by several processes or queried a lot after it was created
+        pragma order matters: page_size must be set before journal_mode=WAL and before tables are created.
+    """
+    performance_profiles = {
+        "durable": {"page_size": 4096, "journal_mode": "DELETE", "synchronous": "FULL",
+                    "temp_store": "DEFAULT", "mmap_size": 0, "cache_size": -2000},
+        "fast-bulk-load": {"page_size": 8192, "journal_mode": "MEMORY", "synchronous": "OFF",
+                           "temp_store": "MEMORY", "mmap_size": 256 * 1024 * 1024, "cache_size": -64 * 1024},
+        "read-mostly": {"page_size": 4096, "journal_mode": "WAL", "synchronous": "NORMAL",
+                        "temp_store": "MEMORY", "mmap_size": 1024 * 1024 * 1024, "cache_size": -32 * 1024},
+    }
+    default_performance_profile = "fast-bulk-load"
+
+    def __init__(self, db_url: str, ddl_folder: Path, performance_profile=None) -> None:
         self.top_user_version = 1  # user_version is a standard pragma tha defaults to 0
         if db_url == ":memory:":
             self.memory_db = True
@@ -63,9 +106,21 @@ class DBMaster(object):
         self.__conn = None
         self.__curs = None
         self.locked_tables = set()
+        # when collect_statistics is True the time of each transaction/selection is added to self.statistics
+        # by description or, if no description was given, by call site. Statistics are printed when the db is closed.
         self.statistics = defaultdict(Statistic)
-        self.print_execute_times = False
+        self._collect_statistics = False
+        self._collect_statistics_generation = None  # config_vars.generation when _collect_statistics was read
         self.transaction_depth = 0
+        self.performance_profile = performance_profile
+
+    @property
+    def collect_statistics(self) -> bool:
+        """ PRINT_STATISTICS_DB might be set after the db was created, so it is read again whenever config_vars changed """
+        if self._collect_statistics_generation != config_vars.generation:
+            self._collect_statistics = bool(config_vars.get("PRINT_STATISTICS_DB", "False"))
+            self._collect_statistics_generation = config_vars.generation
+        return self._collect_statistics
 
     def get_file_path(self) -> str:
         if self.memory_db:
@@ -110,6 +165,7 @@ class DBMaster(object):
             utils.chown_chmod_on_path(self.db_file_path)
 
     def configure_db(self):
+        self.set_performance_profile()
         self.set_db_pragma("foreign_keys", "ON")
         self.set_db_pragma("user_version", self.top_user_version)
         #self.__conn.set_authorizer(self.authorizer_handler_sqlite3)
@@ -139,17 +195,29 @@ class DBMaster(object):
         if self.__conn:
             self.__conn.close()
             self.__conn = None
-        if bool(config_vars.get("PRINT_STATISTICS_DB", "False")) and self.statistics:
-            for name, stats in sorted(self.statistics.items()):
-                average = stats.time/stats.count
-                print(f"{name}, {repr(stats)}")
-
-                max_count = max(self.statistics.items(), key=lambda S: S[1].count)
-                max_time = max(self.statistics.items(), key=lambda S: S[1].time)
-                total_DB_time = sum(stat.time for stat in self.statistics.values())
-                print("max count:", max_count[0], max_count[1])
-                print("max time:", max_time[0], max_time[1])
-                print("total DB time:", total_DB_time)
+        if self.collect_statistics and self.statistics:
+            for line in self.statistics_report():
+                print(line)
+
+    def statistics_report(self):
+        """ lines of: call site, count, total ms, average ms, max ms - sorted by total time """
+        retVal = ["call site, count, total ms, average ms, max ms"]
+        for name, stats in sorted(self.statistics.items(), key=lambda name_stats: name_stats[1].time, reverse=True):
+            retVal.append(f"{name}, {repr(stats)}")
+        total_DB_time = sum(stat.time for stat in self.statistics.values())
+        total_DB_count = sum(stat.count for stat in self.statistics.values())
+        retVal.append(f"total DB time, {total_DB_count}, {total_DB_time:.2f}")
+        return retVal
+
+    def set_performance_profile(self):
+        if not self.performance_profile:
+            self.performance_profile = config_vars.get("DB_PERFORMANCE_PROFILE", self.default_performance_profile).str()
+        if self.performance_profile not in self.performance_profiles:
+            raise ValueError(f"Unknown db performance profile {self.performance_profile}, should be one of {list(self.performance_profiles.keys())}")
+        for pragma_name, pragma_value in self.performance_profiles[self.performance_profile].items():
+            self.set_db_pragma(pragma_name, pragma_value)
+        actual_values = ", ".join(f"{pragma_name}={self.get_db_pragma(pragma_name)}" for pragma_name in self.performance_profiles[self.performance_profile])
+        log.debug(f"DB {self.get_file_path()} performance profile: {self.performance_profile}, {actual_values}")
 
     def set_db_pragma(self, pragma_name, pragma_value):
         set_pragma_q = f"""PRAGMA {pragma_name} = {pragma_value};"""
@@ -206,24 +274,34 @@ class DBMaster(object):
             self.counter += 1
             self.progress_callback(f"{self.description} {self.counter}")
 
+    def description_for_call(self, description, progress_callback):
+        """ if no description was given name the transaction after the function that opened it, or after the
+            call site if collecting statistics. Called from inside the transaction/selection generator so the
+            caller is 3 frames up: this function, the generator, contextlib's __enter__.
+            Description is needed only for progress reporting and statistics, so no frame is looked at otherwise.
+        """
+        retVal = description
+        if not retVal:
+            if self.collect_statistics:
+                retVal = caller_site(3)
+            elif progress_callback:
+                retVal = caller_name(3)
+        return retVal
+
+    def add_statistic(self, description, start_time):
+        self.statistics[description].add_instance((time.perf_counter() - start_time) * 1000.0)
+
     @contextmanager
     def transaction(self, description=None, progress_callback=None, progress_callback_n_instructions=50*1024*1024):
         try:
-
-            if not description:
-                try:  # sporadically inspect.stack()[2] will raise 'list index out of range'
-                    description = inspect.stack()[2][3]
-                except IndexError as ex:
-                    description = "unknown"
+            description = self.description_for_call(description, progress_callback)
             with self.ProgressCallBacker(self, description, progress_callback, progress_callback_n_instructions):
-                #time1 = time.perf_counter()
+                start_time = time.perf_counter() if self.collect_statistics else None
                 self.begin()
                 yield self.__curs
                 self.commit()
-                #time2 = time.perf_counter()
-                #if self.print_execute_times:
-                #    print('DB transaction %s took %0.3f ms' % (description, (time2-time1)*1000.0))
-                #self.statistics[description].add_instance((time2-time1)*1000.0)
+                if start_time is not None:
+                    self.add_statistic(description, start_time)
         except sqlite3.OperationalError as s3oo:
             if not self.memory_db:
                 log.error("database error, disk %s", str(shutil.disk_usage(self.db_file_path.parent)), exc_info=True)
@@ -238,17 +316,12 @@ class DBMaster(object):
             no commit is done
         """
         try:
-            if not description:
-                description = inspect.stack()[2][3]
+            description = self.description_for_call(description, progress_callback)
             with self.ProgressCallBacker(self, description, progress_callback, progress_callback_n_instructions):
-                #time1 = time.perf_counter()
+                start_time = time.perf_counter() if self.collect_statistics else None
                 yield self.__conn.cursor()
-                #time2 = time.perf_counter()
-                #if self.print_execute_times:
-                #    if not description:
-                #        description = inspect.stack()[2][3]
-                #    print('DB selection %s took %0.3f ms' % (description, (time2-time1)*1000.0))
-                #self.statistics[description].add_instance((time2-time1)*1000.0)
+                if start_time is not None:
+                    self.add_statistic(description, start_time)
         except Exception as ex:
             raise
 
@@ -258,17 +331,12 @@ class DBMaster(object):
             no commit is done
         """
         try:
-            if not description:
-                description = inspect.stack()[2][3]
+            description = self.description_for_call(description, progress_callback)
             with self.ProgressCallBacker(self, description, progress_callback, progress_callback_n_instructions):
-                #time1 = time.perf_counter()
+                start_time = time.perf_counter() if self.collect_statistics else None
                 yield self.__conn.cursor()
-                #time2 = time.perf_counter()
-                #if self.print_execute_times:
-                #    if not description:
-                #        description = inspect.stack()[2][3]
-                #    print('DB temporary transaction %s took %0.3f ms' % (description, (time2-time1)*1000.0))
-                #self.statistics[description].add_instance((time2-time1)*1000.0)
+                if start_time is not None:
+                    self.add_statistic(description, start_time)
         except Exception as ex:
             raise
 
@@ -292,10 +360,7 @@ class DBMaster(object):
         try:
             if query_params is None:
                 query_params = {}
-            if self.print_execute_times:
-                description = inspect.stack()[1][3]
-            else:
-                description = None
+            description = caller_site(1) if self.collect_statistics else None
             with self.selection(description=description, progress_callback=progress_callback) as curs:
                 curs.execute(query_text, query_params)
                 one_result = curs.fetchone()
@@ -318,10 +383,7 @@ class DBMaster(object):
         try:
             if query_params is None:
                 query_params = {}
-            if self.print_execute_times:
-                description = inspect.stack()[1][3]
-            else:
-                description = None
+            description = caller_site(1) if self.collect_statistics else None
             with self.selection(description=description, progress_callback=progress_callback) as curs:
                 curs.execute(query_text, query_params)
                 all_results = curs.fetchall()
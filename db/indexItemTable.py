@@ -16,6 +16,7 @@ import utils
 from aYaml import *
 from configVar import config_vars, private_config_vars
 from configVar import eval_conditional
+from .indexSnapshot import IndexSnapshot
 
 # when adding a new OS name also add the name in init-values.ddl
 os_names = ('common', 'Mac', 'Mac32', 'Mac64', 'Win', 'Win32', 'Win64', 'Linux')
@@ -49,6 +50,7 @@ class IndexItemsTable(object):
         self.add_views()
         self.defines_for_iids = dict()  # defines which are specific to an iid
         self.iid_location_in_file = dict()  # for debugging, used in read_index_node_one_by_one to track duplicate IIDs
+        self.index_snapshot_doc = None  # if not None, an IndexSnapshotDoc where read_index_node keeps what it read
 
     def __del__(self):
         self.db.unlock_all_tables()
@@ -435,7 +437,6 @@ class IndexItemsTable(object):
     def resolve_inheritance(self) -> None:
         # utils.add_to_actions_stack("resolving inheritance")
         inherit_order, inherit_dict = self.prepare_inherit_order()
-        resolve_items_script = ""
         if bool(config_vars.get("DEBUG_INDEX_DB", False)):
             with self.db.transaction() as curs:
                 for iid in inherit_order:
@@ -446,16 +447,84 @@ class IndexItemsTable(object):
                         log.info(f"db exception resolving inheritance for {iid}, {ex}")
                 curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_owner_iid ON index_item_detail_t(owner_iid)""")
         else:
-            for iid in inherit_order:
-                resolve_items_script += self.get_resolve_item_query_for_iid(iid, inherit_dict[iid])
-            with self.db.transaction() as curs:
-                curs.executescript(resolve_items_script) #to imporove perofrmance we first execute, then create the index
-                curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_owner_iid ON index_item_detail_t(owner_iid)""")
-                # creating these indexes did not improve DB performance and added 20s to preparing __ALL_GUIDS__ installation
-                #curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_value ON index_item_detail_t(detail_value)""")
-                #curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_name ON index_item_detail_t(detail_name)""")
+            self.resolve_inheritance_by_levels(inherit_order, inherit_dict)
+
+    def resolve_inheritance_by_levels(self, inherit_order, inherit_dict) -> None:
+        """ copy inherited details with one INSERT...SELECT per inheritance level, instead of one per iid.
+            level 1 iids inherit only from iids that do not inherit, level n iids inherit from iids of level < n.
+            Inherited details are first collected in a temp table as references to the original details,
+            and then copied to index_item_detail_t in the same order they would have been inserted
+            by resolving the iids one by one in inherit_order, so _id order of index_item_detail_t does not change.
+        """
+        inherit_level = dict()
+        for iid in inherit_order:  # parents always come before their inheritors in inherit_order
+            inherit_level[iid] = 1 + max(inherit_level.get(parent_iid, 0) for parent_iid in inherit_dict[iid])
+        # resolving one by one found the details with the owner_iid index, so they are ordered by the iid
+        # they are inherited from, then original details by _id, then inherited details in the order they were inherited
+        inheritor_rows = ((iid_pos, parent_rank, iid, parent_iid, inherit_level[iid])
+                          for iid_pos, iid in enumerate(inherit_order)
+                          for parent_rank, parent_iid in enumerate(sorted(set(inherit_dict[iid]))))
+        query_text = f"""
+            INSERT INTO inherited_detail_t (owner_pos, source_rank, source_pos, source_id, owner_iid, original_detail_id, generation)
+            SELECT inherit_from_t.inheritor_pos, inherit_from_t.inherit_from_rank, -1, original_t._id,
+              inherit_from_t.inheritor_iid, original_t._id, original_t.generation+1
+            FROM inherit_from_t
+              JOIN index_item_detail_t AS original_t
+                ON original_t.owner_iid = inherit_from_t.inherit_from_iid
+              JOIN active_operating_systems_t
+                ON active_operating_systems_t._id=original_t.os_id
+                AND active_operating_systems_t.os_is_active = 1
+            WHERE inherit_from_t.level = :level
+            AND original_t.detail_name NOT IN {utils.quoteme_single_list_for_sql(self.not_inherit_details)}
+            UNION ALL
+            SELECT inherit_from_t.inheritor_pos, inherit_from_t.inherit_from_rank, inherited_t.owner_pos, inherited_t._id,
+              inherit_from_t.inheritor_iid, inherited_t.original_detail_id, inherited_t.generation+1
+            FROM inherit_from_t
+              JOIN inherited_detail_t AS inherited_t
+                ON inherited_t.owner_iid = inherit_from_t.inherit_from_iid
+            WHERE inherit_from_t.level = :level
+            ORDER BY 1, 2, 3, 4
+            """
+        with self.db.transaction() as curs:
+            curs.execute("""CREATE TEMP TABLE inherit_from_t
+                            (inheritor_pos INTEGER, inherit_from_rank INTEGER, inheritor_iid TEXT, inherit_from_iid TEXT, level INTEGER)""")
+            curs.executemany("""INSERT INTO inherit_from_t (inheritor_pos, inherit_from_rank, inheritor_iid, inherit_from_iid, level)
+                                VALUES (?, ?, ?, ?, ?)""", inheritor_rows)
+            curs.execute("""CREATE INDEX ix_inherit_from_t_level ON inherit_from_t(level)""")
+            curs.execute("""CREATE TEMP TABLE inherited_detail_t
+                            (_id INTEGER PRIMARY KEY, owner_pos INTEGER, source_rank INTEGER, source_pos INTEGER, source_id INTEGER,
+                             owner_iid TEXT, original_detail_id INTEGER, generation INTEGER)""")
+            curs.execute("""CREATE INDEX ix_inherited_detail_t_owner_iid ON inherited_detail_t(owner_iid)""")
+            for level in range(1, max(inherit_level.values(), default=0) + 1):
+                curs.execute(query_text, {"level": level})
+            curs.execute("""
+                INSERT INTO index_item_detail_t(original_iid, owner_iid, os_id, detail_name, detail_value, generation, tag, os_is_active)
+                SELECT original_t.original_iid,
+                  inherited_t.owner_iid,
+                  original_t.os_id,
+                  original_t.detail_name,
+                  original_t.detail_value,
+                  inherited_t.generation,
+                  original_t.tag,
+                  original_t.os_is_active
+                FROM inherited_detail_t AS inherited_t
+                  JOIN index_item_detail_t AS original_t
+                    ON original_t._id = inherited_t.original_detail_id
+                ORDER BY inherited_t.owner_pos, inherited_t._id
+                """)
+            curs.execute("""DROP TABLE inherited_detail_t""")
+            curs.execute("""DROP TABLE inherit_from_t""")
+            curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_owner_iid ON index_item_detail_t(owner_iid)""")
+            # creating these indexes did not improve DB performance and added 20s to preparing __ALL_GUIDS__ installation
+            #curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_value ON index_item_detail_t(detail_value)""")
+            #curs.execute("""CREATE INDEX IF NOT EXISTS ix_svn_index_item_detail_t_name ON index_item_detail_t(detail_name)""")
 
     def prepare_inherit_order(self):
+        """ return a list of iids that inherit, where each iid comes after all the iids it inherits from,
+            and a dict of iid -> list of iids it inherits from.
+            iids are resolved depth first in sorted order, each iid is visited only once.
+            Raises ValueError if inheritance is circular.
+        """
         inherit_order = utils.unique_list()
         inherit_dict = defaultdict(list)
         query_text = """
@@ -470,26 +539,22 @@ class IndexItemsTable(object):
         for pair in inherit_pairs:
             inherit_dict[pair[0]].append(pair[1])
 
-        def resolve_iid(iid):
-            iis = inherit_dict.get(iid,[])
-            if iis:
-                for ii in iis:
-                    resolve_iid(ii)
-                inherit_order.append(iid)
-
-        def check_inherit_order():
-            assert len(inherit_order) == len(set(inherit_order)), "retVal has duplicates"
-            assert not set(inherit_order) ^ set(inherit_dict.keys()), "retVal and inherit_dict different"
-            for i in range(len(inherit_order)):
-                iis = inherit_dict[inherit_order[i]]
-                for ii in iis:
-                    if ii in inherit_dict:
-                        ii_index = inherit_order.index(ii)
-                        assert ii_index < i, f"{inherit_order[i]} inherit from {ii} but {ii} does not come before {inherit_order[i]}"
-
         for iid in sorted(inherit_dict):
-            resolve_iid(iid)
-        check_inherit_order()
+            if iid in inherit_order:
+                continue
+            # iids whose parents are being resolved -> iterator over their parents, each iid inherits from the next one
+            being_resolved = {iid: iter(inherit_dict[iid])}
+            while being_resolved:
+                for parent_iid in next(reversed(being_resolved.values())):
+                    if parent_iid in inherit_dict and parent_iid not in inherit_order:
+                        if parent_iid in being_resolved:
+                            cycle = list(being_resolved)
+                            cycle = cycle[cycle.index(parent_iid):] + [parent_iid]
+                            raise ValueError(f"circular inheritance: {' -> '.join(cycle)}")
+                        being_resolved[parent_iid] = iter(inherit_dict[parent_iid])
+                        break
+                else:  # all parents resolved
+                    inherit_order.append(being_resolved.popitem()[0])
         return inherit_order, inherit_dict
 
     def get_resolve_item_query_for_iid(self, iid_to_resolve, inherit_from_iids, generation=0):
@@ -524,6 +589,43 @@ class IndexItemsTable(object):
                       "not_inherit_details": utils.quoteme_single_list_for_sql(self.not_inherit_details)})
         return query_text
 
+    @staticmethod
+    def get_config_value_for_index(kind, name):
+        """ config values that reading an index node depends on:
+            conditional: evaluation of __if... keys
+            depends: resolving of depends values that reference config vars
+            template: text of a template definition
+        """
+        if kind == "conditional":
+            retVal = eval_conditional(name, config_vars)
+        elif kind == "depends":
+            retVal = config_vars.resolve_str_to_list(name)
+        elif kind == "template":
+            retVal = config_vars[name].raw()
+        else:
+            raise ValueError(f"unknown kind of config value for index {kind}")
+        return retVal
+
+    def config_value_for_index(self, kind, name):
+        """ return get_config_value_for_index(kind, name) and keep the value in self.index_snapshot_doc, if any """
+        retVal = self.get_config_value_for_index(kind, name)
+        if self.index_snapshot_doc is not None and (kind != "depends" or "$" in name):
+            self.index_snapshot_doc.config_dependencies[(kind, name)] = IndexSnapshot.config_value_to_json(retVal)
+        return retVal
+
+    def config_dependencies_did_not_change(self, config_dependencies) -> bool:
+        """ return True if config values kept by config_value_for_index are the same as the current values """
+        retVal = True
+        for (kind, name), value in config_dependencies.items():
+            try:
+                retVal = IndexSnapshot.config_value_to_json(self.get_config_value_for_index(kind, name)) == value
+            except Exception:
+                retVal = False
+            if not retVal:
+                log.debug(f"config value for index changed {kind} {name}")
+                break
+        return retVal
+
     def read_item_details_from_node(self, the_iid, the_node, the_os='common', **kwargs) -> List:
         details = list()
         # go through the raw yaml nodes instead of doing "for detail_name in the_node".
@@ -536,7 +638,7 @@ class IndexItemsTable(object):
                     detail_name = detail_node[0].value
                     with kwargs['node-stack'](detail_node[1]):
                         if detail_name.startswith("__if"):
-                            if eval_conditional(detail_name, config_vars):
+                            if self.config_value_for_index("conditional", detail_name):
                                 conditional_details = self.read_item_details_from_node(the_iid, detail_node[1], the_os, **kwargs)
                                 details.extend(conditional_details)
                         elif detail_name in IndexItemsTable.os_names_to_num:
@@ -548,6 +650,8 @@ class IndexItemsTable(object):
                         elif detail_name.startswith("define"):
                             self.defines_for_iids[the_iid] = detail_node[1]
                             self.defines_for_iids[the_iid].tag = "!"+detail_name
+                            if self.index_snapshot_doc is not None:
+                                self.index_snapshot_doc.defines[the_iid] = IndexSnapshot.yaml_text_from_node(detail_node[1])
                         else:
                             for details_line in detail_node[1]:
                                 with kwargs['node-stack'](details_line):
@@ -581,7 +685,7 @@ class IndexItemsTable(object):
                                             assert count_insertions < 3, f"count_insertions: {count_insertions}"
                                     elif detail_name == "depends":
                                         # depends might have an item which is a list of items when resolving
-                                        values = config_vars.resolve_str_to_list(value)
+                                        values = self.config_value_for_index("depends", value)
                                         for value in values:
                                             new_detail = (the_iid, the_iid, self.os_names_to_num[the_os], detail_name, value, tag)
                                             details.append(new_detail)
@@ -632,12 +736,18 @@ class IndexItemsTable(object):
         items_details = list()
 
         self.read_index_node_helper(a_node, index_items, items_details, **kwargs)
+        if self.index_snapshot_doc is not None:
+            self.index_snapshot_doc.index_items.extend(index_items)
+            self.index_snapshot_doc.items_details.extend(items_details)
+        self.insert_index_items(index_items, items_details, progress_callback=kwargs.get('progress_callback', None))
 
+    def insert_index_items(self, index_items: List, items_details: List, progress_callback=None) -> None:
+        """ insert rows read by read_index_node_helper, or loaded from IndexSnapshot """
         insert_item_q =        """INSERT INTO index_item_t(iid, from_index) VALUES(?, ?)"""
         insert_item_detail_q = """INSERT INTO index_item_detail_t(original_iid, owner_iid, os_id,
                                                                   detail_name, detail_value, tag)
                                                                   VALUES(?,?,?,?,?,?)"""
-        with self.db.transaction(description="read_index_node", progress_callback=kwargs.get('progress_callback', None)) as curs:
+        with self.db.transaction(description="read_index_node", progress_callback=progress_callback) as curs:
             curs.executemany(insert_item_q, index_items)
             curs.executemany(insert_item_detail_q, items_details)
             curs.execute("""CREATE UNIQUE INDEX IF NOT EXISTS ix_index_item_t_iid ON index_item_t(iid)""")
@@ -722,7 +832,7 @@ class IndexItemsTable(object):
             template_name = template_match['template_name']
             template_args = template_match['template_args'].split(',')
             template_args = [a.strip() for a in template_args]
-            template_text = config_vars[template_name].raw()
+            template_text = self.config_value_for_index("template", template_name)
             yaml_stream = io.StringIO("--- !index\n")
             for instance_node in instances_node.value:
                 with kwargs['node-stack'](instance_node):
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3.9
+
+"""
+    IndexSnapshot keeps what was read from the documents of a yaml file (usually index.yaml)
+    in a small sqlite file, so the next time the same file is read the rows of the !index documents
+    can be inserted to the db directly without parsing yaml and reading the index nodes.
+
+    A snapshot is kept per file contents, the snapshot file name is sha1 of the file's text,
+    IndexSnapshot.schema_version and instl's version (see IndexSnapshot.key).
+    For each document of the file the snapshot keeps:
+        - !index documents: the rows for index_item_t and index_item_detail_t, the define nodes
+          for specific iids and the config values used while reading the document (see IndexItemsTable.config_value_for_index).
+        - other documents (!define, !require, ...): the original text of the document and the line it starts at,
+          these documents are read again, since reading them changes config_vars or depends on the state of the db.
+          Error marks of a document read again point to the same line and column as in the file.
+    Invalidation rules:
+        - if the file's text changed, the snapshot's name changes and a new snapshot is created.
+        - if the tag of an !index document is not read as !index any more (e.g. !index_Mac when TARGET_OS changed to Win),
+          or a document that was not read as !index is now, the document is read from the file and the snapshot is saved again.
+        - if any config value used while reading an !index document changed (__if conditionals,
+          $(...) references in depends, template definitions) the document is read from the file
+          and the snapshot is saved again.
+        - if the snapshot file is corrupted or was created by a different schema version it is ignored and deleted.
+    Resolving of inheritance is not part of the snapshot, since !require documents are read after the
+    !index documents and add to the same tables.
+    Only the max_snapshots most recently used snapshots are kept in a folder.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import yaml
+
+log = logging.getLogger()
+
+
+class IndexSnapshotDoc(object):
+    """ what was read from one document of a yaml file
+        for !index documents yaml_text is None and index_items, items_details, defines and config_dependencies are kept
+        for other documents yaml_text is the text of the document, as it appears in the file from line first_line
+    """
+    def __init__(self, tag: str, yaml_text: str = None, first_line: int = 0) -> None:
+        self.tag = tag
+        self.yaml_text = yaml_text
+        self.first_line = first_line
+        self.index_items: List[Tuple] = list()          # rows for index_item_t
+        self.items_details: List[Tuple] = list()        # rows for index_item_detail_t
+        self.defines: Dict[str, str] = dict()           # iid => yaml text of the iid's define node
+        self.config_dependencies: Dict[Tuple[str, str], str] = dict()  # (kind, name) => json of the value
+
+    @property
+    def is_index(self) -> bool:
+        return self.yaml_text is None
+
+
+class IndexSnapshot(object):
+    schema_version = 2
+    create_tables_q = """
+        CREATE TABLE doc_t
+        (
+            doc_num INTEGER PRIMARY KEY,
+            tag TEXT,
+            yaml_text TEXT,
+            first_line INTEGER
+        );
+        CREATE TABLE index_item_t
+        (
+            doc_num INTEGER,
+            iid TEXT,
+            from_index INTEGER
+        );
+        CREATE TABLE index_item_detail_t
+        (
+            doc_num INTEGER,
+            original_iid TEXT,
+            owner_iid TEXT,
+            os_id INTEGER,
+            detail_name TEXT,
+            detail_value TEXT,
+            tag TEXT
+        );
+        CREATE TABLE define_t
+        (
+            doc_num INTEGER,
+            iid TEXT,
+            yaml_text TEXT
+        );
+        CREATE TABLE config_dependency_t
+        (
+            doc_num INTEGER,
+            kind TEXT,
+            name TEXT,
+            value TEXT
+        );
+        """
+
+    def __init__(self, snapshot_path) -> None:
+        self.snapshot_path = Path(snapshot_path)
+        self.docs: List[IndexSnapshotDoc] = list()
+
+    @classmethod
+    def key(cls, file_text: str, instl_version: str) -> str:
+        """ name of the snapshot file for a yaml file with file_text contents """
+        checksum = hashlib.sha1(f"{cls.schema_version}\n{instl_version}\n".encode())
+        checksum.update(file_text.encode("utf-8"))
+        return checksum.hexdigest()
+
+    @staticmethod
+    def yaml_text_from_node(a_node: yaml.Node) -> str:
+        """ serialize a_node to yaml text.
+            YamlReader.convert_standard_tags sets the value of null nodes to None
+            which yaml cannot serialize, so a copy of the nodes is serialized.
+        """
+        def copy_node(node):
+            if isinstance(node, yaml.ScalarNode):
+                retVal = yaml.ScalarNode(node.tag, "" if node.value is None else node.value, style=node.style)
+            elif isinstance(node, yaml.SequenceNode):
+                retVal = yaml.SequenceNode(node.tag, [copy_node(item) for item in node.value], flow_style=node.flow_style)
+            else:
+                retVal = yaml.MappingNode(node.tag, [(copy_node(key), copy_node(val)) for key, val in node.value], flow_style=node.flow_style)
+            return retVal
+        return yaml.serialize(copy_node(a_node))
+
+    def load(self) -> bool:
+        """ read the snapshot file to self.docs, return True if snapshot was loaded """
+        retVal = False
+        self.docs = list()
+        if self.snapshot_path.is_file():
+            try:
+                conn = sqlite3.connect(os.fspath(self.snapshot_path))
+                try:
+                    if conn.execute("PRAGMA user_version").fetchone()[0] != self.schema_version:
+                        raise sqlite3.DatabaseError(f"schema version is not {self.schema_version}")
+                    for tag, yaml_text, first_line in conn.execute("SELECT tag, yaml_text, first_line FROM doc_t ORDER BY doc_num"):
+                        self.docs.append(IndexSnapshotDoc(tag, yaml_text, first_line))
+                    for doc_num, iid, from_index in conn.execute("SELECT doc_num, iid, from_index FROM index_item_t ORDER BY rowid"):
+                        self.docs[doc_num].index_items.append((iid, from_index))
+                    for doc_num, *detail in conn.execute("""SELECT doc_num, original_iid, owner_iid, os_id, detail_name, detail_value, tag
+                                                            FROM index_item_detail_t ORDER BY rowid"""):
+                        self.docs[doc_num].items_details.append(tuple(detail))
+                    for doc_num, iid, yaml_text in conn.execute("SELECT doc_num, iid, yaml_text FROM define_t ORDER BY rowid"):
+                        self.docs[doc_num].defines[iid] = yaml_text
+                    for doc_num, kind, name, value in conn.execute("SELECT doc_num, kind, name, value FROM config_dependency_t ORDER BY rowid"):
+                        self.docs[doc_num].config_dependencies[(kind, name)] = value
+                finally:
+                    conn.close()
+                os.utime(self.snapshot_path)  # so remove_old_snapshots will know the snapshot was used
+                retVal = True
+            except (sqlite3.Error, OSError, IndexError) as ex:
+                log.warning(f"IndexSnapshot ignoring {self.snapshot_path}, {ex}")
+                self.docs = list()
+                self.remove()
+        return retVal
+
+    def save(self) -> bool:
+        """ write self.docs to the snapshot file, return True if snapshot was saved
+            the file is written to a temporary file first, so a partially written snapshot is never loaded
+        """
+        retVal = False
+        temp_path = self.snapshot_path.with_name(self.snapshot_path.name + f".{os.getpid()}.tmp")
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(os.fspath(temp_path))
+            try:
+                conn.execute("PRAGMA synchronous = OFF")
+                conn.execute(f"PRAGMA user_version = {self.schema_version}")
+                conn.executescript(self.create_tables_q)
+                for doc_num, doc in enumerate(self.docs):
+                    conn.execute("INSERT INTO doc_t(doc_num, tag, yaml_text, first_line) VALUES(?,?,?,?)", (doc_num, doc.tag, doc.yaml_text, doc.first_line))
+                    conn.executemany("INSERT INTO index_item_t(doc_num, iid, from_index) VALUES(?,?,?)",
+                                     ((doc_num, *item) for item in doc.index_items))
+                    conn.executemany("""INSERT INTO index_item_detail_t(doc_num, original_iid, owner_iid, os_id, detail_name, detail_value, tag)
+                                        VALUES(?,?,?,?,?,?,?)""",
+                                     ((doc_num, *detail) for detail in doc.items_details))
+                    conn.executemany("INSERT INTO define_t(doc_num, iid, yaml_text) VALUES(?,?,?)",
+                                     ((doc_num, iid, yaml_text) for iid, yaml_text in doc.defines.items()))
+                    conn.executemany("INSERT INTO config_dependency_t(doc_num, kind, name, value) VALUES(?,?,?,?)",
+                                     ((doc_num, kind, name, value) for (kind, name), value in doc.config_dependencies.items()))
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(temp_path, self.snapshot_path)
+            retVal = True
+        except (sqlite3.Error, OSError) as ex:
+            log.warning(f"IndexSnapshot failed to save {self.snapshot_path}, {ex}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        return retVal
+
+    def remove(self) -> None:
+        try:
+            os.remove(self.snapshot_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def config_value_to_json(value) -> str:
+        return json.dumps(value)
+
+    @staticmethod
+    def remove_old_snapshots(snapshot_folder, max_snapshots: int) -> None:
+        """ keep only the max_snapshots most recently used snapshots in snapshot_folder """
+        try:
+            snapshots = sorted(Path(snapshot_folder).glob("*.sqlite"), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+            for old_snapshot in snapshots[max_snapshots:]:
+                os.remove(old_snapshot)
+        except OSError as ex:
+            log.warning(f"IndexSnapshot failed to remove old snapshots from {snapshot_folder}, {ex}")
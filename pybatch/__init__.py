@@ -6,11 +6,11 @@ from .conditionalBatchCommands import If, IsFile, IsDir, IsSymlink, IsEq, IsNotE
     IsEnvironVarEq, IsEnvironVarNotEq, IsConfigVarDefined, ForInConfigVar
 from .copyBatchCommands import CopyDirContentsToDir, CopyDirToDir, CopyFileToDir, CopyFileToFile, MoveDirToDir, \
     RenameFile, CopyBundle, CopyGlobToDir, MoveFileToDir
-from .downloadBatchCommands import DownloadFileAndCheckChecksum, DownloadManager
+from .downloadBatchCommands import DownloadFileAndCheckChecksum, DownloadManager, ParallelDownloader, DownloadFilesInParallel
 from .fileSystemBatchCommands import AppendFileToFile, Cd, ChFlags, Chmod, Chown, MakeDir, MakeRandomDirs, \
     MakeRandomDataFile, touch, Touch, Unlock, Ls, FileSizes, SplitFile, FixAllPermissions, Glober
 from .info_mapBatchCommands import CheckDownloadFolderChecksum, SetExecPermissionsInSyncFolder, CreateSyncFolders, \
-    InfoMapFullWriter, InfoMapSplitWriter, SetBaseRevision, IndexYamlReader, CopySpecificRepoRev, CreateRepoRevFile, \
+    InfoMapFullWriter, InfoMapSplitWriter, InfoMapDeltaWriter, SetBaseRevision, IndexYamlReader, CopySpecificRepoRev, CreateRepoRevFile, \
     ShortIndexYamlCreator
 from .removeBatchCommands import RmDir, RmFile, RmFileOrDir, RemoveEmptyFolders, RmGlob, RmGlobs, RmDirContents
 from .reportingBatchCommands import AnonymousAccum, Echo, Progress, Remark, Stage, ConfigVarAssign, ConfigVarPrint, \
@@ -1,5 +1,7 @@
 import os
 import shutil
+import threading
+import concurrent.futures
 from collections import defaultdict
 
 from .fileSystemBatchCommands import *
@@ -35,6 +37,7 @@ ignore_patterns: files and folders matching these patterns will not be copied.
 hard_links: if True will attempt to create hard links to original files instead of making a copy; default: True
 no_hard_link_patterns: files and folders matching this patterns will not be hard-linked even if hard_links=True
 no_flags_patterns: if a file matching one of these patterns exists in the destination, it's flags (hidden, system, read-only) will be removed
+num_workers: when copying folders, if > 1 files will be copied (or hard-linked) by this many threads. Folders are still created in order; default: 1
 """
 
 
@@ -74,6 +77,7 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
                  verbose=0,
                  dry_run=False,
                  copy_stat=False,
+                 num_workers=1,
                  **kwargs):
         super().__init__(**kwargs)
         self.src = src
@@ -92,11 +96,16 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
         self.verbose = verbose
         self.dry_run = dry_run
         self.copy_stat = copy_stat
+        self.num_workers = num_workers
         self.top_source_does_not_exist = False  # will be set to true if source does not exist - saving doing work is ignore_if_not_exist is True
         self.top_destination_does_not_exist = False  # will be set to true if destination does not exist - saving many checks
 
         self._get_ignored_files_func = None
         self.statistics = defaultdict(int)
+        self.statistics_lock = threading.Lock()  # statistics are also counted by file copy workers
+        self.file_copy_executor = None  # created by parallel_copy_tree when num_workers > 1
+        self.file_copy_jobs = None      # list of (src, dst, future) in the order files were encountered
+        self.non_representative__dict__keys.extend(('statistics_lock', 'file_copy_executor', 'file_copy_jobs'))
         self.last_step = None
         self.last_src = None
         self.last_dst = None
@@ -130,6 +139,7 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
         params.append(self.optional_named__init__param("verbose", self.verbose, 0))
         params.append(self.optional_named__init__param("dry_run", self.dry_run, False))
         params.append(self.optional_named__init__param("copy_stat", self.copy_stat, False))
+        params.append(self.optional_named__init__param("num_workers", self.num_workers, 1))
         all_args.extend(filter(None, params))
 
     def progress_msg_self(self) -> str:
@@ -229,9 +239,18 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
             else:
                 self.copy_file_to_file(src_path, dst_path)
 
-    def should_copy_file(self, src: Path, dst: Path):
+    def count_statistic(self, statistic_name):
+        with self.statistics_lock:
+            self.statistics[statistic_name] += 1
+
+    def should_copy_file(self, src: Path, dst: Path, top_destination_does_not_exist=None):
+        """ top_destination_does_not_exist: file copy workers pass the value that was current when the copy was scheduled,
+            since self.top_destination_does_not_exist keeps changing while the tree is being walked.
+        """
         retVal = True
-        if not self.top_destination_does_not_exist:
+        if top_destination_does_not_exist is None:
+            top_destination_does_not_exist = self.top_destination_does_not_exist
+        if not top_destination_does_not_exist:
             try:
                 dst_stats = dst.stat()
                 src_stats = src.stat()
@@ -268,7 +287,7 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
                 retVal = True
         return retVal
 
-    def copy_file_to_file(self, src: Path, dst: Path, follow_symlinks=True):
+    def copy_file_to_file(self, src: Path, dst: Path, follow_symlinks=True, top_destination_does_not_exist=None):
         """ copy the file src to the file dst. dst should either be an existing file
             or not exists at all - i.e. dst cannot be a folder. The parent folder of dst
             is assumed to exist
@@ -276,7 +295,7 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
         self.last_src, self.last_dst = src, dst
         self.doing = f"""copy file '{self.last_src}' to '{self.last_dst}'"""
 
-        if self.should_copy_file(src, dst):
+        if self.should_copy_file(src, dst, top_destination_does_not_exist):
             try:
                 if not self.should_hard_link_file(src):
                     log.debug(f"copy file '{self.last_src}' to '{self.last_dst}'")
@@ -288,7 +307,7 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
                     try:
                         self.dry_run or os.link(src, dst)
                         log.debug(f"hard link file '{self.last_src}' to '{self.last_dst}'")
-                        self.statistics['hard_links'] += 1
+                        self.count_statistic('hard_links')
                     except OSError as ose:
                         self.hard_links_failed = True
                         log.debug(f"copy file '{self.last_src}' to '{self.last_dst}'")
@@ -304,7 +323,7 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
                 self.who_locks_file_error_dict(_fast_copy_file, dst)
                 raise
         else:
-            self.statistics['skipped_files'] += 1
+            self.count_statistic('skipped_files')
         return dst
 
     def copy_file_to_dir(self, src: Path, dst: Path, follow_symlinks=True):
@@ -318,9 +337,44 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
         retVal = self.copy_file_to_file(src, final_dst, follow_symlinks)
         return retVal
 
+    def parallel_copy_tree(self, src: Path, dst: Path):
+        """ copy_tree where the copying of files is done by a pool of self.num_workers threads.
+            The tree is walked and folders are created (or skipped, or cleaned of extraneous files)
+            in order by the calling thread, so a file is scheduled only after it's folder is ready.
+            Errors are collected after all copies are done and reported in the order the files were
+            encountered, so the error list does not depend on which worker finished first.
+        """
+        retVal = None
+        errors = []
+        self.file_copy_jobs = list()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="RsyncClone") as self.file_copy_executor:
+                try:
+                    retVal = self.copy_tree(src, dst)
+                except shutil.Error as err:
+                    errors.extend(err.args[0])
+            # leaving the executor's context waited for all scheduled copies
+            for src_item_path, dst_path, job in self.file_copy_jobs:
+                try:
+                    job.result()
+                except shutil.Error as err:
+                    errors.append(err.args[0])
+                except OSError as why:
+                    errors.append((os.fspath(src_item_path), os.fspath(dst_path), str(why)))
+        finally:
+            self.file_copy_executor = None
+            self.file_copy_jobs = None
+
+        if errors:
+            raise shutil.Error(errors)
+        return retVal
+
     def copy_tree(self, src: Path, dst: Path):
         """ based on shutil.copytree
         """
+        if self.num_workers > 1 and self.file_copy_executor is None and not self.dry_run:
+            return self.parallel_copy_tree(src, dst)
+
         self.last_src, self.last_dst = src, dst
         save_top_destination_does_not_exist = self.top_destination_does_not_exist
         self.top_destination_does_not_exist = self.top_destination_does_not_exist or not dst.exists()  # !
@@ -359,8 +413,13 @@ no_flags_patterns: if a file matching one of these patterns exists in the destin
                     self.copy_tree(src_item_path, dst_path)
                 else:
                     self.statistics['files'] += 1
-                    # Will raise a SpecialFileError for unsupported file types
-                    self.copy_file_to_file(src_item_path, dst_path)
+                    if self.file_copy_executor is not None:
+                        job = self.file_copy_executor.submit(self.copy_file_to_file, src_item_path, dst_path,
+                                                             top_destination_does_not_exist=self.top_destination_does_not_exist)
+                        self.file_copy_jobs.append((src_item_path, dst_path, job))
+                    else:
+                        # Will raise a SpecialFileError for unsupported file types
+                        self.copy_file_to_file(src_item_path, dst_path)
             # catch the Error from the recursive copytree so that we can
             # continue with other files
             except shutil.Error as err:
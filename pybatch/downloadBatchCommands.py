@@ -1,3 +1,11 @@
+import os
+import re
+import time
+import logging
+import hashlib
+import threading
+import urllib.parse
+from concurrent import futures
 from typing import List
 from pathlib import Path
 
@@ -11,16 +19,27 @@ from .baseClasses import PythonBatchCommandBase
 from .fileSystemBatchCommands import MakeDir
 import utils
 
+log = logging.getLogger(__name__)
+
 
 # this class can be used internally, it will create the session ar the init phase and will only need
 # the cookie, the rest of the params will be passed to the call method, this way it will allow this class
 # to be called while lopping on multiple files without having the need to create a new connection each time
 class DownloadManager(PythonBatchCommandBase):
+    """ download files with a requests.Session, used to re-download files with bad checksum.
+        Files are streamed to a temp file while sha1 checksum is calculated, and only renamed to their final path if
+        the checksum matches. If the transfer fails, the partial temp file is kept, and the download is resumed
+        with HTTP Range request - by the next attempt or the next time the file is downloaded.
+    """
+    chunk_size = 256 * 1024
+    content_range_re = re.compile(r"^bytes\s+(?P<first_byte>\d+)-")
+
     def __init__(self, cookie: str = None, **kwargs) -> None:
         super().__init__(**kwargs)
         self.cookie = cookie
         self.session = self.download_session()
         self.url = None
+        self.thread_local = threading.local()
 
     def repr_own_args(self, all_args: List[str]) -> None:
         if self.cookie:
@@ -29,23 +48,115 @@ class DownloadManager(PythonBatchCommandBase):
     def __call__(self, *args, **kwargs):
         with self.session as dl_session:
             url = self.url = kwargs["url"]
-            path = Path(kwargs["path"])
-            checksum = kwargs["checksum"]
-            if path.is_dir():
-                filename = Path(url.split("/").pop())
-                path = path.joinpath(filename)
+            path = self.target_path(url, kwargs["path"])
             with MakeDir(path.parent, report_own_progress=False) as dir_maker:
                 dir_maker()
-            with open(path, "wb") as fo:
-                self.doing = f"downloading file {path}"
-                timeout_seconds = int(config_vars.get("CURL_MAX_TIME", 480))
-                read_data = dl_session.get(url, timeout=timeout_seconds)
-                read_data.raise_for_status()  # must raise in case of an error. Server might return json/xml with error details, we do not want that
-                fo.write(read_data.content)
+            self.doing = f"downloading file {path}"
+            self.download_file(dl_session, url, path, kwargs["checksum"],
+                               timeout_seconds=int(config_vars.get("CURL_MAX_TIME", 480)),
+                               retries=int(config_vars.get("CURL_RETRIES", 2)))
+
+    @staticmethod
+    def target_path(url, path) -> Path:
+        retVal = Path(path)
+        if retVal.is_dir():
+            retVal = retVal.joinpath(url.split("/").pop())
+        return retVal
+
+    def stream_to_temp_file(self, dl_session, url, temp_path: Path, timeout_seconds):
+        """ download url to temp_path, if temp_path exists try to continue from where it ends.
+            return (sha1 checksum of temp_path, number of bytes that were already in temp_path)
+        """
+        checksumer = hashlib.sha1()
+        resume_from = temp_path.stat().st_size if temp_path.is_file() else 0
+        headers = {"Range": f"bytes={resume_from}-"} if resume_from else None
+        with dl_session.get(url, stream=True, timeout=timeout_seconds, headers=headers) as read_data:
+            if resume_from and read_data.status_code == 416:  # range not satisfiable, partial file cannot be used
+                read_data.close()
+                utils.safe_remove_file(temp_path)
+                return self.stream_to_temp_file(dl_session, url, temp_path, timeout_seconds)
+            read_data.raise_for_status()  # must raise in case of an error. Server might return json/xml with error details, we do not want that
+            content_range_match = self.content_range_re.match(read_data.headers.get("Content-Range", ""))
+            if resume_from and read_data.status_code == 206 and content_range_match and int(content_range_match['first_byte']) == resume_from:
+                with open(temp_path, "rb") as rfd:
+                    for chunk in iter(lambda: rfd.read(self.chunk_size), b""):
+                        checksumer.update(chunk)
+                open_mode = "ab"
+            else:  # server does not support ranges, download the whole file
+                resume_from = 0
+                open_mode = "wb"
+            with open(temp_path, open_mode) as wfd:
+                for chunk in read_data.iter_content(chunk_size=self.chunk_size):
+                    checksumer.update(chunk)
+                    wfd.write(chunk)
+        return checksumer.hexdigest(), resume_from
+
+    def download_file(self, dl_session, url, path: Path, checksum, timeout_seconds=480, retries=2) -> None:
+        """ download url to path, path's parent folder should already exist.
+            Failed transfers are resumed up to retries times, raise ValueError if checksum of the downloaded file is not as expected.
+        """
+        temp_path = Path(f"{path}.downloading")
+        attempt = 0
+        while True:
+            try:
+                downloaded_checksum, resumed_from = self.stream_to_temp_file(dl_session, url, temp_path, timeout_seconds)
+                if resumed_from and not self.checksum_ok(downloaded_checksum, checksum):
+                    # partial file might be left from a different version of the file, try again from the start
+                    utils.safe_remove_file(temp_path)
+                    downloaded_checksum, resumed_from = self.stream_to_temp_file(dl_session, url, temp_path, timeout_seconds)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as ex:
+                if attempt >= retries:
+                    raise  # partial temp file is kept so next download can resume
+                attempt += 1
+                log.debug(f"resuming download of {url}, {ex}")
+            except Exception:
+                utils.safe_remove_file(temp_path)
+                raise
+
+        if not self.checksum_ok(downloaded_checksum, checksum):
+            utils.safe_remove_file(temp_path)
+            raise ValueError(f"bad checksum for {str(path)} after reqs download")
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def checksum_ok(downloaded_checksum, expected_checksum) -> bool:
+        retVal = bool(expected_checksum) and utils.compare_checksums(downloaded_checksum, expected_checksum)
+        return retVal
+
+    def download_file_in_thread(self, url, path: Path, checksum, timeout_seconds, retries) -> None:
+        """ download_file with the requests.Session of the current thread, create one if needed """
+        dl_session = getattr(self.thread_local, "session", None)
+        if dl_session is None:
+            dl_session = self.thread_local.session = self.download_session()
+        self.download_file(dl_session, url, path, checksum, timeout_seconds, retries)
 
-            checksum_ok = utils.check_file_checksum(path, checksum)
-            if not checksum_ok:
-                raise ValueError(f"bad checksum for {str(path)} after reqs download")
+    def download_files(self, download_list, num_workers: int = 4, progress_callback=None) -> List:
+        """ download concurrently with up to num_workers threads, each with it's own session.
+            download_list: iterable of (url, path, checksum)
+            progress_callback: if not None will be called, in the calling thread, with (url, path) for each file downloaded.
+            return a list of (url, path, exception) for files that failed to download
+        """
+        retVal = list()
+        timeout_seconds = int(config_vars.get("CURL_MAX_TIME", 480))
+        retries = int(config_vars.get("CURL_RETRIES", 2))
+        with futures.ThreadPoolExecutor(max(1, num_workers)) as executor:
+            future_to_url = dict()
+            for url, path, checksum in download_list:
+                path = self.target_path(url, path)
+                with MakeDir(path.parent, report_own_progress=False) as dir_maker:
+                    dir_maker()
+                future = executor.submit(self.download_file_in_thread, url, path, checksum, timeout_seconds, retries)
+                future_to_url[future] = (url, path)
+            for future in futures.as_completed(future_to_url):
+                url, path = future_to_url[future]
+                ex = future.exception()
+                if ex is not None:
+                    log.error(f"failed to download {url} to {path}, {ex}")
+                    retVal.append((url, path, ex))
+                elif progress_callback is not None:
+                    progress_callback(url, path)
+        return retVal
 
     def progress_msg_self(self) -> str:
         return f'downloading file {self.url}'
@@ -88,3 +199,201 @@ class DownloadFileAndCheckChecksum(DownloadManager):
     def __call__(self, *args, **kwargs):
         with DownloadManager(cookie=self.cookie, report_own_progress=False) as downloader:
             downloader(url=self.url, path=self.path, checksum=self.checksum)
+
+
+class _RetryDownload(Exception):
+    pass
+
+
+class ParallelDownloader(object):
+    """ download many files concurrently, in process, as an alternative to running curl with config files.
+        Each worker thread has it's own requests.Session so connections (and TLS sessions) are reused between files.
+        Number of concurrent connections to each host is limited by max_connections_per_host.
+        Files are streamed to disk while sha1 checksum is calculated, and only renamed to their final path if
+        the checksum matches. Connection errors, timeouts, some http errors and bad checksums are retried
+        after retry_delay seconds, like curl's --retry-delay.
+        read_timeout limits the time to wait for data from the server, max_time (if not None) limits the total time
+        of downloading a file, including retries, like curl's --max-time.
+    """
+    retry_status_codes = (408, 429, 500, 502, 503, 504)
+
+    def __init__(self, cookie: str = None, num_workers: int = 8, max_connections_per_host: int = 8,
+                 connect_timeout: float = 16, read_timeout: float = 60, max_time: float = None, retries: int = 2,
+                 retry_delay: float = 1, chunk_size: int = 256 * 1024) -> None:
+        self.cookie = cookie
+        self.num_workers = max(1, num_workers)
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_time = max_time
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.chunk_size = chunk_size
+        self.thread_local = threading.local()
+        self.host_semaphores = dict()
+        self.host_semaphores_lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        """ return the requests.Session of the current thread, create one if needed """
+        retVal = getattr(self.thread_local, "session", None)
+        if retVal is None:
+            retVal = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=self.max_connections_per_host)
+            retVal.mount("http://", adapter)
+            retVal.mount("https://", adapter)
+            if self.cookie:
+                retVal.cookies = cookiejar_from_dict(DownloadManager.get_cookie_dict_from_str(self.cookie))
+            self.thread_local.session = retVal
+        return retVal
+
+    def host_semaphore(self, url) -> threading.BoundedSemaphore:
+        net_loc = urllib.parse.urlparse(url).netloc
+        with self.host_semaphores_lock:
+            if net_loc not in self.host_semaphores:
+                self.host_semaphores[net_loc] = threading.BoundedSemaphore(self.max_connections_per_host)
+            return self.host_semaphores[net_loc]
+
+    @staticmethod
+    def check_deadline(deadline) -> None:
+        if deadline is not None and time.monotonic() > deadline:
+            raise _RetryDownload("max time exceeded")
+
+    def download_file_once(self, url, path, checksum=None, deadline=None) -> None:
+        """ download url to path, raise _RetryDownload on errors that are worth retrying
+            deadline: time.monotonic() value after which the download is stopped, None for no limit
+        """
+        temp_path = f"{path}.downloading"
+        with self.host_semaphore(url):
+            try:
+                timeout = (self.connect_timeout, self.read_timeout)
+                if deadline is not None:
+                    time_left = max(deadline - time.monotonic(), 0.001)
+                    timeout = (min(self.connect_timeout, time_left), min(self.read_timeout, time_left))
+                with self.session().get(url, stream=True, timeout=timeout) as response:
+                    self.check_deadline(deadline)
+                    if response.status_code in self.retry_status_codes:
+                        raise _RetryDownload(f"http status {response.status_code}")
+                    response.raise_for_status()
+                    os.makedirs(os.path.dirname(temp_path) or ".", exist_ok=True)
+                    checksumer = hashlib.sha1()
+                    with open(temp_path, "wb") as wfd:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            checksumer.update(chunk)
+                            wfd.write(chunk)
+                            self.check_deadline(deadline)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as ex:
+                utils.safe_remove_file(temp_path)
+                raise _RetryDownload(str(ex)) from ex
+            except Exception:
+                utils.safe_remove_file(temp_path)
+                raise
+
+        if checksum and not utils.compare_checksums(checksumer.hexdigest(), checksum):
+            utils.safe_remove_file(temp_path)
+            raise _RetryDownload(f"bad checksum, expected {checksum} found {checksumer.hexdigest()}")
+        os.replace(temp_path, path)
+
+    def download_file(self, url, path, checksum=None) -> None:
+        deadline = None if self.max_time is None else time.monotonic() + self.max_time
+        attempt = 0
+        while True:
+            try:
+                self.download_file_once(url, path, checksum, deadline)
+                return
+            except _RetryDownload as ex:
+                if attempt >= self.retries:
+                    raise ValueError(f"failed to download {url} after {attempt+1} attempts, {ex}") from ex
+                if deadline is not None and time.monotonic() + self.retry_delay >= deadline:
+                    raise ValueError(f"failed to download {url} in {self.max_time} seconds, after {attempt+1} attempts, {ex}") from ex
+                log.debug(f"retrying download of {url} in {self.retry_delay} seconds, {ex}")
+                time.sleep(self.retry_delay)
+                attempt += 1
+
+    def download(self, download_list, progress_callback=None) -> List:
+        """ download_list: iterable of (url, path, size, checksum), size is not used but accepted so
+            the list in CUrlHelper.urls_to_download can be passed as is. checksum can be None or empty.
+            progress_callback: if not None will be called, in the calling thread, with (url, path) for each file downloaded.
+            return a list of (url, path, exception) for files that failed to download
+        """
+        retVal = list()
+        with futures.ThreadPoolExecutor(self.num_workers) as executor:
+            future_to_url = {executor.submit(self.download_file, url, path, checksum): (url, path)
+                             for url, path, size, checksum in download_list}
+            for future in futures.as_completed(future_to_url):
+                url, path = future_to_url[future]
+                ex = future.exception()
+                if ex is not None:
+                    log.error(f"failed to download {url} to {path}, {ex}")
+                    retVal.append((url, path, ex))
+                elif progress_callback is not None:
+                    progress_callback(url, path)
+        return retVal
+
+
+class DownloadFilesInParallel(PythonBatchCommandBase):
+    """ download files listed in download_list_file using ParallelDownloader.
+        Each line in download_list_file is: url<tab>path<tab>size<tab>checksum.
+        A line with only "wait" means that files listed after it should be downloaded only after
+        all files before it were downloaded.
+    """
+    def __init__(self, download_list_file, num_workers: int = 8, max_connections_per_host: int = 8, cookie: str = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.download_list_file = download_list_file
+        self.num_workers = num_workers
+        self.max_connections_per_host = max_connections_per_host
+        self.cookie = cookie
+
+    def repr_own_args(self, all_args: List[str]) -> None:
+        all_args.append(self.unnamed__init__param(self.download_list_file))
+        all_args.append(self.optional_named__init__param("num_workers", self.num_workers, 8))
+        all_args.append(self.optional_named__init__param("max_connections_per_host", self.max_connections_per_host, 8))
+        all_args.append(self.optional_named__init__param("cookie", self.cookie))
+
+    def progress_msg_self(self) -> str:
+        return f"""Download files listed in '{self.download_list_file}'"""
+
+    def increment_and_output_progress(self, increment_by=None, prog_counter_msg=None, prog_msg=None):
+        """ override PythonBatchCommandBase.increment_and_output_progress so progress can be reported for each file
+        """
+        pass
+
+    @staticmethod
+    def read_download_list_file(download_list_file) -> List[List]:
+        """ return list of lists of (url, path, size, checksum), lists are separated by "wait" lines in the file """
+        retVal = [[]]
+        with utils.utf8_open_for_read(download_list_file, "r") as rfd:
+            for line in rfd:
+                line = line.rstrip("\r\n")
+                if not line:
+                    continue
+                if line == "wait":
+                    retVal.append([])
+                else:
+                    url, path, size, checksum = line.split("\t")
+                    retVal[-1].append((url, path, int(size or 0), checksum or None))
+        return [download_list for download_list in retVal if download_list]
+
+    def __call__(self, *args, **kwargs) -> None:
+        PythonBatchCommandBase.__call__(self, *args, **kwargs)
+        resolved_download_list_file = utils.ExpandAndResolvePath(self.download_list_file)
+        self.doing = f"""reading download list file '{resolved_download_list_file}'"""
+        lists_of_downloads = self.read_download_list_file(resolved_download_list_file)
+
+        downloader = ParallelDownloader(cookie=self.cookie,
+                                        num_workers=self.num_workers,
+                                        max_connections_per_host=self.max_connections_per_host,
+                                        connect_timeout=int(config_vars.get("CURL_CONNECT_TIMEOUT", 16)),
+                                        read_timeout=int(config_vars.get("DOWNLOAD_READ_TIMEOUT", 60)),
+                                        max_time=int(config_vars.get("CURL_MAX_TIME", 180)),
+                                        retries=int(config_vars.get("CURL_RETRIES", 2)),
+                                        retry_delay=int(config_vars.get("CURL_RETRY_DELAY", 1)))
+
+        def report_progress(url, path):
+            super(DownloadFilesInParallel, self).increment_and_output_progress(increment_by=1, prog_msg=f"downloaded {path}")
+
+        failed_downloads = list()
+        for download_list in lists_of_downloads:
+            self.doing = f"""downloading {len(download_list)} files listed in '{resolved_download_list_file}'"""
+            failed_downloads.extend(downloader.download(download_list, progress_callback=report_progress))
+        if failed_downloads:
+            raise ValueError(f"failed to download {len(failed_downloads)} files, first failure: {failed_downloads[0][0]}, {failed_downloads[0][2]}")
@@ -5,6 +5,8 @@ import os
 import sys
 import stat
 import zlib
+import itertools
+import concurrent.futures
 from collections import defaultdict
 from pathlib import Path
 import logging
@@ -26,6 +28,7 @@ from .wtarBatchCommands import Wzip
 from .copyBatchCommands import CopyFileToFile
 from .downloadBatchCommands import DownloadFileAndCheckChecksum, DownloadManager
 from svnTree.svnTable import SVNTable
+from svnTree.infoMapDelta import write_info_map_delta
 
 from db import DBManager
 
@@ -78,30 +81,38 @@ class CheckDownloadFolderChecksum(DBManager, PythonBatchCommandBase):
             config_vars['LOCAL_SYNC_DIR'].Path(resolve=True).joinpath("BREAK_BEFORE_CHECKSUM"),
             self.break_file_callback)
 
-        for file_item in dl_file_items:
-            self.doing = f"""check checksum for '{file_item.download_path}'"""
-            super().increment_and_output_progress(increment_by=1, prog_msg=self.doing)
-
-            if os.path.isfile(file_item.download_path):
-                file_checksum = utils.get_file_checksum(file_item.download_path)
-                if not utils.compare_checksums(file_checksum, file_item.checksum):
+        # checksums are calculated by num_workers threads, hashlib releases the GIL while hashing so
+        # large files are checked concurrently. Results are reported here, in the order of dl_file_items,
+        # so the lists of bad files are the same regardless of the number of workers.
+        num_workers = int(config_vars.get("NUM_CHECKSUM_WORKERS", 1))
+        group_size = 16
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(num_workers, 1)) as executor:
+            mapper = executor.map if num_workers > 1 else map
+            results = mapper(self._download_files_checksums, utils.iter_grouper(group_size, dl_file_items))
+            for file_item, file_checksum in zip(dl_file_items, itertools.chain.from_iterable(results)):
+                self.doing = f"""check checksum for '{file_item.download_path}'"""
+                super().increment_and_output_progress(increment_by=1, prog_msg=self.doing)
+
+                if file_checksum is not None:
+                    if not utils.compare_checksums(file_checksum, file_item.checksum):
+                        self.num_bad_files += 1
+                        super().increment_and_output_progress(increment_by=0,
+                                                              prog_msg=f"bad checksum for '{file_item.download_path}'\nexpected: {file_item.checksum}, found: {file_checksum}")
+                        self.lists_of_files["bad_checksum"].append(" ".join(("Bad checksum:", file_item.download_path,
+                                                                             "expected", file_item.checksum, "found",
+                                                                             file_checksum)))
+                        self.lists_of_files["to redownload"].append(file_item)
+                else:
                     self.num_bad_files += 1
                     super().increment_and_output_progress(increment_by=0,
-                                                          prog_msg=f"bad checksum for '{file_item.download_path}'\nexpected: {file_item.checksum}, found: {file_checksum}")
-                    self.lists_of_files["bad_checksum"].append(" ".join(("Bad checksum:", file_item.download_path,
-                                                                         "expected", file_item.checksum, "found",
-                                                                         file_checksum)))
+                                                          prog_msg=f"missing file '{file_item.download_path}'")
+                    self.lists_of_files["missing_files"].append(" ".join((file_item.download_path, "was not found")))
                     self.lists_of_files["to redownload"].append(file_item)
-            else:
-                self.num_bad_files += 1
-                super().increment_and_output_progress(increment_by=0,
-                                                      prog_msg=f"missing file '{file_item.download_path}'")
-                self.lists_of_files["missing_files"].append(" ".join((file_item.download_path, "was not found")))
-                self.lists_of_files["to redownload"].append(file_item)
-            if self.max_bad_files_to_redownload is not None and self.num_bad_files > self.max_bad_files_to_redownload:
-                super().increment_and_output_progress(increment_by=0,
-                                                      prog_msg=f"stopping checksum check too many bad or missing files found")
-                break
+                if self.max_bad_files_to_redownload is not None and self.num_bad_files > self.max_bad_files_to_redownload:
+                    super().increment_and_output_progress(increment_by=0,
+                                                          prog_msg=f"stopping checksum check too many bad or missing files found")
+                    executor.shutdown(wait=True, cancel_futures=True)  # do not wait for checksums that were not started
+                    break
 
         if not self.is_checksum_ok():
             if self.max_bad_files_to_redownload is not None and self.num_bad_files <= self.max_bad_files_to_redownload:
@@ -111,27 +122,33 @@ class CheckDownloadFolderChecksum(DBManager, PythonBatchCommandBase):
                 self.re_download_bad_files()
 
         if not self.is_checksum_ok():  # some files still not OK after re_download_bad_files
-            if self.raise_on_bad_checksum:
-                exception_message = "\n".join(
-                    (f'Bad checksum for {len(self.lists_of_files["bad_checksum"])} files',
-                     f'Missing {len(self.lists_of_files["missing_files"])} files'))
+            # ValueError is in exceptions_to_ignore if not raise_on_bad_checksum
+            exception_message = "\n".join(
+                (f'Bad checksum for {len(self.lists_of_files["bad_checksum"])} files',
+                 f'Missing {len(self.lists_of_files["missing_files"])} files'))
             raise ValueError(exception_message)
 
+    @staticmethod
+    def _download_files_checksums(file_items) -> List:
+        """ return the checksum of each file item's download_path, or None if the file is missing """
+        retVal = [utils.get_file_checksum(file_item.download_path) if os.path.isfile(file_item.download_path) else None
+                  for file_item in file_items]
+        return retVal
+
     def re_download_bad_files(self):
-        try:
-            download_path = None
-
-            with DownloadManager(cookie=config_vars["COOKIE_JAR"].str(),
-                                 report_own_progress=False) as dler:  # should get the cookie from the config vars
-                for file_item in self.lists_of_files["to redownload"]:
-                    download_url = self.info_map_table.get_sync_url_for_file_item(file_item)
-                    download_path = file_item.download_path
-                    dler(path=download_path, url=download_url, checksum=file_item.checksum)
-                    super().increment_and_output_progress(increment_by=0,
-                                                          prog_msg=f"redownloaded {file_item.download_path}")
-                    self.num_bad_files -= 1
-        except Exception as ex:
-            log.error(f"""Exception while redownloading {download_path}, {ex}""")
+        download_list = [(self.info_map_table.get_sync_url_for_file_item(file_item), file_item.download_path, file_item.checksum)
+                         for file_item in self.lists_of_files["to redownload"]]
+
+        def report_redownload(url, path):
+            super(CheckDownloadFolderChecksum, self).increment_and_output_progress(increment_by=0, prog_msg=f"redownloaded {path}")
+            self.num_bad_files -= 1
+
+        with DownloadManager(cookie=config_vars["COOKIE_JAR"].str(),
+                             report_own_progress=False) as dler:  # should get the cookie from the config vars
+            failed_downloads = dler.download_files(download_list,
+                                                   num_workers=int(config_vars.get("REDOWNLOAD_NUM_WORKERS", "4")),
+                                                   progress_callback=report_redownload)
+        for url, download_path, ex in failed_downloads:
             super().increment_and_output_progress(increment_by=0,
                                                   prog_msg=f"""Exception while redownloading {download_path}, {ex}""")
 
@@ -183,7 +200,7 @@ class CreateSyncFolders(DBManager, PythonBatchCommandBase):
 
     def __call__(self, *args, **kwargs) -> None:
         super().__call__(*args, **kwargs)
-        dl_dir_items = self.info_map_table.get_download_items(what="dir")
+        dl_dir_items = self.info_map_table.iter_download_items(what="dir")
         for dl_dir in dl_dir_items:
             # direct_sync items have absolute path in member dl_dir.download_path
             # cached items have relative path in member dl_dir.path
@@ -259,7 +276,7 @@ class InfoMapSplitWriter(DBManager, PythonBatchCommandBase):
         self.info_map_table.populate_IIDToSVNItem()
 
         # get the list of info map file names
-        info_map_to_item = dict()
+        files_to_add_to_default_info_map = list()  # the named info_map files and their wzip version should be added to the default info_map
         all_info_map_names = self.items_table.get_unique_detail_values('info_map')
         for infomap_file_name in all_info_map_names:
             info_map_file_path = self.work_folder.joinpath(infomap_file_name)
@@ -272,29 +289,24 @@ class InfoMapSplitWriter(DBManager, PythonBatchCommandBase):
                 if not zip_info_map_file_path.is_file():
                     raise FileNotFoundError(f"found {info_map_file_path} but not {zip_info_map_file_path}")
             else:
+                # each info map is written right after it's items are marked, so items are streamed
+                # from the db to the file instead of keeping the items of all info maps in memory
                 self.info_map_table.mark_items_required_by_infomap(infomap_file_name)
-                info_map_items = self.info_map_table.get_required_items()
-                info_map_to_item[infomap_file_name] = info_map_items
+                if self.info_map_table.num_items("required-items") > 0:  # could be that no items are linked to the info map file
+                    self.info_map_table.write_to_file(in_file=info_map_file_path, items_list=self.info_map_table.iter_required_items(),
+                                                      field_to_write=self.fields_relevant_to_info_map)
+                    files_to_add_to_default_info_map.append(info_map_file_path)
 
-        files_to_add_to_default_info_map = list()  # the named info_map files and their wzip version should be added to the default info_map
-        # write each info map to file
-        for infomap_file_name, info_map_items in info_map_to_item.items():
-            if info_map_items:  # could be that no items are linked to the info map file
-                info_map_file_path = self.work_folder.joinpath(infomap_file_name)
-                self.info_map_table.write_to_file(in_file=info_map_file_path, items_list=info_map_items,
-                                                  field_to_write=self.fields_relevant_to_info_map)
-                files_to_add_to_default_info_map.append(info_map_file_path)
-
-                zip_infomap_file_name = config_vars.resolve_str(infomap_file_name + "$(WZLIB_EXTENSION)")
-                zip_info_map_file_path = self.work_folder.joinpath(zip_infomap_file_name)
-                with Wzip(info_map_file_path, self.work_folder, own_progress_count=0) as wzipper:
-                    wzipper()
-                files_to_add_to_default_info_map.append(zip_info_map_file_path)
+                    zip_infomap_file_name = config_vars.resolve_str(infomap_file_name + "$(WZLIB_EXTENSION)")
+                    zip_info_map_file_path = self.work_folder.joinpath(zip_infomap_file_name)
+                    with Wzip(info_map_file_path, self.work_folder, own_progress_count=0) as wzipper:
+                        wzipper()
+                    files_to_add_to_default_info_map.append(zip_info_map_file_path)
 
         # add the default info map
         default_info_map_file_name = str(config_vars["MAIN_INFO_MAP_FILE_NAME"])
         default_info_map_file_path = self.work_folder.joinpath(default_info_map_file_name)
-        info_map_items = self.info_map_table.get_items_for_default_infomap()
+        info_map_items = self.info_map_table.iter_items_for_default_infomap()
         self.info_map_table.write_to_file(in_file=default_info_map_file_path, items_list=info_map_items,
                                           field_to_write=self.fields_relevant_to_info_map)
         with Wzip(default_info_map_file_path, self.work_folder, own_progress_count=0) as wzipper:
@@ -310,6 +322,42 @@ class InfoMapSplitWriter(DBManager, PythonBatchCommandBase):
                 wfd.write(line_for_main_info_map)
 
 
+class InfoMapDeltaWriter(DBManager, PythonBatchCommandBase):
+    """ write the changes between the info_map files of a previous repo-rev and the ones created by InfoMapSplitWriter,
+        so clients that have the info_maps of the previous repo-rev can download only the changes.
+        If previous_work_folder does not exist no delta is written.
+        Admin pybatch class, used in deployment, not during installation
+    """
+    def __init__(self, previous_work_folder, work_folder, previous_repo_rev, **kwargs):
+        super().__init__(**kwargs)
+        self.previous_work_folder = Path(previous_work_folder)
+        self.work_folder = Path(work_folder)
+        self.previous_repo_rev = int(previous_repo_rev)
+
+    def repr_own_args(self, all_args: List[str]) -> None:
+        all_args.append(self.unnamed__init__param(self.previous_work_folder))
+        all_args.append(self.unnamed__init__param(self.work_folder))
+        all_args.append(self.unnamed__init__param(self.previous_repo_rev))
+
+    def progress_msg_self(self) -> str:
+        return f'''Create info_map delta from repo-rev#{self.previous_repo_rev}'''
+
+    def __call__(self, *args, **kwargs) -> None:
+        super().__call__(*args, **kwargs)
+        if not self.previous_work_folder.is_dir():
+            log.info(f"{self.previous_work_folder} was not found so no info_map delta is created")
+            return
+
+        info_map_names = [str(config_vars["MAIN_INFO_MAP_FILE_NAME"])]
+        info_map_names.extend(self.items_table.get_unique_detail_values('info_map'))
+        info_map_files = [(info_map_name, self.previous_work_folder.joinpath(info_map_name), self.work_folder.joinpath(info_map_name))
+                          for info_map_name in info_map_names
+                          if self.work_folder.joinpath(info_map_name).is_file()]
+        delta_file_path = self.work_folder.joinpath(str(config_vars["INFO_MAP_DELTA_FILE_NAME"]))
+        num_changes = write_info_map_delta(delta_file_path, self.previous_repo_rev, config_vars["TARGET_REPO_REV"].str(), info_map_files)
+        log.info(f"{num_changes} changes written to {delta_file_path}")
+
+
 class IndexYamlReader(DBManager, PythonBatchCommandBase):
     """ Reads and resolves index.yaml
         Admin pybatch class, used in deployment, not during installation
@@ -416,7 +464,7 @@ class CopySpecificRepoRev(DBManager, PythonBatchCommandBase):
     def __call__(self, *args, **kwargs) -> None:
         self.info_map_table.mark_required_for_revision(self.repo_rev)
         self.info_map_table.mark_required_for_dir("instl")
-        files_to_copy = self.info_map_table.get_required_items(what="file")
+        files_to_copy = self.info_map_table.iter_required_items(what="file")
         for a_file in files_to_copy:
             source = Path(self.checkout_folder, a_file)
             target = Path(self.repo_rev_folder, a_file)
@@ -469,6 +517,11 @@ class CreateRepoRevFile(PythonBatchCommandBase):
             "INFO_MAP_FILE_URL"] = "$(BASE_LINKS_URL)/$(REPO_NAME)/$(__CURR_REPO_FOLDER_HIERARCHY__)/instl/" + main_info_map_file_name
         config_vars["INFO_MAP_CHECKSUM"] = main_info_map_checksum
 
+        # create checksum for the info_map delta, if one was created
+        info_map_delta_file = revision_instl_folder_path.joinpath(str(config_vars["INFO_MAP_DELTA_FILE_NAME"]))
+        if info_map_delta_file.is_file():
+            config_vars["INFO_MAP_DELTA_CHECKSUM"] = utils.get_file_checksum(info_map_delta_file)
+
         # create checksum for the main index.yaml file, either wzipped or not
         index_file_name = "index.yaml" + zip_extension
         index_file_path = revision_instl_folder_path.joinpath(index_file_name)
@@ -1,6 +1,7 @@
 from .test_PythonBatchBase import TestPythonBatch
 from .test_copyBatchCommands import TestPythonBatchCopy
 from .test_conditionalBatchCommands import TestPythonBatchConditional
+from .test_downloadBatchCommands import TestPythonBatchDownload
 from .test_fileSystemBatchCommands import TestPythonBatchFileSystem
 from .test_info_mapBatchCommands import TestPythonBatchInfoMap
 from .test_MacOnlyBatchCommands import TestPythonBatchMac
@@ -266,6 +266,99 @@ class TestPythonBatchCopy(unittest.TestCase):
         dir_comp_with_ignore = filecmp.dircmp(dir_to_copy_from, dir_to_copy_to_with_ignore)
         is_identical_dircomp_with_ignore(dir_comp_with_ignore, filen_names_to_ignore)
 
+    def test_RsyncClone_parallel_repr(self):
+        dir_from = "/p/o/i"
+        dir_to = "/q/w/r"
+        self.pbt.reprs_test_runner(RsyncClone(dir_from, dir_to, num_workers=8), CopyDirToDir(dir_from, dir_to, num_workers=4, hard_links=False))
+
+    def test_RsyncClone_parallel(self):
+        """ test RsyncClone, CopyDirToDir and CopyDirContentsToDir with num_workers > 1
+            copies should be identical to the source, ignore_patterns should be honoured,
+            and copying again to an existing destination should work.
+        """
+        dir_to_copy_from = self.pbt.path_inside_test_folder("copy-resource_source_file")
+        dir_to_rsync_to = self.pbt.path_inside_test_folder("rsync-target-parallel")
+        dir_to_copy_to = self.pbt.path_inside_test_folder("copy-dir-target-parallel")
+        copied_dir = dir_to_copy_to.joinpath("copy-resource_source_file")
+        dir_to_copy_contents_to = self.pbt.path_inside_test_folder("copy-contents-target-parallel-with-ignore")
+
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += MakeDir(dir_to_copy_from)
+        with self.pbt.batch_accum.sub_accum(Cd(dir_to_copy_from)) as sub_bc:
+            sub_bc += Touch("hootenanny")  # add one file with fixed (none random) name
+            sub_bc += MakeRandomDirs(num_levels=4, num_dirs_per_level=3, num_files_per_dir=7, file_size=413)
+        self.pbt.batch_accum += RsyncClone(dir_to_copy_from, dir_to_rsync_to, hard_links=False, num_workers=4)
+        self.pbt.batch_accum += CopyDirToDir(dir_to_copy_from, dir_to_copy_to, hard_links=True, num_workers=4)
+        file_names_to_ignore = ["hootenanny"]
+        self.pbt.batch_accum += CopyDirContentsToDir(dir_to_copy_from, dir_to_copy_contents_to, ignore_patterns=file_names_to_ignore, num_workers=4)
+
+        self.pbt.exec_and_capture_output("target-not-exist")
+
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(dir_to_copy_from, dir_to_rsync_to)), f"{self.pbt.which_test} (rsync): source and target dirs are not the same")
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(dir_to_copy_from, copied_dir)), f"{self.pbt.which_test} (copy dir): source and target dirs are not the same")
+        is_identical_dircomp_with_ignore(filecmp.dircmp(dir_to_copy_from, dir_to_copy_contents_to), file_names_to_ignore)
+        self.assertFalse(dir_to_copy_contents_to.joinpath("hootenanny").exists())
+
+        # copy again, files already in the destination should not be copied again
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += RsyncClone(dir_to_copy_from, dir_to_rsync_to, hard_links=False, copy_stat=True, num_workers=4)
+        self.pbt.exec_and_capture_output("target-exist")
+
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(dir_to_copy_from, dir_to_rsync_to)), f"{self.pbt.which_test} (rsync again): source and target dirs are not the same")
+
+    def test_RsyncClone_parallel_hard_links_and_skip(self):
+        """ with num_workers > 1 hard links should be created, and files already hard-linked should be skipped
+            with the same statistics as a serial copy.
+        """
+        dir_to_copy_from = self.pbt.path_inside_test_folder("copy-resource_source_file")
+        dir_to_copy_to = self.pbt.path_inside_test_folder("copy-target-parallel-hard-links")
+        dir_to_copy_from.mkdir(parents=True)
+        with Cd(dir_to_copy_from, report_own_progress=False) as cd:
+            cd()
+            with MakeRandomDirs(num_levels=3, num_dirs_per_level=3, num_files_per_dir=6, file_size=97, report_own_progress=False) as mrd:
+                mrd()
+        source_files = sorted(p.relative_to(dir_to_copy_from) for p in dir_to_copy_from.rglob("*") if p.is_file())
+
+        with RsyncClone(dir_to_copy_from, dir_to_copy_to, hard_links=True, num_workers=4, report_own_progress=False) as copier:
+            copier()
+        for relative_path in source_files:
+            self.assertTrue(dir_to_copy_from.joinpath(relative_path).samefile(dir_to_copy_to.joinpath(relative_path)), f"{relative_path} was not hard linked")
+        self.assertEqual(copier.statistics['files'], len(source_files))
+        self.assertEqual(copier.statistics['hard_links'], len(source_files))
+
+        with RsyncClone(dir_to_copy_from, dir_to_copy_to, hard_links=True, num_workers=4, report_own_progress=False) as copier_again:
+            copier_again()
+        self.assertEqual(copier_again.statistics['skipped_files'], len(source_files))
+        self.assertEqual(copier_again.statistics['hard_links'], 0)
+
+    def test_RsyncClone_parallel_errors(self):
+        """ errors from file copy workers should be collected and reported in the order the files were encountered
+            while walking the source, regardless of the order the workers finished.
+        """
+        dir_to_copy_from = self.pbt.path_inside_test_folder("copy-resource_source_file")
+        dir_to_copy_to = self.pbt.path_inside_test_folder("copy-target-parallel-errors")
+        for sub_dir in ("a", "b"):
+            dir_to_copy_from.joinpath(sub_dir).mkdir(parents=True)
+            for i in range(8):
+                dir_to_copy_from.joinpath(sub_dir, f"file_{i}").write_text(f"{sub_dir} {i}")
+                if i % 3 == 0:  # a folder in the destination where a file should be copied, will fail the copy
+                    dir_to_copy_to.joinpath(sub_dir, f"file_{i}", "blocker").mkdir(parents=True)
+
+        def src_path_of_errors(num_workers):
+            with self.assertRaises(shutil.Error) as context:
+                with RsyncClone(dir_to_copy_from, dir_to_copy_to, hard_links=False, num_workers=num_workers, report_own_progress=False) as copier:
+                    copier()
+            return [error[0] for error in context.exception.args[0]]
+
+        expected_failures = [os.fspath(p) for p in utils.ExpandAndResolvePath(dir_to_copy_from).rglob("*")
+                             if p.is_file() and p.name in ("file_0", "file_3", "file_6")]
+        for _ in range(3):
+            failures = src_path_of_errors(num_workers=8)
+            self.assertCountEqual(failures, expected_failures)
+            self.assertEqual(failures, src_path_of_errors(num_workers=3))
+        # files that could be copied were copied
+        self.assertEqual(dir_to_copy_to.joinpath("b", "file_7").read_text(), "b 7")
+
     def test_MoveDirContentsToDir_repr(self):
         pass
 
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3.9
+
+
+import os
+import re
+import time
+import hashlib
+import threading
+import unittest
+import unittest.mock
+import functools
+import http.server
+from collections import Counter, defaultdict
+import logging
+log = logging.getLogger(__name__)
+
+from pybatch import *
+
+
+from .test_PythonBatchBase import *
+
+
+class LocalHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """ serve files from the server's directory, with failures injected according to server.fail_counts
+        and server.truncate_counts. Range requests are supported if server.support_ranges is True.
+    """
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_counts[self.path] += 1
+            server.range_requests[self.path].append(self.headers.get("Range"))
+            server.active_requests += 1
+            server.max_active_requests = max(server.max_active_requests, server.active_requests)
+            should_fail = server.request_counts[self.path] <= server.fail_counts.get(self.path, 0)
+            should_truncate = server.request_counts[self.path] <= server.truncate_counts.get(self.path, 0)
+        try:
+            time.sleep(server.response_delay)
+            if should_fail:
+                self.send_error(503)
+            elif server.support_ranges or should_truncate:
+                self.send_file_contents(should_truncate)
+            else:
+                super().do_GET()
+        finally:
+            with server.lock:
+                server.active_requests -= 1
+
+    def send_file_contents(self, should_truncate):
+        """ send the file, or the requested range of it, if should_truncate close the connection after sending half the data """
+        file_path = self.translate_path(self.path)
+        if not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+        with open(file_path, "rb") as rfd:
+            contents = rfd.read()
+        first_byte = 0
+        range_match = re.match(r"^bytes=(\d+)-$", self.headers.get("Range", ""))
+        if self.server.support_ranges and range_match:
+            first_byte = int(range_match.group(1))
+            if first_byte >= len(contents):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {first_byte}-{len(contents) - 1}/{len(contents)}")
+        else:
+            self.send_response(200)
+        body = contents[first_byte:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if should_truncate:
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalHTTPServer(http.server.ThreadingHTTPServer):
+    """ stand in for the real download server """
+    daemon_threads = True
+
+    def __init__(self, directory):
+        super().__init__(("127.0.0.1", 0), functools.partial(LocalHTTPRequestHandler, directory=os.fspath(directory)))
+        self.lock = threading.Lock()
+        self.request_counts = Counter()
+        self.fail_counts = dict()
+        self.truncate_counts = dict()
+        self.support_ranges = False
+        self.range_requests = defaultdict(list)
+        self.active_requests = 0
+        self.max_active_requests = 0
+        self.response_delay = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class TestPythonBatchDownload(unittest.TestCase):
+    def __init__(self, which_test):
+        super().__init__(which_test)
+        self.pbt = TestPythonBatch(self, which_test)
+
+    def setUp(self):
+        self.pbt.setUp()
+        self.server_folder = self.pbt.path_inside_test_folder("server")
+        self.download_folder = self.pbt.path_inside_test_folder("download")
+        self.server_folder.mkdir()
+        self.checksums = dict()
+        for i in range(64):
+            contents = os.urandom(1024 * (i % 5) + i)
+            file_name = f"file_{i:03}.bin"
+            self.server_folder.joinpath(file_name).write_bytes(contents)
+            self.checksums[file_name] = hashlib.sha1(contents).hexdigest()
+
+    def tearDown(self):
+        if "CURL_RETRIES" in config_vars:  # assigned by test_DownloadFilesInParallel
+            del config_vars["CURL_RETRIES"]
+        self.pbt.tearDown()
+
+    def download_list(self, server, file_names=None):
+        if file_names is None:
+            file_names = sorted(self.checksums)
+        return [(f"{server.base_url}/{name}", os.fspath(self.download_folder.joinpath("a", name)), 0, self.checksums[name]) for name in file_names]
+
+    def assert_downloaded(self, file_names=None):
+        if file_names is None:
+            file_names = self.checksums
+        for name in file_names:
+            self.assertEqual(self.checksums[name], utils.get_file_checksum(self.download_folder.joinpath("a", name)), name)
+        self.assertEqual([], [p for p in self.download_folder.rglob("*.downloading")])
+
+    def test_DownloadFilesInParallel_repr(self):
+        self.pbt.reprs_test_runner(DownloadFilesInParallel("/a/download/list"),
+                                   DownloadFilesInParallel("/a/download/list", num_workers=16, max_connections_per_host=4),
+                                   DownloadFilesInParallel("/a/download/list", cookie="a=b; c=d"))
+
+    def test_ParallelDownloader(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            downloaded = list()
+            failures = ParallelDownloader(num_workers=8).download(self.download_list(server), progress_callback=lambda url, path: downloaded.append(path))
+        self.assertEqual([], failures)
+        self.assertEqual(len(self.checksums), len(downloaded))
+        self.assert_downloaded()
+
+    def test_ParallelDownloader_retry(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            server.fail_counts = {"/file_001.bin": 2, "/file_002.bin": 5}
+            failures = ParallelDownloader(num_workers=4, retries=2, retry_delay=0.01).download(self.download_list(server))
+        self.assertEqual(["file_002.bin"], [os.path.basename(path) for url, path, ex in failures])
+        self.assertEqual(3, server.request_counts["/file_001.bin"])
+        self.assertEqual(3, server.request_counts["/file_002.bin"])
+        self.assert_downloaded(set(self.checksums) - {"file_002.bin"})
+        self.assertFalse(self.download_folder.joinpath("a", "file_002.bin").exists())
+
+    def test_ParallelDownloader_retry_delay(self):
+        """ retry_delay is fixed, like curl's --retry-delay, not growing with each attempt """
+        with LocalHTTPServer(self.server_folder) as server:
+            server.fail_counts = {"/file_001.bin": 3}
+            with unittest.mock.patch("pybatch.downloadBatchCommands.time.sleep") as sleep_mock:
+                failures = ParallelDownloader(retries=3, retry_delay=12).download(self.download_list(server, ["file_001.bin"]))
+        self.assertEqual([], failures)
+        # time.sleep(0) calls are the server's response_delay
+        self.assertEqual([unittest.mock.call(12)] * 3, [c for c in sleep_mock.call_args_list if c != unittest.mock.call(0)])
+
+    def test_ParallelDownloader_max_time(self):
+        """ max_time limits the total time of downloading a file, including retries """
+        with LocalHTTPServer(self.server_folder) as server:
+            server.fail_counts = {"/file_001.bin": 100}
+            start_time = time.monotonic()
+            failures = ParallelDownloader(retries=100, retry_delay=0.1, max_time=0.5).download(self.download_list(server, ["file_001.bin"]))
+            self.assertLess(time.monotonic() - start_time, 2)
+            self.assertEqual(1, len(failures))
+            self.assertLess(server.request_counts["/file_001.bin"], 10)
+
+            # max_time is the total time, a slow server is not waited for up to read_timeout
+            server.response_delay = 1.0
+            start_time = time.monotonic()
+            failures = ParallelDownloader(read_timeout=30, retries=2, retry_delay=0.01, max_time=0.3).download(self.download_list(server, ["file_002.bin"]))
+            self.assertLess(time.monotonic() - start_time, 1.0)
+            self.assertEqual(1, len(failures))
+        self.assertFalse(self.download_folder.joinpath("a", "file_002.bin").exists())
+
+    def test_ParallelDownloader_bad_checksum(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            download_list = self.download_list(server, ["file_003.bin", "file_004.bin"])
+            download_list[0] = download_list[0][:3] + ("0123456789abcdef0123456789abcdef01234567",)
+            failures = ParallelDownloader(retries=1, retry_delay=0.01).download(download_list)
+        self.assertEqual(1, len(failures))
+        self.assertEqual(2, server.request_counts["/file_003.bin"])  # bad checksum is retried
+        self.assertFalse(self.download_folder.joinpath("a", "file_003.bin").exists())
+        self.assert_downloaded(["file_004.bin"])
+
+    def test_ParallelDownloader_not_found(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            download_list = [(f"{server.base_url}/no_such_file.bin", os.fspath(self.download_folder.joinpath("a", "no_such_file.bin")), 0, None)]
+            failures = ParallelDownloader(retries=3, retry_delay=0.01).download(download_list)
+        self.assertEqual(1, len(failures))
+        self.assertEqual(1, server.request_counts["/no_such_file.bin"])  # 404 is not retried
+
+    def test_ParallelDownloader_max_connections_per_host(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            server.response_delay = 0.02
+            failures = ParallelDownloader(num_workers=16, max_connections_per_host=3).download(self.download_list(server))
+        self.assertEqual([], failures)
+        self.assertLessEqual(server.max_active_requests, 3)
+        self.assert_downloaded()
+
+    def test_DownloadFilesInParallel(self):
+        download_list_file = self.pbt.path_inside_test_folder("dl.download-list")
+        file_names = sorted(self.checksums)
+        with LocalHTTPServer(self.server_folder) as server:
+            with utils.utf8_open_for_write(download_list_file, "w") as wfd:
+                for url, path, size, checksum in self.download_list(server, file_names[:-1]):
+                    wfd.write(f"{url}\t{path}\t{size}\t{checksum}\n")
+                wfd.write("wait\n")
+                for url, path, size, checksum in self.download_list(server, file_names[-1:]):
+                    wfd.write(f"{url}\t{path}\t{size}\t\n")
+            self.assertEqual([len(file_names) - 1, 1], [len(l) for l in DownloadFilesInParallel.read_download_list_file(download_list_file)])
+
+            self.pbt.batch_accum.clear(section_name="doit")
+            self.pbt.batch_accum += DownloadFilesInParallel(download_list_file, num_workers=4)
+            self.pbt.exec_and_capture_output()
+            self.assert_downloaded()
+
+            server.fail_counts = {"/file_005.bin": 100}
+            self.pbt.batch_accum.clear(section_name="doit")
+            self.pbt.batch_accum += ConfigVarAssign("CURL_RETRIES", 0)
+            self.pbt.batch_accum += DownloadFilesInParallel(download_list_file, num_workers=4)
+            self.pbt.exec_and_capture_output("failed_download", expected_exception=ValueError)
+
+    def download_with_DownloadManager(self, server, file_name, checksum=None):
+        with DownloadManager(cookie="a=b", report_own_progress=False) as dler:
+            dler(url=f"{server.base_url}/{file_name}", path=self.download_folder.joinpath("a", file_name), checksum=checksum or self.checksums[file_name])
+
+    def test_DownloadManager_resume(self):
+        # big enough for a few chunks to be written before the connection is cut
+        contents = os.urandom(DownloadManager.chunk_size * 5 + 17)
+        self.server_folder.joinpath("big.bin").write_bytes(contents)
+        self.checksums["big.bin"] = hashlib.sha1(contents).hexdigest()
+        with LocalHTTPServer(self.server_folder) as server:
+            server.support_ranges = True
+            server.truncate_counts = {"/big.bin": 2}
+            self.download_with_DownloadManager(server, "big.bin")
+        # each transfer was cut in the middle, and resumed from where the previous one stopped
+        range_requests = server.range_requests["/big.bin"]
+        self.assertEqual(3, len(range_requests))
+        self.assertIsNone(range_requests[0])
+        resumed_from = [int(re.match(r"^bytes=(\d+)-$", range_request).group(1)) for range_request in range_requests[1:]]
+        self.assertTrue(0 < resumed_from[0] < resumed_from[1] < len(contents), resumed_from)
+        self.assert_downloaded(["big.bin"])
+
+    def test_DownloadManager_ranges_not_supported(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            server.truncate_counts = {"/file_014.bin": 1}
+            self.download_with_DownloadManager(server, "file_014.bin")
+        self.assertEqual(2, server.request_counts["/file_014.bin"])
+        self.assert_downloaded(["file_014.bin"])
+
+    def test_DownloadManager_stale_partial_file(self):
+        self.download_folder.joinpath("a").mkdir(parents=True)
+        with LocalHTTPServer(self.server_folder) as server:
+            server.support_ranges = True
+            # partial file from a different version of the file, resuming will give bad checksum
+            self.download_folder.joinpath("a", "file_014.bin.downloading").write_bytes(b"not the same file")
+            self.download_with_DownloadManager(server, "file_014.bin")
+            self.assertEqual(["bytes=17-", None], server.range_requests["/file_014.bin"])
+            # partial file bigger than the file on the server
+            self.download_folder.joinpath("a", "file_003.bin.downloading").write_bytes(os.urandom(8 * 1024))
+            self.download_with_DownloadManager(server, "file_003.bin")
+            self.assertEqual([f"bytes={8 * 1024}-", None], server.range_requests["/file_003.bin"])
+        self.assert_downloaded(["file_014.bin", "file_003.bin"])
+
+    def test_DownloadManager_bad_checksum(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            with self.assertRaises(ValueError):
+                self.download_with_DownloadManager(server, "file_014.bin", checksum="0123456789abcdef0123456789abcdef01234567")
+        self.assertFalse(self.download_folder.joinpath("a", "file_014.bin").exists())
+        self.assertEqual([], [p for p in self.download_folder.rglob("*.downloading")])
+
+    def test_DownloadManager_download_files(self):
+        with LocalHTTPServer(self.server_folder) as server:
+            server.response_delay = 0.02
+            server.support_ranges = True
+            server.truncate_counts = {"/file_009.bin": 1, "/file_024.bin": 1}  # will be downloaded again, since they are smaller than a chunk
+            download_list = [(url, path, checksum) for url, path, size, checksum in self.download_list(server)]
+            download_list[5] = download_list[5][:2] + ("0123456789abcdef0123456789abcdef01234567",)
+            downloaded = list()
+            with DownloadManager(cookie="a=b", report_own_progress=False) as dler:
+                failures = dler.download_files(download_list, num_workers=4, progress_callback=lambda url, path: downloaded.append(path))
+        self.assertEqual(["file_005.bin"], [path.name for url, path, ex in failures])
+        self.assertEqual(len(self.checksums) - 1, len(downloaded))
+        self.assertLessEqual(server.max_active_requests, 4)
+        self.assertGreater(server.max_active_requests, 1)
+        self.assertEqual(2, len(server.range_requests["/file_009.bin"]))
+        self.assert_downloaded(set(self.checksums) - {"file_005.bin"})
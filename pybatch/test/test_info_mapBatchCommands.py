@@ -1,7 +1,11 @@
 #!/usr/bin/env python3.9
 
 
+import os
+import hashlib
 import unittest
+from types import SimpleNamespace
+from unittest import mock
 import logging
 log = logging.getLogger(__name__)
 
@@ -20,6 +24,9 @@ class TestPythonBatchInfoMap(unittest.TestCase):
         self.pbt.setUp()
 
     def tearDown(self):
+        for var_name in ("LOCAL_SYNC_DIR", "NUM_CHECKSUM_WORKERS"):  # assigned by CheckDownloadFolderChecksum tests
+            if var_name in config_vars:
+                del config_vars[var_name]
         self.pbt.tearDown()
 
     def test_InfoMapBase_repr(self):
@@ -32,7 +39,52 @@ class TestPythonBatchInfoMap(unittest.TestCase):
         pass
 
     def test_CheckDownloadFolderChecksum(self):
-        pass
+        sync_folder = self.pbt.path_inside_test_folder("sync")
+        sync_folder.mkdir()
+        file_items = list()
+        for i in range(100):
+            contents = os.urandom(i * 97)
+            file_path = sync_folder.joinpath(f"file_{i:03}.bin")
+            checksum = hashlib.sha1(contents).hexdigest()
+            if i % 7 == 3:  # missing
+                pass
+            elif i % 11 == 5:  # bad checksum
+                file_path.write_bytes(contents + b"!")
+            else:
+                file_path.write_bytes(contents)
+            file_items.append(SimpleNamespace(download_path=os.fspath(file_path), checksum=checksum))
+        info_map_table = SimpleNamespace(get_download_items=lambda what: file_items)
+
+        lists_of_files_by_num_workers = dict()
+        for num_workers in (1, 4):
+            config_vars["LOCAL_SYNC_DIR"] = sync_folder
+            config_vars["NUM_CHECKSUM_WORKERS"] = num_workers
+            with mock.patch.object(CheckDownloadFolderChecksum, "info_map_table", info_map_table, create=True):
+                checker = CheckDownloadFolderChecksum(raise_on_bad_checksum=False, report_own_progress=False)
+                with mock.patch.object(checker, "re_download_bad_files"):
+                    with checker:
+                        checker()
+            self.assertEqual(sum(1 for i in range(100) if i % 7 == 3 or i % 11 == 5), checker.num_bad_files)
+            lists_of_files_by_num_workers[num_workers] = dict(checker.lists_of_files)
+        self.assertEqual(lists_of_files_by_num_workers[1], lists_of_files_by_num_workers[4])
+        self.assertEqual([os.fspath(sync_folder.joinpath(f"file_{i:03}.bin")) for i in range(100) if i % 7 == 3 or i % 11 == 5],
+                         [file_item.download_path for file_item in lists_of_files_by_num_workers[4]["to redownload"]])
+
+    def test_CheckDownloadFolderChecksum_stop_after_max_bad_files(self):
+        sync_folder = self.pbt.path_inside_test_folder("sync")
+        sync_folder.mkdir()
+        # no files were created so all are missing
+        file_items = [SimpleNamespace(download_path=os.fspath(sync_folder.joinpath(f"file_{i:03}.bin")), checksum="0" * 40) for i in range(1000)]
+        info_map_table = SimpleNamespace(get_download_items=lambda what: file_items)
+        config_vars["LOCAL_SYNC_DIR"] = sync_folder
+        config_vars["NUM_CHECKSUM_WORKERS"] = 4
+        with mock.patch.object(CheckDownloadFolderChecksum, "info_map_table", info_map_table, create=True):
+            checker = CheckDownloadFolderChecksum(raise_on_bad_checksum=False, max_bad_files_to_redownload=10, report_own_progress=False)
+            with mock.patch.object(checker, "re_download_bad_files"):
+                with checker:
+                    checker()
+        self.assertEqual(11, checker.num_bad_files)
+        self.assertEqual(11, len(checker.lists_of_files["missing_files"]))
 
     def test_SetExecPermissionsInSyncFolder_repr(self):
         pass
@@ -46,6 +98,9 @@ class TestPythonBatchInfoMap(unittest.TestCase):
     def test_CreateSyncFolders(self):
         pass
 
+    def test_InfoMapDeltaWriter_repr(self):
+        self.pbt.reprs_test_runner(InfoMapDeltaWriter("/repo/00/07/instl", "/repo/00/08/instl", 7))
+
     @unittest.skip("too local to be a general test")
     def test_create_short_index(self):
         self.pbt.batch_accum.clear(section_name="doit")
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3.9
 
 
+import bz2
+import sqlite3
+import contextlib
+import tarfile
 import unittest
+import unittest.mock
 
 from pybatch import *
+from pybatch.wtarBatchCommands import ChecksumVerifyingTarFile, unwtar_manifest_path
 
 current_os_names = utils.get_current_os_names()
 os_family_name = current_os_names[0]
@@ -36,6 +42,7 @@ class TestPythonBatchWtar(unittest.TestCase):
         list_of_objs.append(Unwtar("/the/memphis/belle"))
         list_of_objs.append(Unwtar("/the/memphis/belle", None))
         list_of_objs.append(Unwtar("/the/memphis/belle", "robota", no_artifacts=True))
+        list_of_objs.append(Wtar("/the/memphis/belle", "robota", num_workers=8))
         self.pbt.reprs_test_runner(*list_of_objs)
 
     def test_Wtar_Unwtar(self):
@@ -73,6 +80,401 @@ class TestPythonBatchWtar(unittest.TestCase):
         dir_wtar_unwtar_diff = filecmp.dircmp(folder_to_wtar, unwtared_folder, ignore=['.DS_Store'])
         self.assertTrue(is_identical_dircmp(dir_wtar_unwtar_diff), f"{self.pbt.which_test} : before wtar and after unwtar dirs are not the same")
 
+    def make_folder_of_wtars(self, folder_name, num_archives):
+        """ create num_archives random folders, wtar them next to each other - every 3rd one split to parts.
+            return the folder with the wtar files and a folder with the original contents
+        """
+        originals_folder = self.pbt.path_inside_test_folder(f"{folder_name}-originals")
+        wtars_folder = self.pbt.path_inside_test_folder(folder_name)
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += MakeDir(wtars_folder.joinpath("sub"))
+        for i in range(num_archives):
+            bundle_folder = originals_folder.joinpath(f"bundle_{i}")
+            self.pbt.batch_accum += MakeDir(bundle_folder)
+            with self.pbt.batch_accum.sub_accum(Cd(bundle_folder)) as cd_accum:
+                cd_accum += MakeRandomDirs(num_levels=2, num_dirs_per_level=3, num_files_per_dir=4, file_size=1024)
+            where_to_put_wtar = wtars_folder if i % 2 == 0 else wtars_folder.joinpath("sub")
+            self.pbt.batch_accum += Wtar(bundle_folder, where_to_put_wtar, split_threshold=8 * 1024 if i % 3 == 0 else 0)
+        self.pbt.exec_and_capture_output(f"create {folder_name}")
+        return wtars_folder, originals_folder
+
+    def test_Unwtar_parallel_repr(self):
+        self.pbt.reprs_test_runner(Unwtar("/the/memphis/belle", "robota", num_workers=8), Unwtar("/the/memphis/belle", num_workers=2, no_artifacts=True))
+
+    def test_Unwtar_parallel(self):
+        """ unwtar a folder of wtar files with a pool of processes, result should be the same as serial unwtar
+            and wtar files should be removed when no_artifacts is True.
+        """
+        num_archives = 6
+        wtars_folder, originals_folder = self.make_folder_of_wtars("wtars", num_archives)
+        self.assertTrue(list(wtars_folder.rglob("*.wtar.aa")), "some wtar files should have been split")
+        serial_copy_of_wtars_folder = self.pbt.path_inside_test_folder("wtars-for-serial")
+        shutil.copytree(wtars_folder, serial_copy_of_wtars_folder)
+
+        unwtar_parallel_here = self.pbt.path_inside_test_folder("unwtar-parallel-here")
+        unwtar_serial_here = self.pbt.path_inside_test_folder("unwtar-serial-here")
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += Unwtar(wtars_folder, unwtar_parallel_here, num_workers=4, no_artifacts=True)
+        self.pbt.batch_accum += Unwtar(serial_copy_of_wtars_folder, unwtar_serial_here)
+        self.pbt.exec_and_capture_output("unwtar")
+
+        unwtarred_parallel = unwtar_parallel_here.joinpath(wtars_folder.name)
+        unwtarred_serial = unwtar_serial_here.joinpath(serial_copy_of_wtars_folder.name)
+        for i in range(num_archives):
+            sub_folder = "" if i % 2 == 0 else "sub"
+            original = originals_folder.joinpath(f"bundle_{i}")
+            self.assertTrue(is_identical_dircmp(filecmp.dircmp(original, unwtarred_parallel.joinpath(sub_folder, f"bundle_{i}"))), f"bundle_{i} was not unwtarred correctly in parallel")
+            self.assertTrue(is_identical_dircmp(filecmp.dircmp(original, unwtarred_serial.joinpath(sub_folder, f"bundle_{i}"))), f"bundle_{i} was not unwtarred correctly serially")
+        self.assertEqual(list(wtars_folder.rglob("*.wtar*")), [], "no_artifacts=True: wtar files should have been removed")
+        self.assertNotEqual(list(serial_copy_of_wtars_folder.rglob("*.wtar*")), [], "no_artifacts=False: wtar files should have remained")
+
+        # unwtar again - destination is identical to the archives so unwtarring should be skipped
+        a_file_in_destination = next(p for p in unwtarred_serial.rglob("*") if p.is_file())
+        os.utime(a_file_in_destination, (1000, 1000))
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += Unwtar(serial_copy_of_wtars_folder, unwtar_serial_here, num_workers=3)
+        self.pbt.exec_and_capture_output("unwtar again")
+        self.assertEqual(a_file_in_destination.stat().st_mtime, 1000, "unwtar should have been skipped when destination has the same checksum")
+
+    def test_Unwtar_parallel_errors(self):
+        """ a corrupt archive should not prevent the other archives from being unwtarred,
+            and the failed archive should be reported.
+        """
+        wtars_folder, originals_folder = self.make_folder_of_wtars("wtars-with-error", 4)
+        corrupt_wtar = wtars_folder.joinpath("sub", "corrupt.wtar")
+        corrupt_wtar.write_bytes(b"BZh91AY&SY" + bytes(range(256)) * 8)
+
+        unwtar_here = self.pbt.path_inside_test_folder("unwtar-here")
+        with self.assertRaises((OSError, tarfile.TarError, EOFError)):
+            with Unwtar(wtars_folder, unwtar_here, num_workers=4, report_own_progress=False) as unwtarer:
+                unwtarer()
+        self.assertEqual(unwtarer.failed_wtar_files, [corrupt_wtar])
+        for i in range(4):
+            sub_folder = "" if i % 2 == 0 else "sub"
+            self.assertTrue(unwtar_here.joinpath(wtars_folder.name, sub_folder, f"bundle_{i}").is_dir(), f"bundle_{i} should have been unwtarred despite the error")
+
+    def test_Unwtar_parallel_worker_setup(self):
+        """ worker processes should get config_vars, use the checksum cache and send their log records to this process """
+        wtars_folder, originals_folder = self.make_folder_of_wtars("wtars", 3)
+        unwtar_here = self.pbt.path_inside_test_folder("unwtar-here")
+        checksum_cache_path = self.pbt.path_inside_test_folder("checksum_cache.sqlite")
+        config_vars["CHECKSUM_CACHE_PATH"] = os.fspath(checksum_cache_path)
+        config_vars["WTAR_IGNORE_FILES"] = ["ignored-file"]
+        self.addCleanup(utils.checksum_cache.disable)
+        self.addCleanup(config_vars.__delitem__, "CHECKSUM_CACHE_PATH")
+        self.addCleanup(config_vars.__delitem__, "WTAR_IGNORE_FILES")
+
+        for _ in range(2):  # second time destinations exist and their files are checksummed
+            with self.assertLogs("pybatch.wtarBatchCommands", level="DEBUG") as captured:
+                with Unwtar(wtars_folder, unwtar_here, num_workers=3, report_own_progress=False) as unwtarer:
+                    unwtarer()
+        unwtarred_log_messages = [record.getMessage() for record in captured.records if record.getMessage().startswith("unwtar ")]
+        self.assertEqual(3, len(unwtarred_log_messages), "workers' log records should be handled by this process")
+        self.assertEqual(3, len([record for record in captured.records if "skipping unwtarring" in record.getMessage()]))
+
+        unwtarred_files = [p for p in unwtar_here.rglob("*") if p.is_file()]
+        with contextlib.closing(sqlite3.connect(os.fspath(checksum_cache_path))) as conn:
+            cached_paths = {row[0] for row in conn.execute("SELECT path FROM checksum_t")}
+        self.assertEqual({os.fspath(p.resolve()) for p in unwtarred_files}, cached_paths, "workers should have added checksums to the checksum cache")
+
+        # WTAR_IGNORE_FILES is known to the workers - an ignored file does not cause unwtarring
+        ignored_file = unwtar_here.joinpath("wtars", "bundle_0", "ignored-file")
+        ignored_file.write_text("ignored")
+        with Unwtar(wtars_folder, unwtar_here, num_workers=3, report_own_progress=False) as unwtarer:
+            unwtarer()
+        self.assertTrue(ignored_file.exists(), "unwtar should have been skipped, not removed the destination")
+
+    def test_Wtar_parallel_compression(self):
+        """ Wtar with num_workers > 1 creates multi-stream bzip2, the tar inside should be identical to
+            the one created by single threaded Wtar, including total_checksum, and Unwtar should expand it.
+        """
+        folder_to_wtar = self.pbt.path_inside_test_folder("folder-to-wtar")
+        single_stream_folder = self.pbt.path_inside_test_folder("single-stream")
+        multi_stream_folder = self.pbt.path_inside_test_folder("multi-stream")
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += MakeDir(folder_to_wtar)
+        with self.pbt.batch_accum.sub_accum(Cd(folder_to_wtar)) as cd_accum:
+            cd_accum += MakeRandomDirs(num_levels=3, num_dirs_per_level=3, num_files_per_dir=5, file_size=64 * 1024)
+        self.pbt.batch_accum += MakeDir(single_stream_folder)
+        self.pbt.batch_accum += MakeDir(multi_stream_folder)
+        self.pbt.batch_accum += Wtar(folder_to_wtar, single_stream_folder)
+        self.pbt.batch_accum += Wtar(folder_to_wtar, multi_stream_folder, num_workers=4)
+        self.pbt.exec_and_capture_output("wtar")
+
+        single_stream_wtar = next(single_stream_folder.glob("folder-to-wtar.wtar*"))
+        multi_stream_wtar = next(multi_stream_folder.glob("folder-to-wtar.wtar*"))
+
+        def uncompressed_tar(first_wtar_file):
+            with utils.MultiFileReader("br", utils.find_split_files(first_wtar_file)) as rfd:
+                with bz2.open(rfd, "rb") as bz2_fd:
+                    return bz2_fd.read()
+        self.assertEqual(uncompressed_tar(single_stream_wtar), uncompressed_tar(multi_stream_wtar), "uncompressed tar should be the same for single and multi stream")
+        base_wtar_name = os.fspath(multi_stream_folder.joinpath("folder-to-wtar.wtar"))
+        self.assertIsNotNone(utils.get_wtar_total_checksum(base_wtar_name))
+        self.assertEqual(utils.get_wtar_total_checksum(os.fspath(single_stream_folder.joinpath("folder-to-wtar.wtar"))), utils.get_wtar_total_checksum(base_wtar_name))
+
+        unwtar_here = self.pbt.path_inside_test_folder("unwtar-here")
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += Unwtar(multi_stream_wtar, unwtar_here)
+        self.pbt.exec_and_capture_output("unwtar")
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(folder_to_wtar, unwtar_here.joinpath("folder-to-wtar"))), "multi-stream wtar was not unwtarred correctly")
+
+    def test_Wtar_checksums_calculated_once(self):
+        """ per file checksums in the pax_headers should be taken from the same pass that calculates total_checksum,
+            not by checksumming each file again, and should match the files' contents.
+        """
+        folder_to_wtar = self.pbt.path_inside_test_folder("folder-to-wtar")
+        wtar_here = self.pbt.path_inside_test_folder("wtar-here")
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += MakeDir(folder_to_wtar)
+        with self.pbt.batch_accum.sub_accum(Cd(folder_to_wtar)) as cd_accum:
+            cd_accum += MakeRandomDirs(num_levels=2, num_dirs_per_level=3, num_files_per_dir=4, file_size=4 * 1024)
+        self.pbt.batch_accum += MakeDir(wtar_here)
+        self.pbt.exec_and_capture_output("create folder")
+
+        with unittest.mock.patch.object(utils, "get_file_checksum", wraps=utils.get_file_checksum) as get_file_checksum_mock:
+            with Wtar(folder_to_wtar, wtar_here, report_own_progress=False) as wtarer:
+                wtarer()
+        get_file_checksum_mock.assert_not_called()
+
+        wtar_file = next(wtar_here.glob("folder-to-wtar.wtar*"))
+        num_files = 0
+        with utils.MultiFileReader("br", utils.find_split_files(wtar_file)) as rfd:
+            with tarfile.open(fileobj=rfd, mode="r:bz2") as tar:
+                with utils.ChangeDirIfExists(folder_to_wtar.parent):
+                    self.assertEqual(tar.pax_headers["total_checksum"], utils.get_recursive_checksums(folder_to_wtar.name)["total_checksum"])
+                for tarinfo in tar:
+                    if tarinfo.isfile():
+                        num_files += 1
+                        self.assertEqual(tarinfo.pax_headers["checksum"], utils.get_file_checksum(folder_to_wtar.parent.joinpath(tarinfo.name)), tarinfo.name)
+        self.assertGreater(num_files, 0)
+
+    def wtar_and_check_created(self, folder_to_wtar, wtar_here, split_threshold):
+        """ wtar and return True if a new archive was created, False if wtarring was skipped """
+        with unittest.mock.patch.object(ChecksumVerifyingTarFile, "open", side_effect=ChecksumVerifyingTarFile.open) as open_mock:
+            with Wtar(folder_to_wtar, wtar_here, split_threshold=split_threshold, report_own_progress=False) as wtarer:
+                wtarer()
+        return open_mock.called
+
+    def test_Wtar_skip_unchanged(self):
+        """ wtarring is skipped if an existing wtar file, or split parts, were created from the same contents.
+            if contents changed, the previous wtar file and all it's parts are replaced.
+        """
+        folder_to_wtar = self.pbt.path_inside_test_folder("folder-to-wtar")
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += MakeDir(folder_to_wtar)
+        with self.pbt.batch_accum.sub_accum(Cd(folder_to_wtar)) as cd_accum:
+            cd_accum += MakeRandomDirs(num_levels=1, num_dirs_per_level=2, num_files_per_dir=4, file_size=8 * 1024)
+        self.pbt.exec_and_capture_output("create folder")
+        files_to_wtar = sorted(p for p in folder_to_wtar.rglob("*") if p.is_file())
+        original_contents = {file_to_wtar: file_to_wtar.read_bytes() for file_to_wtar in files_to_wtar}
+
+        for split_threshold, wtar_here_name in ((0, "wtar-here"), (0, "wtar-plain-here"), (16 * 1024, "wtar-split-here")):
+            wtar_here = self.pbt.path_inside_test_folder(wtar_here_name)
+            wtar_here.mkdir()
+            self.assertTrue(self.wtar_and_check_created(folder_to_wtar, wtar_here, split_threshold))
+            wtar_files = sorted(wtar_here.iterdir())
+            if split_threshold:
+                self.assertGreater(len(wtar_files), 1, "wtar file should have been split")
+                self.assertEqual("folder-to-wtar.wtar.aa", wtar_files[0].name)
+            else:
+                self.assertEqual(["folder-to-wtar.wtar.aa"], [wtar_file.name for wtar_file in wtar_files])
+            if wtar_here_name == "wtar-plain-here":  # a wtar file that was not renamed to .aa
+                wtar_files = [wtar_files[0].rename(wtar_here.joinpath("folder-to-wtar.wtar"))]
+            wtar_files_stats = [wtar_file.stat() for wtar_file in wtar_files]
+
+            # only modification time changed - existing wtar is kept
+            os.utime(files_to_wtar[0], (1000, 1000))
+            self.assertFalse(self.wtar_and_check_created(folder_to_wtar, wtar_here, split_threshold), "wtarring should have been skipped")
+            self.assertEqual(wtar_files, sorted(wtar_here.iterdir()))
+            self.assertEqual([(st.st_ino, st.st_mtime_ns) for st in wtar_files_stats],
+                             [(wtar_file.stat().st_ino, wtar_file.stat().st_mtime_ns) for wtar_file in wtar_files])
+
+            # contents changed - wtar is replaced, no parts of the previous wtar remain
+            for file_to_wtar in files_to_wtar:
+                file_to_wtar.write_bytes(b"changed")
+            self.assertTrue(self.wtar_and_check_created(folder_to_wtar, wtar_here, split_threshold))
+            new_wtar_files = sorted(wtar_here.iterdir())
+            if split_threshold:
+                self.assertLess(len(new_wtar_files), len(wtar_files))
+            else:
+                self.assertEqual(["folder-to-wtar.wtar.aa"], [wtar_file.name for wtar_file in new_wtar_files])
+            unwtar_here = self.pbt.path_inside_test_folder(f"unwtar-{wtar_here_name}")
+            with Unwtar(new_wtar_files[0], unwtar_here, report_own_progress=False) as unwtarer:
+                unwtarer()
+            self.assertTrue(is_identical_dircmp(filecmp.dircmp(folder_to_wtar, unwtar_here.joinpath("folder-to-wtar"))))
+            for file_to_wtar, contents in original_contents.items():
+                file_to_wtar.write_bytes(contents)
+
+    def unwtar_and_count(self, wtar_file, unwtar_here, full_verify=False):
+        """ unwtar and return (number of files read for checksumming, True if the archive was extracted) """
+        with unittest.mock.patch.object(utils.misc_utils, "get_fd_checksum", wraps=utils.misc_utils.get_fd_checksum) as get_fd_checksum_mock, \
+             unittest.mock.patch.object(tarfile.TarFile, "extractall", autospec=True, side_effect=tarfile.TarFile.extractall) as extractall_mock:
+            with Unwtar(wtar_file, unwtar_here, full_verify=full_verify, report_own_progress=False) as unwtarer:
+                unwtarer()
+        return get_fd_checksum_mock.call_count, extractall_mock.called
+
+    def test_Unwtar_manifest_repr(self):
+        self.pbt.reprs_test_runner(Unwtar("/the/memphis/belle", "robota", full_verify=True), Unwtar("/the/memphis/belle", num_workers=2, full_verify=True))
+
+    def test_Unwtar_manifest(self):
+        """ a manifest written when unwtarring allows skipping the next unwtar without checksumming
+            files whose size, mtime and inode did not change. Tampered files are detected.
+        """
+        folder_to_wtar = self.pbt.path_inside_test_folder("folder-to-wtar")
+        wtar_here = self.pbt.path_inside_test_folder("wtar-here")
+        unwtar_here = self.pbt.path_inside_test_folder("unwtar-here")
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += MakeDir(folder_to_wtar)
+        with self.pbt.batch_accum.sub_accum(Cd(folder_to_wtar)) as cd_accum:
+            cd_accum += MakeRandomDirs(num_levels=2, num_dirs_per_level=2, num_files_per_dir=3, file_size=1024)
+        self.pbt.batch_accum += MakeDir(wtar_here)
+        self.pbt.batch_accum += Wtar(folder_to_wtar, wtar_here)
+        self.pbt.exec_and_capture_output("wtar")
+        wtar_file = next(wtar_here.glob("folder-to-wtar.wtar*"))
+        unwtarred_folder = unwtar_here.joinpath("folder-to-wtar")
+        manifests_folder = self.pbt.path_inside_test_folder("unwtar-manifests")
+        config_vars["UNWTAR_MANIFESTS_DIR"] = os.fspath(manifests_folder)
+        self.addCleanup(config_vars.__delitem__, "UNWTAR_MANIFESTS_DIR")
+
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertTrue(extracted)
+        unwtarred_files = sorted(p for p in unwtarred_folder.rglob("*") if p.is_file())
+        num_files = len(unwtarred_files)
+        self.assertEqual(num_checksummed, 0, "manifest should be written from the checksums in the archive, not by reading the files")
+        self.assertEqual([unwtarred_folder], list(unwtar_here.iterdir()), "manifest should not be written next to the unwtarred folder")
+        manifest_path = unwtar_manifest_path(unwtarred_folder)
+        self.assertEqual([manifest_path], list(manifests_folder.iterdir()))
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(folder_to_wtar, unwtarred_folder)))
+
+        # nothing changed - skip without reading any file
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertFalse(extracted, "unwtar should have been skipped")
+        self.assertEqual(num_checksummed, 0, "no file should have been checksummed")
+
+        # full verify - skip after checksumming all files
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here, full_verify=True)
+        self.assertFalse(extracted, "unwtar should have been skipped")
+        self.assertEqual(num_checksummed, num_files)
+
+        # only modification time changed - only that file is checksummed, contents are the same so skip
+        os.utime(unwtarred_files[0], (1000, 1000))
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertFalse(extracted, "unwtar should have been skipped")
+        self.assertEqual(num_checksummed, 1, "only the file with changed modification time should have been checksummed")
+
+        # tampered file with the same size - checksummed and detected
+        unwtarred_files[1].write_bytes(b"x" * unwtarred_files[1].stat().st_size)
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertTrue(extracted, "tampered file should have caused unwtarring")
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(folder_to_wtar, unwtarred_folder)))
+
+        # tampered file with size, mtime and inode preserved is not detected from the manifest, only by full verify
+        original_stat = unwtarred_files[2].stat()
+        with open(unwtarred_files[2], "r+b") as wfd:
+            wfd.write(b"y" * original_stat.st_size)
+        os.utime(unwtarred_files[2], ns=(original_stat.st_atime_ns, original_stat.st_mtime_ns))
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertFalse(extracted)
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here, full_verify=True)
+        self.assertTrue(extracted, "full_verify should have detected the tampered file")
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(folder_to_wtar, unwtarred_folder)))
+
+        # extra file and removed file are detected
+        extra_file = unwtarred_folder.joinpath("extra-file")
+        extra_file.write_text("extra")
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertTrue(extracted, "extra file should have caused unwtarring")
+        self.assertFalse(extra_file.exists())
+        unwtarred_files[3].unlink()
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertTrue(extracted, "removed file should have caused unwtarring")
+        self.assertTrue(is_identical_dircmp(filecmp.dircmp(folder_to_wtar, unwtarred_folder)))
+
+        # corrupt manifest - fall back to checksumming all files
+        manifest_path.write_text("{not json")
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertFalse(extracted, "unwtar should have been skipped")
+        self.assertEqual(num_checksummed, num_files)
+
+        # manifest of a different destination is not used
+        other_unwtar_here = self.pbt.path_inside_test_folder("other-unwtar-here")
+        self.unwtar_and_count(wtar_file, other_unwtar_here)
+        other_manifest_path = unwtar_manifest_path(other_unwtar_here.joinpath("folder-to-wtar"))
+        self.assertNotEqual(manifest_path, other_manifest_path)
+        os.replace(other_manifest_path, manifest_path)
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertFalse(extracted, "unwtar should have been skipped")
+        self.assertEqual(num_checksummed, num_files)
+
+    def test_Unwtar_manifest_parallel(self):
+        """ manifests should be written and used by Unwtar's worker processes """
+        wtars_folder, originals_folder = self.make_folder_of_wtars("wtars", 3)
+        unwtar_here = self.pbt.path_inside_test_folder("unwtar-here")
+        manifests_folder = self.pbt.path_inside_test_folder("unwtar-manifests")
+        config_vars["UNWTAR_MANIFESTS_DIR"] = os.fspath(manifests_folder)
+        self.addCleanup(config_vars.__delitem__, "UNWTAR_MANIFESTS_DIR")
+
+        with Unwtar(wtars_folder, unwtar_here, num_workers=3, report_own_progress=False) as unwtarer:
+            unwtarer()
+        unwtarred_bundles = sorted(unwtar_here.rglob("bundle_*"))
+        self.assertEqual(3, len(unwtarred_bundles))
+        self.assertEqual(sorted(unwtar_manifest_path(bundle) for bundle in unwtarred_bundles), sorted(manifests_folder.iterdir()))
+
+        # tampered file with size, mtime and inode preserved is not detected when the manifest is used
+        tampered_file = next(p for p in unwtarred_bundles[0].rglob("*") if p.is_file())
+        original_stat = tampered_file.stat()
+        with open(tampered_file, "r+b") as wfd:
+            wfd.write(b"y" * original_stat.st_size)
+        os.utime(tampered_file, ns=(original_stat.st_atime_ns, original_stat.st_mtime_ns))
+        with Unwtar(wtars_folder, unwtar_here, num_workers=3, report_own_progress=False) as unwtarer:
+            unwtarer()
+        self.assertEqual(b"y" * original_stat.st_size, tampered_file.read_bytes(), "manifest should have been used by the worker")
+        with Unwtar(wtars_folder, unwtar_here, num_workers=3, full_verify=True, report_own_progress=False) as unwtarer:
+            unwtarer()
+        self.assertNotEqual(b"y" * original_stat.st_size, tampered_file.read_bytes(), "full_verify should have detected the tampered file")
+
+    def test_Unwtar_without_manifests_dir(self):
+        """ when UNWTAR_MANIFESTS_DIR is not defined no manifest is written and all files are checksummed """
+        folder_to_wtar = self.pbt.path_inside_test_folder("folder-to-wtar")
+        wtar_here = self.pbt.path_inside_test_folder("wtar-here")
+        unwtar_here = self.pbt.path_inside_test_folder("unwtar-here")
+        self.pbt.batch_accum.clear(section_name="doit")
+        self.pbt.batch_accum += MakeDir(folder_to_wtar)
+        with self.pbt.batch_accum.sub_accum(Cd(folder_to_wtar)) as cd_accum:
+            cd_accum += MakeRandomDirs(num_levels=1, num_dirs_per_level=2, num_files_per_dir=3, file_size=1024)
+        self.pbt.batch_accum += MakeDir(wtar_here)
+        self.pbt.batch_accum += Wtar(folder_to_wtar, wtar_here)
+        self.pbt.exec_and_capture_output("wtar")
+        wtar_file = next(wtar_here.glob("folder-to-wtar.wtar*"))
+        unwtarred_folder = unwtar_here.joinpath("folder-to-wtar")
+        self.assertNotIn("UNWTAR_MANIFESTS_DIR", config_vars)
+        self.assertIsNone(unwtar_manifest_path(unwtarred_folder))
+
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertTrue(extracted)
+        self.assertEqual([unwtarred_folder], list(unwtar_here.iterdir()))
+        num_checksummed, extracted = self.unwtar_and_count(wtar_file, unwtar_here)
+        self.assertFalse(extracted, "unwtar should have been skipped")
+        self.assertEqual(num_checksummed, len([p for p in unwtarred_folder.rglob("*") if p.is_file()]))
+
+    def test_Wtar_file_changed_while_wtarring(self):
+        """ data archived is checksummed on the fly and verified against the checksum in the file's pax_headers """
+        file_to_add = self.pbt.path_inside_test_folder("file-to-add")
+        file_to_add.write_bytes(b"now you see me")
+        with ChecksumVerifyingTarFile.open(self.pbt.path_inside_test_folder("good.tar"), "w", format=tarfile.PAX_FORMAT) as tar:
+            tarinfo = tar.gettarinfo(file_to_add, arcname="file-to-add")
+            tarinfo.pax_headers = {"checksum": utils.get_file_checksum(file_to_add)}
+            with open(file_to_add, "rb") as rfd:
+                tar.addfile(tarinfo, rfd)
+
+        with ChecksumVerifyingTarFile.open(self.pbt.path_inside_test_folder("bad.tar"), "w", format=tarfile.PAX_FORMAT) as tar:
+            tarinfo = tar.gettarinfo(file_to_add, arcname="file-to-add")
+            tarinfo.pax_headers = {"checksum": utils.get_buffer_checksum(b"now you don't")}
+            with open(file_to_add, "rb") as rfd:
+                with self.assertRaises(ValueError):
+                    tar.addfile(tarinfo, rfd)
+
     def test_Wzip_repr(self):
         list_of_objs = list()
         list_of_objs.append(Wzip("/the/memphis/belle"))
@@ -1,12 +1,17 @@
+import concurrent.futures
 import filecmp
+import hashlib
+import json
 import logging
+import logging.handlers
+import multiprocessing
 import os
 import stat
 import tarfile
 import zipfile
 from collections import OrderedDict
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import zlib
 
@@ -30,19 +35,119 @@ def can_skip_unwtar(what_to_work_on: Path, where_to_unwtar: Path):
     return retVal
 
 
+unwtar_manifest_version = 1
+
+
+def unwtar_manifest_path(destination_path: Path) -> Optional[Path]:
+    """ manifests of unwtarred files or folders are kept in UNWTAR_MANIFESTS_DIR and not next to them, so nothing is added
+        to install folders. manifest file name is sha1 of the destination's full path.
+        return None if UNWTAR_MANIFESTS_DIR is not defined, in which case manifests are not used.
+    """
+    retVal = None
+    manifests_dir = config_vars.get("UNWTAR_MANIFESTS_DIR", "").str()
+    if manifests_dir:
+        path_checksum = hashlib.sha1(os.fspath(destination_path.resolve()).encode()).hexdigest()
+        retVal = Path(manifests_dir, f"{path_checksum}.unwtar-manifest")
+    return retVal
+
+
+def read_unwtar_manifest(destination_path: Path):
+    """ return the dict mapping each unwtarred file to [size, mtime_ns, inode, checksum] as written by
+        write_unwtar_manifest, or None if there is no manifest or it cannot be used.
+    """
+    retVal = None
+    manifest_path = unwtar_manifest_path(destination_path)
+    if manifest_path is not None:
+        try:
+            with open(manifest_path, "r") as rfd:
+                manifest = json.load(rfd)
+            if manifest.get("version") == unwtar_manifest_version and manifest.get("destination") == os.fspath(destination_path.resolve()):
+                retVal = manifest["files"]
+        except (OSError, ValueError, KeyError, AttributeError) as ex:
+            log.debug(f"unwtar manifest for {destination_path} cannot be used, {ex}")
+    return retVal
+
+
+def remove_unwtar_manifest(destination_path: Path) -> None:
+    manifest_path = unwtar_manifest_path(destination_path)
+    if manifest_path is not None:
+        utils.safe_remove_file(manifest_path)
+
+
+def write_unwtar_manifest(destination_path: Path, tar_total_checksum, members_checksums, ignore):
+    """ write a manifest of [size, mtime_ns, inode, checksum] for each file unwtarred to destination_path.
+        members_checksums maps tar member names to the "checksum" in their pax_headers, so files do not have to be read again.
+        the manifest is written only if the checksums add up to the archive's total_checksum.
+    """
+    manifest_path = unwtar_manifest_path(destination_path)
+    if manifest_path is None:
+        return
+    manifest_files = dict()
+    with utils.ChangeDirIfExists(destination_path.parent):
+        for normalized_path, item_path in utils.paths_to_checksum(destination_path.name, ignore):
+            if os.path.islink(item_path):
+                the_checksum = utils.get_buffer_checksum(os.readlink(item_path).encode())
+            else:
+                the_checksum = members_checksums.get(normalized_path) or utils.get_file_checksum(item_path)
+            manifest_files[normalized_path] = [*utils.ChecksumCache.stat_key(os.lstat(item_path)), the_checksum]
+    total_checksum = utils.get_total_checksum({path: file_info[3] for path, file_info in manifest_files.items()})
+    if total_checksum == tar_total_checksum:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(manifest_path, "w") as wfd:
+            json.dump({"version": unwtar_manifest_version, "destination": os.fspath(destination_path.resolve()),
+                       "total_checksum": total_checksum, "files": manifest_files}, wfd)
+    else:
+        log.debug(f"unwtar manifest for {destination_path} not written, checksums do not match archive's total_checksum")
+
+
+class ChecksumReader(object):
+    """ file object wrapper calculating the sha1 checksum of the data read through it """
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha1ner = hashlib.sha1()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sha1ner.update(data)
+        return data
+
+    def hexdigest(self):
+        return self.sha1ner.hexdigest()
+
+
+class ChecksumVerifyingTarFile(tarfile.TarFile):
+    """ TarFile that checksums the data of each file while it is archived and
+        verifies it matches the "checksum" in the file's pax_headers. Wtar calculates
+        these checksums before archiving, a file that was changed since would otherwise
+        be archived with a wrong checksum.
+    """
+    def addfile(self, tarinfo, fileobj=None):
+        expected_checksum = tarinfo.pax_headers.get("checksum")
+        if fileobj is None or expected_checksum is None:
+            super().addfile(tarinfo, fileobj)
+        else:
+            checksum_reader = ChecksumReader(fileobj)
+            super().addfile(tarinfo, checksum_reader)
+            if not utils.compare_checksums(checksum_reader.hexdigest(), expected_checksum):
+                raise ValueError(f"'{tarinfo.name}' was changed while wtarring, checksum {checksum_reader.hexdigest()} != {expected_checksum}")
+
+
 class Wtar(PythonBatchCommandBase):
     """ create a new wtar archive for a file or folder
+        if num_workers > 1 bz2 compression is done by num_workers threads, see __call__ doc string.
     """
-    def __init__(self, what_to_wtar: os.PathLike, where_to_put_wtar=None, split_threshold=0, **kwargs) -> None:
+    def __init__(self, what_to_wtar: os.PathLike, where_to_put_wtar=None, split_threshold=0, num_workers=1, **kwargs) -> None:
         super().__init__(**kwargs)
         self.what_to_wtar = what_to_wtar
         self.where_to_put_wtar = where_to_put_wtar if where_to_put_wtar else None
         self.split_threshold = split_threshold
+        self.num_workers = num_workers
 
     def repr_own_args(self, all_args: List[str]) -> None:
         all_args.append(self.named__init__param("what_to_wtar", self.what_to_wtar))
         all_args.append(self.optional_named__init__param("where_to_put_wtar", self.where_to_put_wtar))
         all_args.append(self.optional_named__init__param("split_threshold", self.split_threshold, 0))
+        all_args.append(self.optional_named__init__param("num_workers", self.num_workers, 1))
 
     def progress_msg_self(self) -> str:
         if self.where_to_put_wtar:
@@ -97,6 +202,13 @@ class Wtar(PythonBatchCommandBase):
                 ensures that if the number of new wtar split files is smaller than the number of old split files, not extra files wil remain. E.g. if before [a.wtar.aa, a.wtar.ab, a.wtar.ac] and after  [a.wtar.aa, a.wtar.ab] a.wtar.ac will be removed.
             Format of the tar is PAX_FORMAT.
             Compression is bzip2.
+            If self.num_workers > 1 the tar is compressed by utils.ParallelBZ2Writer to a multi-stream bzip2 file,
+                each stream compressed by a different thread. The uncompressed tar is identical to the one created
+                with num_workers=1, and tarfile/bz2 read multi-stream bzip2 transparently, so Unwtar and
+                utils.get_wtar_total_checksum need no change.
+            Each file is read once to calculate the checksums and, if a new wtar is created, once more to archive it.
+                The per file checksums are not calculated again, instead the data being archived is checksummed
+                on the fly by ChecksumVerifyingTarFile and compared to the checksum already written to the file's pax_headers.
 
         """
 
@@ -117,14 +229,7 @@ class Wtar(PythonBatchCommandBase):
                 md()
             target_wtar_file = resolved_where_to_put_wtar.joinpath(resolved_what_to_wtar.name+".wtar")
 
-        # remove previous wtarred files
-        if target_wtar_file.is_file():
-            target_wtar_file.unlink()
-        # also look for parts
-        target_wtar_dir = target_wtar_file.parent
-        parts = target_wtar_dir.glob(target_wtar_file.name+".wtar.??")
-        [p.unlink() for p in parts]
-
+        # previous wtarred file or parts are removed only if their contents is different, see below
         tar_total_checksum = utils.get_wtar_total_checksum(target_wtar_file)
         ignore_files = list(config_vars.get("WTAR_IGNORE_FILES", []))
 
@@ -132,7 +237,11 @@ class Wtar(PythonBatchCommandBase):
         with FixAllPermissions(resolved_what_to_wtar, report_own_progress=False, recursive=resolved_what_to_wtar.is_dir()) as perm_fixer:
             perm_fixer()
         with utils.ChangeDirIfExists(resolved_what_to_wtar.parent):
-            pax_headers = {"total_checksum": utils.get_recursive_checksums(resolved_what_to_wtar.name, ignore=ignore_files)["total_checksum"]}
+            # checksums of all files are calculated once, the per file checksums are reused for each file's
+            # pax_headers and verified against the data actually written while archiving - instead of reading
+            # each file again just to calculate its checksum.
+            files_checksums = utils.get_recursive_checksums(resolved_what_to_wtar.name, ignore=ignore_files)
+            pax_headers = {"total_checksum": files_checksums.pop("total_checksum")}
 
             def check_tarinfo(tarinfo):
                 for ig in ignore_files:
@@ -149,18 +258,29 @@ class Wtar(PythonBatchCommandBase):
                     # ourselves AND passing an OrderedDict as the pax_headers
                     # hopefully the final tar will be the same for different runs.
                     file_pax_headers = OrderedDict()
-                    file_pax_headers["checksum"] = utils.get_file_checksum(tarinfo.path)
+                    file_checksum = files_checksums.get(tarinfo.name)
+                    if file_checksum is None or os.path.islink(tarinfo.path):
+                        # get_recursive_checksums checksums the symlink itself, but the file pointed by the symlink is archived
+                        file_checksum = utils.get_file_checksum(tarinfo.path)
+                    file_pax_headers["checksum"] = file_checksum
                     mode_time = str(float(os.lstat(tarinfo.path)[stat.ST_MTIME]))
                     file_pax_headers["mtime"] = mode_time
                     tarinfo.pax_headers = file_pax_headers
                 return tarinfo
             compresslevel = 1
             if pax_headers["total_checksum"] != tar_total_checksum:
-                if utils.is_first_wtar_file(target_wtar_file):
-                    existing_wtar_parts = utils.find_split_files_from_base_file(target_wtar_file)
-                    [utils.safe_remove_file(f) for f in existing_wtar_parts]
-                with tarfile.open(target_wtar_file, "w:bz2", format=tarfile.PAX_FORMAT, pax_headers=pax_headers, compresslevel=compresslevel) as tar:
-                    tar.add(resolved_what_to_wtar.name, filter=check_tarinfo)
+                # remove previous wtarred file and all it's parts, so no extra parts remain if the new wtar has less parts
+                utils.safe_remove_file(target_wtar_file)
+                if target_wtar_file.parent.is_dir():
+                    for existing_wtar_part in utils.find_split_files(target_wtar_file.with_name(target_wtar_file.name + ".aa")):
+                        utils.safe_remove_file(existing_wtar_part)
+                if self.num_workers > 1:
+                    with utils.ParallelBZ2Writer(target_wtar_file, compresslevel=compresslevel, num_workers=self.num_workers) as bz2_writer:
+                        with ChecksumVerifyingTarFile.open(fileobj=bz2_writer, mode="w", format=tarfile.PAX_FORMAT, pax_headers=pax_headers) as tar:
+                            tar.add(resolved_what_to_wtar.name, filter=check_tarinfo)
+                else:
+                    with ChecksumVerifyingTarFile.open(target_wtar_file, "w:bz2", format=tarfile.PAX_FORMAT, pax_headers=pax_headers, compresslevel=compresslevel) as tar:
+                        tar.add(resolved_what_to_wtar.name, filter=check_tarinfo)
 
                 with SplitFile(target_wtar_file, max_size=self.split_threshold, own_progress_count=0) as sf:
                     sf()
@@ -168,21 +288,65 @@ class Wtar(PythonBatchCommandBase):
                 log.debug(f"{resolved_what_to_wtar.name} skipped since {resolved_what_to_wtar.name}.wtar already exists and has the same contents")
 
 
+# config vars used while unwtarring, sent to each of Unwtar's worker processes by init_unwtar_worker
+unwtar_worker_config_vars = ("WTAR_IGNORE_FILES", "UNWTAR_MANIFESTS_DIR", "CHECKSUM_CACHE_PATH")
+
+
+class _HandleByLogger(logging.Handler):
+    """ handle log records received from worker processes by the parent process' logger of the same name """
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def init_unwtar_worker(config_values, log_queue, log_level):
+    """ initializer of Unwtar's worker processes. A spawned process starts with empty config_vars, a closed
+        checksum cache and no log handlers, so these are set up from what the parent process sent:
+        config_values: resolved values of unwtar_worker_config_vars
+        log_queue: log records are put in this queue and handled by the parent process
+    """
+    for var_name, values in config_values.items():
+        config_vars[var_name] = values
+    checksum_cache_path = config_vars.get("CHECKSUM_CACHE_PATH", "").str()
+    if checksum_cache_path:
+        utils.checksum_cache.commit_every = 1  # the cache file is shared with the other workers, keep write transactions short
+        utils.checksum_cache.open(checksum_cache_path)
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root_logger.setLevel(log_level)
+
+
+def unwtar_archive_in_worker(wtar_file_path: Path, destination_folder: Path, no_artifacts, copy_owner, full_verify=False):
+    """ unwtar one archive set in a worker process of Unwtar's process pool, initialized by init_unwtar_worker """
+    ignore_files = list(config_vars.get("WTAR_IGNORE_FILES", []))
+    unwtarer = Unwtar(wtar_file_path, destination_folder, no_artifacts=no_artifacts, copy_owner=copy_owner, full_verify=full_verify, report_own_progress=False)
+    unwtarer.unwtar_a_file(wtar_file_path, destination_folder, no_artifacts=no_artifacts, ignore=ignore_files, copy_owner=copy_owner)
+
+
 class Unwtar(PythonBatchCommandBase):
     """ uncompress a wtar archive
+        when what_to_unwtar is a folder, all wtar archives in the folder are unwtarred.
+        if num_workers > 1 archives are unwtarred concurrently by a pool of num_workers processes.
+        unwtarring is skipped if the destination already exists and has the same total_checksum as the archive.
+        A manifest written to UNWTAR_MANIFESTS_DIR when unwtarring, allows checksumming only files that changed
+        since (by size, modification time or inode). if full_verify is True the manifest is not used and all files are checksummed.
     """
-    def __init__(self, what_to_unwtar: os.PathLike, where_to_unwtar=None, no_artifacts=False, copy_owner=True, **kwargs) -> None:
+    def __init__(self, what_to_unwtar: os.PathLike, where_to_unwtar=None, no_artifacts=False, copy_owner=True, num_workers=1, full_verify=False, **kwargs) -> None:
         super().__init__(**kwargs)
         self.what_to_unwtar = what_to_unwtar
         self.where_to_unwtar = where_to_unwtar if where_to_unwtar else None
         self.no_artifacts = no_artifacts
         self.copy_owner = copy_owner
+        self.num_workers = num_workers
+        self.full_verify = full_verify
         self.wtar_file_paths = None
+        self.failed_wtar_files = list()
 
     def repr_own_args(self, all_args: List[str]) -> None:
         all_args.append(self.named__init__param("what_to_unwtar", self.what_to_unwtar))
         all_args.append(self.optional_named__init__param("where_to_unwtar", self.where_to_unwtar, None))
         all_args.append(self.optional_named__init__param("no_artifacts", self.no_artifacts, False))
+        all_args.append(self.optional_named__init__param("num_workers", self.num_workers, 1))
+        all_args.append(self.optional_named__init__param("full_verify", self.full_verify, False))
 
     def progress_msg_self(self) -> str:
         return f"""Expand '{self.what_to_unwtar}' to '{self.where_to_unwtar}'"""
@@ -191,6 +355,8 @@ class Unwtar(PythonBatchCommandBase):
         super().error_dict_self(exc_type, exc_val, exc_tb)
         # replace plain paths with detailed info such as size, permissions, mod date, user, group
         self.wtar_file_paths = [utils.single_disk_item_listing(wtar_file_path, "PuUgGRTfC") for wtar_file_path in self.wtar_file_paths]
+        if self.failed_wtar_files:
+            self._error_dict["failed_wtar_files"] = [os.fspath(failed_wtar_file) for failed_wtar_file in self.failed_wtar_files]
 
     def unwtar_a_file(self, wtar_file_path: Path, destination_folder: Path, no_artifacts=False, ignore=None, copy_owner=False):
         if ignore is None:
@@ -212,8 +378,9 @@ class Unwtar(PythonBatchCommandBase):
                     if tar_total_checksum:
                         try:
                             if destination_path.exists():
+                                known_checksums = None if self.full_verify else read_unwtar_manifest(destination_path)
                                 with utils.ChangeDirIfExists(destination_folder):
-                                    disk_total_checksum = utils.get_recursive_checksums(destination_leaf_name, ignore=ignore).get("total_checksum", "disk_total_checksum_was_not_found")
+                                    disk_total_checksum = utils.get_recursive_checksums(destination_leaf_name, ignore=ignore, known_checksums=known_checksums).get("total_checksum", "disk_total_checksum_was_not_found")
                                     # log.debug(f"total checksum for destination {destination_folder} {disk_total_checksum}")
 
                                 if disk_total_checksum == tar_total_checksum:
@@ -223,6 +390,7 @@ class Unwtar(PythonBatchCommandBase):
                             # if checking checksum failed for any reason -> do the unwtarring
                             pass
                     if do_the_unwtarring:
+                        remove_unwtar_manifest(destination_path)
                         with RmDir(destination_path, report_own_progress=False, recursive=True) as dir_remover:
                             # RmDir will also remove a file and will not raise if destination_path does not exist
                             dir_remover()
@@ -233,6 +401,13 @@ class Unwtar(PythonBatchCommandBase):
                             first_wtar_file_st = self.wtar_file_paths[0].stat()
                             # log.debug(f"copy_owner: {destination_folder} {first_wtar_file_st[stat.ST_UID]}:{first_wtar_file_st[stat.ST_GID]}")
                             Chown(destination_folder, first_wtar_file_st[stat.ST_UID], first_wtar_file_st[stat.ST_GID], recursive=True)()
+                        if tar_total_checksum:
+                            try:
+                                members_checksums = {member.name: member.pax_headers.get("checksum") for member in tar.getmembers() if member.isfile()}
+                                write_unwtar_manifest(destination_path, tar_total_checksum, members_checksums, ignore)
+                            except OSError as ex:
+                                # manifest is only an optimization for the next unwtar
+                                log.warning(f"failed to write unwtar manifest for {destination_path}, {ex}")
                     else:
                         log.info(f"skip uwtar of {destination_path} because it exists and matches wtar file checksum")
             if no_artifacts:
@@ -271,6 +446,7 @@ class Unwtar(PythonBatchCommandBase):
                 destination_folder = self.what_to_unwtar
             self.doing = f"""unwtar folder '{self.what_to_unwtar}' to '{destination_folder}''"""
             if not can_skip_unwtar(self.what_to_unwtar, destination_folder):
+                archives_to_unwtar = list()  # (first wtar file, where to unwtar), archives are independent of each other
                 for root, dirs, files in os.walk(self.what_to_unwtar, followlinks=False):
                     # a hack to prevent unwtarring of the sync folder. Copy command might copy something
                     # to the top level of the sync folder.
@@ -284,14 +460,56 @@ class Unwtar(PythonBatchCommandBase):
                     for a_file in files:
                         a_file_path = root_Path.joinpath(a_file)
                         if utils.is_first_wtar_file(a_file_path):
-                            where_to_unwtar_the_file = destination_folder.joinpath(tail_folder)
-                            self.unwtar_a_file(a_file_path, where_to_unwtar_the_file, no_artifacts=self.no_artifacts, ignore=ignore_files, copy_owner=self.copy_owner)
+                            archives_to_unwtar.append((a_file_path, destination_folder.joinpath(tail_folder)))
+
+                if self.num_workers > 1 and len(archives_to_unwtar) > 1:
+                    self.unwtar_archives_in_parallel(archives_to_unwtar)
+                else:
+                    for a_file_path, where_to_unwtar_the_file in archives_to_unwtar:
+                        self.unwtar_a_file(a_file_path, where_to_unwtar_the_file, no_artifacts=self.no_artifacts, ignore=ignore_files, copy_owner=self.copy_owner)
             else:
                 log.debug(f"unwtar {self.what_to_unwtar} to {self.where_to_unwtar} skipping unwtarring because both folders have the same Info.xml file")
 
         else:
             raise FileNotFoundError(self.what_to_unwtar)
 
+    def unwtar_archives_in_parallel(self, archives_to_unwtar):
+        """ unwtar each archive in a separate process, since bz2 decompression of one archive uses a single core.
+            all archives are attempted even if some fail. Each failure is logged, and the first failure,
+            in the order archives were found, is raised after all workers are done.
+            Workers get the values of unwtar_worker_config_vars and send their log records back, see init_unwtar_worker.
+        """
+        self.doing = f"""unwtar {len(archives_to_unwtar)} archives in '{self.what_to_unwtar}' with {self.num_workers} processes"""
+        # create destination folders beforehand, otherwise concurrent extractall might race to create a shared parent folder
+        for where_to_unwtar_the_file in sorted(set(where for _, where in archives_to_unwtar)):
+            with MakeDir(where_to_unwtar_the_file, report_own_progress=False) as md:
+                md()
+        errors = list()
+        config_values = {var_name: list(config_vars[var_name]) for var_name in unwtar_worker_config_vars if var_name in config_vars}
+        utils.checksum_cache.close()  # commit, so workers are not blocked by this process' write transaction
+        # spawn rather than fork - the parent might have threads and open db connections
+        mp_context = multiprocessing.get_context("spawn")
+        log_queue = mp_context.Queue()
+        log_listener = logging.handlers.QueueListener(log_queue, _HandleByLogger())
+        log_listener.start()
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(self.num_workers, len(archives_to_unwtar)), mp_context=mp_context,
+                                                        initializer=init_unwtar_worker, initargs=(config_values, log_queue, log.getEffectiveLevel())) as executor:
+                jobs = [(a_file_path, executor.submit(unwtar_archive_in_worker, a_file_path, where_to_unwtar_the_file, self.no_artifacts, self.copy_owner, self.full_verify))
+                        for a_file_path, where_to_unwtar_the_file in archives_to_unwtar]
+                for a_file_path, job in jobs:
+                    try:
+                        job.result()
+                    except Exception as ex:
+                        log.warning(f"failed to unwtar {a_file_path}: {ex}")
+                        errors.append((a_file_path, ex))
+        finally:
+            log_listener.stop()
+        if errors:
+            self.failed_wtar_files = [a_file_path for a_file_path, ex in errors]
+            self.wtar_file_paths = utils.find_split_files(errors[0][0])
+            raise errors[0][1]
+
 
 class Wzip(PythonBatchCommandBase):
     """ Create a new wzip for a file  provided in '--in' command line option
@@ -123,15 +123,31 @@ cookie = {cookie_text}
 
 
 
-    def add_download_url(self, url, path, verbatim=False, size=0, download_last=False):
+    def add_download_url(self, url, path, verbatim=False, size=0, download_last=False, checksum=None):
         if verbatim:
             translated_url = url
         else:
             translated_url = connectionBase.connection_factory(config_vars).translate_url(url)
         if download_last:
-            self.urls_to_download_last.append((translated_url, path, size))
+            self.urls_to_download_last.append((translated_url, path, size, checksum))
         else:
-            self.urls_to_download.append((translated_url, path, size))
+            self.urls_to_download.append((translated_url, path, size, checksum))
+
+    def add_download_urls(self, url_items):
+        """ add many urls at once, url_items is an iterable of (url, path, size, checksum) tuples.
+            Same as calling add_download_url for each url, with urls ending with 'Info.xml' downloaded last,
+            but the connection used to translate the urls is looked up only once.
+            returns the number of urls added
+        """
+        translate_url = connectionBase.connection_factory(config_vars).translate_url
+        retVal = 0
+        for url, path, size, checksum in url_items:
+            if url.endswith('Info.xml'):
+                self.urls_to_download_last.append((translate_url(url), path, size, checksum))
+            else:
+                self.urls_to_download.append((translate_url(url), path, size, checksum))
+            retVal += 1
+        return retVal
 
     def get_num_urls_to_download(self):
         return len(self.urls_to_download)+len(self.urls_to_download_last)
@@ -222,7 +238,7 @@ cookie = {cookie_text}
         # No sorting for curl's parallel as the progress looks better when there are mixed sizes
         sorted_by_size = self.urls_to_download if self.is_internal_parallel_supported() else sorted(self.urls_to_download, key=functools.cmp_to_key(url_sorter))
 
-        for url, path, size in sorted_by_size:
+        for url, path, size, checksum in sorted_by_size:
             fixed_path = self.fix_path(path)
             file_details = next(cfig_file_cycler)
             file_details.wfd.write(f'''url = "{url}"\noutput = "{fixed_path}"\n\n''')
@@ -235,7 +251,7 @@ cookie = {cookie_text}
 
         if last_file:
             # write urls for files that should be downloaded last
-            for url, path, size in self.urls_to_download_last:
+            for url, path, size, checksum in self.urls_to_download_last:
                 fixed_path = self.fix_path(path)
                 last_file.wfd.write(f'''url = "{url}"\noutput = "{fixed_path}"\n\n''')
                 last_file.num_urls += 1
@@ -265,6 +281,9 @@ cookie = {cookie_text}
         curl_config_folder = main_outfile.parent.joinpath(main_outfile.name+"_curl")
         MakeDir(curl_config_folder, chowner=True, own_progress_count=0, report_own_progress=False)()
 
+        if str(config_vars.get("DOWNLOAD_ENGINE", "curl")) == "python":
+            return self.create_python_download_instructions(dl_commands, curl_config_folder)
+
         num_config_files = int(config_vars["PARALLEL_SYNC"])
         # TODO: Move class someplace else
         config_file_list = self.create_config_files(curl_config_folder, num_config_files)
@@ -317,6 +336,40 @@ cookie = {cookie_text}
 
             return dl_commands
 
+    def create_download_list_file(self, download_list_file_path):
+        """ write the urls to download to a file that can be read by DownloadFilesInParallel.
+            urls_to_download_last are written after a "wait" line.
+        """
+        with utils.utf8_open_for_write(download_list_file_path, "w") as wfd:
+            for url, path, size, checksum in self.urls_to_download:
+                wfd.write(f"{url}\t{path}\t{size}\t{checksum or ''}\n")
+            if self.urls_to_download and self.urls_to_download_last:
+                wfd.write("wait\n")
+            for url, path, size, checksum in self.urls_to_download_last:
+                wfd.write(f"{url}\t{path}\t{size}\t{checksum or ''}\n")
+
+    def create_python_download_instructions(self, dl_commands, download_list_folder):
+        """ Download in process with DownloadFilesInParallel, instead of running curl with config files.
+            Selected with DOWNLOAD_ENGINE: python
+        """
+        if self.get_num_urls_to_download() > 0:
+            num_workers = int(config_vars["PARALLEL_SYNC"])
+            download_list_file_path = download_list_folder.joinpath(config_vars.resolve_str("$(CURL_CONFIG_FILE_NAME).download-list"))
+            self.create_download_list_file(download_list_file_path)
+            total_files_to_download = int(config_vars["__NUM_FILES_TO_DOWNLOAD__"])
+            dl_commands += Progress(f"Downloading with {num_workers} threads in parallel")
+            dl_commands += DownloadFilesInParallel(download_list_file_path,
+                                                   num_workers=num_workers,
+                                                   max_connections_per_host=int(config_vars.get("DOWNLOAD_MAX_CONNECTIONS_PER_HOST", num_workers)),
+                                                   cookie=str(config_vars.get("COOKIE_FOR_SYNC_URLS", "")) or None,
+                                                   own_progress_count=total_files_to_download,
+                                                   report_own_progress=False)
+            if total_files_to_download > 1:
+                dl_commands += Progress(f"Downloading {total_files_to_download} files done")
+            else:
+                dl_commands += Progress("Downloading 1 file done")
+        return dl_commands
+
     def create_parallel_run_config_file(self, parallel_run_config_file_path, config_files):
         with utils.utf8_open_for_write(parallel_run_config_file_path, "w") as wfd:
             for config_file in config_files:
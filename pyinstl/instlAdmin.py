@@ -246,7 +246,7 @@ class InstlAdmin(InstlInstanceBase):
         self.compiled_should_be_exec_regex = utils.compile_regex_list_ORed(should_be_exec_regex_list)
 
         with self.batch_accum.sub_accum(Cd(repo_folder)) as repo_folder_accum:
-            for item in self.info_map_table.get_items(what="any"):
+            for item in self.info_map_table.iter_items(what="any"):
                 shouldBeExec = self.should_be_exec(item)
                 for extra_prop in item.extra_props_list():
                     repo_folder_accum += SVNDelProp("svn:"+extra_prop, item.path)
@@ -536,7 +536,7 @@ class InstlAdmin(InstlInstanceBase):
                         self.batch_accum += RmFile(item_to_delete)
 
                     for item_to_tar in items_to_tar:
-                        self.batch_accum += Wtar(item_to_tar, split_threshold=self.min_file_size_to_wtar)
+                        self.batch_accum += Wtar(item_to_tar, split_threshold=self.min_file_size_to_wtar, num_workers=int(config_vars.get("WTAR_NUM_WORKERS", 1)))
                         self.batch_accum += RmFileOrDir(item_to_tar)
 
         self.progress("found", total_items_to_tar, "to wtar")
@@ -729,10 +729,10 @@ class InstlAdmin(InstlInstanceBase):
         self.progress("info map:", num_files, "files in", num_dirs, "folders")
         self.progress("info map:", num_required_files, "required files, ", num_required_dirs, "required folders")
 
-        unrequired_files = self.info_map_table.get_unrequired_items(what="file")
+        unrequired_files = self.info_map_table.iter_unrequired_items(what="file")
         self.progress("unrequired files:")
         [self.progress("    ", f.path) for f in unrequired_files]
-        unrequired_dirs = self.info_map_table.get_unrequired_items(what="dir")
+        unrequired_dirs = self.info_map_table.iter_unrequired_items(what="dir")
         self.progress("unrequired dirs:")
         [self.progress("    ", d.path) for d in unrequired_dirs]
 
@@ -1048,6 +1048,15 @@ class InstlAdmin(InstlInstanceBase):
 
             batch_accum += InfoMapFullWriter(full_info_map_file_path, in_format='text')
             batch_accum += InfoMapSplitWriter(revision_instl_folder_path, in_format='text')
+            # instl folder of previously uploaded repo-rev is kept (see RmDirContents below) so info_map delta can be created
+            previous_repo_rev = r.get(config_vars["UPLOAD_REPO_REV_LAST_UPLOADED_REDIS_KEY"].str())
+            if previous_repo_rev and int(previous_repo_rev) < repo_rev:
+                with config_vars.push_scope_context(use_cache=False):
+                    for repo_rev_var in ("REPO_REV", "TARGET_REPO_REV", "__CURR_REPO_REV__"):
+                        config_vars[repo_rev_var] = previous_repo_rev
+                    config_vars["__CURR_REPO_FOLDER_HIERARCHY__"] = self.info_map_table.repo_rev_to_folder_hierarchy(previous_repo_rev)
+                    previous_revision_instl_folder_path = Path(config_vars["UPLOAD_REVISION_INSTL_FOLDER"])
+                batch_accum += InfoMapDeltaWriter(previous_revision_instl_folder_path, revision_instl_folder_path, previous_repo_rev)
             batch_accum += Wzip(revision_instl_index_path)
             batch_accum += ShortIndexYamlCreator(checkout_folder_short_index_path)
             batch_accum += CreateRepoRevFile()
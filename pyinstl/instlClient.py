@@ -467,16 +467,27 @@ class InstlClient(InstlInstanceBase):
         #
         # for each file item in the source this function will set the full path where to download the file: item.download_path
         # and the top folder common to all items in a single source: item.download_root
+        #
+        # download_path and download_root are not calculated here item by item, instead the download location of each source
+        # is described by the path prefix and how much of the item's path to replace with the prefix - see
+        # SVNTable.set_download_locations_for_sources, which sets the download locations of all sources with a few bulk queries.
         sync_and_source = self.items_table.get_sync_folders_and_sources_for_active_iids()
 
-        items_to_update = list()
+        download_sources = list()
         local_repo_sync_dir = os.fspath(config_vars["LOCAL_REPO_SYNC_DIR"])
         config_vars.setdefault("ALL_SYNC_DIRS", local_repo_sync_dir)
+        # many sources share the same install folder and direct sync indicator, so resolve each only once
+        resolved_install_folders = dict()
+        direct_sync_statuses = dict()
         for iid, direct_sync_indicator, source, source_tag, install_folder in sync_and_source:
-            direct_sync = self.get_direct_sync_status_from_indicator(direct_sync_indicator)
+            if direct_sync_indicator not in direct_sync_statuses:
+                direct_sync_statuses[direct_sync_indicator] = self.get_direct_sync_status_from_indicator(direct_sync_indicator)
+            direct_sync = direct_sync_statuses[direct_sync_indicator]
             resolved_source_parts = source.split("/")
             if install_folder:
-                resolved_install_folder = config_vars.resolve_str(install_folder)
+                if install_folder not in resolved_install_folders:
+                    resolved_install_folders[install_folder] = config_vars.resolve_str(install_folder)
+                resolved_install_folder = resolved_install_folders[install_folder]
             else:
                 resolved_install_folder = install_folder
 
@@ -492,55 +503,31 @@ class InstlClient(InstlInstanceBase):
                             need_to_sync = not utils.check_file_checksum(info_xml_of_target, info_xml_item.checksum)
                     if need_to_sync:
                         config_vars["ALL_SYNC_DIRS"].append(resolved_install_folder)
-                        item_paths = self.info_map_table.get_recursive_paths_in_dir(dir_path=source, what="any")
-                        self.progress(f"mark for download {len(item_paths)} files of {iid}/{source}")
                         if source_tag == '!dir':
                             source_parent = "/".join(resolved_source_parts[:-1])
-                            for item in item_paths:
-                                item_to_update = {"_id": item['_id'],
-                                                "download_path": config_vars.resolve_str("/".join((resolved_install_folder, item['path'][len(source_parent)+1:]))),
-                                                "download_root": config_vars.resolve_str("/".join((resolved_install_folder, resolved_source_parts[-1])))}
-                                items_to_update.append(item_to_update)
+                            download_root = config_vars.resolve_str("/".join((resolved_install_folder, resolved_source_parts[-1])))
                         else:  # !dir_cont
                             source_parent = source
-                            for item in item_paths:
-                                item_to_update = {"_id": item['_id'],
-                                                "download_path": config_vars.resolve_str("/".join((resolved_install_folder, item['path'][len(source_parent)+1:]))),
-                                                "download_root": resolved_install_folder}
-                                items_to_update.append(item_to_update)
+                            download_root = resolved_install_folder
+                        download_sources.append((source, "dir-any", resolved_install_folder + "/", len(source_parent) + 1, download_root))
                     else:
                         num_ignored_files = self.info_map_table.ignore_file_paths_of_dir(dir_path=source)
                         if num_ignored_files < 1:
                             num_ignored_files = ""  # sqlite curs.rowcount does not always returns the number of effected rows
                         self.progress(f"avoid download {num_ignored_files} files of {iid}, Info.xml has not changed")
-
                 else:
-                    item_paths = self.info_map_table.get_recursive_paths_in_dir(dir_path=source)
-                    self.progress(f"mark for download {len(item_paths)} files of {iid}/{source}")
-                    for item in item_paths:
-                        item_to_update = {"_id": item['_id'],
-                                                "download_path": config_vars.resolve_str("/".join((local_repo_sync_dir, item['path']))),
-                                                "download_root": None}
-                        items_to_update.append(item_to_update)
+                    download_sources.append((source, "dir-file", local_repo_sync_dir + "/", 0, None))
             elif source_tag == '!file':
                 # if the file was wtarred and split it would have multiple items
-                items_for_file = self.info_map_table.get_required_paths_for_file(source)
-                self.progress(f"mark for download {len(items_for_file)} files of {iid}/{source}")
                 if direct_sync:
                     config_vars["ALL_SYNC_DIRS"].append(resolved_install_folder)
-                    for item in items_for_file:
-                        item_to_update = {"_id": item['_id'],
-                                        "download_path": config_vars.resolve_str("/".join((resolved_install_folder, item['leaf']))),
-                                        "download_root": config_vars.resolve_str(resolved_install_folder)}
-                        items_to_update.append(item_to_update)
+                    download_sources.append((source, "file-leaf", resolved_install_folder + "/", 0, config_vars.resolve_str(resolved_install_folder)))
                 else:
-                    for item in items_for_file:
-                        item_to_update = {"_id": item['_id'],
-                                        "download_path": config_vars.resolve_str("/".join((local_repo_sync_dir, item['path']))),
-                                        "download_root": None}  # no need to set item.download_root here - it will not be used
-                        items_to_update.append(item_to_update)
+                    # no need to set item.download_root here - it will not be used
+                    download_sources.append((source, "file-path", local_repo_sync_dir + "/", 0, None))
 
-        self.info_map_table.update_downloads(items_to_update)
+        num_items = self.info_map_table.set_download_locations_for_sources(download_sources, resolve_callback=config_vars.resolve_str)
+        self.progress(f"mark for download {num_items} items of {len(download_sources)} sources")
 
     #TODO: oren - understand this functionallity
     def create_remove_previous_sources_instructions_for_target_folder(self, target_folder_path):
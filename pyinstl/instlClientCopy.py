@@ -190,7 +190,7 @@ class InstlClientCopy(InstlClient):
                             retVal += Chmod(source_path_relative_to_current_dir, source_item.chmod_spec(), recursive=True, ignore_all_errors=True)
 
         if len(wtar_items) > 0:
-            retVal += Unwtar(source_path_abs, os.pardir)  # to parent otherwise unwtar will create a folder inside the current folder, e.g. Utilities/Utilities. This issue is unique to !dir_cont
+            retVal += Unwtar(source_path_abs, os.pardir, num_workers=int(config_vars.get("UNWTAR_NUM_WORKERS", 1)))  # to parent otherwise unwtar will create a folder inside the current folder, e.g. Utilities/Utilities. This issue is unique to !dir_cont
 
         return retVal
 
@@ -242,7 +242,7 @@ class InstlClientCopy(InstlClient):
                         retVal += Chmod(source_path_relative_to_current_dir, source_item.chmod_spec())
 
             if has_wtars > 0:
-                retVal += Unwtar(source_path_abs, os.curdir)
+                retVal += Unwtar(source_path_abs, os.curdir, num_workers=int(config_vars.get("UNWTAR_NUM_WORKERS", 1)))
 
             # change ownership on destination folder + currently copied folder name (e.g: /Applications/Waves/Plug-Ins V11/XXX.bundle/, /Applications/Waves/YYY.framework)
             if self.mac_current_and_target:
@@ -387,7 +387,7 @@ class InstlClientCopy(InstlClient):
             retVal += post_copy_item_from_db
 
         if num_wtars > 0:
-            retVal += Unwtar(sync_folder_name, os.curdir, no_artifacts=False)
+            retVal += Unwtar(sync_folder_name, os.curdir, no_artifacts=False, num_workers=int(config_vars.get("UNWTAR_NUM_WORKERS", 1)))
 
         # accumulate post_copy_to_folder actions from all items, eliminating duplicates
         post_copy_to_folder_from_db = self.accumulate_unique_actions_for_active_iids('post_copy_to_folder', items_in_folder)
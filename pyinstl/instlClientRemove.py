@@ -90,7 +90,7 @@ class InstlClientRemove(InstlClient):
             elif source_type == '!file':  # remove single file
                 retVal += RmFile(to_remove_path)
             elif source_type == '!dir_cont':  # remove all source's files and folders from a folder
-                remove_items = self.info_map_table.get_items_in_dir(dir_path=source_path, immediate_children_only=True)
+                remove_items = self.info_map_table.iter_items_in_dir(dir_path=source_path, immediate_children_only=True)
                 remove_paths = utils.original_names_from_wtars_names(item.path for item in remove_items)
                 for remove_path in remove_paths:
                     base_, leaf = os.path.split(remove_path)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3.9
 
 import os
+import io
 import sys
 import re
 import abc
@@ -12,6 +13,8 @@ import datetime
 import time
 import logging
 
+import yaml
+
 import aYaml
 import utils
 
@@ -20,6 +23,7 @@ from configVar import ConfigVarYamlReader
 
 from . import connectionBase
 from db import DBManager
+from db.indexSnapshot import IndexSnapshot, IndexSnapshotDoc
 from pybatch import *
 
 from .curlHelper import CUrlHelper
@@ -74,6 +78,97 @@ class IndexYamlReaderBase(DBManager, ConfigVarYamlReader):
         del args
         self.items_table.read_require_node(a_node, **kwargs)
 
+    def read_index_from_snapshot(self, snapshot_doc: IndexSnapshotDoc):
+        self.items_table.insert_index_items(snapshot_doc.index_items, snapshot_doc.items_details)
+        for iid, define_text in snapshot_doc.defines.items():
+            self.items_table.defines_for_iids[iid] = yaml.compose(define_text)
+
+    def get_index_snapshot_folder(self):
+        """ folder where IndexSnapshot files are kept, or None if index snapshots are not used """
+        return None
+
+    def is_index_doc_tag(self, tag) -> bool:
+        """ return True if a document with this tag would be read by read_index """
+        self.specific_doc_readers.clear()
+        self.init_specific_doc_readers()
+        read_func, is_post_tag = self.get_read_function_for_doc(yaml.ScalarNode(tag, ""))
+        return read_func == self.read_index and not is_post_tag
+
+    def read_yaml_from_stream(self, the_stream, *args, **kwargs):
+        snapshot_folder = self.get_index_snapshot_folder()
+        if snapshot_folder is None or not isinstance(the_stream, io.StringIO) or bool(config_vars.get("DEBUG_INDEX_DB", False)) \
+                or "!index" not in the_stream.getvalue():  # only files with !index documents are worth a snapshot
+            super().read_yaml_from_stream(the_stream, *args, **kwargs)
+        else:
+            self.read_yaml_from_stream_with_snapshot(the_stream, Path(snapshot_folder), *args, **kwargs)
+
+    def read_yaml_doc_for_snapshot(self, a_node, file_text, *args, **kwargs) -> IndexSnapshotDoc:
+        """ read a yaml document and return what should be kept about it in IndexSnapshot
+            file_text: the text a_node was composed from
+        """
+        if self.is_index_doc_tag(a_node.tag):
+            retVal = IndexSnapshotDoc(a_node.tag)
+            self.items_table.index_snapshot_doc = retVal
+            try:
+                self.read_yaml_from_node(a_node, *args, **kwargs)
+            finally:
+                self.items_table.index_snapshot_doc = None
+        else:
+            # the document's original text is kept from the beginning of it's first line
+            doc_start = a_node.start_mark.index - a_node.start_mark.column
+            retVal = IndexSnapshotDoc(a_node.tag, yaml_text=file_text[doc_start:a_node.end_mark.index], first_line=a_node.start_mark.line)
+            self.read_yaml_from_node(a_node, *args, **kwargs)
+        return retVal
+
+    def read_yaml_from_stream_with_snapshot(self, the_stream, snapshot_folder, *args, **kwargs):
+        """ read yaml documents like read_yaml_from_stream, but !index documents are loaded from IndexSnapshot
+            if there is a valid snapshot for the_stream's text, see db/indexSnapshot.py for details.
+        """
+        file_text = the_stream.getvalue()
+        instl_version = ".".join(config_vars.get("__INSTL_VERSION__", []).list())
+        snapshot_name = IndexSnapshot.key(file_text, instl_version) + ".sqlite"
+        snapshot = IndexSnapshot(snapshot_folder.joinpath(snapshot_name))
+        new_docs = list()
+        if snapshot.load():
+            snapshot_changed = False
+            file_nodes = None  # file is parsed only if a document must be read again
+            for doc_num, snapshot_doc in enumerate(snapshot.docs):
+                if snapshot_doc.is_index and self.is_index_doc_tag(snapshot_doc.tag) \
+                        and self.items_table.config_dependencies_did_not_change(snapshot_doc.config_dependencies):
+                    self.read_index_from_snapshot(snapshot_doc)
+                    new_docs.append(snapshot_doc)
+                else:
+                    if snapshot_doc.is_index:
+                        if file_nodes is None:
+                            file_stream = io.StringIO(file_text)
+                            file_stream.name = getattr(the_stream, "name", snapshot_name)
+                            file_nodes = list(yaml.compose_all(file_stream))
+                        a_node = file_nodes[doc_num]
+                        doc_text = file_text
+                    else:
+                        # preceding empty lines so marks have the same line numbers as in the file
+                        doc_text = "\n" * snapshot_doc.first_line + snapshot_doc.yaml_text
+                        doc_stream = io.StringIO(doc_text)
+                        doc_stream.name = getattr(the_stream, "name", snapshot_name)
+                        a_node = yaml.compose(doc_stream)
+                    with kwargs['node-stack'](a_node):
+                        new_doc = self.read_yaml_doc_for_snapshot(a_node, doc_text, *args, **kwargs)
+                    snapshot_changed = snapshot_changed or snapshot_doc.is_index or new_doc.is_index
+                    new_docs.append(new_doc)
+        else:
+            snapshot_changed = True
+            for a_node in yaml.compose_all(the_stream):
+                with kwargs['node-stack'](a_node):
+                    try:
+                        new_docs.append(self.read_yaml_doc_for_snapshot(a_node, file_text, *args, **kwargs))
+                    except Exception as ex:
+                        print(ex)
+                        raise
+        if snapshot_changed and any(doc.is_index for doc in new_docs):
+            snapshot.docs = new_docs
+            if snapshot.save():
+                IndexSnapshot.remove_old_snapshots(snapshot_folder, int(config_vars.get("MAX_INDEX_SNAPSHOTS", 4)))
+
 
 # noinspection PyPep8Naming
 class InstlInstanceBase(IndexYamlReaderBase, metaclass=abc.ABCMeta):
@@ -340,6 +435,20 @@ class InstlInstanceBase(IndexYamlReaderBase, metaclass=abc.ABCMeta):
 
         in_batch_accum += PythonDoSomething(f'''RemoveEmptyFolders.set_a_kwargs_default("files_to_ignore", config_vars.get("REMOVE_EMPTY_FOLDERS_IGNORE_FILES", []).list())''')
         in_batch_accum += PythonDoSomething(f"""log.setLevel({config_vars.get("PYTHON_BATCH_LOG_LEVEL", 20)})""")
+        if self.open_checksum_cache():
+            in_batch_accum += PythonDoSomething('''utils.checksum_cache.open(config_vars["CHECKSUM_CACHE_PATH"].str())''')
+
+    def open_checksum_cache(self):
+        """ open utils.checksum_cache if CHECKSUM_CACHE_PATH is defined and fully resolved
+            return True if checksum cache was opened
+        """
+        retVal = False
+        if "CHECKSUM_CACHE_PATH" in config_vars:
+            checksum_cache_path = config_vars["CHECKSUM_CACHE_PATH"].str()
+            if checksum_cache_path and config_vars.is_str_resolved(checksum_cache_path):
+                utils.checksum_cache.open(checksum_cache_path)
+                retVal = True
+        return retVal
 
     def calc_user_cache_dir_var(self):
         if "USER_CACHE_DIR" not in config_vars:
@@ -456,6 +565,18 @@ class InstlInstanceBase(IndexYamlReaderBase, metaclass=abc.ABCMeta):
         repo_rev = str(config_vars.get("REPO_REV", "unknown"))
         self.progress("repo-rev", repo_rev)
 
+    def read_index_from_snapshot(self, snapshot_doc: IndexSnapshotDoc):
+        self.progress("reading index.yaml from snapshot")
+        IndexYamlReaderBase.read_index_from_snapshot(self, snapshot_doc)
+        repo_rev = str(config_vars.get("REPO_REV", "unknown"))
+        self.progress("repo-rev", repo_rev)
+
+    def get_index_snapshot_folder(self):
+        retVal = None
+        if bool(config_vars.get("USE_INDEX_SNAPSHOT_CACHE", False)):
+            retVal = self.get_aux_cache_dir(make_dir=False).joinpath("index_snapshots")
+        return retVal
+
     def find_cycles(self):
         try:
             from . import installItemGraph
@@ -7,6 +7,7 @@ import logging
 log = logging.getLogger()
 
 import utils
+import svnTree
 from configVar import config_vars
 
 
@@ -36,69 +37,147 @@ class InstlInstanceSync(object, metaclass=abc.ABCMeta):
 
     def read_remote_info_map(self):
         """ Reads the info map of the static files available for syncing.
+            If have_info_map from the previous sync can be updated with an info_map delta, only the delta
+            is downloaded, otherwise all info_map files are downloaded and read.
             Writes the map to local sync folder for reference and debugging.
         """
+        with self.instlObj.info_map_table.reading_files_context():
+            os.makedirs(os.fspath(config_vars["LOCAL_REPO_BOOKKEEPING_DIR"]), exist_ok=True)
+            os.makedirs(os.fspath(config_vars["LOCAL_REPO_REV_BOOKKEEPING_DIR"]), exist_ok=True)
+
+            if "INSTL_FOLDER_BASE_URL" not in config_vars:
+                if "REPO_REV_FOLDER_HIERARCHY" not in config_vars:
+                    config_vars["REPO_REV_FOLDER_HIERARCHY"] = self.instlObj.info_map_table.repo_rev_to_folder_hierarchy(config_vars["REPO_REV"].str())
+                config_vars["INSTL_FOLDER_BASE_URL"] = "$(BASE_LINKS_URL)/$(REPO_NAME)/$(REPO_REV_FOLDER_HIERARCHY)/instl"
+
+            additional_info_maps = list(self.instlObj.items_table.get_details_for_active_iids("info_map", unique_values=True))
+            info_maps_checksums = None
+            if bool(config_vars.get("USE_INFO_MAP_DELTA", "no")):
+                info_maps_checksums = self.read_info_maps_with_delta(additional_info_maps)
+            if info_maps_checksums is None:
+                info_maps_checksums = self.read_info_maps(additional_info_maps)
+
+            # record which info_maps were read, so next sync can tell if an info_map delta can be applied to have_info_map
+            self.instlObj.info_map_table.comments.extend(svnTree.info_map_state_comments(config_vars["REPO_REV"].str(), info_maps_checksums))
+            new_have_info_map_path = os.fspath(config_vars["NEW_HAVE_INFO_MAP_PATH"])
+            self.instlObj.progress(f"write info_map {new_have_info_map_path}")
+            self.instlObj.info_map_table.write_to_file(new_have_info_map_path, field_to_write=('path', 'flags', 'revision', 'checksum', 'size'), progress_callback=self.instlObj.progress)
+
+    def read_info_maps(self, additional_info_maps):
+        """ download and read the main info_map and the additional_info_maps
+            returns {info_map name: checksum} of the info_map files read
+        """
+        retVal = dict()
         info_map_file_url = None
         try:
             from . import connectionBase  # importing connectionBase take time so do it only when and where needed
-            with self.instlObj.info_map_table.reading_files_context():
-                os.makedirs(os.fspath(config_vars["LOCAL_REPO_BOOKKEEPING_DIR"]), exist_ok=True)
-                os.makedirs(os.fspath(config_vars["LOCAL_REPO_REV_BOOKKEEPING_DIR"]), exist_ok=True)
-
-                if "INSTL_FOLDER_BASE_URL" not in config_vars:
-                    if "REPO_REV_FOLDER_HIERARCHY" not in config_vars:
-                        config_vars["REPO_REV_FOLDER_HIERARCHY"] = self.instlObj.info_map_table.repo_rev_to_folder_hierarchy(config_vars["REPO_REV"].str())
-                    config_vars["INSTL_FOLDER_BASE_URL"] = "$(BASE_LINKS_URL)/$(REPO_NAME)/$(REPO_REV_FOLDER_HIERARCHY)/instl"
-
-                if "INFO_MAP_FILE_URL" not in config_vars:
-                    config_vars["INFO_MAP_FILE_URL"] = config_vars.resolve_str("$(INSTL_FOLDER_BASE_URL)/info_map.txt")
-
-                info_map_file_url = config_vars["INFO_MAP_FILE_URL"].str()
-                info_map_file_expected_checksum = None
-                if "INFO_MAP_CHECKSUM" in config_vars:
-                    info_map_file_expected_checksum = config_vars["INFO_MAP_CHECKSUM"].str()
-                local_copy_of_info_map_in = os.fspath(config_vars["LOCAL_COPY_OF_REMOTE_INFO_MAP_PATH"])
-                local_copy_of_info_map_out = utils.download_from_file_or_url(in_url=info_map_file_url,
-                                                config_vars=config_vars,
-                                                in_target_path=local_copy_of_info_map_in,
-                                                translate_url_callback=connectionBase.translate_url,
-                                                cache_folder=self.instlObj.get_default_sync_dir(continue_dir="cache", make_dir=True),
-                                                expected_checksum=info_map_file_expected_checksum)
+            if "INFO_MAP_FILE_URL" not in config_vars:
+                config_vars["INFO_MAP_FILE_URL"] = config_vars.resolve_str("$(INSTL_FOLDER_BASE_URL)/$(MAIN_INFO_MAP_FILE_NAME)")
+
+            info_map_file_url = config_vars["INFO_MAP_FILE_URL"].str()
+            info_map_file_expected_checksum = None
+            if "INFO_MAP_CHECKSUM" in config_vars:
+                info_map_file_expected_checksum = config_vars["INFO_MAP_CHECKSUM"].str()
+            local_copy_of_info_map_in = os.fspath(config_vars["LOCAL_COPY_OF_REMOTE_INFO_MAP_PATH"])
+            local_copy_of_info_map_out = utils.download_from_file_or_url(in_url=info_map_file_url,
+                                            config_vars=config_vars,
+                                            in_target_path=local_copy_of_info_map_in,
+                                            translate_url_callback=connectionBase.translate_url,
+                                            cache_folder=self.instlObj.get_default_sync_dir(continue_dir="cache", make_dir=True),
+                                            expected_checksum=info_map_file_expected_checksum)
+
+            self.instlObj.progress(f"read info_map {info_map_file_url}")
+            self.instlObj.info_map_table.read_from_file(local_copy_of_info_map_out, progress_callback=self.instlObj.progress)
+            retVal[str(config_vars["MAIN_INFO_MAP_FILE_NAME"])] = utils.get_file_checksum(local_copy_of_info_map_out)
+
+            # additional info_maps are downloaded and decompressed concurrently, and read to the db
+            # one by one, by this thread, in the same order as they were listed
+            additional_info_maps_urls = list()
+            additional_info_maps_download_kwargs = list()
+            cache_folder = self.instlObj.get_default_sync_dir("cache", make_dir=True)
+            for additional_info_map in additional_info_maps:
+                # try to get the zipped info_map
+                additional_info_map_file_name = config_vars.resolve_str(f"{additional_info_map}$(WZLIB_EXTENSION)")
+                path_in_main_info_map = config_vars.resolve_str(f"instl/{additional_info_map_file_name}")
+                additional_info_map_item = self.instlObj.info_map_table.get_file_item(path_in_main_info_map)
+                if not additional_info_map_item:  # zipped not found try the unzipped inf_map
+                    additional_info_map_file_name = additional_info_map
+                    path_in_main_info_map = config_vars.resolve_str(f"instl/{additional_info_map}")
+                    additional_info_map_item = self.instlObj.info_map_table.get_file_item(path_in_main_info_map)
+
+                checksum = additional_info_map_item.checksum if additional_info_map_item else None
 
+                additional_info_maps_urls.append(config_vars.resolve_str(f"$(INSTL_FOLDER_BASE_URL)/{additional_info_map_file_name}"))
+                additional_info_maps_download_kwargs.append({"in_url": additional_info_maps_urls[-1],
+                                                             "config_vars": config_vars,
+                                                             "in_target_path": config_vars.resolve_str(f"$(LOCAL_REPO_REV_BOOKKEEPING_DIR)/{additional_info_map}"),
+                                                             "translate_url_callback": connectionBase.translate_url,
+                                                             "cache_folder": cache_folder,
+                                                             "expected_checksum": checksum})
+
+            num_workers = int(config_vars.get("INFO_MAP_DOWNLOAD_NUM_WORKERS", "8"))
+            downloaded_info_maps = utils.download_from_file_or_url_in_parallel(additional_info_maps_download_kwargs, num_workers=num_workers)
+            for additional_info_map, info_map_file_url, local_copy_of_info_map_out in zip(additional_info_maps, additional_info_maps_urls, downloaded_info_maps):
                 self.instlObj.progress(f"read info_map {info_map_file_url}")
                 self.instlObj.info_map_table.read_from_file(local_copy_of_info_map_out, progress_callback=self.instlObj.progress)
-
-                additional_info_maps = self.instlObj.items_table.get_details_for_active_iids("info_map", unique_values=True)
-                for additional_info_map in additional_info_maps:
-                    # try to get the zipped info_map
-                    additional_info_map_file_name = config_vars.resolve_str(f"{additional_info_map}$(WZLIB_EXTENSION)")
-                    path_in_main_info_map = config_vars.resolve_str(f"instl/{additional_info_map_file_name}")
-                    additional_info_map_item = self.instlObj.info_map_table.get_file_item(path_in_main_info_map)
-                    if not additional_info_map_item:  # zipped not found try the unzipped inf_map
-                        additional_info_map_file_name = additional_info_map
-                        path_in_main_info_map = config_vars.resolve_str(f"instl/{additional_info_map}")
-                        additional_info_map_item = self.instlObj.info_map_table.get_file_item(path_in_main_info_map)
-
-                    checksum = additional_info_map_item.checksum if additional_info_map_item else None
-
-                    info_map_file_url = config_vars.resolve_str(f"$(INSTL_FOLDER_BASE_URL)/{additional_info_map_file_name}")
-                    local_copy_of_info_map_in = config_vars.resolve_str(f"$(LOCAL_REPO_REV_BOOKKEEPING_DIR)/{additional_info_map}")
-                    local_copy_of_info_map_out = utils.download_from_file_or_url(in_url=info_map_file_url,
-                                                config_vars=config_vars,
-                                                in_target_path=local_copy_of_info_map_in,
-                                                translate_url_callback=connectionBase.translate_url,
-                                                cache_folder=self.instlObj.get_default_sync_dir("cache", make_dir=True),
-                                                expected_checksum=checksum)
-
-                    self.instlObj.progress(f"read info_map {info_map_file_url}")
-                    self.instlObj.info_map_table.read_from_file(local_copy_of_info_map_out, progress_callback=self.instlObj.progress)
-
-                new_have_info_map_path = os.fspath(config_vars["NEW_HAVE_INFO_MAP_PATH"])
-                self.instlObj.progress(f"write info_map {new_have_info_map_path}")
-                self.instlObj.info_map_table.write_to_file(new_have_info_map_path, field_to_write=('path', 'flags', 'revision', 'checksum', 'size'), progress_callback=self.instlObj.progress)
+                retVal[additional_info_map] = utils.get_file_checksum(local_copy_of_info_map_out)
         except Exception:
             log.error(f"""Exception reading info_map: {info_map_file_url}""")
             raise
+        return retVal
+
+    def read_info_maps_with_delta(self, additional_info_maps):
+        """ read have_info_map and apply the info_map delta from the have_info_map's repo-rev to REPO_REV.
+            Delta is used only if have_info_map was created from the same info_map files (checked by checksum)
+            the delta was created from. Otherwise, or if the delta could not be downloaded, nothing is read.
+            returns {info_map name: checksum} of the info_map files the table now represents or None if delta was not used
+        """
+        have_info_map_path = os.fspath(config_vars["HAVE_INFO_MAP_PATH"])
+        have_state = svnTree.read_info_map_state(have_info_map_path)
+        if have_state is None:
+            return None
+        have_repo_rev, have_info_maps_checksums = have_state
+        repo_rev = int(config_vars["REPO_REV"])
+        info_map_names = {str(config_vars["MAIN_INFO_MAP_FILE_NAME"]), *additional_info_maps}
+        if have_repo_rev >= repo_rev or set(have_info_maps_checksums) != info_map_names:
+            return None
+
+        delta_url = config_vars.resolve_str("$(INSTL_FOLDER_BASE_URL)/$(INFO_MAP_DELTA_FILE_NAME)")
+        try:
+            from . import connectionBase  # importing connectionBase take time so do it only when and where needed
+            delta_expected_checksum = None
+            if "INFO_MAP_DELTA_CHECKSUM" in config_vars:
+                delta_expected_checksum = config_vars["INFO_MAP_DELTA_CHECKSUM"].str()
+            local_copy_of_delta = utils.download_from_file_or_url(in_url=delta_url,
+                                            config_vars=config_vars,
+                                            in_target_path=config_vars.resolve_str("$(LOCAL_REPO_REV_BOOKKEEPING_DIR)/$(INFO_MAP_DELTA_FILE_NAME)"),
+                                            translate_url_callback=connectionBase.translate_url,
+                                            cache_folder=self.instlObj.get_default_sync_dir(continue_dir="cache", make_dir=True),
+                                            expected_checksum=delta_expected_checksum)
+            delta_header = svnTree.read_info_map_delta_header(local_copy_of_delta)
+        except Exception as ex:
+            log.info(f"""info_map delta not used, could not read {delta_url}: {ex}""")
+            return None
+
+        if delta_header.from_repo_rev != have_repo_rev or delta_header.to_repo_rev != repo_rev:
+            return None
+        for info_map_name in info_map_names:
+            if info_map_name not in delta_header.info_maps or delta_header.info_maps[info_map_name][0] != have_info_maps_checksums[info_map_name]:
+                return None
+
+        self.instlObj.progress(f"read info_map {have_info_map_path}")
+        self.instlObj.info_map_table.read_from_file(have_info_map_path, progress_callback=self.instlObj.progress)
+        with utils.utf8_open_for_read(local_copy_of_delta, "r") as rfd:
+            num_changes = self.instlObj.info_map_table.read_from_info_map_delta(rfd, info_map_names, progress_callback=self.instlObj.progress)
+        expected_num_items = sum(delta_header.info_maps[info_map_name][2] for info_map_name in info_map_names)
+        actual_num_items = self.instlObj.info_map_table.num_items("all-items")
+        if actual_num_items != expected_num_items:
+            log.warning(f"""info_map delta not used, expected {expected_num_items} items after applying {delta_url}, found {actual_num_items}""")
+            self.instlObj.info_map_table.clear_all()
+            return None
+        self.instlObj.progress(f"applied {num_changes} changes from info_map delta {delta_url}")
+        retVal = {info_map_name: delta_header.info_maps[info_map_name][1] for info_map_name in info_map_names}
+        return retVal
 
     def mark_required_items(self):
         """ Mark all files that are needed for installation.
@@ -107,9 +186,8 @@ class InstlInstanceSync(object, metaclass=abc.ABCMeta):
         """
         self.instlObj.info_map_table.mark_required_files_for_active_items(progress_callback=self.instlObj.progress)
         required_file_path = os.fspath(config_vars["REQUIRED_INFO_MAP_PATH"])
-        required_items_list = self.instlObj.info_map_table.get_required_items()
-        self.instlObj.info_map_table.write_to_file(in_file=required_file_path, items_list=required_items_list)
-        num_required_files = sum(item.fileFlag for item in required_items_list)
+        self.instlObj.info_map_table.write_to_file(in_file=required_file_path, items_list=self.instlObj.info_map_table.iter_required_items())
+        num_required_files = self.instlObj.info_map_table.num_items("required-files")
         self.instlObj.progress(f"{num_required_files} files required for installation")
 
     def mark_download_items(self):
@@ -119,11 +197,11 @@ class InstlInstanceSync(object, metaclass=abc.ABCMeta):
         """
         self.instlObj.progress("create list of files to download")
         self.instlObj.set_sync_locations_for_active_items()
+        self.instlObj.open_checksum_cache()
         self.instlObj.progress("check checksum of existing required files ...")
         self.instlObj.info_map_table.mark_need_download(progress_callback=self.instlObj.progress)
         need_download_file_path = os.fspath(config_vars["TO_SYNC_INFO_MAP_PATH"])
-        need_download_items_list = self.instlObj.info_map_table.get_download_items()
-        self.instlObj.info_map_table.write_to_file(in_file=need_download_file_path, items_list=need_download_items_list, progress_callback=self.instlObj.progress)
+        self.instlObj.info_map_table.write_to_file(in_file=need_download_file_path, items_list=self.instlObj.info_map_table.iter_download_items(), progress_callback=self.instlObj.progress)
 
     # syncers that download from urls (url, boto) need to prepare a list of all the individual files that need updating.
     # syncers that use configuration management tools (p4, svn) do not need since the tools takes care of that.
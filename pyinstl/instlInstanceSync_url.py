@@ -46,23 +46,22 @@ class InstlInstanceSync_url(InstlInstanceSync):
             # we only need the second part
             config_vars["COOKIE_FOR_SYNC_URLS"] = the_cookie[1]
 
-    def create_sync_urls(self, in_file_list):
-        """ Create urls and local download paths for a list of file items.
-            in_file_list is a list of SVNRow objects
+    def create_sync_urls(self):
+        """ Create urls and local download paths for all files marked as need_download.
             A url for a file can come from two sources:
             - If the file item has a predefined url it will be used, otherwise
             - the url is a concatenation of the base url, the file's repo-rev
             and the partial path. E.g.:
             "http://some.base.url/" + "07/27" + "/path/to/file"
             The download path is the resolved file item's download_path
+            urls are calculated for all files in one pass over the db, see SVNTable.iter_sync_urls_for_download_files
         """
 
         self.sync_base_url = config_vars["SYNC_BASE_URL"].str()
         self.get_cookie_for_sync_urls(self.sync_base_url)
-        for file_item in in_file_list:
-            source_url = self.instlObj.info_map_table.get_sync_url_for_file_item(file_item)
-            self.instlObj.dl_tool.add_download_url(source_url, file_item.download_path, verbatim=source_url==['url'], size=file_item.size, download_last=source_url.endswith('Info.xml'))
-        self.instlObj.progress(f"created download urls for {len(in_file_list)} files")
+        sync_urls = self.instlObj.info_map_table.iter_sync_urls_for_download_files("$(SYNC_BASE_URL)")
+        num_urls = self.instlObj.dl_tool.add_download_urls(sync_urls)
+        self.instlObj.progress(f"created download urls for {num_urls} files")
 
     def create_curl_download_instructions(self):
         """ Download is done be creating files with instructions for curl - curl config files.
@@ -136,16 +135,15 @@ class InstlInstanceSync_url(InstlInstanceSync):
         if to_sync_num_files == 0:
             return dl_commands
 
-        file_list = self.instlObj.info_map_table.get_download_items(what="file")
         if False:   # need to rethink how to calc mount point sizes efficiently
-            mount_points_to_size = total_sizes_by_mount_point(file_list)
+            mount_points_to_size = total_sizes_by_mount_point(self.instlObj.info_map_table.iter_download_items(what="file"))
 
             for m_p in sorted(mount_points_to_size):
                 free_bytes = shutil.disk_usage(m_p).free
                 log.info(f"""{mount_points_to_size[m_p]} bytes to download to drive {"".join(("'", m_p, "'"))} {free_bytes-mount_points_to_size[m_p]} bytes will remain""")
 
         dl_commands += self.create_sync_folders()
-        self.create_sync_urls(file_list)
+        self.create_sync_urls()
         dl_commands += self.create_curl_download_instructions()
 
         dl_commands += self.instlObj.create_sync_folder_manifest_command("after-sync", back_ground=True)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3.9
+
+"""
+    generate synthetic index.yaml text for tests and benchmarks.
+    Text is deterministic for a given set of parameters, so different runs
+    work on the same items.
+"""
+
+import random
+
+
+def generate_index_yaml_text(num_items, templates_ratio=0.05, max_template_depth=6, items_per_document=None, seed=17):
+    """ return index.yaml text with num_items items, as read by IndexItemsTable.read_index_node.
+        about templates_ratio of the items are templates, organized in inheritance chains of up to max_template_depth.
+        Each template inherits from one template of a lower depth. Products inherit from one template and
+        some also from a mixin, or from one product that was defined before. So there are no inheritance diamonds
+        which would create duplicate details.
+        Names of items are not sorted in inheritance order.
+        If items_per_document is given, items are split to several !index documents.
+    """
+    rand = random.Random(seed)
+    num_templates = max(int(num_items * templates_ratio), max_template_depth)
+    templates_by_depth = [list() for _ in range(max_template_depth)]
+    mixins = [f"MIXIN_{mixin_num:02}_IID" for mixin_num in range(8)]
+    products = list()
+    lines = list()
+    num_items_added = 0
+
+    def add_item(iid, inherit, extra_lines=()):
+        nonlocal num_items_added
+        if num_items_added == 0 or (items_per_document and num_items_added % items_per_document == 0):
+            lines.extend(("--- !index", ""))
+        num_items_added += 1
+        lines.append(f"{iid}:")
+        lines.append(f"    name: {iid.lower()}")
+        if inherit:
+            lines.append("    inherit:")
+            lines.extend(f"        - {parent_iid}" for parent_iid in inherit)
+        lines.append(f"    install_folders: $(COMMON_FOLDER)/{iid.lower()}")
+        lines.append("    actions:")
+        lines.append("        post_copy_to_folder:")
+        lines.append(f'            - Echo("copied {iid}")')
+        for os_name in ("Mac", "Win"):
+            lines.append(f"    {os_name}:")
+            lines.append("        install_sources:")
+            lines.append(f"            - {os_name}/{iid.lower()}")
+            lines.append(f"            - !file {os_name}/{iid.lower()}.txt")
+            lines.append("        actions:")
+            lines.append("            pre_copy_item:")
+            lines.append(f'                - Echo("{os_name} {iid}")')
+        lines.extend(extra_lines)
+        lines.append("")
+
+    for template_num in range(num_templates):
+        depth = template_num % max_template_depth
+        template_iid = f"TEMPLATE_{rand.getrandbits(32):08x}_IID"
+        templates_by_depth[depth].append(template_iid)
+        add_item(template_iid, [rand.choice(templates_by_depth[depth - 1])] if depth > 0 else ())
+    all_templates = [template_iid for templates in templates_by_depth for template_iid in templates]
+    for product_num in range(num_items - num_templates):
+        product_iid = f"{rand.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}_{product_num:05}_IID"
+        if products and rand.random() < 0.1:
+            inherit = [rand.choice(products)]
+        else:
+            inherit = [rand.choice(all_templates)]
+            if rand.random() < 0.3:
+                inherit.append(rand.choice(mixins))
+        products.append(product_iid)
+        add_item(product_iid, inherit, (f"    guid: {rand.getrandbits(128):032x}",
+                                        f"    version: 1.{product_num}",
+                                        "    depends:",
+                                        f"        - {rand.choice(products)}"))
+    for mixin_iid in mixins:
+        add_item(mixin_iid, ())
+    retVal = "\n".join(lines) + "\n"
+    return retVal
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3.9
+
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+sys.path.append(os.path.realpath(os.path.join(__file__, os.pardir, os.pardir)))
+sys.path.append(os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
+from db.dbMaster import DBMaster
+from db.indexItemTable import IndexItemsTable
+from db.indexSnapshot import IndexSnapshot
+from pyinstl import IndexYamlReaderBase
+from configVar import config_vars
+
+
+class SnapshotIndexYamlReader(IndexYamlReaderBase):
+    """ IndexYamlReaderBase with it's own in memory items table, instead of the one shared by DBManager instances """
+    def __init__(self, snapshot_folder) -> None:
+        super().__init__(config_vars)
+        self.snapshot_folder = snapshot_folder
+        self.read_from_snapshot = 0
+        self.require_marks = list()
+        self.own_items_table = IndexItemsTable(DBMaster(":memory:", Path(__file__).parent.parent.parent.joinpath("defaults")))
+
+    @property
+    def items_table(self):
+        return self.own_items_table
+
+    def get_index_snapshot_folder(self):
+        return self.snapshot_folder
+
+    def read_index_from_snapshot(self, snapshot_doc):
+        self.read_from_snapshot += 1
+        super().read_index_from_snapshot(snapshot_doc)
+
+    def read_require(self, a_node, *args, **kwargs):
+        self.require_marks.append((a_node.start_mark.name, a_node.start_mark.line, a_node.start_mark.column))
+        super().read_require(a_node, *args, **kwargs)
+
+
+class TestIndexSnapshot(unittest.TestCase):
+    """ reading index.yaml from IndexSnapshot should give the same tables as reading from the file """
+    index_text = """--- !define
+ITEM_DEPENDS: [A_IID, X_IID]
+PRODUCT: |
+    $(name)_IID:
+        name: $(name)
+        version: $(version)
+        install_sources: $(name).bundle
+--- !index
+A_IID:
+    name: A
+    install_sources: a
+    define:
+        A_VAR: a value
+        A_EMPTY:
+B_IID:
+    __ifdef__(WITH_B_FOLDER):
+        install_folders: b_folder
+    __ifndef__(WITH_B_FOLDER):
+        install_folders: no_b_folder
+C_IID:
+    depends:
+        - $(ITEM_DEPENDS)
+        - B_IID
+    inherit: A_IID
+PRODUCT<name, version>:
+    - [X, 1.0]
+    - [Y, 2.0]
+--- !require
+A_IID:
+    version: 1.0
+    require_by: [C_IID]
+"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.snapshot_folder = self.temp_dir.joinpath("index_snapshots")
+        self.index_path = self.temp_dir.joinpath("index.yaml")
+        self.index_path.write_text(self.index_text)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        for var in ("WITH_B_FOLDER", "EXTRA_DEPENDS", "ITEM_DEPENDS", "PRODUCT", "PRODUCT_IN_FILE"):
+            if var in config_vars:
+                del config_vars[var]
+
+    def read_index(self, snapshot_folder, index_path=None):
+        """ read index_path with a fresh db, return the reader, the tables and the defines for iids """
+        reader = SnapshotIndexYamlReader(snapshot_folder)
+        reader.read_yaml_file(index_path or self.index_path)
+        items = [tuple(row) for row in reader.items_table.db.select_and_fetchall("SELECT * FROM index_item_t ORDER BY _id")]
+        details = [tuple(row) for row in reader.items_table.db.select_and_fetchall("SELECT * FROM index_item_detail_t ORDER BY _id")]
+        defines = {iid: IndexSnapshot.yaml_text_from_node(node) for iid, node in reader.items_table.defines_for_iids.items()}
+        return reader, (items, details, defines)
+
+    def test_warm_read_same_as_cold_read(self):
+        _, without_snapshot = self.read_index(None)
+        self.assertFalse(self.snapshot_folder.exists())
+
+        cold_reader, cold = self.read_index(self.snapshot_folder)
+        self.assertEqual(0, cold_reader.read_from_snapshot)
+        self.assertEqual(1, len(list(self.snapshot_folder.glob("*.sqlite"))))
+
+        warm_reader, warm = self.read_index(self.snapshot_folder)
+        self.assertEqual(1, warm_reader.read_from_snapshot)
+
+        self.assertEqual(without_snapshot, cold)
+        self.assertEqual(cold, warm)
+        self.assertIn("A_IID", warm[2])
+        self.assertIn("X_IID", [item[1] for item in warm[0]])
+        # !require document is read again and adds to index_item_detail_t
+        self.assertIn("require_version", [detail[4] for detail in warm[1]])
+        # !define document is read again
+        self.assertEqual(["A_IID", "X_IID"], list(config_vars["ITEM_DEPENDS"]))
+
+    def test_key(self):
+        key = IndexSnapshot.key(self.index_text, "2.3.4.5")
+        self.assertEqual(key, IndexSnapshot.key(self.index_text, "2.3.4.5"))
+        self.assertNotEqual(key, IndexSnapshot.key(self.index_text + "\n", "2.3.4.5"))
+        self.assertNotEqual(key, IndexSnapshot.key(self.index_text, "2.3.4.6"))
+
+    def test_file_change_creates_new_snapshot(self):
+        self.read_index(self.snapshot_folder)
+        self.index_path.write_text(self.index_text.replace("a value", "another value"))
+        reader, _ = self.read_index(self.snapshot_folder)
+        self.assertEqual(0, reader.read_from_snapshot)
+        self.assertEqual(2, len(list(self.snapshot_folder.glob("*.sqlite"))))
+
+    def set_config_var(self, var_name, value):
+        if value is None:
+            if var_name in config_vars:
+                del config_vars[var_name]
+        else:
+            config_vars[var_name] = value
+
+    def check_invalidation(self, var_name, value_before, value_after):
+        """ a snapshot created when var_name's value is value_before should not be used when the value is value_after,
+            instead the index should be read from file, as without a snapshot, and the snapshot saved again
+        """
+        self.set_config_var(var_name, value_before)
+        self.read_index(self.snapshot_folder)
+        self.set_config_var(var_name, value_after)
+        _, without_snapshot = self.read_index(None)
+        reader, after_change = self.read_index(self.snapshot_folder)
+        self.assertEqual(0, reader.read_from_snapshot)
+        self.assertEqual(without_snapshot, after_change)
+        reader, _ = self.read_index(self.snapshot_folder)
+        self.assertEqual(1, reader.read_from_snapshot)
+
+    def test_conditional_invalidates(self):
+        self.check_invalidation("WITH_B_FOLDER", None, "yes")
+
+    def test_depends_invalidates(self):
+        self.index_text = self.index_text.replace("- B_IID\n", "- $(EXTRA_DEPENDS)\n")
+        self.index_path.write_text(self.index_text)
+        self.check_invalidation("EXTRA_DEPENDS", "B_IID", ["B_IID", "Y_IID"])
+
+    def test_template_invalidates(self):
+        self.index_text = self.index_text.replace("PRODUCT: |", "PRODUCT_IN_FILE: |")
+        self.index_path.write_text(self.index_text)
+        self.check_invalidation("PRODUCT",
+                                "$(name)_IID:\n    name: $(name)\n",
+                                "$(name)_IID:\n    name: $(name)\n    version: $(version)\n")
+
+    def test_corrupted_snapshot(self):
+        _, cold = self.read_index(self.snapshot_folder)
+        for snapshot_path in self.snapshot_folder.glob("*.sqlite"):
+            snapshot_path.write_bytes(b"not an sqlite file")
+        reader, after_corruption = self.read_index(self.snapshot_folder)
+        self.assertEqual(0, reader.read_from_snapshot)
+        self.assertEqual(cold, after_corruption)
+        reader, _ = self.read_index(self.snapshot_folder)
+        self.assertEqual(1, reader.read_from_snapshot)
+
+    def test_remove_old_snapshots(self):
+        config_vars["MAX_INDEX_SNAPSHOTS"] = 2
+        try:
+            for version in range(4):
+                self.index_path.write_text(self.index_text.replace("1.0", f"1.{version}"))
+                self.read_index(self.snapshot_folder)
+        finally:
+            del config_vars["MAX_INDEX_SNAPSHOTS"]
+        self.assertEqual(2, len(list(self.snapshot_folder.glob("*.sqlite"))))
+
+    def test_marks_of_documents_read_again(self):
+        """ documents read again on a warm read should have the same marks as when read from the file """
+        cold_reader, _ = self.read_index(self.snapshot_folder)
+        warm_reader, _ = self.read_index(self.snapshot_folder)
+        self.assertEqual(1, warm_reader.read_from_snapshot)
+        self.assertEqual(1, len(cold_reader.require_marks))
+        self.assertEqual(cold_reader.require_marks, warm_reader.require_marks)
+        self.assertEqual(os.fspath(self.index_path), os.fspath(warm_reader.require_marks[0][0]))
+
+    def test_no_snapshot_without_index_document(self):
+        """ files without !index documents, such as require.yaml, are read without a snapshot """
+        require_path = self.temp_dir.joinpath("require.yaml")
+        require_path.write_text(self.index_text[self.index_text.index("--- !require"):])
+        with unittest.mock.patch.object(IndexYamlReaderBase, "read_yaml_from_stream_with_snapshot") as with_snapshot_mock:
+            reader, _ = self.read_index(self.snapshot_folder, require_path)
+        with_snapshot_mock.assert_not_called()
+        self.assertEqual(1, len(reader.require_marks))
+        self.assertFalse(self.snapshot_folder.exists())
@@ -6,11 +6,15 @@ import os
 import unittest
 import time
 from pathlib import Path
+import yaml
 from pybatch.info_mapBatchCommands import IndexYamlReader
 
 sys.path.append(os.path.realpath(os.path.join(__file__, os.pardir, os.pardir)))
 sys.path.append(os.path.realpath(os.path.join(__file__, os.pardir, os.pardir, os.pardir)))
 from db.indexItemTable import IndexItemsTable
+from db.dbMaster import DBMaster
+from aYaml.yamlReader import YamlNodeStack
+from .synthetic_index import generate_index_yaml_text
 import aYaml
 import utils
 from configVar import config_vars
@@ -54,6 +58,74 @@ class TestConditionalsInIndex(unittest.TestCase):
         self.assertEqual(num_iids, num_oks, f"{num_iids=} != {num_oks=}")
 
 
+class TestResolveInheritance(unittest.TestCase):
+    """ resolve_inheritance resolves all iids of the same inheritance level together,
+        compare with resolving iids one by one as done when DEBUG_INDEX_DB is true.
+    """
+    index_text = """--- !index
+        Z_PRODUCT_IID:
+            inherit:
+              - B_TEMPLATE_IID
+              - A_MIXIN_IID
+            install_sources: z_product
+        B_TEMPLATE_IID:
+            inherit: C_BASE_IID
+            install_folders: b_folder
+            Mac:
+                actions:
+                    pre_copy_item: Echo("B Mac")
+            Win:
+                actions:
+                    pre_copy_item: Echo("B Win")
+        C_BASE_IID:
+            name: base
+            version: 1.2.3
+            actions:
+                post_copy: Echo("C")
+        D_PRODUCT_IID:
+            inherit: Z_PRODUCT_IID
+            guid: 01234567-89ab-cdef-0123-456789abcdef
+        A_MIXIN_IID:
+            depends: C_BASE_IID
+        """
+
+    def tearDown(self):
+        if "DEBUG_INDEX_DB" in config_vars:
+            del config_vars["DEBUG_INDEX_DB"]
+
+    def items_table_from_text(self, index_text):
+        retVal = IndexItemsTable(DBMaster(":memory:", Path(__file__).parent.parent.parent.joinpath("defaults")))
+        retVal.read_index_node(yaml.compose(index_text), **{'node-stack': YamlNodeStack()})
+        retVal.activate_specific_oses("Mac", "Mac64")
+        return retVal
+
+    def resolved_details(self, index_text, debug_index_db):
+        items_table = self.items_table_from_text(index_text)
+        config_vars["DEBUG_INDEX_DB"] = debug_index_db
+        items_table.resolve_inheritance()
+        retVal = [dict(row) for row in items_table.db.select_and_fetchall("SELECT * FROM index_item_detail_t ORDER BY _id")]
+        return retVal
+
+    def test_inherit_order(self):
+        inherit_order, inherit_dict = self.items_table_from_text(self.index_text).prepare_inherit_order()
+        self.assertEqual(["B_TEMPLATE_IID", "Z_PRODUCT_IID", "D_PRODUCT_IID"], list(inherit_order))
+        self.assertCountEqual(["B_TEMPLATE_IID", "A_MIXIN_IID"], inherit_dict["Z_PRODUCT_IID"])
+
+    def test_circular_inheritance(self):
+        circular_index_text = self.index_text.replace("version: 1.2.3", "inherit: D_PRODUCT_IID")
+        with self.assertRaises(ValueError) as context:
+            self.items_table_from_text(circular_index_text).prepare_inherit_order()
+        self.assertIn("B_TEMPLATE_IID -> C_BASE_IID -> D_PRODUCT_IID -> Z_PRODUCT_IID -> B_TEMPLATE_IID", str(context.exception))
+
+    def test_same_details_as_one_by_one(self):
+        for index_text in (self.index_text, generate_index_yaml_text(600)):
+            one_by_one_details = self.resolved_details(index_text, True)
+            by_levels_details = self.resolved_details(index_text, False)
+            self.assertTrue(any(row["generation"] > 2 for row in by_levels_details))
+            # same details with same _id, so queries that ORDER BY _id return the same results
+            self.assertEqual(one_by_one_details, by_levels_details)
+
+
 class TestReadWrite(unittest.TestCase):
     @timing
     def setUp(self):
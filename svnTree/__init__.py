@@ -1 +1,2 @@
 from .svnTable import SVNTable, SVNRow
+from .infoMapDelta import InfoMapDeltaHeader, write_info_map_delta, read_info_map_delta_header, info_map_state_comments, read_info_map_state
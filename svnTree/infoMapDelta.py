@@ -0,0 +1,143 @@
+#!/usr/bin/env python3.9
+
+"""
+    info_map delta: the changes between the info_map files of two repo-revs.
+    Created by admin next to the info_map files of a repo-rev, so a client that already
+    has the info_map files of the previous repo-rev (as recorded in it's have_info_map)
+    can download the small delta instead of all info_map files.
+    Delta file is csv like info_map files:
+        # instl info_map delta
+        delta-format, 1
+        from-repo-rev, 7
+        to-repo-rev, 8
+        info_map, info_map.txt, <checksum in repo-rev 7>, <checksum in repo-rev 8>, <number of items in repo-rev 8>
+        -, info_map.txt, Mac/A/removed.txt
+        +, info_map.txt, Mac/A/added_or_changed.txt, f, 8, 0123456789abcdef0123456789abcdef01234567, 17
+    The header rows (all rows before the first change) are read with read_info_map_delta_header,
+    the changes are applied to an SVNTable with SVNTable.read_from_info_map_delta.
+"""
+
+import os
+import re
+import csv
+import logging
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger()
+
+import utils
+
+info_map_delta_format_version = "1"
+
+# comments written to have_info_map by the client, recording the repo-rev and the info_map files that were read
+info_map_state_repo_rev_re = re.compile(r"^#\s*repo-rev:\s*(?P<repo_rev>\d+)\s*$")
+info_map_state_info_map_re = re.compile(r"^#\s*info_map:\s*(?P<name>[^,]+),\s*(?P<checksum>[\da-f]+)\s*$")
+
+
+@dataclass
+class InfoMapDeltaHeader:
+    from_repo_rev: int = -1
+    to_repo_rev: int = -1
+    # info_map name -> (checksum in from_repo_rev, checksum in to_repo_rev, number of items in to_repo_rev)
+    info_maps: Dict[str, Tuple[str, str, int]] = field(default_factory=dict)
+
+
+def read_info_map_rows(info_map_path) -> Dict[str, List[str]]:
+    """ return {path: row} for each item in an info_map text file """
+    retVal = dict()
+    with utils.utf8_open_for_read(info_map_path, "r") as rfd:
+        for row in csv.reader(rfd, skipinitialspace=True):
+            if row and row[0][0] != '#':
+                retVal[row[0]] = row
+    return retVal
+
+
+def write_info_map_delta(delta_path, from_repo_rev, to_repo_rev, info_map_files: List[Tuple[str, Path, Path]]) -> int:
+    """ write the changes between old and new versions of info_map files.
+        info_map_files: list of (info_map name, path to info_map in from_repo_rev, path to info_map in to_repo_rev).
+        info_map that does not exist in from_repo_rev is written with empty checksum, so clients will not use
+        the delta for it.
+        returns the number of changes written
+    """
+    retVal = 0
+    header_rows = [("delta-format", info_map_delta_format_version),
+                   ("from-repo-rev", from_repo_rev),
+                   ("to-repo-rev", to_repo_rev)]
+    change_rows = list()
+    for info_map_name, old_info_map_path, new_info_map_path in info_map_files:
+        old_rows = dict()
+        old_checksum = ""
+        if os.path.isfile(old_info_map_path):
+            old_rows = read_info_map_rows(old_info_map_path)
+            old_checksum = utils.get_file_checksum(old_info_map_path)
+        new_rows = read_info_map_rows(new_info_map_path)
+        header_rows.append(("info_map", info_map_name, old_checksum, utils.get_file_checksum(new_info_map_path), len(new_rows)))
+        for path, row in new_rows.items():
+            if old_rows.pop(path, None) != row:
+                change_rows.append(("+", info_map_name, *row))
+        for path in old_rows:  # items left in old_rows were removed
+            change_rows.append(("-", info_map_name, path))
+
+    with utils.utf8_open_for_write(delta_path, "w") as wfd:
+        wfd.write("# instl info_map delta\n")
+        for row in header_rows + change_rows:
+            wfd.write(", ".join(str(value) for value in row))
+            wfd.write("\n")
+    retVal = len(change_rows)
+    return retVal
+
+
+def read_info_map_delta_header(delta_path) -> InfoMapDeltaHeader:
+    """ read the header rows of info_map delta file, raise ValueError if the file is not a known delta format """
+    retVal = InfoMapDeltaHeader()
+    with utils.utf8_open_for_read(delta_path, "r") as rfd:
+        reader = csv.reader(rfd, skipinitialspace=True)
+        format_version = None
+        for row in reader:
+            if not row or row[0][0] == '#':
+                continue
+            if row[0] in ("-", "+"):
+                break
+            elif row[0] == "delta-format":
+                format_version = row[1]
+            elif row[0] == "from-repo-rev":
+                retVal.from_repo_rev = int(row[1])
+            elif row[0] == "to-repo-rev":
+                retVal.to_repo_rev = int(row[1])
+            elif row[0] == "info_map":
+                retVal.info_maps[row[1]] = (row[2], row[3], int(row[4]))
+    if format_version != info_map_delta_format_version:
+        raise ValueError(f"{delta_path} is not info_map delta format {info_map_delta_format_version}")
+    return retVal
+
+
+def info_map_state_comments(repo_rev, info_maps_checksums: Dict[str, str]) -> List[str]:
+    """ comments to add to have_info_map, so next sync can tell if an info_map delta can be applied to it """
+    retVal = [f"repo-rev: {repo_rev}"]
+    retVal.extend(f"info_map: {name}, {checksum}" for name, checksum in info_maps_checksums.items())
+    return retVal
+
+
+def read_info_map_state(info_map_path) -> Optional[Tuple[int, Dict[str, str]]]:
+    """ read comments written by info_map_state_comments at the top of an info_map file
+        returns (repo-rev, {info_map name: checksum}) or None if the file does not exist or has no such comments
+    """
+    retVal = None
+    if os.path.isfile(info_map_path):
+        repo_rev = None
+        info_maps_checksums = dict()
+        with utils.utf8_open_for_read(info_map_path, "r") as rfd:
+            for line in rfd:
+                if not line.startswith("#"):
+                    break  # state comments are only at the top of the file
+                match = info_map_state_repo_rev_re.match(line)
+                if match:
+                    repo_rev = int(match['repo_rev'])
+                match = info_map_state_info_map_re.match(line)
+                if match:
+                    info_maps_checksums[match['name']] = match['checksum']
+        if repo_rev is not None and info_maps_checksums:
+            retVal = repo_rev, info_maps_checksums
+    return retVal
@@ -10,6 +10,7 @@ log = logging.getLogger()
 
 import csv
 import sqlite3
+import concurrent.futures
 from contextlib import contextmanager
 from typing import Dict, Generator, List, Tuple
 from functools import lru_cache
@@ -23,6 +24,7 @@ comment_line_re = re.compile(r"""
             (?P<the_comment>.*)
             $
             """, re.X)
+dl_path_re = re.compile("dl_path:'(?P<ld_path>.+)'")
 text_line_re = re.compile(r"""
             ^
             (?P<path>.+)
@@ -234,6 +236,15 @@ class SVNTable(object):
     drop_parent_id_index_q = """DROP INDEX IF EXISTS ix_svn_item_t_parent_id;"""
     create_unwtarred_id_index_q = """CREATE INDEX IF NOT EXISTS ix_svn_item_t_unwtarred_id ON svn_item_t (unwtarred);"""
     drop_unwtarred_id_index_q = """DROP INDEX IF EXISTS ix_svn_item_t_unwtarred_id;"""
+    insert_info_map_row_q = """
+        INSERT INTO svn_item_t (path, flags, revision,
+                              checksum, size, url, download_path,
+                              level, parent, leaf,
+                              fileFlag, wtarFlag, unwtarred,
+                              required, need_download,
+                              symlinkFlag)
+         VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?);
+        """
     update_parent_ids_q = """
         UPDATE svn_item_t
         SET parent_id =
@@ -279,6 +290,7 @@ class SVNTable(object):
         ORDER BY parent_id
         """
     get_immediate_child_items_q = """SELECT * FROM svn_item_t WHERE parent_id==:parent_id"""
+    fetchmany_size = 4096  # rows fetched at a time by iter_rows
 
     def __init__(self, db_master) -> None:
         super().__init__()
@@ -428,54 +440,75 @@ class SVNTable(object):
             for rows in utils.iter_grouper(8192, row_yielder):
                 curs.executemany(insert_q, rows)
 
+    def info_map_row_to_db_row(self, row):
+        """ convert a row read from info_map text file to the values inserted by insert_info_map_row_q """
+        # when there are 6 items in row the last might be url or dl_path
+        # so if row is (path, flags, repo-rev, checksum, size, dl_path) insert a None for url so row will be:
+        # (path, flags, repo-rev, checksum, size, url, dl_path)
+        if len(row) == 6 and row[5].startswith("dl_path:"):
+            row.insert(5, None)
+        info_map_line_defaults = ('!path!', '!flags!', '!repo-rev!', None, 0, None, None)
+        row_data = list(utils.iter_complete_to_longest(row,
+                                                       info_map_line_defaults))  # path, flags, revision, checksum, size, url, dl_path
+        if row_data[6] is not None:
+            match = dl_path_re.match(row_data[6])
+            if match:
+                row_data[6] = match['ld_path']
+        row_data.extend(self.level_parent_and_leaf_from_path(row_data[0]))  # level, parent, leaf
+        row_data.append(1 if 'f' in row_data[1] else 0)  # fileFlag
+        wtar_match = utils.wtar_file_re.match(row_data[0])
+        if wtar_match:
+            row_data.append(1)  # wtarFlag
+            row_data.append(wtar_match['base_name'])  # unwtarred
+        else:
+            row_data.extend((0, row_data[0]))  # wtarFlag, unwtarred
+        row_data.extend((0, 0))  # required, need_download
+        if row_data[0].endswith('.symlink'):  # symlinkFlag
+            row_data.append(1)
+        else:
+            row_data.append(0)
+        return row_data
+
     def read_from_text(self, rfd, progress_callback=None):
-        dl_path_re = re.compile("dl_path:'(?P<ld_path>.+)'")
 
         def yield_row(_rfd_):
             reader = csv.reader(_rfd_, skipinitialspace=True)
             for row in reader:
                 if row and row[0][0] != '#':
-                    # when there are 6 items in row the last might be url or dl_path
-                    # so if row is (path, flags, repo-rev, checksum, size, dl_path) insert a None for url so row will be:
-                    # (path, flags, repo-rev, checksum, size, url, dl_path)
-                    if len(row) == 6 and row[5].startswith("dl_path:"):
-                        row.insert(5, None)
-                    info_map_line_defaults = ('!path!', '!flags!', '!repo-rev!', None, 0, None, None)
-                    row_data = list(utils.iter_complete_to_longest(row,
-                                                                   info_map_line_defaults))  # path, flags, revision, checksum, size, url, dl_path
-                    if row_data[6] is not None:
-                        match = dl_path_re.match(row_data[6])
-                        if match:
-                            row_data[6] = match['ld_path']
-                    row_data.extend(self.level_parent_and_leaf_from_path(row_data[0]))  # level, parent, leaf
-                    row_data.append(1 if 'f' in row_data[1] else 0)  # fileFlag
-                    wtar_match = utils.wtar_file_re.match(row_data[0])
-                    if wtar_match:
-                        row_data.append(1)  # wtarFlag
-                        row_data.append(wtar_match['base_name'])  # unwtarred
-                    else:
-                        row_data.extend((0, row_data[0]))  # wtarFlag, unwtarred
-                    row_data.extend((0, 0))  # required, need_download
-                    if row_data[0].endswith('.symlink'):  # symlinkFlag
-                        row_data.append(1)
-                    else:
-                        row_data.append(0)
-                    yield row_data
+                    yield self.info_map_row_to_db_row(row)
 
         row_yielder = yield_row(rfd)
         description = f"read info_map from {rfd.name}"
         with self.db.transaction(description=description, progress_callback=progress_callback) as curs:
-            insert_q = """
-                INSERT INTO svn_item_t (path, flags, revision,
-                                      checksum, size, url, download_path,
-                                      level, parent, leaf,
-                                      fileFlag, wtarFlag, unwtarred,
-                                      required, need_download,
-                                      symlinkFlag)
-                 VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?);
-                """
             for rows in utils.iter_grouper(8192, row_yielder):
-                curs.executemany(insert_q, rows)
+                curs.executemany(self.insert_info_map_row_q, rows)
+
+    def read_from_info_map_delta(self, rfd, info_map_names, progress_callback=None) -> int:
+        """ apply changes from info_map delta file (see svnTree.infoMapDelta) to items already in the table.
+            Only changes to info_maps in info_map_names are applied.
+            Changed items are removed and inserted again, so their _id will change.
+            returns the number of changed items
+        """
+        changed_paths = list()
+        rows_to_insert = list()
+        for row in csv.reader(rfd, skipinitialspace=True):
+            # header rows and comments are skipped, change rows are: op, info_map name, info_map row...
+            if len(row) > 2 and row[0] in ("-", "+") and row[1] in info_map_names:
+                changed_paths.append((row[2],))
+                if row[0] == "+":
+                    rows_to_insert.append(self.info_map_row_to_db_row(row[2:]))
+
+        description = f"read info_map delta from {rfd.name}"
+        with self.db.transaction(description=description, progress_callback=progress_callback) as curs:
+            # path index might not exist while reading files, so delete by joining with a temp table of paths
+            curs.execute("""CREATE TEMP TABLE delta_paths_t (path TEXT PRIMARY KEY ON CONFLICT IGNORE)""")
+            curs.executemany("""INSERT INTO delta_paths_t (path) VALUES (?)""", changed_paths)
+            curs.execute("""DELETE FROM svn_item_t WHERE path IN (SELECT path FROM delta_paths_t)""")
+            curs.execute("""DROP TABLE delta_paths_t""")
+            for rows in utils.iter_grouper(8192, rows_to_insert):
+                curs.executemany(self.insert_info_map_row_q, rows)
+        retVal = len(changed_paths)
+        return retVal
 
     @staticmethod
     def get_wtar_file_status(file_name) -> Tuple[bool, bool]:
@@ -498,7 +531,7 @@ class SVNTable(object):
         """
 
         if items_list is None:
-            items_list = self.get_items()
+            items_list = self.iter_items()
         if in_format == "guess":
             _, extension = os.path.splitext(in_file)
             in_format = map_info_extension_to_format[extension[1:]]
@@ -757,132 +790,169 @@ class SVNTable(object):
         return retVal
 
     #oren TODO: perhaps we can do this actions on the previous walk on this folder
-    def get_files_that_should_be_removed_from_sync_folder(self, files_to_check, progress_callback=None) -> List[int]:
+    def get_files_that_should_be_removed_from_sync_folder(self, files_to_check, progress_callback=None) -> List[str]:
         """
-        :param files_to_check: a list of tuples [(partial_path, full_path), ...]
+        :param files_to_check: a list of partial paths of files found in the sync folder
         :param progress_callback: progress callback, if not None must accept a single string parameter and return None
-        :return: list of indexes into files_to_check who's partial path is not in info_map
+        :return: list of partial paths from files_to_check that are not in info_map
+        Paths are compared case insensitively (ASCII only) - as was done when comparison was done with LIKE.
+        Prefix matching is done with range comparison on an indexed column, instead of LIKE, so
+        the time is proportional to the number of prefixes * log(number of files) and not
+        to the number of prefixes * number of files.
         """
         retVal = list()
 
         with self.db.transaction(description="get_files_that_should_be_removed_from_sync_folder",
                                  progress_callback=progress_callback) as curs:
-            create_table_text = """CREATE TEMP TABLE cache_folder_file_paths_t (path TEXT, remove BOOLEAN DEFAULT 1);"""
+            # COLLATE NOCASE keeps the case insensitivity that LIKE had, and allows using the index
+            create_table_text = """CREATE TEMP TABLE cache_folder_file_paths_t (path TEXT COLLATE NOCASE, remove BOOLEAN DEFAULT 1);"""
             curs.execute(create_table_text)
 
-            # each partial path is inserted with it's index in the list
-            list_of_inserts = [(p,) for p in files_to_check]
             insert_q = """INSERT INTO cache_folder_file_paths_t (path) VALUES (?);"""
-            curs.executemany(insert_q, list_of_inserts)
+            curs.executemany(insert_q, ((p,) for p in files_to_check))
+            curs.execute("""CREATE INDEX temp.ix_cache_folder_file_paths_t_path ON cache_folder_file_paths_t (path);""")
 
-            # create a list of files that should stay in the cache folder.
-            # the list is a combination of:
+            # files that should stay in the cache folder are a combination of:
             # - all files in known info_map files
             # - all files appearing in IIDs that have custom info_map files.
-            # Since we do not know the exact path of such files, we append % to the folder names and later use LIKE
+            # Since we do not know the exact path of such files, their install_sources are used as prefixes
 
-            create_table_text = """CREATE TEMP TABLE do_not_remove_file_paths_t (path TEXT);"""
+            # files that appear in the info_map
+            update_paths_q = """
+                UPDATE cache_folder_file_paths_t
+                SET remove = 0
+                WHERE path IN (SELECT path FROM svn_item_t)
+                """
+            curs.execute(update_paths_q)
+
+            create_table_text = """CREATE TEMP TABLE do_not_remove_prefixes_t (prefix TEXT COLLATE NOCASE);"""
             curs.execute(create_table_text)
 
+            # files in folders of IIDs that have their own info_map, for items that are not currently being installed.
             path_that_should_stay_q = """
-                    INSERT INTO do_not_remove_file_paths_t (path)  
-                    SELECT install_sources_t.detail_value||"%" as __path
-                    FROM index_item_detail_t AS install_sources_t, index_item_detail_t as info_map_t
-                    WHERE install_sources_t.detail_name == "install_sources"
-                            AND info_map_t.detail_name == "info_map"
-                            AND info_map_t.owner_iid == install_sources_t.owner_iid
-                            AND install_sources_t.detail_value NOT IN (SELECT path FROM svn_item_t)
-                   UNION 
-                    SELECT svn_item_t.path as __path from svn_item_t
-                    ORDER BY __path
-                    """
+                INSERT INTO do_not_remove_prefixes_t (prefix)
+                SELECT DISTINCT install_sources_t.detail_value
+                FROM index_item_detail_t AS install_sources_t, index_item_detail_t as info_map_t
+                WHERE install_sources_t.detail_name == "install_sources"
+                        AND info_map_t.detail_name == "info_map"
+                        AND info_map_t.owner_iid == install_sources_t.owner_iid
+                        AND install_sources_t.detail_value NOT IN (SELECT path FROM svn_item_t)
+                """
             curs.execute(path_that_should_stay_q)
 
-            # this query will mark not to remove all files found in the sync folder that are not in the info_map
-            # database, BUT will exclude those files in folders that have their own info_map for
-            # items that are not currently being installed.
-
-            update_paths_q = f"""
+            # char(1114111) is the highest unicode code point, so all strings starting with prefix
+            # are >= prefix and < prefix || char(1114111)
+            update_prefixed_paths_q = """
                 UPDATE cache_folder_file_paths_t
                 SET remove = 0
-                WHERE cache_folder_file_paths_t.path  in
-                (SELECT cache_folder_file_paths_t.path FROM cache_folder_file_paths_t, do_not_remove_file_paths_t
-                WHERE cache_folder_file_paths_t.path LIKE do_not_remove_file_paths_t.path)
+                WHERE rowid IN
+                (SELECT cache_folder_file_paths_t.rowid
+                FROM do_not_remove_prefixes_t
+                JOIN cache_folder_file_paths_t
+                    ON cache_folder_file_paths_t.path >= do_not_remove_prefixes_t.prefix
+                    AND cache_folder_file_paths_t.path < do_not_remove_prefixes_t.prefix || char(1114111))
                 """
-            curs.execute(update_paths_q)
+            curs.execute(update_prefixed_paths_q)
 
             get_to_remove_q = """
                 SELECT path from cache_folder_file_paths_t
                 WHERE remove=1
+                ORDER BY rowid
                 """
             retVal.extend(self.db.select_and_fetchall(get_to_remove_q))
+            curs.execute("""DROP TABLE cache_folder_file_paths_t;""")
+            curs.execute("""DROP TABLE do_not_remove_prefixes_t;""")
 
         return retVal
 
-    def get_items(self, what="any") -> List[SVNRow]:
+    def iter_rows(self, query_text, query_params=None) -> Generator[SVNRow, None, None]:
+        """ execute query_text and yield an SVNRow for each row returned.
+            Rows are fetched from the cursor fetchmany_size at a time and SVNRow objects are
+            created as they are consumed, so memory does not depend on the number of rows returned.
+            svn_item_t should not be modified until iteration is done.
         """
-        get_items return all items or all file items or all dir items according to the 'what' parameter
+        if query_params is None:
+            query_params = {}
+        with self.db.selection() as curs:
+            curs.execute(query_text, query_params)
+            rows = curs.fetchmany(self.fetchmany_size)
+            while rows:
+                for row in rows:
+                    yield SVNRow(row)
+                rows = curs.fetchmany(self.fetchmany_size)
+
+    def iter_items(self, what="any") -> Generator[SVNRow, None, None]:
+        """
+        iter_items yield all items or all file items or all dir items according to the 'what' parameter
         :param what: what type of items to return "file" - only files, "dir" - only dirs, "any" - all type of items
-        :return: all the items
         """
         if what not in ("any", "file", "dir"):
             raise ValueError(f"{what} not a valid filter for get_item")
 
         extra_condition = {"file": "WHERE fileFlag == 1", "dir": "WHERE fileFlag == 0"}.get(what, "")
-        with self.db.selection() as curs:
-            curs.execute(f"""
+        yield from self.iter_rows(f"""
                     SELECT * FROM svn_item_t
                     {extra_condition}
                     ORDER BY _id
                     """)
-            retVal = curs.fetchall()
-            retVal = self.SVNRowListToObjects(retVal)
-        return retVal
 
-    def get_required_items(self, what="any", get_unrequired=False) -> List[SVNRow]:
+    def get_items(self, what="any") -> List[SVNRow]:
         """
-        get_items return items that are marked as required
+        get_items return all items or all file items or all dir items according to the 'what' parameter
         :param what: what type of items to return "file" - only files, "dir" - only dirs, "any" - all type of items
         :return: all the items
         """
+        retVal = list(self.iter_items(what))
+        return retVal
+
+    def iter_required_items(self, what="any") -> Generator[SVNRow, None, None]:
+        """
+        iter_required_items yield items that are marked as required
+        :param what: what type of items to return "file" - only files, "dir" - only dirs, "any" - all type of items
+        """
         if what not in ("any", "file", "dir"):
             raise ValueError(f"{what} not a valid filter for get_item")
 
-        want_file = what in ("any", "file")
-        want_dir = what in ("any", "dir")
         extra_condition = {"file": "AND fileFlag == 1", "dir": "AND fileFlag == 0"}.get(what, "")
-        with self.db.selection() as curs:
-            curs.execute(f"""
+        yield from self.iter_rows(f"""
                     SELECT * FROM svn_item_t
                     WHERE required == 1
                     {extra_condition}
                     ORDER BY _id
                     """)
-            retVal = curs.fetchall()
-            retVal = self.SVNRowListToObjects(retVal)
-        return retVal
 
-    def get_unrequired_items(self, what="any") -> List[SVNRow]:
+    def get_required_items(self, what="any", get_unrequired=False) -> List[SVNRow]:
         """
-        get_items return items that are not marked as required
+        get_items return items that are marked as required
         :param what: what type of items to return "file" - only files, "dir" - only dirs, "any" - all type of items
         :return: all the items
         """
+        retVal = list(self.iter_required_items(what))
+        return retVal
+
+    def iter_unrequired_items(self, what="any") -> Generator[SVNRow, None, None]:
+        """
+        iter_unrequired_items yield items that are not marked as required
+        :param what: what type of items to return "file" - only files, "dir" - only dirs, "any" - all type of items
+        """
         if what not in ("any", "file", "dir"):
             raise ValueError(f"{what} not a valid filter for get_item")
 
-        want_file = what in ("any", "file")
-        want_dir = what in ("any", "dir")
         extra_condition = {"file": "AND fileFlag == 1", "dir": "AND fileFlag == 0"}.get(what, "")
-        with self.db.selection() as curs:
-            curs.execute(f"""
+        yield from self.iter_rows(f"""
                     SELECT * FROM svn_item_t
                     WHERE required == 0
                     {extra_condition}
                     ORDER BY _id
                     """)
-            retVal = curs.fetchall()
-            retVal = self.SVNRowListToObjects(retVal)
+
+    def get_unrequired_items(self, what="any") -> List[SVNRow]:
+        """
+        get_items return items that are not marked as required
+        :param what: what type of items to return "file" - only files, "dir" - only dirs, "any" - all type of items
+        :return: all the items
+        """
+        retVal = list(self.iter_unrequired_items(what))
         return retVal
 
     def get_exec_file_paths(self) -> List[str]:
@@ -924,11 +994,10 @@ class SVNTable(object):
         retVal = self.db.select_and_fetchall(query_text)
         return retVal
 
-    def get_download_items(self, what: str = "any") -> List[SVNRow]:
+    def iter_download_items(self, what: str = "any") -> Generator[SVNRow, None, None]:
         """
-        get_items applies a filter and return all items
+        iter_download_items yield items that are marked as need_download
         :param: what: one of "any", "file", "dir"
-        :return: all items returned by applying the filter called filter_name
         """
         if what not in ("any", "file", "dir"):
             raise ValueError(what + " not a valid filter for get_item")
@@ -954,10 +1023,15 @@ class SVNTable(object):
                 ORDER BY _id
                 """
 
-        with self.db.selection() as curs:
-            curs.execute(query_text)
-            retVal = curs.fetchall()
-            retVal = self.SVNRowListToObjects(retVal)
+        yield from self.iter_rows(query_text)
+
+    def get_download_items(self, what: str = "any") -> List[SVNRow]:
+        """
+        get_items applies a filter and return all items
+        :param: what: one of "any", "file", "dir"
+        :return: all items returned by applying the filter called filter_name
+        """
+        retVal = list(self.iter_download_items(what))
         return retVal
 
     def get_not_to_download_num_files_and_size(self) -> Tuple[int, int]:
@@ -1117,29 +1191,32 @@ class SVNTable(object):
             retVal = curs.execute(query_text, {'dir_path': dir_path}).fetchone()[0]
         return retVal
 
-    def get_items_in_dir(self, dir_path="", immediate_children_only=False) -> List[SVNRow]:
-        """ get all files in dir_path.
-            level_deep: how much to dig in. level_deep=1 will only get immediate files
-            :return: list of items in dir or empty list (if there aren't any) or None
-            if dir_path is not a dir
+    def iter_items_in_dir(self, dir_path="", immediate_children_only=False) -> Generator[SVNRow, None, None]:
+        """ yield all items in dir_path.
+            immediate_children_only: if True only yield items whose parent is dir_path
+            nothing is yielded if dir_path is not a dir
         """
-        retVal: List[SVNRow] = []
         if dir_path == "":
-            retVal = self.get_items(what="any")
+            yield from self.iter_items(what="any")
         else:
             root_dir_item = self.get_dir_item(item_path=dir_path)
             if root_dir_item is not None:
-                with self.db.selection() as curs:
-                    if immediate_children_only:
-                        query_text = self.get_immediate_child_items_q
-                    else:
-                        query_text = self.get_child_items_q
-                    query_text = query_text.format(another_filter="")
-                    curs.execute(query_text, {"parent_id": root_dir_item._id})
-                    retVal = curs.fetchall()
-                    retVal = self.SVNRowListToObjects(retVal)
+                if immediate_children_only:
+                    query_text = self.get_immediate_child_items_q
+                else:
+                    query_text = self.get_child_items_q
+                query_text = query_text.format(another_filter="")
+                yield from self.iter_rows(query_text, {"parent_id": root_dir_item._id})
             else:
                 log.warning(f"""{dir_path} was not found""")
+
+    def get_items_in_dir(self, dir_path="", immediate_children_only=False) -> List[SVNRow]:
+        """ get all files in dir_path.
+            level_deep: how much to dig in. level_deep=1 will only get immediate files
+            :return: list of items in dir or empty list (if there aren't any) or None
+            if dir_path is not a dir
+        """
+        retVal: List[SVNRow] = list(self.iter_items_in_dir(dir_path, immediate_children_only))
         return retVal
 
     def mark_required_for_dir(self, dir_path) -> int:
@@ -1205,20 +1282,51 @@ class SVNTable(object):
             retVal = curs.rowcount
         return retVal
 
-    def mark_need_download(self, progress_callback=None) -> None:
-        self.db.create_function("need_to_download_file", 2, utils.need_to_download_file)
-        # mark files that need download
+    @staticmethod
+    def _ids_of_files_that_need_download(candidates) -> List[int]:
+        """ candidates is a list of (_id, download_path, checksum) rows
+            return the _ids of the rows whose file is missing or has the wrong checksum
+        """
+        retVal = [candidate[0] for candidate in candidates if utils.need_to_download_file(candidate[1], candidate[2])]
+        return retVal
+
+    def mark_need_download(self, progress_callback=None, num_workers=None) -> None:
+        """ mark required files that are missing from disk or have wrong checksum as need_download,
+            and then mark the folders of these files.
+            Files are checked outside of sqlite, num_workers threads check groups of files concurrently.
+            num_workers defaults to config var NUM_CHECKSUM_WORKERS, 1 means check serially.
+        """
+        if num_workers is None:
+            num_workers = int(config_vars.get("NUM_CHECKSUM_WORKERS", 1))
         query_text = """
-            UPDATE svn_item_t
-            SET need_download = 1
+            SELECT _id, download_path, checksum
+            FROM svn_item_t
             WHERE required == 1
             AND ignore == 0
             AND fileFlag == 1
-            AND need_to_download_file(download_path, checksum)
+            ORDER BY _id
             """
-        with self.db.transaction("mark_need_download", progress_callback=progress_callback,
-                                 progress_callback_n_instructions=1024 * 10) as curs:
-            curs.execute(query_text)
+        with self.db.selection("mark_need_download_candidates") as curs:
+            candidates = curs.execute(query_text).fetchall()
+
+        ids_to_download = list()
+        group_size = 256
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(num_workers, 1)) as executor:
+            mapper = executor.map if num_workers > 1 else map
+            results = mapper(self._ids_of_files_that_need_download, utils.iter_grouper(group_size, candidates))
+            for group_num, ids_in_group in enumerate(results, start=1):
+                ids_to_download.extend(ids_in_group)
+                if progress_callback and group_num % 64 == 0:
+                    progress_callback(f"mark_need_download {group_num * group_size} of {len(candidates)}")
+
+        # mark files that need download
+        query_text = """
+            UPDATE svn_item_t
+            SET need_download = 1
+            WHERE _id == ?
+            """
+        with self.db.transaction("mark_need_download", progress_callback=progress_callback) as curs:
+            curs.executemany(query_text, ((_id,) for _id in ids_to_download))
         # mark folders of files that need download
         query_text = """
             WITH RECURSIVE get_parents(__PARENT_ID) AS
@@ -1384,9 +1492,8 @@ class SVNTable(object):
                     """, {"infomap_name": infomap_name})
 
     # TODO: orem mayb use this function
-    def get_items_for_default_infomap(self) -> List[SVNRow]:
-        with self.db.selection() as curs:
-            curs.execute("""
+    def iter_items_for_default_infomap(self) -> Generator[SVNRow, None, None]:
+        yield from self.iter_rows("""
                     SELECT * FROM svn_item_t
                     WHERE svn_item_t._id NOT IN (
                     SELECT svnitem_with_non_default_info_map._id FROM svn_item_t AS svnitem_with_non_default_info_map
@@ -1396,8 +1503,9 @@ class SVNTable(object):
                       AND index_item_detail_t.detail_name == 'info_map')
                     ORDER BY svn_item_t.path
                     """)
-            retVal = curs.fetchall()
-            retVal = self.SVNRowListToObjects(retVal)
+
+    def get_items_for_default_infomap(self) -> List[SVNRow]:
+        retVal = list(self.iter_items_for_default_infomap())
         return retVal
 
     def populate_IIDToSVNItem(self) -> None:
@@ -1464,6 +1572,86 @@ class SVNTable(object):
         with self.db.transaction() as curs:
             curs.executemany(query_text, items_to_update)
 
+    def set_download_locations_for_sources(self, download_sources, resolve_callback=None, progress_callback=None) -> int:
+        """ set download_path and download_root for all items of many sources with a few bulk queries.
+            download_sources is a list of (source, what, path_prefix, strip_len, download_root) where
+            what is one of:
+                "dir-any": all items (files and dirs) in source dir, or in the wtar files of the dir
+                "dir-file": all files in source dir, or in the wtar files of the dir
+                "file-path", "file-leaf": the source file or it's wtar files
+            for each item: download_path = path_prefix + item's path[strip_len:], or path_prefix + item's leaf for "file-leaf".
+            If an item belongs to more than one source, the last source in download_sources wins.
+            download_paths that still have a '$' are passed to resolve_callback.
+            returns the number of items updated
+        """
+        retVal = 0
+        with self.db.transaction(description="set_download_locations_for_sources", progress_callback=progress_callback) as curs:
+            curs.execute("""CREATE TEMP TABLE download_source_t
+                            (source_num INTEGER PRIMARY KEY, source TEXT, what TEXT,
+                             path_prefix TEXT, strip_len INTEGER, download_root TEXT)""")
+            curs.executemany("""INSERT INTO download_source_t (source_num, source, what, path_prefix, strip_len, download_root)
+                                VALUES (?, ?, ?, ?, ?, ?)""",
+                             ((source_num, *download_source) for source_num, download_source in enumerate(download_sources)))
+            curs.execute("""CREATE TEMP TABLE download_location_t
+                            (_id INTEGER PRIMARY KEY ON CONFLICT REPLACE, download_path TEXT, download_root TEXT)""")
+            # items are inserted by order of source_num, so for item in more than one source, the last source replaces
+            curs.execute("""
+                WITH RECURSIVE get_children(__ID, __SOURCE_NUM) AS
+                (
+                    SELECT first_item_t._id, download_source_t.source_num
+                    FROM svn_item_t AS first_item_t, download_source_t
+                    WHERE download_source_t.what IN ('dir-any', 'dir-file')
+                    AND first_item_t.unwtarred == download_source_t.source
+
+                    UNION
+
+                    SELECT child_item_t._id, get_children.__SOURCE_NUM
+                    FROM svn_item_t child_item_t, get_children
+                    WHERE child_item_t.parent_id = get_children.__ID
+                ),
+                items_of_sources(__ID, __SOURCE_NUM) AS
+                (
+                    SELECT __ID, __SOURCE_NUM
+                    FROM get_children
+
+                    UNION ALL
+
+                    SELECT svn_item_t._id, download_source_t.source_num
+                    FROM svn_item_t, download_source_t
+                    WHERE download_source_t.what IN ('file-path', 'file-leaf')
+                    AND svn_item_t.fileFlag == 1
+                    AND svn_item_t.unwtarred == download_source_t.source
+                )
+                INSERT INTO download_location_t (_id, download_path, download_root)
+                SELECT svn_item_t._id,
+                       download_source_t.path_prefix ||
+                            CASE download_source_t.what
+                                WHEN 'file-leaf' THEN svn_item_t.leaf
+                                ELSE substr(svn_item_t.path, download_source_t.strip_len + 1)
+                            END,
+                       download_source_t.download_root
+                FROM items_of_sources, svn_item_t, download_source_t
+                WHERE svn_item_t._id == items_of_sources.__ID
+                AND download_source_t.source_num == items_of_sources.__SOURCE_NUM
+                AND (download_source_t.what != 'dir-file' OR svn_item_t.fileFlag == 1)
+                ORDER BY download_source_t.source_num, svn_item_t._id
+                """)
+            if resolve_callback is not None:
+                unresolved = curs.execute("""SELECT _id, download_path FROM download_location_t
+                                             WHERE instr(download_path, '$') > 0""").fetchall()
+                curs.executemany("""UPDATE download_location_t SET download_path=? WHERE _id=?""",
+                                 ((resolve_callback(download_path), _id) for _id, download_path in unresolved))
+            curs.execute("""
+                UPDATE svn_item_t
+                SET download_path=(SELECT download_path FROM download_location_t WHERE download_location_t._id == svn_item_t._id),
+                    download_root=(SELECT download_root FROM download_location_t WHERE download_location_t._id == svn_item_t._id)
+                WHERE _id IN (SELECT _id FROM download_location_t)
+                """)
+            retVal = curs.rowcount
+            curs.execute("""DROP TABLE download_location_t""")
+            curs.execute("""DROP TABLE download_source_t""")
+        return retVal
+
     def SVNRowListToObjects(self, svn_row_list) -> List[SVNRow]:
         retVal = [SVNRow(item) for item in svn_row_list]
         return retVal
@@ -1590,3 +1778,40 @@ class SVNTable(object):
             sync_base_url = self.get_sync_base_url_for_iid(file_item.needed_for_iid, "$(SYNC_BASE_URL)")
             retVal = '/'.join(utils.make_one_list(sync_base_url, repo_rev_folder_hierarchy, file_item.path))
         return retVal
+
+    def iter_sync_urls_for_download_files(self, default_url: str = "$(SYNC_BASE_URL)") -> Generator[Tuple[str, str, int, str], None, None]:
+        """ yield (url, download_path, size, checksum) for each file marked as need_download, ordered by _id.
+            Same urls as calling get_sync_url_for_file_item for each item of get_download_items(what="file"),
+            but the sync_base_url of each file's iid is joined in a single query instead of a query per iid,
+            and only the needed columns are read - no SVNRow objects are created.
+            Resolved base urls and repo-rev hierarchies are calculated once per distinct value.
+        """
+        query_text = """
+            SELECT svn_item_t.url, svn_item_t.revision, svn_item_t.path,
+                   svn_item_t.download_path, svn_item_t.size, svn_item_t.checksum,
+                   base_url_t.the_url
+            FROM svn_item_t
+            LEFT JOIN (SELECT owner_iid, detail_value AS the_url, min(generation) AS gen
+                       FROM index_item_detail_t
+                       WHERE detail_name == 'sync_base_url'
+                       GROUP BY owner_iid) AS base_url_t
+                ON base_url_t.owner_iid == svn_item_t.needed_for_iid
+            WHERE svn_item_t.need_download == 1
+            AND svn_item_t.fileFlag == 1
+            ORDER BY svn_item_t._id
+            """
+        resolved_base_urls = dict()
+        with self.db.selection() as curs:
+            curs.execute(query_text)
+            rows = curs.fetchmany(self.fetchmany_size)
+            while rows:
+                for url, revision, path, download_path, size, checksum, base_url in rows:
+                    if url is None:
+                        if base_url is None:
+                            base_url = default_url
+                        resolved_base_url = resolved_base_urls.get(base_url)
+                        if resolved_base_url is None:
+                            resolved_base_url = resolved_base_urls[base_url] = config_vars.resolve_str(base_url)
+                        url = f"{resolved_base_url}/{self.repo_rev_to_folder_hierarchy(revision)}/{path}"
+                    yield url, download_path, size, checksum
+                rows = curs.fetchmany(self.fetchmany_size)
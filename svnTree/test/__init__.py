@@ -1,3 +1,3 @@
 from .test_SVNTree import TestSVNTree
-from .test_SVNItem import TestSVNItem
-
+from .test_svnTable import TestSVNTableMarkNeedDownload, TestSVNTableDBProfiles, TestSVNTableRedundantSyncFiles, TestSVNTableIterators, TestSVNTableSyncUrls, TestSVNTableDownloadLocations
+from .test_infoMapDelta import TestInfoMapDelta
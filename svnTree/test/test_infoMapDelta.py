@@ -0,0 +1,99 @@
+#!/usr/bin/env python3.9
+
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from svnTree import write_info_map_delta, read_info_map_delta_header, info_map_state_comments, read_info_map_state
+from .test_svnTable import create_svn_table
+
+
+def info_map_text(items):
+    return "".join(f"{line}\n" for line in items)
+
+
+class TestInfoMapDelta(unittest.TestCase):
+    fields = ('path', 'flags', 'revision', 'checksum', 'size')
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.old_folder = self.temp_dir.joinpath("old")
+        self.new_folder = self.temp_dir.joinpath("new")
+        old_main = ["Mac, d, 1", "Mac/A, d, 1", "Mac/B, d, 3"]
+        new_main = ["Mac, d, 1", "Mac/A, d, 1", "Mac/B, d, 4", "Mac/C, d, 4"]
+        for i in range(50):
+            old_main.append(f"Mac/A/file_{i}.txt, f, 1, {i:040x}, {i}")
+            if i % 10 == 3:  # changed checksum and revision
+                new_main.append(f"Mac/A/file_{i}.txt, f, 4, {i + 1000:040x}, {i + 1}")
+            elif i % 10 == 7:  # changed flags only
+                new_main.append(f"Mac/A/file_{i}.txt, fx, 1, {i:040x}, {i}")
+            elif i % 10 != 5:  # i % 10 == 5 removed
+                new_main.append(f"Mac/A/file_{i}.txt, f, 1, {i:040x}, {i}")
+        new_main.extend(("Mac/C/added.txt, f, 4, 0123456789abcdef0123456789abcdef01234567, 17",
+                         "Mac/C/added.wtar.aa, f, 4, 0123456789abcdef0123456789abcdef01234567, 17",
+                         "Mac/C/link.symlink, fs, 4, 0123456789abcdef0123456789abcdef01234567, 3"))
+        old_product = ["Mac/P, d, 2", "Mac/P/p.txt, f, 2, 0123456789abcdef0123456789abcdef01234567, 5"]
+        new_product = ["Mac/P, d, 4", "Mac/P/p.txt, f, 4, 89abcdef0123456789abcdef0123456789abcdef, 6", "Mac/P/q.txt, f, 4, 89abcdef0123456789abcdef0123456789abcdef, 7"]
+        other_product = ["Mac/O, d, 4", "Mac/O/o.txt, f, 4, 89abcdef0123456789abcdef0123456789abcdef, 8"]
+        self.old_texts = {"info_map.txt": info_map_text(old_main), "P_info_map.txt": info_map_text(old_product)}
+        self.new_texts = {"info_map.txt": info_map_text(new_main), "P_info_map.txt": info_map_text(new_product), "O_info_map.txt": info_map_text(other_product)}
+        for folder, texts in ((self.old_folder, self.old_texts), (self.new_folder, self.new_texts)):
+            folder.mkdir()
+            for name, text in texts.items():
+                folder.joinpath(name).write_text(text)
+        self.delta_path = self.temp_dir.joinpath("info_map.delta")
+        self.num_changes = write_info_map_delta(self.delta_path, 3, 4, [(name, self.old_folder.joinpath(name), self.new_folder.joinpath(name))
+                                                                        for name in ("info_map.txt", "P_info_map.txt", "O_info_map.txt")])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def table_items(self, table):
+        return sorted(item.str_specific_fields(self.fields) for item in table.get_items())
+
+    def test_header(self):
+        header = read_info_map_delta_header(self.delta_path)
+        self.assertEqual((3, 4), (header.from_repo_rev, header.to_repo_rev))
+        self.assertEqual(["info_map.txt", "P_info_map.txt", "O_info_map.txt"], list(header.info_maps))
+        self.assertEqual(("", 2), (header.info_maps["O_info_map.txt"][0], header.info_maps["O_info_map.txt"][2]))
+        self.assertEqual(52, header.info_maps["info_map.txt"][2])
+        self.assertNotEqual(header.info_maps["P_info_map.txt"][0], header.info_maps["P_info_map.txt"][1])
+        # Mac/B, Mac/C, 3 added, 5 removed, 5 changed checksum, 5 changed flags in main; 2 changed, 1 added in P; 2 added in O
+        self.assertEqual(25, self.num_changes)
+        self.delta_path.write_text("just, some, text\n")
+        with self.assertRaises(ValueError):
+            read_info_map_delta_header(self.delta_path)
+
+    def test_apply_delta(self):
+        old_table = create_svn_table(self.old_texts["info_map.txt"] + self.old_texts["P_info_map.txt"])
+        with open(self.delta_path, "r") as rfd:
+            num_changes = old_table.read_from_info_map_delta(rfd, {"info_map.txt", "P_info_map.txt"})
+        self.assertEqual(23, num_changes)  # changes to O_info_map.txt are not applied
+        old_table.create_indexes()
+        new_table = create_svn_table(self.new_texts["info_map.txt"] + self.new_texts["P_info_map.txt"])
+        self.assertEqual(self.table_items(new_table), self.table_items(old_table))
+        self.assertEqual(new_table.num_items("all-items"), old_table.num_items("all-items"))
+        # fields calculated when reading should also be the same
+        for path in ("Mac/C/added.wtar.aa", "Mac/C/link.symlink", "Mac/A/file_7.txt", "Mac/P/q.txt"):
+            new_item, applied_item = new_table.get_any_item(path), old_table.get_any_item(path)
+            for field in ("fileFlag", "wtarFlag", "unwtarred", "symlinkFlag", "level", "parent", "leaf"):
+                self.assertEqual(getattr(new_item, field), getattr(applied_item, field), f"{path} {field}")
+        self.assertEqual(old_table.get_any_item("Mac/C")._id, old_table.get_any_item("Mac/C/added.txt").parent_id)
+
+    def test_info_map_state(self):
+        have_path = self.temp_dir.joinpath("have_info_map.txt")
+        self.assertIsNone(read_info_map_state(have_path))
+        table = create_svn_table(self.new_texts["info_map.txt"])
+        table.comments.append("Original file info_map.txt")
+        table.comments.extend(info_map_state_comments("4", {"info_map.txt": "0123456789abcdef0123456789abcdef01234567", "P_info_map.txt": "89abcdef0123456789abcdef0123456789abcdef"}))
+        table.write_to_file(os.fspath(have_path), field_to_write=self.fields)
+        self.assertEqual((4, {"info_map.txt": "0123456789abcdef0123456789abcdef01234567", "P_info_map.txt": "89abcdef0123456789abcdef0123456789abcdef"}),
+                         read_info_map_state(have_path))
+        # comments are ignored when reading have_info_map
+        read_table = create_svn_table(have_path.read_text())
+        self.assertEqual(self.table_items(table), self.table_items(read_table))
+        have_path.write_text(self.new_texts["info_map.txt"])
+        self.assertIsNone(read_info_map_state(have_path))
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3.9
+
+
+import os
+import io
+import shutil
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+
+from db.dbMaster import DBMaster
+from svnTree import SVNTable
+from configVar import config_vars
+from pyinstl.curlHelper import CUrlHelper
+
+
+defaults_folder = Path(__file__).parent.parent.parent.joinpath("defaults")
+
+
+def create_svn_table(info_map_text, db_url=":memory:", performance_profile=None):
+    """ create an SVNTable in a db and read info_map_text into it """
+    db = DBMaster(db_url, defaults_folder, performance_profile=performance_profile)
+    table = SVNTable(db)
+    rfd = io.StringIO(info_map_text)
+    rfd.name = "test_info_map.txt"
+    table.read_from_text(rfd)
+    table.create_indexes()
+    return table
+
+
+class TestSVNTableMarkNeedDownload(unittest.TestCase):
+    def setUp(self):
+        self.sync_dir = tempfile.mkdtemp()
+        info_map_lines = ["Mac, d, 1", "Mac/A, d, 1", "Mac/B, d, 1", "Mac/B/C, d, 1"]
+        self.expected_need_download = set()
+        for i in range(600):
+            folder = ("Mac/A", "Mac/B", "Mac/B/C")[i % 3]
+            file_path = f"{folder}/file_{i}.txt"
+            contents = f"contents of file {i}".encode()
+            checksum = hashlib.sha1(contents).hexdigest()
+            info_map_lines.append(f"{file_path}, f, 1, {checksum}, {len(contents)}")
+            disk_path = os.path.join(self.sync_dir, file_path)
+            if i % 7 == 0:  # missing file
+                self.expected_need_download.add(file_path)
+                continue
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            with open(disk_path, "wb") as wfd:
+                if i % 11 == 0:  # file with wrong contents
+                    wfd.write(contents + b"!")
+                    self.expected_need_download.add(file_path)
+                else:
+                    wfd.write(contents)
+        self.info_map_text = "\n".join(info_map_lines) + "\n"
+
+    def tearDown(self):
+        shutil.rmtree(self.sync_dir, ignore_errors=True)
+
+    def prepare_table(self):
+        table = create_svn_table(self.info_map_text)
+        with table.db.transaction() as curs:
+            curs.execute("UPDATE svn_item_t SET required=1")
+        table.update_downloads([{"_id": item._id, "download_root": self.sync_dir, "download_path": os.path.join(self.sync_dir, item.path)}
+                                for item in table.get_items(what="file")])
+        return table
+
+    def need_download_paths(self, table):
+        return {item.path for item in table.get_download_items()}
+
+    def test_serial_and_parallel_results_match(self):
+        serial_table = self.prepare_table()
+        serial_table.mark_need_download(num_workers=1)
+        serial_result = self.need_download_paths(serial_table)
+
+        parallel_table = self.prepare_table()
+        parallel_table.mark_need_download(num_workers=4)
+        parallel_result = self.need_download_paths(parallel_table)
+
+        self.assertEqual(serial_result, parallel_result)
+        expected_files = self.expected_need_download
+        self.assertEqual(expected_files, {item.path for item in parallel_table.get_download_items(what="file")})
+        # all folders containing files that need download should also be marked
+        self.assertEqual({"Mac", "Mac/A", "Mac/B", "Mac/B/C"}, {item.path for item in parallel_table.get_download_items(what="dir")})
+
+    def test_ignored_and_unrequired_files_not_marked(self):
+        table = self.prepare_table()
+        with table.db.transaction() as curs:
+            curs.execute("UPDATE svn_item_t SET required=0 WHERE path LIKE 'Mac/A/%'")
+            curs.execute("UPDATE svn_item_t SET ignore=1 WHERE path LIKE 'Mac/B/C/%'")
+        table.mark_need_download(num_workers=3)
+        expected_files = {path for path in self.expected_need_download if path.startswith("Mac/B/file_")}
+        self.assertEqual(expected_files, {item.path for item in table.get_download_items(what="file")})
+        self.assertEqual({"Mac", "Mac/B"}, {item.path for item in table.get_download_items(what="dir")})
+
+
+class TestSVNTableDBProfiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_same_contents_for_all_profiles(self):
+        info_map_text = "Mac, d, 1\nMac/A, d, 2\nMac/A/a.txt, f, 2, 0123456789abcdef0123456789abcdef01234567, 17\nMac/A/b.wtar.aa, f, 1, 0123456789abcdef0123456789abcdef01234567, 18\n"
+        contents_by_profile = dict()
+        for profile in DBMaster.performance_profiles:
+            for db_url in (":memory:", os.path.join(self.temp_dir, f"{profile}.sqlite")):
+                table = create_svn_table(info_map_text, db_url=db_url, performance_profile=profile)
+                contents_by_profile[(profile, db_url)] = [str(item) for item in table.get_items()]
+                table.db.close()
+        first_contents = list(contents_by_profile.values())[0]
+        self.assertEqual(4, len(first_contents))
+        for profile_and_url, contents in contents_by_profile.items():
+            self.assertEqual(first_contents, contents, f"different contents for {profile_and_url}")
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            create_svn_table("", performance_profile="warp-speed")
+
+
+class TestDBMasterStatistics(unittest.TestCase):
+    def tearDown(self):
+        if "PRINT_STATISTICS_DB" in config_vars:
+            del config_vars["PRINT_STATISTICS_DB"]
+
+    def test_set_after_db_created(self):
+        """ PRINT_STATISTICS_DB is read when transactions are done, not only when the db is created """
+        table = create_svn_table("Mac, d, 1\nMac/a.txt, f, 1, 0123456789abcdef0123456789abcdef01234567, 17\n")
+        table.db.select_and_fetchall("SELECT path FROM svn_item_t")
+        self.assertEqual({}, table.db.statistics)
+        config_vars["PRINT_STATISTICS_DB"] = "yes"
+        table.db.select_and_fetchall("SELECT path FROM svn_item_t")
+        self.assertEqual(1, sum(stat.count for stat in table.db.statistics.values()))
+        config_vars["PRINT_STATISTICS_DB"] = "no"
+        table.db.select_and_fetchall("SELECT path FROM svn_item_t")
+        self.assertEqual(1, sum(stat.count for stat in table.db.statistics.values()))
+
+
+class TestSVNTableRedundantSyncFiles(unittest.TestCase):
+    like_query = """
+        SELECT cache_t.path FROM cache_t
+        WHERE cache_t.path NOT IN
+        (SELECT cache_t.path FROM cache_t,
+            (SELECT install_sources_t.detail_value||"%" AS path
+            FROM index_item_detail_t AS install_sources_t, index_item_detail_t as info_map_t
+            WHERE install_sources_t.detail_name == "install_sources"
+                    AND info_map_t.detail_name == "info_map"
+                    AND info_map_t.owner_iid == install_sources_t.owner_iid
+                    AND install_sources_t.detail_value NOT IN (SELECT path FROM svn_item_t)
+            UNION
+            SELECT svn_item_t.path AS path FROM svn_item_t) AS do_not_remove_t
+        WHERE cache_t.path LIKE do_not_remove_t.path)
+        ORDER BY cache_t.rowid
+        """
+
+    def setUp(self):
+        info_map_text = "Mac, d, 1\nMac/A, d, 1\nMac/A/a.txt, f, 1, 0123456789abcdef0123456789abcdef01234567, 17\nMac/A/b.txt, f, 1, 0123456789abcdef0123456789abcdef01234567, 17\n"
+        self.table = create_svn_table(info_map_text)
+        with self.table.db.transaction() as curs:
+            curs.executemany("INSERT INTO index_item_t (iid) VALUES (?)", (("MAIN_IID",), ("CUSTOM_IID",), ("OTHER_IID",)))
+            details = [("MAIN_IID", "install_sources", "Mac/A"),
+                       ("CUSTOM_IID", "install_sources", "Mac/Custom"),
+                       ("CUSTOM_IID", "install_sources", "Mac/Other Custom"),
+                       ("CUSTOM_IID", "info_map", "Custom_info_map.txt"),
+                       ("OTHER_IID", "install_sources", "Mac/Not Custom")]
+            curs.executemany("""INSERT INTO index_item_detail_t (original_iid, owner_iid, os_id, detail_name, detail_value)
+                                VALUES (?, ?, 0, ?, ?)""", ((iid, iid, name, value) for iid, name, value in details))
+        self.files_to_check = ["Mac/A/a.txt", "Mac/A/c.txt", "mac/a/B.TXT", "Mac/A",
+                               "Mac/Custom/x.txt", "Mac/Custom/sub/y.txt", "Mac/CustomMore/z.txt", "mac/custom/w.txt",
+                               "Mac/Other Custom/q.txt", "Mac/Other", "Mac/Not Custom/r.txt", "Mac/Cust.txt", "Mac/B/a.txt"]
+
+    def test_same_result_as_like(self):
+        with self.table.db.transaction() as curs:
+            curs.execute("CREATE TEMP TABLE cache_t (path TEXT)")
+            curs.executemany("INSERT INTO cache_t (path) VALUES (?)", ((p,) for p in self.files_to_check))
+        expected = self.table.db.select_and_fetchall(self.like_query)
+        self.assertEqual(["Mac/A/c.txt", "Mac/Other", "Mac/Not Custom/r.txt", "Mac/Cust.txt", "Mac/B/a.txt"], expected)
+        self.assertEqual(expected, self.table.get_files_that_should_be_removed_from_sync_folder(self.files_to_check))
+        # second call should work as well, temp tables are dropped
+        self.assertEqual(expected, self.table.get_files_that_should_be_removed_from_sync_folder(self.files_to_check))
+
+    def test_wildcard_characters_are_literal(self):
+        # with LIKE, _ and % in paths were wildcards
+        result = self.table.get_files_that_should_be_removed_from_sync_folder(["Mac/A/a_txt", "Mac/A/%", "Mac/Custom%/x.txt"])
+        self.assertEqual(["Mac/A/a_txt", "Mac/A/%"], result)
+
+    def test_empty(self):
+        self.assertEqual([], self.table.get_files_that_should_be_removed_from_sync_folder([]))
+
+
+class TestSVNTableIterators(unittest.TestCase):
+    def setUp(self):
+        info_map_lines = ["Mac, d, 1", "Mac/A, d, 1", "Mac/B, d, 1", "Mac/B/C, d, 1"]
+        for i in range(100):
+            folder = ("Mac/A", "Mac/B", "Mac/B/C")[i % 3]
+            info_map_lines.append(f"{folder}/file_{i}.txt, f, 1, 0123456789abcdef0123456789abcdef01234567, {i}")
+        self.table = create_svn_table("\n".join(info_map_lines) + "\n")
+        self.table.fetchmany_size = 7  # so rows are fetched in several batches
+        with self.table.db.transaction() as curs:
+            curs.execute("UPDATE svn_item_t SET required=1 WHERE _id % 2 == 0")
+            curs.execute("UPDATE svn_item_t SET need_download=1 WHERE _id % 5 == 0")
+
+    def as_comparable(self, items):
+        return [(item._id, str(item)) for item in items]
+
+    def test_iter_same_as_get(self):
+        for what in ("any", "file", "dir"):
+            self.assertEqual(self.as_comparable(self.table.get_items(what)), self.as_comparable(self.table.iter_items(what)))
+            self.assertEqual(self.as_comparable(self.table.get_required_items(what)), self.as_comparable(self.table.iter_required_items(what)))
+            self.assertEqual(self.as_comparable(self.table.get_unrequired_items(what)), self.as_comparable(self.table.iter_unrequired_items(what)))
+            self.assertEqual(self.as_comparable(self.table.get_download_items(what)), self.as_comparable(self.table.iter_download_items(what)))
+        self.assertEqual(104, len(self.as_comparable(self.table.iter_items())))
+        self.assertEqual(52, len(self.as_comparable(self.table.iter_required_items())))
+        for dir_path, immediate_children_only in (("", False), ("Mac/B", False), ("Mac/B", True), ("Mac/B/C", True), ("Mac/Z", False)):
+            self.assertEqual(self.as_comparable(self.table.get_items_in_dir(dir_path, immediate_children_only)),
+                             self.as_comparable(self.table.iter_items_in_dir(dir_path, immediate_children_only)))
+        self.assertEqual(34, len(self.as_comparable(self.table.iter_items_in_dir("Mac/B", immediate_children_only=True))))
+
+    def test_iter_is_lazy(self):
+        items = self.table.iter_items(what="file")
+        first_item = next(items)
+        self.assertEqual("Mac/A/file_0.txt", first_item.path)
+        items.close()  # stop before all rows were read
+        with self.assertRaises(ValueError):
+            next(self.table.iter_items(what="fish"))
+
+    def test_write_to_file_from_iterator(self):
+        list_wfd, iter_wfd = io.StringIO(), io.StringIO()
+        list_wfd.name = iter_wfd.name = "info_map.txt"
+        self.table.write_as_text(list_wfd, self.table.get_required_items(), comments=False, field_to_write=("path", "flags", "revision", "size"))
+        self.table.write_as_text(iter_wfd, self.table.iter_required_items(), comments=False, field_to_write=("path", "flags", "revision", "size"))
+        self.assertEqual(list_wfd.getvalue(), iter_wfd.getvalue())
+        self.assertEqual(52, len(iter_wfd.getvalue().splitlines()))
+
+
+class TestSVNTableSyncUrls(unittest.TestCase):
+    config_var_values = {"SYNC_BASE_URL": "http://sync.example.com/repo",
+                         "CUSTOM_SYNC_URL": "https://custom.example.com/other repo",
+                         "NUM_DIGITS_REPO_REV_HIERARCHY": "4",
+                         "NUM_DIGITS_PER_FOLDER_REPO_REV_HIERARCHY": "2"}
+
+    def setUp(self):
+        self.saved_config_vars = {name: config_vars[name].raw() for name in self.config_var_values if name in config_vars}
+        for name, value in self.config_var_values.items():
+            config_vars[name] = value
+        info_map_lines = ["Mac, d, 1", "Mac/A, d, 1", "Mac/B, d, 1"]
+        for i in range(60):
+            folder = ("Mac/A", "Mac/B")[i % 2]
+            file_name = "Info.xml" if i % 10 == 0 else f"file {i}.txt"
+            url = f", http://predefined.example.com/file_{i}.txt" if i % 9 == 0 else ""
+            info_map_lines.append(f"{folder}/{i}/{file_name}, f, {i % 7 + 1}, 0123456789abcdef0123456789abcdef01234567, {i}{url}")
+        self.table = create_svn_table("\n".join(info_map_lines) + "\n")
+        self.table.fetchmany_size = 7  # so rows are fetched in several batches
+        with self.table.db.transaction() as curs:
+            curs.executemany("INSERT INTO index_item_t (iid) VALUES (?)", (("MAIN_IID",), ("CUSTOM_IID",), ("NO_URL_IID",)))
+            details = [("CUSTOM_IID", "sync_base_url", "$(CUSTOM_SYNC_URL)", 0),
+                       ("CUSTOM_IID", "sync_base_url", "http://not.used.example.com", 1),
+                       ("NO_URL_IID", "install_sources", "Mac/B", 0)]
+            curs.executemany("""INSERT INTO index_item_detail_t (original_iid, owner_iid, os_id, detail_name, detail_value, generation)
+                                VALUES (?, ?, 0, ?, ?, ?)""", ((iid, iid, name, value, gen) for iid, name, value, gen in details))
+            curs.execute("UPDATE svn_item_t SET need_download=1, download_path='/sync/'||path WHERE fileFlag==1 AND _id % 3 != 0")
+            curs.execute("UPDATE svn_item_t SET needed_for_iid=(CASE _id % 4 WHEN 0 THEN 'MAIN_IID' WHEN 1 THEN 'CUSTOM_IID' WHEN 2 THEN 'NO_URL_IID' END)")
+
+    def tearDown(self):
+        for name in self.config_var_values:
+            del config_vars[name]
+            if name in self.saved_config_vars:
+                config_vars[name] = self.saved_config_vars[name]
+
+    def test_same_as_per_item_urls(self):
+        per_item = [(self.table.get_sync_url_for_file_item(item), item.download_path, item.size, item.checksum)
+                    for item in self.table.get_download_items(what="file")]
+        bulk = list(self.table.iter_sync_urls_for_download_files())
+        self.assertEqual(per_item, bulk)
+        self.assertEqual(40, len(bulk))
+        urls = [url for url, _, _, _ in bulk]
+        self.assertIn("http://sync.example.com/repo/00/04/Mac/B/3/file 3.txt", urls)
+        self.assertIn("https://custom.example.com/other repo/00/07/Mac/B/13/file 13.txt", urls)
+        self.assertIn("http://predefined.example.com/file_9.txt", urls)
+
+    def test_same_download_urls(self):
+        per_item_helper, bulk_helper = CUrlHelper(), CUrlHelper()
+        for item in self.table.get_download_items(what="file"):
+            source_url = self.table.get_sync_url_for_file_item(item)
+            per_item_helper.add_download_url(source_url, item.download_path, size=item.size, download_last=source_url.endswith('Info.xml'), checksum=item.checksum)
+        self.assertEqual(40, bulk_helper.add_download_urls(self.table.iter_sync_urls_for_download_files()))
+        self.assertEqual(per_item_helper.urls_to_download, bulk_helper.urls_to_download)
+        self.assertEqual(per_item_helper.urls_to_download_last, bulk_helper.urls_to_download_last)
+        self.assertEqual(3, len(bulk_helper.urls_to_download_last))
+
+
+def resolve_x(str_to_resolve):
+    return str_to_resolve.replace("$(X)", "x-resolved")
+
+
+def per_item_download_locations(table, sync_sources, local_repo_sync_dir):
+    """ download_path and download_root of items calculated item by item, as was done by InstlClient.set_sync_locations_for_active_items
+        sync_sources: list of (source, source_tag, direct_sync, resolved_install_folder)
+    """
+    items_to_update = list()
+    for source, source_tag, direct_sync, resolved_install_folder in sync_sources:
+        resolved_source_parts = source.split("/")
+        if source_tag in ('!dir', '!dir_cont'):
+            if direct_sync:
+                item_paths = table.get_recursive_paths_in_dir(dir_path=source, what="any")
+                if source_tag == '!dir':
+                    source_parent = "/".join(resolved_source_parts[:-1])
+                    for item in item_paths:
+                        items_to_update.append({"_id": item['_id'],
+                                                "download_path": resolve_x("/".join((resolved_install_folder, item['path'][len(source_parent)+1:]))),
+                                                "download_root": resolve_x("/".join((resolved_install_folder, resolved_source_parts[-1])))})
+                else:
+                    for item in item_paths:
+                        items_to_update.append({"_id": item['_id'],
+                                                "download_path": resolve_x("/".join((resolved_install_folder, item['path'][len(source)+1:]))),
+                                                "download_root": resolved_install_folder})
+            else:
+                for item in table.get_recursive_paths_in_dir(dir_path=source):
+                    items_to_update.append({"_id": item['_id'],
+                                            "download_path": resolve_x("/".join((local_repo_sync_dir, item['path']))),
+                                            "download_root": None})
+        elif source_tag == '!file':
+            for item in table.get_required_paths_for_file(source):
+                if direct_sync:
+                    items_to_update.append({"_id": item['_id'],
+                                            "download_path": resolve_x("/".join((resolved_install_folder, item['leaf']))),
+                                            "download_root": resolve_x(resolved_install_folder)})
+                else:
+                    items_to_update.append({"_id": item['_id'],
+                                            "download_path": resolve_x("/".join((local_repo_sync_dir, item['path']))),
+                                            "download_root": None})
+    table.update_downloads(items_to_update)
+
+
+def bulk_download_locations(table, sync_sources, local_repo_sync_dir):
+    """ same as per_item_download_locations, with SVNTable.set_download_locations_for_sources """
+    download_sources = list()
+    for source, source_tag, direct_sync, resolved_install_folder in sync_sources:
+        resolved_source_parts = source.split("/")
+        if source_tag == '!dir' and direct_sync:
+            download_sources.append((source, "dir-any", resolved_install_folder + "/", len("/".join(resolved_source_parts[:-1])) + 1,
+                                     resolve_x("/".join((resolved_install_folder, resolved_source_parts[-1])))))
+        elif source_tag == '!dir_cont' and direct_sync:
+            download_sources.append((source, "dir-any", resolved_install_folder + "/", len(source) + 1, resolved_install_folder))
+        elif source_tag in ('!dir', '!dir_cont'):
+            download_sources.append((source, "dir-file", local_repo_sync_dir + "/", 0, None))
+        elif direct_sync:
+            download_sources.append((source, "file-leaf", resolved_install_folder + "/", 0, resolve_x(resolved_install_folder)))
+        else:
+            download_sources.append((source, "file-path", local_repo_sync_dir + "/", 0, None))
+    return table.set_download_locations_for_sources(download_sources, resolve_callback=resolve_x)
+
+
+class TestSVNTableDownloadLocations(unittest.TestCase):
+    local_repo_sync_dir = "/Library/Caches/instl/sync"
+
+    def setUp(self):
+        info_map_lines = ["Mac, d, 1", "Mac/Plugins, d, 1", "Mac/Shared, d, 1", "Mac/Icons, d, 1", "Mac/Icons/$(X), d, 1"]
+        for bundle_num in range(6):
+            bundle = f"Mac/Plugins/P{bundle_num}.bundle"
+            if bundle_num % 3 == 2:  # wtarred bundle
+                info_map_lines.extend(f"{bundle}.wtar.a{part}, f, 2, 0123456789abcdef0123456789abcdef01234567, {part_num}"
+                                      for part_num, part in enumerate("abc"))
+            else:
+                info_map_lines.extend((f"{bundle}, d, 1", f"{bundle}/Contents, d, 1", f"{bundle}/Contents/Resources, d, 1"))
+                for file_num in range(5):
+                    info_map_lines.append(f"{bundle}/Contents/file_{file_num}.txt, f, 1, 0123456789abcdef0123456789abcdef01234567, {file_num}")
+                    info_map_lines.append(f"{bundle}/Contents/Resources/res {file_num}.png, f, 1, 0123456789abcdef0123456789abcdef01234567, {file_num}")
+        info_map_lines.extend(("Mac/Shared/lib.dylib, f, 1, 0123456789abcdef0123456789abcdef01234567, 1",
+                               "Mac/Shared/big.dat.wtar.aa, f, 1, 0123456789abcdef0123456789abcdef01234567, 1",
+                               "Mac/Shared/big.dat.wtar.ab, f, 1, 0123456789abcdef0123456789abcdef01234567, 1",
+                               "Mac/Icons/icon.png, f, 1, 0123456789abcdef0123456789abcdef01234567, 1",
+                               "Mac/Icons/$(X)/icon.png, f, 1, 0123456789abcdef0123456789abcdef01234567, 1"))
+        self.info_map_text = "\n".join(info_map_lines) + "\n"
+        # sources overlap, so the order of the sources matters
+        self.sync_sources = [("Mac/Plugins/P0.bundle", "!dir", True, "/Applications/Plugins"),
+                             ("Mac/Plugins/P1.bundle", "!dir_cont", True, "/Applications/P1 plugin"),
+                             ("Mac/Plugins/P3.bundle", "!dir", True, "/Applications/Plugins"),
+                             ("Mac/Plugins", "!dir", False, None),
+                             ("Mac/Plugins/P2.bundle", "!dir", True, "/Applications/Plugins"),
+                             ("Mac/Plugins/P4.bundle", "!dir", True, "/Applications/$(X)/Plugins"),
+                             ("Mac/Plugins/P5.bundle", "!dir_cont", True, "/Applications/P5"),
+                             ("Mac/Shared/lib.dylib", "!file", True, "/Applications/Shared"),
+                             ("Mac/Shared/big.dat", "!file", False, None),
+                             ("Mac/Shared/big.dat", "!file", True, "/Applications/$(X)"),
+                             ("Mac/Icons", "!dir_cont", False, None),
+                             ("Mac/Icons", "!dir", True, "/Applications/Icons"),
+                             ("Mac/Missing", "!dir", True, "/Applications/Missing"),
+                             ("Mac/Missing.txt", "!file", False, None)]
+
+    def download_locations(self, table):
+        with table.db.selection() as curs:
+            retVal = curs.execute("SELECT path, download_path, download_root FROM svn_item_t ORDER BY _id").fetchall()
+        return retVal
+
+    def test_same_as_per_item(self):
+        per_item_table = create_svn_table(self.info_map_text)
+        per_item_download_locations(per_item_table, self.sync_sources, self.local_repo_sync_dir)
+        bulk_table = create_svn_table(self.info_map_text)
+        num_updated = bulk_download_locations(bulk_table, self.sync_sources, self.local_repo_sync_dir)
+        per_item_locations = self.download_locations(per_item_table)
+        self.assertEqual(per_item_locations, self.download_locations(bulk_table))
+        self.assertEqual(sum(1 for path, download_path, download_root in per_item_locations if download_path is not None), num_updated)
+        bulk_locations = {path: (download_path, download_root) for path, download_path, download_root in self.download_locations(bulk_table)}
+        # P0, P1 & P3 sources are overridden by the later Mac/Plugins source, P2, P4 & P5 override it
+        self.assertEqual(("/Library/Caches/instl/sync/Mac/Plugins/P1.bundle/Contents/file_3.txt", None),
+                         bulk_locations["Mac/Plugins/P1.bundle/Contents/file_3.txt"])
+        self.assertEqual(("/Applications/x-resolved/Plugins/P4.bundle/Contents/Resources/res 1.png", "/Applications/x-resolved/Plugins/P4.bundle"),
+                         bulk_locations["Mac/Plugins/P4.bundle/Contents/Resources/res 1.png"])
+        self.assertEqual(("/Applications/Plugins/P2.bundle.wtar.ab", "/Applications/Plugins/P2.bundle"), bulk_locations["Mac/Plugins/P2.bundle.wtar.ab"])
+        self.assertEqual(("/Applications/x-resolved/big.dat.wtar.ab", "/Applications/x-resolved"), bulk_locations["Mac/Shared/big.dat.wtar.ab"])
+        self.assertEqual(("/Applications/Icons/Icons/x-resolved/icon.png", "/Applications/Icons/Icons"), bulk_locations["Mac/Icons/$(X)/icon.png"])
+        self.assertEqual((None, None), bulk_locations["Mac/Plugins"])
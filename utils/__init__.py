@@ -4,6 +4,8 @@ from .str_utils import *
 from .searchPaths import SearchPaths
 from .parallel_run import run_processes_in_parallel, run_process
 from .multi_file import MultiFileReader
+from .parallel_bz2 import ParallelBZ2Writer
+from .checksum_cache import ChecksumCache, checksum_cache
 from .extract_info import extract_binary_info, check_binaries_versions_in_folder, check_binaries_versions_filter_with_ignore_regexes, get_info_from_plugin
 from .ls import disk_item_listing, single_disk_item_listing
 from .log_utils import *
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3.9
+
+"""
+    ChecksumCache keeps sha1 checksums of files in a small sqlite file
+    so files that did not change since last time they were checksummed
+    do not have to be read again.
+
+    An entry is keyed by the file's absolute path and is valid only as long as
+    the file's size, modification time (in nanoseconds) and inode are the same
+    as they were when the checksum was calculated.
+    Invalidation rules:
+        - if any of size, mtime_ns or inode changed the entry is ignored and replaced
+          by the new checksum.
+        - if the file does not exist anymore the entry is removed.
+        - files that were modified less than racy_window_sec before the checksum was
+          calculated are not cached - a file might be modified again within the
+          file system's timestamp granularity without changing it's size or mtime.
+        - if the file changed while being checksummed (stat before != stat after)
+          the checksum is returned but not cached.
+        - if the cache file is corrupted or was created by a different schema version
+          it is recreated.
+
+    Until open() is called with a path to the cache file the cache is disabled:
+    get() always returns None and put() does nothing.
+
+    Usage:
+        utils.checksum_cache.open("/path/to/bookkeeping/checksum_cache.sqlite")
+        checksum = utils.checksum_cache.get(file_path)
+        if checksum is None:
+            ...calculate checksum...
+            utils.checksum_cache.put(file_path, stat_before, checksum)
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import atexit
+import logging
+
+log = logging.getLogger()
+
+
+class ChecksumCache(object):
+    schema_version = 1
+    create_table_q = """
+        CREATE TABLE IF NOT EXISTS checksum_t
+        (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER,
+            checksum TEXT
+        ) WITHOUT ROWID;
+        """
+    select_q = """SELECT size, mtime_ns, inode, checksum FROM checksum_t WHERE path=?"""
+    insert_q = """INSERT OR REPLACE INTO checksum_t (path, size, mtime_ns, inode, checksum) VALUES (?,?,?,?,?)"""
+    delete_q = """DELETE FROM checksum_t WHERE path=?"""
+
+    def __init__(self, racy_window_sec=2.0, commit_every=1024) -> None:
+        self.db_path = None
+        self.racy_window_ns = int(racy_window_sec * 1_000_000_000)
+        self.commit_every = commit_every
+        self.__conn = None
+        self.__lock = threading.Lock()
+        self.__num_uncommitted = 0
+        self.__registered_atexit = False
+        self.hits = 0
+        self.misses = 0
+
+    def is_enabled(self) -> bool:
+        return self.db_path is not None
+
+    def open(self, db_path) -> None:
+        """ set the path to the cache file, the file itself will be opened
+            (or created) on first access.
+        """
+        db_path = os.fspath(db_path) if db_path else None
+        if db_path != self.db_path:
+            self.close()
+            self.db_path = db_path
+            if not self.__registered_atexit:
+                atexit.register(self.close)
+                self.__registered_atexit = True
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__conn is not None:
+                try:
+                    self.__conn.commit()
+                    self.__conn.close()
+                except sqlite3.Error as ex:
+                    log.warning(f"ChecksumCache failed to close {self.db_path}, {ex}")
+                self.__conn = None
+                self.__num_uncommitted = 0
+
+    def disable(self) -> None:
+        self.close()
+        self.db_path = None
+
+    def clear(self) -> None:
+        with self.__lock:
+            conn = self.__get_conn()
+            if conn is not None:
+                conn.execute("DELETE FROM checksum_t")
+                conn.commit()
+
+    def __get_conn(self):
+        """ must be called while holding self.__lock """
+        if self.__conn is None and self.db_path is not None:
+            try:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                self.__conn = self.__connect()
+            except (sqlite3.Error, OSError) as ex:
+                log.warning(f"ChecksumCache recreating {self.db_path}, {ex}")
+                try:
+                    os.remove(self.db_path)
+                    self.__conn = self.__connect()
+                except (sqlite3.Error, OSError) as ex:
+                    log.warning(f"ChecksumCache disabled, could not open {self.db_path}, {ex}")
+                    self.db_path = None
+        return self.__conn
+
+    def __connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.schema_version:
+                conn.execute("DROP TABLE IF EXISTS checksum_t")
+                conn.execute(f"PRAGMA user_version = {self.schema_version}")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute(self.create_table_q)
+            conn.commit()
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def stat_key(file_stat):
+        return file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino
+
+    def get(self, file_path):
+        """ return the cached checksum for file_path or None if there is no
+            valid entry for file_path.
+        """
+        retVal = None
+        if self.db_path is not None:
+            abs_path = os.path.abspath(file_path)
+            try:
+                file_stat = os.stat(abs_path)
+            except OSError:
+                file_stat = None
+            with self.__lock:
+                conn = self.__get_conn()
+                if conn is not None:
+                    try:
+                        if file_stat is None:
+                            conn.execute(self.delete_q, (abs_path,))
+                            self.__count_change(conn)
+                        else:
+                            row = conn.execute(self.select_q, (abs_path,)).fetchone()
+                            if row is not None and tuple(row[0:3]) == self.stat_key(file_stat):
+                                retVal = row[3]
+                    except sqlite3.Error as ex:
+                        log.warning(f"ChecksumCache.get failed for {abs_path}, {ex}")
+            if retVal is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return retVal
+
+    def put(self, file_path, stat_before, checksum) -> bool:
+        """ cache checksum for file_path.
+            stat_before is the os.stat_result of the file taken before it's contents were read,
+            it is compared with the file's current stat to verify the file did not change while read.
+            return True if checksum was cached.
+        """
+        retVal = False
+        if self.db_path is not None:
+            abs_path = os.path.abspath(file_path)
+            try:
+                stat_after = os.stat(abs_path)
+            except OSError:
+                stat_after = None
+            if stat_after is not None \
+                    and self.stat_key(stat_before) == self.stat_key(stat_after) \
+                    and time.time_ns() - stat_after.st_mtime_ns > self.racy_window_ns:
+                with self.__lock:
+                    conn = self.__get_conn()
+                    if conn is not None:
+                        try:
+                            conn.execute(self.insert_q, (abs_path, *self.stat_key(stat_after), checksum))
+                            self.__count_change(conn)
+                            retVal = True
+                        except sqlite3.Error as ex:
+                            log.warning(f"ChecksumCache.put failed for {abs_path}, {ex}")
+        return retVal
+
+    def __count_change(self, conn):
+        """ must be called while holding self.__lock """
+        self.__num_uncommitted += 1
+        if self.__num_uncommitted >= self.commit_every:
+            conn.commit()
+            self.__num_uncommitted = 0
+
+
+checksum_cache = ChecksumCache()
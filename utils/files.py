@@ -7,6 +7,9 @@ import shutil
 import time
 import stat
 import fnmatch
+import concurrent.futures
+import threading
+from collections import defaultdict
 from contextlib import contextmanager
 import ssl
 import subprocess
@@ -349,9 +352,7 @@ def download_and_cache_file_or_url(in_url, config_vars, cache_folder: Path, tran
     with MakeDir(cache_folder, report_own_progress=False) as md:
         md()
 
-    url_file_name = last_url_item(in_url)
-    cached_file_name = expected_checksum if expected_checksum else url_file_name
-    cached_file_path = cache_folder.joinpath(cached_file_name)
+    cached_file_path = cached_file_path_for_url(in_url, cache_folder, expected_checksum)
     if expected_checksum is None:  # no checksum? -> force download
         safe_remove_file(cached_file_path)
 
@@ -363,12 +364,25 @@ def download_and_cache_file_or_url(in_url, config_vars, cache_folder: Path, tran
         contents_buffer = read_from_file_or_url(in_url, config_vars, translate_url_callback, expected_checksum,
                                                 encoding=None)
         if contents_buffer:
-            with open(cached_file_path, "wb") as wfd:
-                chown_chmod_on_fd(wfd)
-                wfd.write(contents_buffer)
+            # write to a temporary file first, so a partially written file is never found in the cache
+            temp_file_path = cached_file_path.with_name(f"{cached_file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with open(temp_file_path, "wb") as wfd:
+                    chown_chmod_on_fd(wfd)
+                    wfd.write(contents_buffer)
+                os.replace(temp_file_path, cached_file_path)
+            except OSError:
+                safe_remove_file(temp_file_path)
+                raise
     return cached_file_path
 
 
+def cached_file_path_for_url(in_url, cache_folder: Path, expected_checksum=None) -> Path:
+    """ path of the file download_and_cache_file_or_url caches in_url to, files are named by their checksum when it is known """
+    cached_file_name = expected_checksum if expected_checksum else last_url_item(in_url)
+    return cache_folder.joinpath(cached_file_name)
+
+
 def download_from_file_or_url(in_url, config_vars, in_target_path=None, translate_url_callback=None, cache_folder=None,
                               expected_checksum=None):
     """
@@ -407,6 +421,39 @@ def download_from_file_or_url(in_url, config_vars, in_target_path=None, translat
     return final_file_path
 
 
+def download_from_file_or_url_in_parallel(download_kwargs_list, num_workers=8):
+    """ call download_from_file_or_url for each dict of keyword arguments in download_kwargs_list,
+        with up to num_workers downloads (and decompressions) running at the same time.
+        Final file paths are yielded in the order of download_kwargs_list, each as soon as it's download
+        is done, so the caller can process a file while the next ones are still downloading.
+        Exception raised by a download is raised when it's turn to be yielded comes, downloads that did not start yet are cancelled.
+        Downloads that are cached to the same file (e.g. files with identical contents) are done one after the other
+        by the same worker, so the first downloads to the cache and the others are copied from it.
+    """
+    def download_one_after_the_other(kwargs_list):
+        return [download_from_file_or_url(**download_kwargs) for download_kwargs in kwargs_list]
+
+    kwargs_by_cache_path = defaultdict(list)
+    position_in_group = list()  # (cache key, index in group) for each item in download_kwargs_list
+    for download_kwargs in download_kwargs_list:
+        cache_folder = download_kwargs.get("cache_folder")
+        if cache_folder:
+            cache_key = cached_file_path_for_url(download_kwargs["in_url"], cache_folder, download_kwargs.get("expected_checksum"))
+        else:
+            cache_key = len(position_in_group)
+        position_in_group.append((cache_key, len(kwargs_by_cache_path[cache_key])))
+        kwargs_by_cache_path[cache_key].append(download_kwargs)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        futures = {cache_key: executor.submit(download_one_after_the_other, kwargs_list) for cache_key, kwargs_list in kwargs_by_cache_path.items()}
+        try:
+            for cache_key, index_in_group in position_in_group:
+                yield futures[cache_key].result()[index_in_group]
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+
 class ChangeDirIfExists(object):
     """Context manager for changing the current working directory"""
 
@@ -281,6 +281,10 @@ def ParallelContinuationIter(*iterables):
         yield list(map(next, continue_iterables))
 
 
+# size of the buffer used to read files for checksum calculation
+checksum_read_buffer_size = 1024 * 1024
+
+
 def get_buffer_checksum(buff):
     sha1ner = hashlib.sha1()
     sha1ner.update(buff)
@@ -288,6 +292,24 @@ def get_buffer_checksum(buff):
     return retVal
 
 
+def get_fd_checksum(rfd, buffer_size=None):
+    """ return the sha1 checksum of the contents of a file opened for binary read.
+        File is read in chunks of buffer_size bytes into one reused buffer,
+        so memory usage does not depend on the size of the file.
+    """
+    if not buffer_size:
+        buffer_size = checksum_read_buffer_size
+    sha1ner = hashlib.sha1()
+    buff = bytearray(buffer_size)
+    buff_view = memoryview(buff)
+    num_read = rfd.readinto(buff)
+    while num_read:
+        sha1ner.update(buff_view[:num_read])
+        num_read = rfd.readinto(buff)
+    retVal = sha1ner.hexdigest()
+    return retVal
+
+
 def compare_checksums(_1st_checksum, _2nd_checksum):
     retVal = _1st_checksum.lower() == _2nd_checksum.lower()
     return retVal
@@ -303,25 +325,33 @@ def check_file_checksum(file_path, expected_checksum):
     retVal = False  # if file does not exist return False
     if file_path and expected_checksum:  # prevent reading the file if file_path or expected_checksum is None
         try:
-            with open(file_path, "rb") as rfd:
-                retVal = check_buffer_checksum(rfd.read(), expected_checksum)
+            retVal = compare_checksums(get_file_checksum(file_path), expected_checksum)
         except:
             pass
     return retVal
 
 
-def get_file_checksum(file_path, follow_symlinks=True):
+def get_file_checksum(file_path, follow_symlinks=True, buffer_size=None):
     """ return the sha1 checksum of the contents of a file.
         If file_path is a symbolic link and follow_symlinks is True
             the file pointed by the symlink is checksumed.
         If file_path is a symbolic link and follow_symlinks is False
             the contents of the symlink is checksumed - by calling os.readlink.
+        Checksums of files (but not of symlinks contents) are looked up in,
+        and added to, utils.checksum_cache - if the cache was opened.
+        File is read in chunks of buffer_size bytes, see get_fd_checksum.
     """
     if os.path.islink(file_path) and not follow_symlinks:
         retVal = get_buffer_checksum(os.readlink(file_path).encode())
     else:
-        with open(file_path, "rb") as rfd:
-            retVal = get_buffer_checksum(rfd.read())
+        retVal = utils.checksum_cache.get(file_path)
+        if retVal is None:
+            with open(file_path, "rb", buffering=0) as rfd:
+                stat_before = os.fstat(rfd.fileno())
+                # no need for a buffer larger than the file
+                buffer_size = min(buffer_size or checksum_read_buffer_size, stat_before.st_size + 1)
+                retVal = get_fd_checksum(rfd, buffer_size)
+            utils.checksum_cache.put(file_path, stat_before, retVal)
     return retVal
 
 
@@ -619,7 +649,7 @@ def original_names_from_wtars_names(original_list):
     return replaced_list
 
 
-def get_recursive_checksums(some_path, ignore=None):
+def get_recursive_checksums(some_path, ignore=None, known_checksums=None):
     """ If some_path is a file return a dict mapping the file's path to it's sha1 checksum
         and mapping "total_checksum" to the files checksum, e.g.
         assuming /a/b/c.txt is a file
@@ -637,28 +667,51 @@ def get_recursive_checksums(some_path, ignore=None):
         Sorting is done to ensure same total_checksum is returned regardless the order
         in which os.scandir returned the files, but that a different checksum will be
         returned if a file changed it's name without changing contents.
+        known_checksums: optional dict mapping a path (as it would appear in the returned dict) to
+            [size, mtime_ns, inode, checksum], the checksum is used instead of reading the file
+            if size, mtime_ns and inode of the file (lstat) are still the same.
         Note:
             - If you have a file called total_checksum your'e f**d.
             - Symlinks are not followed and are checksum as regular files (by calling readlink).
     """
     if ignore is None:
         ignore = ()
+    if known_checksums is None:
+        known_checksums = dict()
     retVal = dict()
     some_path_dir, some_path_leaf = os.path.split(some_path)
     if some_path_leaf not in ignore:
-        if os.path.isfile(some_path):
-            retVal[some_path_leaf] = get_file_checksum(some_path, follow_symlinks=False)
-        elif os.path.isdir(some_path):
-            for item in utils.scandir_walk(some_path, report_dirs=False):
-                item_path_dir, item_path_leaf = os.path.split(item.path)
-                if item_path_leaf not in ignore:
-                    the_checksum = get_file_checksum(item.path, follow_symlinks=False)
-                    normalized_path = PurePath(item.path).as_posix()
-                    retVal[normalized_path] = the_checksum
-
-        checksum_list = sorted(list(retVal.keys()) + list(retVal.values()))
-        string_of_checksums = "".join(checksum_list)
-        retVal['total_checksum'] = get_buffer_checksum(string_of_checksums.encode())
+        for normalized_path, item_path in paths_to_checksum(some_path, ignore):
+            the_checksum = None
+            known = known_checksums.get(normalized_path)
+            if known is not None and tuple(known[0:3]) == utils.ChecksumCache.stat_key(os.lstat(item_path)):
+                the_checksum = known[3]
+            if the_checksum is None:
+                the_checksum = get_file_checksum(item_path, follow_symlinks=False)
+            retVal[normalized_path] = the_checksum
+        retVal['total_checksum'] = get_total_checksum(retVal)
+    return retVal
+
+
+def paths_to_checksum(some_path, ignore=()):
+    """ yield (normalized_path, path) for each file get_recursive_checksums(some_path) checksums.
+        normalized_path is the key used in get_recursive_checksums's returned dict
+    """
+    some_path_dir, some_path_leaf = os.path.split(some_path)
+    if os.path.isfile(some_path):
+        yield some_path_leaf, some_path
+    elif os.path.isdir(some_path):
+        for item in utils.scandir_walk(some_path, report_dirs=False):
+            item_path_dir, item_path_leaf = os.path.split(item.path)
+            if item_path_leaf not in ignore:
+                yield PurePath(item.path).as_posix(), item.path
+
+
+def get_total_checksum(checksums):
+    """ calculate total_checksum from a dict mapping paths to checksums, see get_recursive_checksums """
+    checksum_list = sorted(list(checksums.keys()) + list(checksums.values()))
+    string_of_checksums = "".join(checksum_list)
+    retVal = get_buffer_checksum(string_of_checksums.encode())
     return retVal
 
 
@@ -689,9 +742,10 @@ def obj_memory_size(obj, seen=None):
 def get_wtar_total_checksum(wtar_file_path):
     tar_total_checksum = None
     try:
-        if not os.path.isfile(wtar_file_path):
-            wtar_file_path += ".aa"
-        if os.path.isfile(wtar_file_path):
+        wtar_file_path = Path(wtar_file_path)  # find_split_files expects a Path
+        if not wtar_file_path.is_file():
+            wtar_file_path = wtar_file_path.with_name(wtar_file_path.name + ".aa")
+        if wtar_file_path.is_file():
             wtar_file_paths = utils.find_split_files(wtar_file_path)
             with utils.MultiFileReader("br", wtar_file_paths) as fd:
                 with tarfile.open(fileobj=fd) as tar:
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3.9
+
+import io
+import os
+import bz2
+import collections
+import concurrent.futures
+
+
+"""
+    ParallelBZ2Writer compresses the data written to it with bz2, using several threads.
+    Data is cut into blocks of block_size bytes, each block is compressed independently
+    to a complete bz2 stream and the streams are written in order to the output file.
+    The output is a standard multi-stream bz2 file that bz2.open, bz2.decompress, BZ2File
+    and tarfile (mode 'r', 'r:*' or 'r:bz2') read as one continuous stream.
+    bz2 compression releases the GIL so threads are enough to use several cores.
+    ParallelBZ2Writer implements the io.RawIOBase interface for writing.
+
+    Example, creating a bz2 compressed tar file:
+        with ParallelBZ2Writer('a.tar.bz2', compresslevel=1, num_workers=8) as bz2_writer:
+            with tarfile.open(fileobj=bz2_writer, mode='w', format=tarfile.PAX_FORMAT) as tar:
+                tar.add('a')
+"""
+
+
+class ParallelBZ2Writer(io.RawIOBase):
+    def __init__(self, file_to_write, compresslevel=9, num_workers=4, block_size=1024 * 1024) -> None:
+        """ file_to_write: path or binary file object opened for writing. A file opened here is also closed here.
+            block_size: bytes of uncompressed data per bz2 stream. Each stream has a few bytes of overhead and
+                bz2 blocks do not span streams, so block_size should be a few times compresslevel*100k.
+        """
+        super().__init__()
+        if hasattr(file_to_write, "write"):
+            self.fileobj = file_to_write
+            self.own_fileobj = False
+        else:
+            self.fileobj = open(os.fspath(file_to_write), "wb")
+            self.own_fileobj = True
+        self.compresslevel = compresslevel
+        self.block_size = block_size
+        self.max_pending_blocks = max(1, num_workers) * 2  # limit memory used by blocks waiting to be compressed or written
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, num_workers), thread_name_prefix="ParallelBZ2Writer")
+        self.pending_blocks = collections.deque()
+        self.buffer = bytearray()
+        self.position = 0  # number of uncompressed bytes written so far
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed ParallelBZ2Writer")
+        self.buffer += data
+        num_bytes = len(data) if not isinstance(data, memoryview) else data.nbytes
+        self.position += num_bytes
+        while len(self.buffer) >= self.block_size:
+            self.compress_block(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return num_bytes
+
+    def compress_block(self, block: bytes) -> None:
+        self.pending_blocks.append(self.executor.submit(bz2.compress, block, self.compresslevel))
+        while len(self.pending_blocks) > self.max_pending_blocks:
+            self.write_next_compressed_block()
+
+    def write_next_compressed_block(self) -> None:
+        compressed_block = self.pending_blocks.popleft().result()
+        self.fileobj.write(compressed_block)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            # empty input should still produce a valid bz2 file, so the last block is compressed even if empty
+            if self.buffer or self.position == 0:
+                self.compress_block(bytes(self.buffer))
+                self.buffer.clear()
+            while self.pending_blocks:
+                self.write_next_compressed_block()
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            if self.own_fileobj:
+                self.fileobj.close()
+            else:
+                self.fileobj.flush()
+            super().close()
@@ -4,13 +4,13 @@
 import subprocess
 import sys
 import os
-import time
+import codecs
 import signal
 import logging
 import psutil
 from itertools import repeat
 from concurrent import futures
-from threading import Timer
+from threading import Timer, Thread, Event
 
 import utils
 
@@ -19,6 +19,8 @@ log = logging.getLogger()
 exit_val = 0
 aborted = False
 process_list = list()
+enqueue_output_read_size = 64 * 1024
+enqueue_output_drain_timeout = 5.0  # seconds to read output after the process exited
 
 
 class ProcessTerminatedExternally(RuntimeError):
@@ -80,19 +82,16 @@ def run_process(command, shell, do_enqueue_output=True, abort_file=None):
         t.start()
 
     try:
-        while True:
-            if do_enqueue_output:  # Calling enqueue_output only if abort file is not used.
-                enqueue_output(a_process)
-            status = a_process.poll()
-            if status is not None:  # None means it's still alive
-                log.debug(f'Process finished - {command}')
-                if aborted:
-                    exit_val = status
-                    raise ProcessTerminatedExternally(command)
-                elif status != 0:
-                    exit_val = status
-                    raise RuntimeError(f'Command failed {command}')
-                break
+        if do_enqueue_output:  # Calling enqueue_output only if abort file is not used.
+            enqueue_output(a_process)  # returns when the process exited and it's output was read
+        status = a_process.wait()  # blocking wait, abort file timer will kill the process if needed
+        log.debug(f'Process finished - {command}')
+        if aborted:
+            exit_val = status
+            raise ProcessTerminatedExternally(command)
+        elif status != 0:
+            exit_val = status
+            raise RuntimeError(f'Command failed {command}')
     finally:
         if t is not None:
             t.cancel()
@@ -109,7 +108,8 @@ def launch_process(command, shell, do_enqueue_output):
     if getattr(os, "setsid", None):  # UNIX
         kwargs['preexec_fn'] = os.setsid
     if do_enqueue_output:
-        kwargs.update({'stdout': subprocess.PIPE, 'stderr': subprocess.PIPE, 'bufsize': 128})
+        # stderr is redirected to stdout so a process writing a lot to stderr will not block on a full pipe
+        kwargs.update({'stdout': subprocess.PIPE, 'stderr': subprocess.STDOUT, 'bufsize': enqueue_output_read_size})
     try:
         a_process = subprocess.Popen(full_command, shell=shell, env=os.environ, **kwargs)
     except Exception as e:
@@ -118,25 +118,43 @@ def launch_process(command, shell, do_enqueue_output):
     return a_process
 
 
-def enqueue_output(a_process):
-    out = a_process.stdout
+def enqueue_output(a_process, drain_timeout=None):
+    """ log the process output line by line, until the process closes it's output.
+        A background process started by the process can keep the output open long after the process exited,
+        so once the process exited, output is read for at most drain_timeout more seconds.
+    """
+    if drain_timeout is None:
+        drain_timeout = enqueue_output_drain_timeout
+    stop_reading = Event()
+    reader = Thread(target=log_process_output, args=(a_process.stdout, stop_reading), daemon=True)
+    reader.start()
+    a_process.wait()
+    reader.join(drain_timeout)
+    if reader.is_alive():
+        stop_reading.set()
+        log.debug(f"stopped logging output of {a_process.args}, output was not closed {drain_timeout} seconds after process exited")
+
+
+def log_process_output(out, stop_reading):
+    """ log lines read from out until EOF or until stop_reading is set.
+        read1 blocks until some output is available, so no CPU is used while the process is silent.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='backslashreplace')
     try:
         buffer = ''
-        while True:
-            time.sleep(0)  # Releasing thread to yield other threads to do work
-            if a_process.poll() is not None:
+        while not stop_reading.is_set():
+            b = out.read1(enqueue_output_read_size)
+            if not b or stop_reading.is_set():  # EOF or process exited long ago
                 break
-            b = out.read(128).decode('utf-8', errors='backslashreplace')  # Reading stream to buffer
-            if b:
-                buffer += b
-                if '\n' in buffer:
-                    to_print = buffer.split('\n')
-                    for line in to_print[:-1]:  # Logging every line except the last one in the buffer
-                        log.info(line.strip('\r\n'))
-                    if to_print[-1].endswith('\n'):  # In case the last line in the buffer ends with a newline
-                        log.info(to_print[-1].strip('\r\n'))
-                    else:
-                        buffer = to_print[-1]  # Store the rest for the next round of read
+            buffer += decoder.decode(b)
+            if '\n' in buffer:
+                to_print = buffer.split('\n')
+                for line in to_print[:-1]:  # Logging every line except the last one in the buffer
+                    log.info(line.strip('\r\n'))
+                buffer = to_print[-1]  # Store the rest for the next round of read
+        buffer += decoder.decode(b'', final=True)
+        if buffer:
+            log.info(buffer.strip('\r\n'))
 
     except ValueError as e:
         pass  # on mac the stdout is closed when the process is terminated. In this case we ignore
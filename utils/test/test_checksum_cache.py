@@ -0,0 +1,128 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import unittest
+
+import utils
+from utils.checksum_cache import ChecksumCache
+
+
+class TestChecksumCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.temp_dir, "bookkeeping", "checksum_cache.sqlite")
+        self.cache = ChecksumCache(racy_window_sec=0)
+        self.cache.open(self.cache_path)
+
+    def tearDown(self):
+        self.cache.disable()
+        utils.checksum_cache.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_file(self, name, contents, age_sec=10):
+        file_path = os.path.join(self.temp_dir, name)
+        with open(file_path, "wb") as wfd:
+            wfd.write(contents)
+        past = time.time() - age_sec
+        os.utime(file_path, (past, past))
+        return file_path
+
+    def put_file(self, file_path):
+        the_stat = os.stat(file_path)
+        checksum = utils.get_buffer_checksum(open(file_path, "rb").read())
+        return self.cache.put(file_path, the_stat, checksum), checksum
+
+    def test_disabled_cache(self):
+        disabled_cache = ChecksumCache()
+        file_path = self.make_file("a.txt", b"abc")
+        self.assertFalse(disabled_cache.is_enabled())
+        self.assertFalse(disabled_cache.put(file_path, os.stat(file_path), "123"))
+        self.assertIsNone(disabled_cache.get(file_path))
+
+    def test_hit_and_persist(self):
+        file_path = self.make_file("a.txt", b"abc")
+        self.assertIsNone(self.cache.get(file_path))
+        was_put, checksum = self.put_file(file_path)
+        self.assertTrue(was_put)
+        self.assertEqual(checksum, self.cache.get(file_path))
+        # reopen to verify checksum was persisted
+        self.cache.close()
+        reopened_cache = ChecksumCache(racy_window_sec=0)
+        reopened_cache.open(self.cache_path)
+        self.assertEqual(checksum, reopened_cache.get(file_path))
+        reopened_cache.close()
+
+    def test_invalidate_on_size_change(self):
+        file_path = self.make_file("a.txt", b"abc")
+        self.put_file(file_path)
+        mtime_ns = os.stat(file_path).st_mtime_ns
+        with open(file_path, "ab") as wfd:
+            wfd.write(b"d")
+        os.utime(file_path, ns=(mtime_ns, mtime_ns))  # same mtime, different size
+        self.assertIsNone(self.cache.get(file_path))
+
+    def test_invalidate_on_mtime_change(self):
+        file_path = self.make_file("a.txt", b"abc")
+        self.put_file(file_path)
+        with open(file_path, "wb") as wfd:
+            wfd.write(b"xyz")  # same size, different mtime
+        self.assertIsNone(self.cache.get(file_path))
+
+    def test_invalidate_on_inode_change(self):
+        file_path = self.make_file("a.txt", b"abc")
+        self.put_file(file_path)
+        the_stat = os.stat(file_path)
+        replacement_path = self.make_file("b.txt", b"xyz")
+        os.utime(replacement_path, ns=(the_stat.st_atime_ns, the_stat.st_mtime_ns))
+        os.replace(replacement_path, file_path)  # same size & mtime, different inode
+        self.assertIsNone(self.cache.get(file_path))
+
+    def test_removed_file(self):
+        file_path = self.make_file("a.txt", b"abc")
+        self.put_file(file_path)
+        os.remove(file_path)
+        self.assertIsNone(self.cache.get(file_path))
+        self.make_file("a.txt", b"abc")
+        self.assertIsNone(self.cache.get(file_path))
+
+    def test_racy_file_not_cached(self):
+        racy_cache = ChecksumCache(racy_window_sec=60)
+        racy_cache.open(self.cache_path)
+        file_path = self.make_file("a.txt", b"abc", age_sec=0)
+        self.assertFalse(racy_cache.put(file_path, os.stat(file_path), "123"))
+        self.assertIsNone(racy_cache.get(file_path))
+        racy_cache.close()
+
+    def test_changed_while_checksummed_not_cached(self):
+        file_path = self.make_file("a.txt", b"abc")
+        stat_before = os.stat(file_path)
+        self.make_file("a.txt", b"abcdef")
+        self.assertFalse(self.cache.put(file_path, stat_before, "123"))
+
+    def test_corrupted_cache_file(self):
+        self.cache.close()
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, "wb") as wfd:
+            wfd.write(b"this is not an sqlite file" * 100)
+        file_path = self.make_file("a.txt", b"abc")
+        self.assertIsNone(self.cache.get(file_path))
+        was_put, checksum = self.put_file(file_path)
+        self.assertTrue(was_put)
+        self.assertEqual(checksum, self.cache.get(file_path))
+
+    def test_get_file_checksum_uses_cache(self):
+        utils.checksum_cache.open(os.path.join(self.temp_dir, "global_cache.sqlite"))
+        file_path = self.make_file("a.txt", b"abc")
+        expected_checksum = hashlib.sha1(b"abc").hexdigest()
+        self.assertEqual(expected_checksum, utils.get_file_checksum(file_path))
+        hits_before = utils.checksum_cache.hits
+        self.assertEqual(expected_checksum, utils.get_file_checksum(file_path))
+        self.assertTrue(utils.check_file_checksum(file_path, expected_checksum.upper()))
+        self.assertFalse(utils.need_to_download_file(file_path, expected_checksum))
+        self.assertEqual(hits_before + 3, utils.checksum_cache.hits)
+        # modified file must be re-checksummed
+        self.make_file("a.txt", b"abcd")
+        self.assertEqual(hashlib.sha1(b"abcd").hexdigest(), utils.get_file_checksum(file_path))
+        self.assertTrue(utils.need_to_download_file(file_path, expected_checksum))
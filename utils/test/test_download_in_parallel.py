@@ -0,0 +1,112 @@
+import os
+import time
+import zlib
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import utils
+from configVar import config_vars
+
+
+class TestDownloadInParallel(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.source_folder = self.temp_dir.joinpath("source")
+        self.source_folder.mkdir()
+        self.target_folder = self.temp_dir.joinpath("target")
+        self.target_folder.mkdir()
+        self.cache_folder = self.temp_dir.joinpath("cache")
+        self.contents = dict()
+        self.download_kwargs_list = list()
+        for i in range(1, 13):
+            name = f"{i}_info_map.txt"
+            self.contents[name] = "".join(f"Mac/{i}/file_{j}.txt, f, 1, {j:040x}, {j}\n" for j in range(i * 10)).encode()
+            if i % 2:  # odd ones are compressed
+                source_path = self.source_folder.joinpath(f"{name}.wzip")
+                source_path.write_bytes(zlib.compress(self.contents[name]))
+            else:
+                source_path = self.source_folder.joinpath(name)
+                source_path.write_bytes(self.contents[name])
+            self.download_kwargs_list.append({"in_url": os.fspath(source_path),
+                                              "config_vars": config_vars,
+                                              "in_target_path": self.target_folder.joinpath(name),
+                                              "cache_folder": self.cache_folder,
+                                              "expected_checksum": utils.get_file_checksum(source_path)})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_results_in_order(self):
+        downloaded = list(utils.download_from_file_or_url_in_parallel(self.download_kwargs_list, num_workers=4))
+        self.assertEqual([kwargs["in_target_path"] for kwargs in self.download_kwargs_list], downloaded)
+        for name, contents in self.contents.items():
+            self.assertEqual(contents, self.target_folder.joinpath(name).read_bytes(), name)
+        # downloaded files are cached by checksum, compressed ones before decompression
+        for kwargs in self.download_kwargs_list:
+            self.assertTrue(self.cache_folder.joinpath(kwargs["expected_checksum"]).is_file())
+
+    def test_concurrent_downloads(self):
+        original_download = utils.files.download_and_cache_file_or_url
+        lock = threading.Lock()
+        running = [0, 0]  # currently running, max running
+
+        def slow_download(**kwargs):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return original_download(**kwargs)
+
+        with mock.patch("utils.files.download_and_cache_file_or_url", side_effect=slow_download):
+            downloaded = list(utils.download_from_file_or_url_in_parallel(self.download_kwargs_list, num_workers=4))
+        self.assertEqual(len(self.download_kwargs_list), len(downloaded))
+        self.assertGreater(running[1], 1)
+        self.assertLessEqual(running[1], 4)
+
+    def test_bad_checksum(self):
+        self.download_kwargs_list[5]["expected_checksum"] = "0123456789abcdef0123456789abcdef01234567"
+        downloaded = list()
+        with self.assertRaises(IOError):
+            for final_path in utils.download_from_file_or_url_in_parallel(self.download_kwargs_list, num_workers=3):
+                downloaded.append(final_path)
+        self.assertEqual(5, len(downloaded))  # the files listed before the bad one were yielded
+
+    def test_identical_contents(self):
+        """ info maps with identical contents are cached to the same file, they should not be downloaded concurrently """
+        identical_kwargs_list = list()
+        for i in range(8):
+            source_path = self.source_folder.joinpath(f"identical_{i}_info_map.txt")
+            source_path.write_bytes(self.contents["2_info_map.txt"])
+            identical_kwargs_list.append({"in_url": os.fspath(source_path),
+                                          "config_vars": config_vars,
+                                          "in_target_path": self.target_folder.joinpath(source_path.name),
+                                          "cache_folder": self.cache_folder,
+                                          "expected_checksum": utils.get_file_checksum(source_path)})
+        self.download_kwargs_list[3:3] = identical_kwargs_list
+        original_read = utils.files.read_from_file_or_url
+        lock = threading.Lock()
+        running = dict()  # cache file name => [currently reading, max reading]
+
+        def slow_read(in_url, config_vars, translate_url_callback, expected_checksum, encoding):
+            with lock:
+                counts = running.setdefault(expected_checksum, [0, 0])
+                counts[0] += 1
+                counts[1] = max(counts)
+            time.sleep(0.02)
+            with lock:
+                counts[0] -= 1
+            return original_read(in_url, config_vars, translate_url_callback, expected_checksum, encoding)
+
+        with mock.patch("utils.files.read_from_file_or_url", side_effect=slow_read):
+            downloaded = list(utils.download_from_file_or_url_in_parallel(self.download_kwargs_list, num_workers=4))
+        self.assertEqual([kwargs["in_target_path"] for kwargs in self.download_kwargs_list], downloaded)
+        for kwargs in identical_kwargs_list:
+            self.assertEqual(self.contents["2_info_map.txt"], kwargs["in_target_path"].read_bytes())
+        self.assertEqual(1, running[identical_kwargs_list[0]["expected_checksum"]][1])
+        self.assertEqual([], list(self.cache_folder.glob("*.tmp")), "temporary cache files should not be left")
@@ -0,0 +1,38 @@
+import os
+import io
+import shutil
+import hashlib
+import tempfile
+import unittest
+
+import utils
+
+
+class TestFileChecksum(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_chunked_checksum_same_as_whole(self):
+        buffer_size = 4096
+        for size in (0, 1, buffer_size - 1, buffer_size, buffer_size + 1, 3 * buffer_size, 3 * buffer_size + 17):
+            contents = os.urandom(size)
+            expected_checksum = hashlib.sha1(contents).hexdigest()
+            file_path = os.path.join(self.temp_dir, f"file_{size}")
+            with open(file_path, "wb") as wfd:
+                wfd.write(contents)
+            self.assertEqual(expected_checksum, utils.get_file_checksum(file_path, buffer_size=buffer_size), f"size {size}")
+            self.assertEqual(expected_checksum, utils.get_file_checksum(file_path), f"size {size}")
+            self.assertEqual(expected_checksum, utils.get_fd_checksum(io.BytesIO(contents), buffer_size=buffer_size), f"size {size}")
+            self.assertTrue(utils.check_file_checksum(file_path, expected_checksum))
+
+    def test_symlink_checksum(self):
+        target_path = os.path.join(self.temp_dir, "target")
+        with open(target_path, "wb") as wfd:
+            wfd.write(b"target contents")
+        link_path = os.path.join(self.temp_dir, "link")
+        os.symlink("target", link_path)
+        self.assertEqual(hashlib.sha1(b"target").hexdigest(), utils.get_file_checksum(link_path, follow_symlinks=False))
+        self.assertEqual(hashlib.sha1(b"target contents").hexdigest(), utils.get_file_checksum(link_path, follow_symlinks=True))
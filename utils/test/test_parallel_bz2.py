@@ -0,0 +1,87 @@
+import io
+import os
+import bz2
+import random
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+import utils
+
+
+class TestParallelBZ2Writer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def compressible_data(self, size):
+        rand = random.Random(size)
+        words = [bytes(rand.choices(range(97, 123), k=rand.randint(2, 9))) for _ in range(500)]
+        return b" ".join(rand.choices(words, k=size // 4 + 1))[:size]
+
+    def test_round_trip(self):
+        block_size = 64 * 1024
+        for size in (0, 1, block_size - 1, block_size, block_size + 1, 7 * block_size + 513):
+            data = self.compressible_data(size)
+            file_path = os.path.join(self.temp_dir, f"data_{size}.bz2")
+            with utils.ParallelBZ2Writer(file_path, compresslevel=1, num_workers=3, block_size=block_size) as bz2_writer:
+                # write in odd sized pieces so blocks are cut in the middle of writes
+                for i in range(0, size, 10_007):
+                    bz2_writer.write(data[i:i + 10_007])
+                self.assertEqual(bz2_writer.tell(), size)
+            with open(file_path, "rb") as rfd:
+                compressed = rfd.read()
+            self.assertEqual(bz2.decompress(compressed), data, f"size {size}")
+            with bz2.open(file_path, "rb") as rfd:
+                self.assertEqual(rfd.read(), data, f"size {size}")
+            num_streams = compressed.count(b"BZh1")
+            self.assertGreaterEqual(num_streams, max(1, -(-size // block_size)), f"size {size}")
+
+    def test_write_to_file_object(self):
+        data = self.compressible_data(300_000)
+        out_fd = io.BytesIO()
+        with utils.ParallelBZ2Writer(out_fd, compresslevel=9, num_workers=2, block_size=100_000) as bz2_writer:
+            bz2_writer.write(memoryview(data))
+        self.assertFalse(out_fd.closed, "file object passed to ParallelBZ2Writer should not be closed")
+        self.assertEqual(bz2.decompress(out_fd.getvalue()), data)
+
+    def test_deterministic_output(self):
+        data = self.compressible_data(1_000_000)
+        outputs = set()
+        for num_workers in (1, 2, 8):
+            out_fd = io.BytesIO()
+            with utils.ParallelBZ2Writer(out_fd, compresslevel=1, num_workers=num_workers, block_size=128 * 1024) as bz2_writer:
+                bz2_writer.write(data)
+            outputs.add(out_fd.getvalue())
+        self.assertEqual(len(outputs), 1, "output should not depend on the number of workers")
+
+    def test_tar_round_trip(self):
+        source_folder = os.path.join(self.temp_dir, "source")
+        os.makedirs(os.path.join(source_folder, "sub"))
+        for i in range(20):
+            with open(os.path.join(source_folder, "sub" if i % 2 else "", f"file_{i}.txt"), "wb") as wfd:
+                wfd.write(self.compressible_data(i * 9_000))
+        single_stream_path = os.path.join(self.temp_dir, "single.tar.bz2")
+        multi_stream_path = os.path.join(self.temp_dir, "multi.tar.bz2")
+        pax_headers = {"total_checksum": "1234"}
+        with tarfile.open(single_stream_path, "w:bz2", format=tarfile.PAX_FORMAT, pax_headers=pax_headers, compresslevel=1) as tar:
+            tar.add(source_folder, arcname="source")
+        with utils.ParallelBZ2Writer(multi_stream_path, compresslevel=1, num_workers=4, block_size=32 * 1024) as bz2_writer:
+            with tarfile.open(fileobj=bz2_writer, mode="w", format=tarfile.PAX_FORMAT, pax_headers=pax_headers) as tar:
+                tar.add(source_folder, arcname="source")
+
+        # byte level compatibility: uncompressed tar is the same
+        with bz2.open(single_stream_path, "rb") as single_fd, bz2.open(multi_stream_path, "rb") as multi_fd:
+            self.assertEqual(single_fd.read(), multi_fd.read())
+        with tarfile.open(multi_stream_path) as tar:
+            self.assertEqual(tar.pax_headers.get("total_checksum"), "1234")
+            extract_folder = os.path.join(self.temp_dir, "extract")
+            tar.extractall(extract_folder)
+        for i in range(20):
+            relative_path = os.path.join("sub" if i % 2 else "", f"file_{i}.txt")
+            with open(os.path.join(extract_folder, "source", relative_path), "rb") as rfd:
+                self.assertEqual(rfd.read(), self.compressible_data(i * 9_000))
+
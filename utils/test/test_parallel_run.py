@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import signal
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from concurrent import futures
+
+from utils import parallel_run
+from utils.parallel_run import run_process, run_processes_in_parallel, ProcessTerminatedExternally
+
+
+@unittest.skipIf(sys.platform == 'win32', "uses posix shell commands")
+class TestParallelRun(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        parallel_run.exit_val = 0
+        parallel_run.aborted = False
+        self.saved_signal_handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGABRT, signal.SIGFPE, signal.SIGILL, signal.SIGINT, signal.SIGSEGV, signal.SIGTERM)}
+
+    def tearDown(self):
+        for sig, handler in self.saved_signal_handlers.items():
+            signal.signal(sig, handler)
+        parallel_run.process_list.clear()
+        parallel_run.exit_val = 0
+        parallel_run.aborted = False
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def run_many(self, commands, do_enqueue_output):
+        with futures.ThreadPoolExecutor(len(commands)) as executor:
+            list(executor.map(lambda c: run_process(c, False, do_enqueue_output), commands))
+
+    def test_supervisor_cpu_time(self):
+        commands = [["sleep", "1"] for _ in range(16)]
+        for do_enqueue_output in (False, True):
+            cpu_before, wall_before = time.process_time(), time.perf_counter()
+            self.run_many(commands, do_enqueue_output)
+            cpu_time, wall_time = time.process_time() - cpu_before, time.perf_counter() - wall_before
+            self.assertGreaterEqual(wall_time, 1.0)
+            self.assertLess(cpu_time, 0.25, f"supervising {len(commands)} processes used {cpu_time:.3f}s CPU, do_enqueue_output={do_enqueue_output}")
+
+    def test_output_is_logged(self):
+        script = "printf 'line 1\\nline 2\\n'; sleep 0.2; echo 'to stderr' 1>&2; printf 'no newline'"
+        with self.assertLogs(level="INFO") as captured:
+            run_process(["sh", "-c", script], False, do_enqueue_output=True)
+        self.assertEqual(["line 1", "line 2", "to stderr", "no newline"], [r.getMessage() for r in captured.records])
+
+    def test_background_process_holds_output(self):
+        """ a process that exited should not be waited for because a background process it started still holds it's output """
+        script = "echo started; sleep 30 & echo done"
+        with unittest.mock.patch.object(parallel_run, "enqueue_output_drain_timeout", 0.5):
+            start_time = time.perf_counter()
+            with self.assertLogs(level="INFO") as captured:
+                run_process(["sh", "-c", script], False, do_enqueue_output=True)
+            self.assertLess(time.perf_counter() - start_time, 5)
+        self.assertEqual(["started", "done"], [r.getMessage() for r in captured.records])
+        os.killpg(parallel_run.process_list[-1].pid, signal.SIGTERM)
+
+    def test_failed_process(self):
+        with self.assertRaises(RuntimeError):
+            run_process(["sh", "-c", "exit 3"], False, do_enqueue_output=True)
+        self.assertEqual(3, parallel_run.exit_val)
+
+    def test_abort_file(self):
+        abort_file = os.path.join(self.temp_dir, "abort.txt")
+        open(abort_file, "w").close()
+        futures.ThreadPoolExecutor(1).submit(lambda: (time.sleep(0.5), os.remove(abort_file)))
+        start_time = time.perf_counter()
+        with self.assertRaises(ProcessTerminatedExternally):
+            run_process(["sleep", "30"], False, abort_file=abort_file)
+        self.assertLess(time.perf_counter() - start_time, 5)
+
+    def test_wait_groups(self):
+        """ commands after "wait" should start only after all commands before it finished """
+        marker = os.path.join(self.temp_dir, "marker")
+        commands = [["sh", "-c", f"sleep 0.5; touch '{marker}'"], ["true"],
+                    ["wait"],
+                    ["test", "-f", marker]]
+        with self.assertRaises(SystemExit) as context:
+            run_processes_in_parallel(commands)
+        self.assertEqual(0, context.exception.code)
+
+        os.remove(marker)
+        commands = [["sh", "-c", f"sleep 0.5; touch '{marker}'"], ["test", "-f", marker]]
+        with self.assertRaises(SystemExit) as context:
+            run_processes_in_parallel(commands)
+        self.assertNotEqual(0, context.exception.code)